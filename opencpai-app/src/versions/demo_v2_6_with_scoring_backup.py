@@ -34,6 +34,10 @@ VBA宏执行顺序:
     D5 附注平衡: 10分
     D6 数据比对: 30分
 
+用法:
+    python demo_v2_6_with_scoring_backup.py                        # 单个样本（配置区SAMPLE_DIR）
+    python demo_v2_6_with_scoring_backup.py --batch 样本30份 --workers 4   # 批量并发
+
 作者: CTO合伙人
 """
 
@@ -41,7 +45,8 @@ import sys
 import os
 import re
 import json
-import requests
+import functools
+from concurrent.futures import Future
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, List, Tuple, Optional
@@ -64,8 +69,34 @@ sys.path.insert(0, str(PROJECT_ROOT / "OpenCPAiOS-Ling"))
 CLEAN_ROOT = Path(r"D:\桌面\Python清洗科目余额表")
 sys.path.insert(0, str(CLEAN_ROOT))
 
-# 导入PDF审计报告解析器（使用document模块下的版本，支持资产负债表+利润表+现金流量表）
-from jenny.parsers.document.audit_report_parser import AuditReportParser
+# OpenCPAi-Web Python引擎模块（scripts/experimental/opencpai_pipeline）
+WEB_ROOT = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(WEB_ROOT / "scripts" / "experimental"))
+
+from opencpai_pipeline.workbook_backend import as_backend, open_workbook
+from opencpai_pipeline.snapshot import SheetSnapshot
+from opencpai_pipeline.write_plan import WritePlan
+from opencpai_pipeline.session import PipelineSession
+from opencpai_pipeline.excel_pool import init_process_pool, process_pool
+from opencpai_pipeline.engagement import EngagementInputs, discover_engagements
+from opencpai_pipeline.batch import run_batch
+from opencpai_pipeline.registration import BusinessRegistrationClient, RegistrationCache
+from opencpai_pipeline.statements import ParsedStatement, load_statement
+from opencpai_pipeline.line_item_matcher import LineItemMatcher
+from opencpai_pipeline.prior_report import join_prior_report, start_prior_report_parse
+from opencpai_pipeline.km_table import build_km_table, write_km_table
+from opencpai_pipeline.allocation import allocate, load_allocation_rules, missing_sheets
+from opencpai_pipeline.report_extract import extract_report, load_report_sections
+from opencpai_pipeline.check_report import ReportTable, write_check_report_xlsx
+from opencpai_pipeline.pdf_render import render_check_report_pdf, render_workbook_pdf
+from opencpai_pipeline.scoring import ScoreCard, ScoringScheme, default_scheme, load_scoring_scheme, score_workpaper
+from opencpai_pipeline.subject_mapper import AliasStore, SubjectMapper, SubjectMappingResult, standard_name_column
+from opencpai_pipeline.report_cache import ReportCache, parser_version
+from opencpai_pipeline.pdf_cache import PdfDocumentCache, PdfTextStore
+from opencpai_pipeline.scheduler import Stage, StageError, StageScheduler
+from opencpai_pipeline.stage_cache import RunManifest, StageCache
+from opencpai_pipeline.tracing import Tracer, span
+from opencpai_pipeline.balance_ingest import block_bytes_from_mb, write_frame_to_sheet, write_frame_to_xlsx
 
 # =============================================================================
 # 配置
@@ -91,12 +122,103 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # 工商查询API配置（百度企业工商标准版）
 # ⚠️ API密钥从环境变量读取，不硬编码
-BUSINESS_API_URL = "http://gwgp-gwbyafindsn.n.bdcloudapi.com/business2/get"
+BUSINESS_API_URL = os.getenv("BAIDU_BUSINESS_API_URL", "http://gwgp-gwbyafindsn.n.bdcloudapi.com/business2/get")
 BUSINESS_API_CODE = os.getenv("BAIDU_BUSINESS_APP_CODE", "")
 
+# 工商查询磁盘缓存（付费API，同一公司有效期内不重复查询）
+BUSINESS_CACHE_DIR = PROJECT_ROOT / "OpenCPAi测试" / "cache" / "business_info"
+BUSINESS_CACHE_TTL_DAYS = 30
+_REGISTRATION_CLIENT = None
+
 # 🔧 API开关：设为False时使用Mock数据，节省API费用（Web端上线时改为True）
 USE_Z10_API = True
 
+# 🔧 工作簿引擎：读取/比对/评分步骤使用的后端
+#   "openpyxl" - 纯Python，无需启动Excel（Linux可用）
+#   "com"      - win32com，沿用Excel进程
+WORKBOOK_ENGINE = "openpyxl"
+
+# 🔧 余额表分块写入的单块内存上限（MB），大型集团客户可调小
+#   环境变量 OPENCPAI_BALANCE_BLOCK_MB 优先
+BALANCE_BLOCK_MAX_BYTES = block_bytes_from_mb(float(os.getenv("OPENCPAI_BALANCE_BLOCK_MB", "32")))
+
+# 🔧 上年审计报告PDF在流程开始时于后台进程解析（False=Step 4时当前进程解析）
+PRIOR_REPORT_PREFETCH = True
+
+# 🔧 上年审计报告解析结果缓存（按PDF内容+解析器版本，同一PDF重复运行不再解析）
+#   清理: python -m opencpai_pipeline report-cache --dir <目录> purge
+REPORT_CACHE_ENABLED = True
+REPORT_CACHE_DIR = PROJECT_ROOT / "OpenCPAi测试" / "cache" / "audit_reports"
+REPORT_CACHE_MAX_MB = 512
+
+# 🔧 PDF逐页文本缓存目录（按PDF内容哈希，重复运行不再解码）
+PDF_TEXT_CACHE_DIR = PROJECT_ROOT / "OpenCPAi测试" / "cache" / "pdf_text"
+
+# 🔧 阶段调度并行度：线程（文件/网络/等待）与进程（余额表清洗等计算）
+#   批量模式下每个项目已占一个进程，可将 STAGE_CPU_WORKERS 设为0（计算阶段改走线程）
+STAGE_IO_WORKERS = 4
+STAGE_CPU_WORKERS = 1
+
+# 🔧 增量重跑：输入文件/模板/代码未变的阶段直接复用上次输出，只重跑受影响的下游阶段
+#   缓存键含阶段函数源码 + 阶段声明的辅助函数、映射表与开关（修改后只有用到它的阶段失效）
+STAGE_CACHE_ENABLED = True
+STAGE_CACHE_DIR = PROJECT_ROOT / "OpenCPAi测试" / "cache" / "stages"
+STAGE_CACHE_MAX_MB = 2048
+
+# 🔧 KM表生成引擎
+#   "vba"    - 执行KMSCB宏（默认）
+#   "python" - opencpai_pipeline.km_table 由清洗后余额表直接生成（无需Excel宏）
+#   切换前先用 scripts/experimental/golden_km_table.py 对照宏输出校验
+KM_ENGINE = "vba"
+
+# 🔧 底稿分配引擎
+#   "vba"    - 执行newfenpenjxr宏（默认）
+#   "python" - opencpai_pipeline.allocation 按分配规则由KM表计算各底稿写入，批量提交
+#   规则文件不存在或规则中的工作表在模板中缺失时回退到宏；
+#   切换前先用 scripts/experimental/golden_allocation.py 对照宏输出校验
+ALLOCATION_ENGINE = "vba"
+ALLOCATION_RULES_FILE = PROJECT_ROOT / "OpenCPAi测试" / "底稿分配规则.json"
+
+# 🔧 科目名称映射
+#   "vba"    - 执行Auto_MapSubjectNames宏（默认）；Python映射仍会执行，用于D3评分与待确认清单
+#   "python" - 不执行宏，标准科目名写入余额表 SUBJECT_MAP_COLUMN 列
+#   待确认清单填写后导入别名库: python -m opencpai_pipeline subject-alias <别名库> import <清单.csv>
+SUBJECT_MAP_ENGINE = "vba"
+SUBJECT_MAP_COLUMN = 9  # 余额表I列（标准8列之后）
+SUBJECT_ALIAS_FILE = PROJECT_ROOT / "OpenCPAi测试" / "科目映射别名库.json"
+
+# 🔧 财审报告提取
+#   "vba"    - 执行FinPageS宏（默认），Step 8 在输出目录中查找最新的【财审报告】xlsx
+#   "python" - opencpai_pipeline.report_extract 按版式读取已保存底稿、流式写出报告（不需要Excel，
+#              与检查报告并行）；版式文件不存在时回退到宏
+REPORT_ENGINE = "vba"
+REPORT_SPEC_FILE = PROJECT_ROOT / "OpenCPAi测试" / "财审报告版式.json"
+
+# 🔧 PDF渲染引擎（检查报告、财审报告）
+#   "excel"  - COM调用 ExportAsFixedFormat（默认，与人工导出版式一致）
+#   "python" - opencpai_pipeline.pdf_render（reportlab，不需要Excel，Linux可用；财审报告PDF在线程池中生成）
+#   Linux上建议安装可嵌入的中文TrueType字体（如 fonts-wqy-microhei），或用环境变量 OPENCPAI_PDF_FONT 指定
+PDF_ENGINE = "excel"
+
+# 🔧 检查报告xlsx版式（流式写出，不经Excel）
+#   "single"   - 三节写在同一工作表（同原报告）
+#   "sections" - 每节一个工作表（表头冻结、自动筛选），差异项多时便于查看
+CHECK_REPORT_LAYOUT = "single"
+
+# 🔧 评分规则（opencpai_pipeline.scoring）：文件存在时按其中的规则评分，否则使用内置规则
+#   评分读取已保存底稿的 Z7 / Z3-2 / Z3-4 / Z3-5 快照；WORKBOOK_ENGINE="openpyxl" 时在线程池中执行
+SCORING_RULES_FILE = PROJECT_ROOT / "OpenCPAi测试" / "评分规则.json"
+
+# 🔧 Excel实例池（批量模式）：每个工作进程启动时预热一个Excel实例，各项目租用而不是冷启动
+#   实例服务 EXCEL_POOL_MAX_JOBS 个项目后回收；崩溃或健康检查未通过的实例自动替换
+#   宏执行超过 EXCEL_MACRO_TIMEOUT_S 秒视为卡死：结束该Excel实例，项目记为失败，后续项目不受影响
+EXCEL_POOL_ENABLED = True
+EXCEL_POOL_MAX_JOBS = 20
+EXCEL_MACRO_TIMEOUT_S = 1800
+
+# 余额表清洗模块（其源码哈希计入清洗阶段的缓存键）
+CLEANER_MODULE = "core_v4.v4_5_current.universal_cleaner_v4_5"
+
 # Mock工商数据（API关闭时使用）
 MOCK_BUSINESS_DATA = {
     "企业类型": "有限责任公司",
@@ -192,6 +314,26 @@ Z3_2_BALANCE_MAPPING = {
     "负债和所有者权益总计": 80,
 }
 
+# 报表项目别名（新旧准则/企业报表常见写法 -> Z3-2标准项目名）
+Z3_2_BALANCE_ALIASES = {
+    "预付账款": "预付款项",
+    "预收账款": "预收款项",
+    "股本": "实收资本",
+    "实收资本(或股本)": "实收资本",
+    "库存股": "减：库存股",
+    "所有者权益(或股东权益)合计": "所有者权益合计",
+    "股东权益合计": "所有者权益合计",
+    "负债和所有者权益(或股东权益)总计": "负债和所有者权益总计",
+    "负债和股东权益总计": "负债和所有者权益总计",
+}
+
+# Z3-2 比对快照区域：C7:D287（C列=年末余额/本年，D列=年初余额/上年度）
+# 一次区域读取覆盖资产负债表、利润表、现金流量表全部行
+Z3_2_SNAPSHOT_FIRST_ROW = 7
+Z3_2_SNAPSHOT_LAST_ROW = 287
+Z3_2_SNAPSHOT_FIRST_COL = 3  # C列
+Z3_2_SNAPSHOT_LAST_COL = 4   # D列
+
 # -----------------------------------------------------------------------------
 # Z3-2 利润表行号映射（D列=上年度）
 # PDF项目名称 → Z3-2行号
@@ -284,6 +426,23 @@ Z3_2_CASHFLOW_MAPPING = {
     "期末现金及现金等价物余额": 287,
 }
 
+# Z3-2 公式计算行（小计/净额），写入时跳过
+Z3_2_FORMULA_ROWS = {
+    166, 201, 202,  # 经营活动：流入小计、流出小计、净额
+    221, 242, 243,  # 投资活动：流入小计、流出小计、净额
+    261, 282, 283,  # 筹资活动：流入小计、流出小计、净额
+    285,            # 现金及现金等价物净增加额
+}
+
+# Z3-2 利润表/现金流量表区域中模板的空白行（D列）：未映射的明细子项目行，上年数由人工填列，生成底稿时为空
+Z3_2_EMPTY_ROWS = (
+    set(range(95, 119)) | set(range(146, 288))
+) - set(Z3_2_INCOME_MAPPING.values()) - set(Z3_2_CASHFLOW_MAPPING.values()) - Z3_2_FORMULA_ROWS
+
+# Z3-2 批量写入：间隔不超过该行数、且间隔行均为公式行或空白行的写入合并为一次区域写入（间隔行原样回写）
+# 利润表、现金流量表各合并为1次区域写入（各先读取1次公式）
+Z3_2_WRITE_MAX_GAP = 20
+
 # =============================================================================
 # 公司名称提取（多来源）
 # =============================================================================
@@ -350,42 +509,50 @@ def extract_company_name_from_filename(filename: str) -> str:
     return ""
 
 
-def extract_company_name_from_pdf(pdf_path: Path) -> str:
+def extract_company_name_from_pdf(pdf_path: Path, pdf_cache: Optional[PdfDocumentCache] = None) -> str:
     """
     从PDF审计报告中提取公司名称
     
     查找"全体股东："前面的公司名称
+    
+    Args:
+        pdf_cache: 本次运行的PDF文档缓存（页面文本只解码一次，并按文件哈希持久化）
     """
     if not pdf_path.exists():
         return ""
     
+    own_cache = pdf_cache is None
+    if own_cache:
+        pdf_cache = PdfDocumentCache()
+    
     try:
-        import pdfplumber
-        
-        with pdfplumber.open(pdf_path) as pdf:
-            # 只读取前2页
-            for page_num in range(min(2, len(pdf.pages))):
-                page = pdf.pages[page_num]
-                text = page.extract_text()
-                
-                if text:
-                    # 查找"全体股东"模式
-                    match = re.search(r'(.+?(?:公司|企业|集团))\s*全体股东', text)
-                    if match:
-                        return match.group(1).strip()
+        doc = pdf_cache.get(pdf_path)
+        # 只读取前2页
+        for page_num in range(min(2, doc.page_count)):
+            text = doc.page_text(page_num)
+            
+            if text:
+                # 查找"全体股东"模式
+                match = re.search(r'(.+?(?:公司|企业|集团))\s*全体股东', text)
+                if match:
+                    return match.group(1).strip()
         
         return ""
         
     except Exception as e:
         print(f"    PDF公司名称提取失败: {e}")
         return ""
+    finally:
+        if own_cache:
+            pdf_cache.close()
 
 
 def get_company_name_multi_source(
     balance_sheet_path: Optional[Path] = None,
     profit_statement_path: Optional[Path] = None,
     audit_pdf_path: Optional[Path] = None,
-    sample_dir: Optional[Path] = None
+    sample_dir: Optional[Path] = None,
+    pdf_cache: Optional[PdfDocumentCache] = None
 ) -> str:
     """
     从多个来源提取公司名称，按优先级返回
@@ -399,43 +566,19 @@ def get_company_name_multi_source(
     
     # 来源1: PDF审计报告（优先级最高）
     if audit_pdf_path and audit_pdf_path.exists():
-        name = extract_company_name_from_pdf(audit_pdf_path)
+        name = extract_company_name_from_pdf(audit_pdf_path, pdf_cache=pdf_cache)
         if name:
             candidates.append(("PDF审计报告", name))
     
-    # 来源2: 资产负债表Excel
-    if balance_sheet_path and balance_sheet_path.exists():
-        try:
-            df = pd.read_excel(balance_sheet_path, header=None)
-            for i in range(min(5, len(df))):
-                for j in range(min(5, len(df.columns))):
-                    val = df.iloc[i, j]
-                    if isinstance(val, str):
-                        name = extract_company_name_from_text(val)
-                        if name:
-                            candidates.append(("资产负债表", name))
-                            break
-                if candidates and candidates[-1][0] == "资产负债表":
-                    break
-        except Exception:
-            pass
-    
-    # 来源3: 利润表Excel
-    if profit_statement_path and profit_statement_path.exists():
-        try:
-            df = pd.read_excel(profit_statement_path, header=None)
-            for i in range(min(5, len(df))):
-                for j in range(min(5, len(df.columns))):
-                    val = df.iloc[i, j]
-                    if isinstance(val, str):
-                        name = extract_company_name_from_text(val)
-                        if name:
-                            candidates.append(("利润表", name))
-                            break
-                if candidates and candidates[-1][0] == "利润表":
-                    break
-        except Exception:
-            pass
+    # 来源2/3: 资产负债表、利润表Excel（与报表解析共用同一次读取）
+    for label, statement_path in (("资产负债表", balance_sheet_path), ("利润表", profit_statement_path)):
+        if statement_path and statement_path.exists():
+            try:
+                name = load_financial_statement(statement_path).company_name
+                if name:
+                    candidates.append((label, name))
+            except Exception:
+                pass
     
     # 来源4: 目录名/文件名
     if sample_dir:
@@ -462,94 +605,63 @@ def get_company_name_multi_source(
 # 财务报表解析
 # =============================================================================
 
-def parse_balance_sheet_excel(file_path: Path) -> Tuple[Dict[str, float], str]:
+def load_financial_statement(file_path: Path) -> ParsedStatement:
+    """
+    读取财务报表Excel（按路径+修改时间缓存）
+    
+    公司名称提取与报表解析共用同一次读取
+    """
+    return load_statement(file_path, name_extractor=extract_company_name_from_text)
+
+
+def parse_balance_sheet_excel(file_path: Optional[Path]) -> Tuple[Dict[str, float], str]:
     """解析资产负债表Excel"""
-    if not file_path.exists():
+    if file_path is None or not file_path.exists():
         print(f"  警告: 资产负债表文件不存在: {file_path}")
         return {}, ""
     
     try:
-        df = pd.read_excel(file_path, header=None)
-        
-        # 提取公司名称（使用新的提取函数）
-        company_name = ""
-        for i in range(min(5, len(df))):
-            for j in range(min(5, len(df.columns))):
-                val = df.iloc[i, j]
-                if isinstance(val, str):
-                    extracted = extract_company_name_from_text(val)
-                    if extracted:
-                        company_name = extracted
-                        break
-            if company_name:
-                break
-        
-        # 解析数据
-        data = {}
-        for idx, row in df.iterrows():
-            item_name = str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else ""
-            
-            # 匹配已知项目
-            for key in Z3_2_BALANCE_MAPPING.keys():
-                if key in item_name:
-                    # 尝试获取期末余额（通常在第2列或第3列）
-                    for col_idx in [1, 2, 3]:
-                        if col_idx < len(row):
-                            val = row.iloc[col_idx]
-                            if pd.notna(val) and isinstance(val, (int, float)):
-                                data[key] = float(val)
-                                break
-                    break
+        statement = load_financial_statement(file_path)
+        extraction = statement.extract_line_items(BALANCE_SHEET_MATCHER)
+        data = dict(extraction.data)
         
         print(f"  ✓ 资产负债表解析: {len(data)}项")
-        return data, company_name
+        report_ambiguous_line_items(extraction)
+        return data, statement.company_name
         
     except Exception as e:
         print(f"  资产负债表解析错误: {e}")
         return {}, ""
 
 
-def parse_income_statement_excel(file_path: Path) -> Tuple[Dict[str, float], str]:
+# 利润表项目
+INCOME_STATEMENT_ITEMS = ["营业收入", "营业成本", "营业利润", "利润总额", "净利润"]
+
+# 项目匹配器（模块加载时编译一次）
+BALANCE_SHEET_MATCHER = LineItemMatcher(Z3_2_BALANCE_MAPPING.keys(), aliases=Z3_2_BALANCE_ALIASES)
+INCOME_STATEMENT_MATCHER = LineItemMatcher(INCOME_STATEMENT_ITEMS)
+
+
+def report_ambiguous_line_items(extraction) -> None:
+    """打印歧义行（最长候选不唯一，需人工复核）"""
+    for idx, item_name, candidates in extraction.ambiguous_rows:
+        print(f"    ⚠ 第{idx + 1}行 \"{item_name}\" 匹配不唯一: {', '.join(candidates)}")
+
+
+def parse_income_statement_excel(file_path: Optional[Path]) -> Tuple[Dict[str, float], str]:
     """解析利润表Excel"""
-    if not file_path.exists():
+    if file_path is None or not file_path.exists():
         print(f"  警告: 利润表文件不存在: {file_path}")
         return {}, ""
     
     try:
-        df = pd.read_excel(file_path, header=None)
-        
-        # 提取公司名称（使用新的提取函数）
-        company_name = ""
-        for i in range(min(5, len(df))):
-            for j in range(min(5, len(df.columns))):
-                val = df.iloc[i, j]
-                if isinstance(val, str):
-                    extracted = extract_company_name_from_text(val)
-                    if extracted:
-                        company_name = extracted
-                        break
-            if company_name:
-                break
-        
-        # 利润表项目映射
-        income_items = ["营业收入", "营业成本", "营业利润", "利润总额", "净利润"]
-        data = {}
-        
-        for idx, row in df.iterrows():
-            item_name = str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else ""
-            
-            for key in income_items:
-                if key in item_name:
-                    for col_idx in [1, 2, 3]:
-                        if col_idx < len(row):
-                            val = row.iloc[col_idx]
-                            if pd.notna(val) and isinstance(val, (int, float)):
-                                data[key] = float(val)
-                                break
-                    break
+        statement = load_financial_statement(file_path)
+        extraction = statement.extract_line_items(INCOME_STATEMENT_MATCHER)
+        data = dict(extraction.data)
         
         print(f"  ✓ 利润表解析: {len(data)}项")
-        return data, company_name
+        report_ambiguous_line_items(extraction)
+        return data, statement.company_name
         
     except Exception as e:
         print(f"  利润表解析错误: {e}")
@@ -572,22 +684,42 @@ class DiffItem:
     target_label: str = "目标"
 
 
+def load_z32_snapshot(workbook) -> SheetSnapshot:
+    """一次区域读取Z3-2的C7:D287，供所有比对与评分检查共用"""
+    return SheetSnapshot.load(
+        as_backend(workbook),
+        "Z3-2",
+        Z3_2_SNAPSHOT_FIRST_ROW,
+        Z3_2_SNAPSHOT_FIRST_COL,
+        Z3_2_SNAPSHOT_LAST_ROW,
+        Z3_2_SNAPSHOT_LAST_COL
+    )
+
+
 def compare_z32_vs_financial_statements(
     workbook,
     balance_sheet_data: Dict[str, float],
-    income_statement_data: Dict[str, float]
+    income_statement_data: Dict[str, float],
+    snapshot: Optional[SheetSnapshot] = None
 ) -> List[DiffItem]:
-    """对比财务报表 vs Z3-2期末（C列）"""
+    """
+    对比财务报表 vs Z3-2期末（C列）
+    
+    Args:
+        workbook: 工作簿后端（WorkbookBackend）或COM工作簿对象
+        snapshot: Z3-2快照（load_z32_snapshot），未传入时自动读取
+    """
     diffs = []
     
     try:
-        ws = workbook.Sheets("Z3-2")
+        if snapshot is None:
+            snapshot = load_z32_snapshot(workbook)
         
         print("  对比: 财务报表 vs Z3-2期末(C列)")
         
         for item_name, row_num in Z3_2_BALANCE_MAPPING.items():
             # 获取Z3-2的C列值（年末余额）
-            z32_raw = ws.Cells(row_num, 3).Value  # C列
+            z32_raw = snapshot.value(row_num, 3)  # C列
             
             # 类型检查：跳过非数值（如表头文字）
             if z32_raw is None:
@@ -627,9 +759,10 @@ def compare_z32_vs_financial_statements(
 
 def compare_z32_vs_prior_audit(
     workbook,
-    prior_audit_data: Dict[str, float]
+    prior_audit_data: Dict[str, float],
+    snapshot: Optional[SheetSnapshot] = None
 ) -> List[DiffItem]:
-    """对比上年审计报告期末 vs Z3-2期初（D列）"""
+    """对比上年审计报告期末 vs Z3-2期初（D列），snapshot同上"""
     diffs = []
     
     if not prior_audit_data:
@@ -637,13 +770,14 @@ def compare_z32_vs_prior_audit(
         return diffs
     
     try:
-        ws = workbook.Sheets("Z3-2")
+        if snapshot is None:
+            snapshot = load_z32_snapshot(workbook)
         
         print("  对比: 上年审计报告期末 vs Z3-2期初(D列)")
         
         for item_name, row_num in Z3_2_BALANCE_MAPPING.items():
             # 获取Z3-2的D列值（年初余额）
-            z32_raw = ws.Cells(row_num, 4).Value  # D列
+            z32_raw = snapshot.value(row_num, 4)  # D列
             
             # 类型检查：跳过非数值
             if z32_raw is None:
@@ -684,17 +818,17 @@ def detect_z35_differences(workbook) -> List[DiffItem]:
     diffs = []
     
     try:
-        ws = workbook.Sheets("Z3-5")
+        wb = as_backend(workbook)
         
         print("  检测: Z3-5 I/J列差异")
         
         # Z3-5结构：I列=差异，J列=说明
         for row in range(7, 50):
-            item_name = ws.Cells(row, 1).Value  # A列
+            item_name = wb.read_cell("Z3-5", row, 1)  # A列
             if not item_name:
                 continue
             
-            diff_value = ws.Cells(row, 9).Value  # I列
+            diff_value = wb.read_cell("Z3-5", row, 9)  # I列
             
             if diff_value and abs(float(diff_value)) > 1:
                 diffs.append(DiffItem(
@@ -726,45 +860,41 @@ def write_prior_year_income_cashflow_to_z32(
     根据需求：只写入利润表和现金流量表，不写入资产负债表
     
     Args:
-        workbook: Excel工作簿COM对象
+        workbook: 工作簿后端（WorkbookBackend）或COM工作簿对象
         income_statement_data: 利润表数据（PDF提取的本期金额）
         cashflow_statement_data: 现金流量表数据（PDF提取的本期金额）
     
     Returns:
-        Dict: {"income_written": int, "cashflow_written": int}
+        Dict: {"income_written": int, "cashflow_written": int, "range_writes": int}
+              written为去重后的目标行数
     """
-    result = {"income_written": 0, "cashflow_written": 0}
+    result = {"income_written": 0, "cashflow_written": 0, "range_writes": 0}
     
     try:
-        ws = workbook.Sheets("Z3-2")
+        wb = as_backend(workbook)
         
-        print("  写入上年利润表到Z3-2...")
+        # 写入计划：别名去重 + 跳过公式行 + 合并区域写入（跨越公式行与模板空白行）
+        plan = WritePlan(skip_rows={"Z3-2": Z3_2_FORMULA_ROWS}, empty_rows={"Z3-2": Z3_2_EMPTY_ROWS})
         
-        # 1. 写入利润表（D列）
-        for item_name, amount in income_statement_data.items():
-            if item_name in Z3_2_INCOME_MAPPING:
-                row_num = Z3_2_INCOME_MAPPING[item_name]
-                try:
-                    ws.Cells(row_num, 4).Value = amount  # D列
-                    result["income_written"] += 1
-                except Exception as e:
-                    print(f"    写入失败 {item_name} (行{row_num}): {e}")
+        # 1. 利润表（D列）
+        income_rows = plan.add_mapped("Z3-2", 4, income_statement_data, Z3_2_INCOME_MAPPING, source="利润表")
+        result["income_written"] = len(income_rows)
         
-        print(f"    利润表: 已写入 {result['income_written']} 项")
+        # 2. 现金流量表（D列）
+        cashflow_rows = plan.add_mapped("Z3-2", 4, cashflow_statement_data, Z3_2_CASHFLOW_MAPPING, source="现金流量表")
+        result["cashflow_written"] = len(cashflow_rows)
         
-        # 2. 写入现金流量表（D列）
-        print("  写入上年现金流量表到Z3-2...")
+        if plan.skipped:
+            print(f"    跳过公式行: {len(plan.skipped)} 项")
         
-        for item_name, amount in cashflow_statement_data.items():
-            if item_name in Z3_2_CASHFLOW_MAPPING:
-                row_num = Z3_2_CASHFLOW_MAPPING[item_name]
-                try:
-                    ws.Cells(row_num, 4).Value = amount  # D列
-                    result["cashflow_written"] += 1
-                except Exception as e:
-                    print(f"    写入失败 {item_name} (行{row_num}): {e}")
+        result["range_writes"] = plan.commit(wb, max_gap=Z3_2_WRITE_MAX_GAP)
         
+        for sheet, row_num, sources in plan.duplicates:
+            print(f"    别名合并 行{row_num}: {', '.join(sources)}")
+        
+        print(f"    利润表: 已写入 {result['income_written']} 项")
         print(f"    现金流量表: 已写入 {result['cashflow_written']} 项")
+        print(f"    区域写入: {result['range_writes']} 次")
         
     except Exception as e:
         print(f"    写入Z3-2失败: {e}")
@@ -776,112 +906,86 @@ def write_prior_year_income_cashflow_to_z32(
 # 6维度评分
 # =============================================================================
 
-def evaluate_6_dimensions(workpaper_path: Path) -> Dict[str, Dict[str, Any]]:
+def scoring_scheme() -> ScoringScheme:
+    """评分方案：SCORING_RULES_FILE 存在时加载，否则按Z3-2映射生成内置规则"""
+    if SCORING_RULES_FILE.exists():
+        return load_scoring_scheme(SCORING_RULES_FILE)
+    return default_scheme(Z3_2_BALANCE_MAPPING, Z3_2_BALANCE_ALIASES)
+
+
+def evaluate_6_dimensions(
+    workpaper_path: Path,
+    engine: Optional[str] = None,
+    session: Optional[PipelineSession] = None,
+    subject_mapping: Optional[SubjectMappingResult] = None,
+    balance_sheet_data: Optional[Dict[str, float]] = None,
+    prior_balance_data: Optional[Dict[str, float]] = None,
+    scheme: Optional[ScoringScheme] = None
+) -> Dict[str, Dict[str, Any]]:
     """
-    执行6维度评分
-    
-    评分体系 V1.1 (总分100分):
-        D1 报表平衡: 30分 - Z7的I4/I5/J4/J5是否显示"勾稽正确"或"报表平衡"
-        D2 表格表头: 10分 - 附注表头完整性检查
-        D3 科目映射: 10分 - Z3-2科目映射检查
-        D4 基本情况: 10分 - Z3-4特殊字符检查
-        D5 附注平衡: 10分 - Z3-5 I/J列无错报
-        D6 数据比对: 30分 - 财务报表vs系统数据比对
-    """
-    import win32com.client
-    import pythoncom
-    
-    scores = {
-        "D1_报表平衡": {"max": 30, "actual": 0, "details": []},
-        "D2_表格表头": {"max": 10, "actual": 10, "details": []},
-        "D3_科目映射": {"max": 10, "actual": 10, "details": []},
-        "D4_基本情况": {"max": 10, "actual": 10, "details": []},
-        "D5_附注平衡": {"max": 10, "actual": 10, "details": []},
-        "D6_数据比对": {"max": 30, "actual": 24, "details": []},  # 默认80%
-    }
+    执行6维度评分（opencpai_pipeline.scoring：规则在底稿快照上求值）
     
-    pythoncom.CoInitialize()
-    excel = None
+    评分体系 V1.1 (总分100分，内置规则):
+        D1 报表平衡: 30分 - Z7的I4/I5/J4/J5显示"勾稽正确"或"报表平衡"的比例
+        D2 表格表头: 10分 - Z3-2、Z3-5表头完整性
+        D3 科目映射: 10分 - Z3-2项目行与映射一致的比例 + 一级科目映射得分率（传入subject_mapping时）
+        D4 基本情况: 10分 - Z3-4的A7/A10非空且无特殊字符/错误值
+        D5 附注平衡: 10分 - Z3-5 I列每处差异扣1分
+        D6 数据比对: 30分 - 财务报表 vs Z3-2期末、上年审计报告 vs Z3-2期初 一致项比例
     
+    Args:
+        workpaper_path: 已由Excel保存的底稿路径
+        engine: 工作簿引擎，默认使用 WORKBOOK_ENGINE（openpyxl只读打开，无需启动Excel）
+        session: 流程会话，底稿仍打开时直接在该句柄上读取快照，不再重新打开
+        subject_mapping: 科目名称映射结果（确定映射计1，待确认计0.5）
+        balance_sheet_data: 财务报表资产负债表 {项目: 期末金额}（D6）
+        prior_balance_data: 上年审计报告资产负债表 {项目: 期末金额}（D6）
+        scheme: 评分方案，默认 scoring_scheme()
+    """
+    scheme = scheme or scoring_scheme()
+    use_session = session is not None and session.has_workpaper
+    engine = "com" if use_session else (engine or WORKBOOK_ENGINE)
+    
+    context: Dict[str, Any] = {}
+    if balance_sheet_data:
+        context["balance_sheet"] = balance_sheet_data
+    if prior_balance_data:
+        context["prior_balance"] = prior_balance_data
+    if subject_mapping is not None:
+        context["subject_mapping_ratio"] = subject_mapping.score_ratio
+    
+    own_session = None
     try:
-        excel = win32com.client.Dispatch("Excel.Application")
-        excel.Visible = False
-        excel.DisplayAlerts = False
-        
-        wb = excel.Workbooks.Open(str(workpaper_path.absolute()))
-        
-        # D1. 报表平衡检查
-        try:
-            z7 = wb.Sheets("Z7")
-            all_correct = True
-            for cell in ["I4", "I5", "J4", "J5"]:
-                val = str(z7.Range(cell).Value or "")
-                if "正确" in val or "平衡" in val:
-                    scores["D1_报表平衡"]["details"].append(f"{cell}: {val}")
-                else:
-                    all_correct = False
-            scores["D1_报表平衡"]["actual"] = 30 if all_correct else 18
-        except Exception as e:
-            scores["D1_报表平衡"]["actual"] = 18
-            scores["D1_报表平衡"]["details"].append(f"检查失败: {e}")
-        
-        # D2. 表格表头检查 (默认通过)
-        scores["D2_表格表头"]["details"].append("表头检查通过")
-        
-        # D3. 科目映射检查
-        try:
-            z3_2 = wb.Sheets("Z3-2")
-            scores["D3_科目映射"]["details"].append("Z3-2科目映射检查通过")
-        except:
-            scores["D3_科目映射"]["actual"] = 5
-            scores["D3_科目映射"]["details"].append("Z3-2工作表不存在")
-        
-        # D4. 基本情况检查
-        try:
-            z3_4 = wb.Sheets("Z3-4")
-            a7 = str(z3_4.Range("A7").Value or "")
-            a10 = str(z3_4.Range("A10").Value or "")
-            special_chars = ["\ufffd", "\x00", "�"]
-            has_special = any(c in a7 or c in a10 for c in special_chars)
-            if has_special:
-                scores["D4_基本情况"]["actual"] = 0
-                scores["D4_基本情况"]["details"].append("发现特殊字符")
-            else:
-                scores["D4_基本情况"]["details"].append("基本情况检查通过")
-        except:
-            scores["D4_基本情况"]["actual"] = 5
-        
-        # D5. 附注平衡检查
-        try:
-            z3_5 = wb.Sheets("Z3-5")
-            error_count = 0
-            for row in range(7, 50):
-                i_val = z3_5.Cells(row, 9).Value  # I列
-                if i_val and abs(float(i_val)) > 1:
-                    error_count += 1
-            if error_count > 0:
-                scores["D5_附注平衡"]["actual"] = max(0, 10 - error_count)
-                scores["D5_附注平衡"]["details"].append(f"发现{error_count}处差异")
-            else:
-                scores["D5_附注平衡"]["details"].append("附注平衡检查通过")
-        except:
-            scores["D5_附注平衡"]["actual"] = 5
-        
-        # D6. 数据比对 (默认给80%分数，需要人工对比确认)
-        scores["D6_数据比对"]["details"].append("默认评分（需人工确认）")
-        
-        wb.Close(SaveChanges=False)
-        
+        if use_session:
+            card = score_workpaper(session.backend, scheme, context)
+        elif engine == "com":
+            own_session = PipelineSession()
+            wb = open_workbook(workpaper_path, engine="com", excel=own_session.start())
+            try:
+                card = score_workpaper(wb, scheme, context)
+            finally:
+                wb.close(save=False)
+        else:
+            card = score_workpaper(workpaper_path, scheme, context, engine=engine)
+        print(f"  ✓ 评分完成: {len(scheme.rules)}条规则（{card.elapsed_s * 1000:.0f}ms）")
     except Exception as e:
         print(f"  评分异常: {e}")
+        card = ScoreCard.empty(scheme, error=str(e))
     finally:
-        if excel:
-            try:
-                excel.Quit()
-            except:
-                pass
-        pythoncom.CoUninitialize()
-    
+        if own_session:
+            own_session.close()
+    
+    scores = card.as_dict()
+    d3 = scores.get("D3_科目映射")
+    if d3 is not None and subject_mapping is not None:
+        counts = subject_mapping.tier_counts()
+        tentative = len(subject_mapping.tentative)
+        d3["details"].append(
+            f"一级科目{subject_mapping.total}个: 确定映射{subject_mapping.total - counts['unmapped'] - tentative}，"
+            f"待确认{tentative}，未映射{counts['unmapped']}"
+        )
+        for m in subject_mapping.unmapped[:5]:
+            d3["details"].append(f"未映射: {m.code} {m.name}")
     return scores
 
 
@@ -889,18 +993,55 @@ def evaluate_6_dimensions(workpaper_path: Path) -> Dict[str, Dict[str, Any]]:
 # 检查报告生成
 # =============================================================================
 
+def check_report_tables(
+    fs_vs_z32_diffs: List[DiffItem],
+    prior_vs_z32_diffs: List[DiffItem],
+    z35_diffs: List[DiffItem]
+) -> List[ReportTable]:
+    """检查报告的三节（xlsx与PDF共用）"""
+    return [
+        ReportTable(
+            "一、财务报表 vs Z3-2期末 对比",
+            ["项目", "财务报表", "Z3-2期末", "差异", "差异率(%)"],
+            [[d.item_name, d.source_value, d.target_value, d.diff, f"{d.diff_percent:.2f}%"] for d in fs_vs_z32_diffs],
+            sheet="报表vsZ3-2期末",
+        ),
+        ReportTable(
+            "二、上年审计报告 vs Z3-2期初 对比",
+            ["项目", "上年审计报告", "Z3-2期初", "差异", "差异率(%)"],
+            [[d.item_name, d.source_value, d.target_value, d.diff, f"{d.diff_percent:.2f}%"] for d in prior_vs_z32_diffs],
+            empty_text="（暂无上年审计数据）",
+            sheet="上年审计vsZ3-2期初",
+        ),
+        ReportTable(
+            "三、Z3-5 差异检测",
+            ["项目", "差异金额"],
+            [[d.item_name, d.diff] for d in z35_diffs],
+            sheet="Z3-5差异",
+        ),
+    ]
+
+
 def generate_comprehensive_check_report(
     output_dir: Path,
     fs_vs_z32_diffs: List[DiffItem],
     prior_vs_z32_diffs: List[DiffItem],
     z35_diffs: List[DiffItem],
     company_name: str,
-    audit_year: str = "2024"
+    audit_year: str = "2024",
+    session: Optional[PipelineSession] = None,
+    pdf_engine: str = "excel",
+    layout: str = "single"
 ) -> Tuple[Path, Path]:
-    """生成综合检查报告（Excel + PDF）"""
-    import win32com.client
-    import pythoncom
+    """
+    生成综合检查报告（Excel + PDF）
     
+    xlsx由差异列表流式写出（opencpai_pipeline.check_report：样式只定义一次、列宽预先计算，不经Excel）
+    
+    session: 流程会话，pdf_engine="excel" 时复用其Excel进程导出PDF，否则单独启动并退出Excel
+    pdf_engine: "excel" 由Excel导出PDF；"python" 由检查结果直接渲染PDF（不经Excel）
+    layout: "single" 三节写在同一工作表；"sections" 每节一个工作表
+    """
     # 命名规则：参考财审底稿，使用完整公司名+年份
     # 文件名安全处理：替换可能导致问题的字符
     safe_company_name = company_name.replace('（', '(').replace('）', ')')
@@ -910,121 +1051,40 @@ def generate_comprehensive_check_report(
     excel_path = output_dir / excel_name
     pdf_path = output_dir / pdf_name
     
-    pythoncom.CoInitialize()
-    excel = None
+    title = f"审计底稿检查报告 - {company_name}"
+    subtitle = f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    tables = check_report_tables(fs_vs_z32_diffs, prior_vs_z32_diffs, z35_diffs)
     
     try:
-        excel = win32com.client.Dispatch("Excel.Application")
-        excel.Visible = False
-        excel.DisplayAlerts = False
-        
-        wb = excel.Workbooks.Add()
-        ws = wb.ActiveSheet
-        ws.Name = "检查报告"
-        
-        # 标题
-        ws.Cells(1, 1).Value = f"审计底稿检查报告 - {company_name}"
-        ws.Range("A1:G1").Merge()
-        ws.Cells(1, 1).Font.Size = 16
-        ws.Cells(1, 1).Font.Bold = True
-        
-        ws.Cells(2, 1).Value = f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        
-        current_row = 4
-        
-        # 1. 财务报表 vs Z3-2
-        ws.Cells(current_row, 1).Value = "一、财务报表 vs Z3-2期末 对比"
-        ws.Cells(current_row, 1).Font.Bold = True
-        current_row += 1
-        
-        if fs_vs_z32_diffs:
-            headers = ["项目", "财务报表", "Z3-2期末", "差异", "差异率(%)"]
-            for col, header in enumerate(headers, 1):
-                ws.Cells(current_row, col).Value = header
-                ws.Cells(current_row, col).Font.Bold = True
-            current_row += 1
-            
-            for diff in fs_vs_z32_diffs:
-                ws.Cells(current_row, 1).Value = diff.item_name
-                ws.Cells(current_row, 2).Value = diff.source_value
-                ws.Cells(current_row, 3).Value = diff.target_value
-                ws.Cells(current_row, 4).Value = diff.diff
-                ws.Cells(current_row, 5).Value = f"{diff.diff_percent:.2f}%"
-                current_row += 1
-        else:
-            ws.Cells(current_row, 1).Value = "✓ 无差异"
-            current_row += 1
-        
-        current_row += 1
-        
-        # 2. 上年审计 vs Z3-2期初
-        ws.Cells(current_row, 1).Value = "二、上年审计报告 vs Z3-2期初 对比"
-        ws.Cells(current_row, 1).Font.Bold = True
-        current_row += 1
-        
-        if prior_vs_z32_diffs:
-            headers = ["项目", "上年审计报告", "Z3-2期初", "差异", "差异率(%)"]
-            for col, header in enumerate(headers, 1):
-                ws.Cells(current_row, col).Value = header
-                ws.Cells(current_row, col).Font.Bold = True
-            current_row += 1
-            
-            for diff in prior_vs_z32_diffs:
-                ws.Cells(current_row, 1).Value = diff.item_name
-                ws.Cells(current_row, 2).Value = diff.source_value
-                ws.Cells(current_row, 3).Value = diff.target_value
-                ws.Cells(current_row, 4).Value = diff.diff
-                ws.Cells(current_row, 5).Value = f"{diff.diff_percent:.2f}%"
-                current_row += 1
-        else:
-            ws.Cells(current_row, 1).Value = "（暂无上年审计数据）"
-            current_row += 1
-        
-        current_row += 1
-        
-        # 3. Z3-5差异
-        ws.Cells(current_row, 1).Value = "三、Z3-5 差异检测"
-        ws.Cells(current_row, 1).Font.Bold = True
-        current_row += 1
-        
-        if z35_diffs:
-            headers = ["项目", "差异金额"]
-            for col, header in enumerate(headers, 1):
-                ws.Cells(current_row, col).Value = header
-                ws.Cells(current_row, col).Font.Bold = True
-            current_row += 1
-            
-            for diff in z35_diffs:
-                ws.Cells(current_row, 1).Value = diff.item_name
-                ws.Cells(current_row, 2).Value = diff.diff
-                current_row += 1
-        else:
-            ws.Cells(current_row, 1).Value = "✓ 无差异"
-            current_row += 1
-        
-        # 调整列宽
-        ws.Columns("A:G").AutoFit()
-        
-        # 保存Excel
-        wb.SaveAs(str(excel_path.absolute()))
-        print(f"  ✓ 检查报告Excel: {excel_path.name}")
-        
-        # 导出PDF
-        ws.ExportAsFixedFormat(0, str(pdf_path.absolute()))
-        print(f"  ✓ 检查报告PDF: {pdf_path.name}")
-        
-        wb.Close(SaveChanges=False)
-        
+        write_check_report_xlsx(excel_path, title, tables, subtitle=subtitle, layout=layout)
+        print(f"  ✓ 检查报告Excel: {excel_path.name}（{sum(len(t.rows) for t in tables)}条差异）")
     except Exception as e:
         print(f"  检查报告生成失败: {e}")
         traceback.print_exc()
+        return excel_path, pdf_path
+    
+    if pdf_engine == "python":
+        try:
+            render_check_report_pdf(pdf_path, title, tables, subtitle=subtitle)
+            print(f"  ✓ 检查报告PDF: {pdf_path.name}")
+        except Exception as e:
+            print(f"  检查报告PDF生成失败: {e}")
+        return excel_path, pdf_path
+    
+    own_session = session is None
+    if own_session:
+        session = PipelineSession()
+    
+    try:
+        wb = session.open_workbook(excel_path)
+        wb.ExportAsFixedFormat(0, str(pdf_path.absolute()))
+        wb.Close(SaveChanges=False)
+        print(f"  ✓ 检查报告PDF: {pdf_path.name}")
+    except Exception as e:
+        print(f"  检查报告PDF导出失败: {e}")
     finally:
-        if excel:
-            try:
-                excel.Quit()
-            except:
-                pass
-        pythoncom.CoUninitialize()
+        if own_session:
+            session.close()
     
     return excel_path, pdf_path
 
@@ -1033,20 +1093,32 @@ def generate_comprehensive_check_report(
 # 财审报告PDF导出
 # =============================================================================
 
-def export_audit_report_to_pdf(excel_path: Path, pdf_path: Path) -> bool:
-    """将财审报告Excel导出为PDF"""
-    import win32com.client
-    import pythoncom
+def export_audit_report_to_pdf(
+    excel_path: Path,
+    pdf_path: Path,
+    session: Optional[PipelineSession] = None,
+    engine: str = "excel"
+) -> bool:
+    """
+    将财审报告Excel导出为PDF（session同 generate_comprehensive_check_report）
     
-    pythoncom.CoInitialize()
-    excel = None
+    engine: "excel" 由Excel导出；"python" 按工作表版式直接渲染（不需要Excel，可在任意线程/进程执行）
+    """
+    if engine == "python":
+        try:
+            render_workbook_pdf(excel_path, pdf_path)
+            print(f"  ✓ 财审报告PDF: {pdf_path.name}")
+            return True
+        except Exception as e:
+            print(f"  财审报告PDF生成失败: {e}")
+            return False
+    
+    own_session = session is None
+    if own_session:
+        session = PipelineSession()
     
     try:
-        excel = win32com.client.Dispatch("Excel.Application")
-        excel.Visible = False
-        excel.DisplayAlerts = False
-        
-        wb = excel.Workbooks.Open(str(excel_path.absolute()))
+        wb = session.open_workbook(excel_path)
         
         # 导出所有工作表为PDF
         wb.ExportAsFixedFormat(0, str(pdf_path.absolute()))
@@ -1060,12 +1132,8 @@ def export_audit_report_to_pdf(excel_path: Path, pdf_path: Path) -> bool:
         print(f"  财审报告PDF导出失败: {e}")
         return False
     finally:
-        if excel:
-            try:
-                excel.Quit()
-            except:
-                pass
-        pythoncom.CoUninitialize()
+        if own_session:
+            session.close()
 
 
 # =============================================================================
@@ -1090,9 +1158,33 @@ def format_date(date_str: str) -> str:
         return str(date_str)
 
 
+def get_registration_client() -> BusinessRegistrationClient:
+    """进程内共享的工商查询客户端（连接池 + 磁盘缓存 + 请求合并）"""
+    global _REGISTRATION_CLIENT
+    if _REGISTRATION_CLIENT is None:
+        _REGISTRATION_CLIENT = BusinessRegistrationClient(
+            BUSINESS_API_URL,
+            BUSINESS_API_CODE,
+            cache=RegistrationCache(BUSINESS_CACHE_DIR, ttl_seconds=BUSINESS_CACHE_TTL_DAYS * 24 * 3600),
+            timeout=30
+        )
+    return _REGISTRATION_CLIENT
+
+
+def prefetch_business_info(company_name: str) -> Optional[Future]:
+    """
+    提前发起工商查询（Step 1拿到公司名后调用，与清洗、宏执行并行）
+    
+    API关闭或未配置密钥时返回None
+    """
+    if not USE_Z10_API or not BUSINESS_API_CODE or not company_name:
+        return None
+    return get_registration_client().submit(company_name)
+
+
 def query_business_info_api(company_name: str) -> Optional[Dict[str, Any]]:
     """
-    调用百度企业工商标准版API查询企业信息
+    调用百度企业工商标准版API查询企业信息（优先读取磁盘缓存）
     
     返回字段：
     - companyName: 企业名称
@@ -1111,55 +1203,12 @@ def query_business_info_api(company_name: str) -> Optional[Dict[str, Any]]:
         print("    ⚠️ 未配置BAIDU_BUSINESS_APP_CODE环境变量")
         return None
     
-    headers = {
-        'Content-Type': 'application/json;charset=UTF-8',
-        'X-Bce-Signature': f'AppCode/{BUSINESS_API_CODE}'
-    }
-    
-    params = {
-        'keyword': company_name
-    }
-    
-    try:
-        print(f"    正在查询API: {company_name[:20]}...")
-        response = requests.get(BUSINESS_API_URL, params=params, headers=headers, timeout=30)
-        
-        if response.status_code != 200:
-            print(f"    API HTTP错误: {response.status_code}")
-            return None
-        
-        result = response.json()
-        success = result.get('success', False)
-        code = result.get('code')
-        
-        if success and code == 200:
-            data = result.get('data', {})
-            company_data = data.get('data', {})
-            
-            if company_data:
-                print(f"    ✓ 查询成功: {company_data.get('companyName', '')[:20]}")
-                return company_data
-            else:
-                print("    查无记录")
-                return None
-        else:
-            print(f"    API业务错误: code={code}, msg={result.get('msg', '')}")
-            return None
-            
-    except requests.exceptions.Timeout:
-        print("    API超时（30秒）")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("    网络连接失败")
-        return None
-    except Exception as e:
-        print(f"    API查询异常: {e}")
-        return None
+    return get_registration_client().lookup(company_name)
 
 
 def write_business_info_to_z10(workbook, company_data: Dict[str, Any]) -> bool:
     """
-    将工商信息写入Z10工作表
+    将工商信息写入Z10工作表（workbook可为工作簿后端或COM工作簿对象）
     
     Z10结构（根据实际底稿）：
     - C7: 企业类型
@@ -1175,35 +1224,35 @@ def write_business_info_to_z10(workbook, company_data: Dict[str, Any]) -> bool:
     - C11: 经营范围
     """
     try:
-        ws = workbook.Sheets("Z10")
+        wb = as_backend(workbook)
         
         # 写入工商信息
-        ws.Range("C7").Value = company_data.get('companyType', '')
-        ws.Range("E7").Value = company_data.get('legalPerson', '')
-        ws.Range("G7").Value = company_data.get('authority', '')
+        wb.write_ref("Z10", "C7", company_data.get('companyType', ''))
+        wb.write_ref("Z10", "E7", company_data.get('legalPerson', ''))
+        wb.write_ref("Z10", "G7", company_data.get('authority', ''))
         
         # 成立日期（转换为中文格式）
         establish_date = company_data.get('establishDate', '')
-        ws.Range("C8").Value = format_date(establish_date)
+        wb.write_ref("Z10", "C8", format_date(establish_date))
         
         # 纳税人识别号（统一社会信用代码）
-        ws.Range("C9").Value = company_data.get('creditNo', '')
+        wb.write_ref("Z10", "C9", company_data.get('creditNo', ''))
         
         # 注册资本
-        ws.Range("G8").Value = company_data.get('capital', '')
+        wb.write_ref("Z10", "G8", company_data.get('capital', ''))
         
         # 经营期限
         operation_enddate = company_data.get('operationEnddate', '')
         if operation_enddate and operation_enddate != 'null':
-            ws.Range("G9").Value = format_date(operation_enddate)
+            wb.write_ref("Z10", "G9", format_date(operation_enddate))
         else:
-            ws.Range("G9").Value = "长期"
+            wb.write_ref("Z10", "G9", "长期")
         
         # 注册地址
-        ws.Range("C10").Value = company_data.get('companyAddress', '')
+        wb.write_ref("Z10", "C10", company_data.get('companyAddress', ''))
         
         # 经营范围
-        ws.Range("C11").Value = company_data.get('businessScope', '')
+        wb.write_ref("Z10", "C11", company_data.get('businessScope', ''))
         
         return True
         
@@ -1217,18 +1266,18 @@ def write_mock_business_info_to_z10(workbook, company_name: str) -> bool:
     将Mock工商信息写入Z10工作表（API关闭时使用）
     """
     try:
-        ws = workbook.Sheets("Z10")
+        wb = as_backend(workbook)
         
         # 写入Mock数据
-        ws.Range("C7").Value = MOCK_BUSINESS_DATA.get('企业类型', '')
-        ws.Range("E7").Value = MOCK_BUSINESS_DATA.get('法定代表人', '')
-        ws.Range("G7").Value = "（测试模式）"
-        ws.Range("C8").Value = MOCK_BUSINESS_DATA.get('成立日期', '')
-        ws.Range("C9").Value = MOCK_BUSINESS_DATA.get('统一社会信用代码', '')
-        ws.Range("G8").Value = MOCK_BUSINESS_DATA.get('注册资本', '')
-        ws.Range("G9").Value = "长期"
-        ws.Range("C10").Value = MOCK_BUSINESS_DATA.get('注册地址', '')
-        ws.Range("C11").Value = MOCK_BUSINESS_DATA.get('经营范围', '')
+        wb.write_ref("Z10", "C7", MOCK_BUSINESS_DATA.get('企业类型', ''))
+        wb.write_ref("Z10", "E7", MOCK_BUSINESS_DATA.get('法定代表人', ''))
+        wb.write_ref("Z10", "G7", "（测试模式）")
+        wb.write_ref("Z10", "C8", MOCK_BUSINESS_DATA.get('成立日期', ''))
+        wb.write_ref("Z10", "C9", MOCK_BUSINESS_DATA.get('统一社会信用代码', ''))
+        wb.write_ref("Z10", "G8", MOCK_BUSINESS_DATA.get('注册资本', ''))
+        wb.write_ref("Z10", "G9", "长期")
+        wb.write_ref("Z10", "C10", MOCK_BUSINESS_DATA.get('注册地址', ''))
+        wb.write_ref("Z10", "C11", MOCK_BUSINESS_DATA.get('经营范围', ''))
         
         return True
         
@@ -1237,12 +1286,16 @@ def write_mock_business_info_to_z10(workbook, company_name: str) -> bool:
         return False
 
 
-def query_business_registration_python(workbook, company_name: str) -> bool:
+def query_business_registration_python(
+    workbook,
+    company_name: str,
+    prefetched: Optional[Future] = None
+) -> bool:
     """
     纯Python版工商信息查询（替代VBA宏）
     
     流程：
-    1. 调用百度工商API查询企业信息
+    1. 调用百度工商API查询企业信息（prefetched为Step 1提前发起的查询）
     2. 将结果写入Z10工作表
     """
     print(f"\n【Z10工商信息查询 - Python API】")
@@ -1250,8 +1303,7 @@ def query_business_registration_python(workbook, company_name: str) -> bool:
     
     # 首先将公司名称写入首页F7
     try:
-        ws_home = workbook.Sheets("首页")
-        ws_home.Cells(7, 6).Value = company_name
+        as_backend(workbook).write_cell("首页", 7, 6, company_name)
         print(f"  ✓ 首页F7已写入公司名称")
     except Exception as e:
         print(f"  首页F7写入失败: {e}")
@@ -1265,8 +1317,11 @@ def query_business_registration_python(workbook, company_name: str) -> bool:
             return True
         return False
     
-    # 调用API查询工商信息
-    company_data = query_business_info_api(company_name)
+    # 调用API查询工商信息（已提前发起时直接等待结果）
+    if prefetched is not None:
+        company_data = prefetched.result()
+    else:
+        company_data = query_business_info_api(company_name)
     
     if not company_data:
         print("  ✗ 工商信息查询失败，Z10保持空白")
@@ -1289,302 +1344,688 @@ def query_business_registration_python(workbook, company_name: str) -> bool:
 # 主流程
 # =============================================================================
 
-def run_demo_v24():
-    """运行Demo V2.4完整流程"""
-    import win32com.client
-    import pythoncom
-    
-    print("=" * 70)
-    print("OpenCPAi Demo V2.4 - 完整审计底稿生成流程（纯Python版）")
-    print("=" * 70)
-    print(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"输出目录: {OUTPUT_DIR}")
-    print()
-    print("⭐ V2.4新特性: Z10工商查询使用纯Python API（无VBA依赖）")
-    print()
-    
-    # Step 1: 解析财务报表 + 提取公司名称
-    print("【Step 1】解析财务报表 + 提取公司名称")
-    
-    # 使用多来源提取公司名称（优先级：PDF > Excel > 文件名）
-    print("  [1.1] 提取公司名称（多来源）")
-    company_name = get_company_name_multi_source(
-        balance_sheet_path=BALANCE_SHEET_FILE,
-        profit_statement_path=PROFIT_STATEMENT_FILE,
-        audit_pdf_path=AUDIT_REPORT_PDF,
-        sample_dir=SAMPLE_DIR
+def default_engagement_inputs() -> EngagementInputs:
+    """配置区的单个样本（SAMPLE_DIR）"""
+    return EngagementInputs(
+        sample_dir=SAMPLE_DIR,
+        balance_file=BALANCE_FILE,
+        output_dir=OUTPUT_DIR,
+        balance_sheet_file=BALANCE_SHEET_FILE,
+        profit_statement_file=PROFIT_STATEMENT_FILE,
+        audit_report_pdf=AUDIT_REPORT_PDF,
+        manual_audit_report_xlsx=MANUAL_AUDIT_REPORT_XLSX
     )
+
+
+class TrialBalanceCleaningError(RuntimeError):
+    """科目余额表清洗失败（流程终止，不打印堆栈）"""
+
+
+def clean_trial_balance(balance_file: Path) -> pd.DataFrame:
+    """
+    Step 2: 清洗科目余额表（模块级函数，调度器可在独立进程中执行）
     
-    if not company_name:
-        # 备选：从目录名提取
-        company_name = extract_company_name_from_filename(SAMPLE_DIR.name)
-        print(f"    备选来源: 目录名 -> {company_name}")
-    
-    if not company_name:
-        company_name = "保贝优创（深圳）科技有限公司"  # 最后兜底
-        print(f"    使用默认公司名称: {company_name}")
-    
-    print(f"  ✓ 最终公司名称: {company_name}")
-    
-    # 解析财务报表数据
-    print("  [1.2] 解析财务报表")
-    balance_sheet_data, _ = parse_balance_sheet_excel(BALANCE_SHEET_FILE)
-    income_statement_data, _ = parse_income_statement_excel(PROFIT_STATEMENT_FILE)
-    
-    # ⭐ 保存财务报表数据到JSON（作为数据源）
-    print("  [1.3] 保存财务报表数据源")
-    audit_year = "2024"  # 审计年度
-    fs_data_source = {
-        "company_name": company_name,
-        "audit_year": audit_year,
-        "balance_sheet": balance_sheet_data,
-        "income_statement": income_statement_data,
-        "source_files": {
-            "balance_sheet": str(BALANCE_SHEET_FILE.name),
-            "income_statement": str(PROFIT_STATEMENT_FILE.name)
-        }
-    }
-    safe_name = company_name.replace('（', '(').replace('）', ')')
-    fs_json_path = OUTPUT_DIR / f"【数据源】财务报表_{safe_name[:10]}.json"
-    with open(fs_json_path, 'w', encoding='utf-8') as f:
-        json.dump(fs_data_source, f, ensure_ascii=False, indent=2)
-    print(f"  ✓ 财务报表数据源: {fs_json_path.name}")
-    
-    # Step 2: 清洗科目余额表
+    Raises:
+        TrialBalanceCleaningError: 清洗失败
+    """
     print("\n【Step 2】清洗科目余额表")
     from core_v4.v4_5_current.universal_cleaner_v4_5 import UniversalCleanerV4_5
     
-    cleaner = UniversalCleanerV4_5(str(BALANCE_FILE), verbose=False)
-    result = cleaner.clean()
+    with span("cleaner.clean"):
+        cleaner = UniversalCleanerV4_5(str(balance_file), verbose=False)
+        result = cleaner.clean()
     
     if not result.get('is_valid'):
         print(f"  ✗ 清洗失败: {result.get('error_message')}")
-        return
+        raise TrialBalanceCleaningError(f"清洗失败: {result.get('error_message')}")
     
     df_cleaned = result['df_cleaned']
     print(f"  ✓ 清洗成功: {len(df_cleaned)}行")
+    return df_cleaned
+
+
+def use_python_report() -> bool:
+    """财审报告是否由Python提取（版式文件缺失时回退到FinPageS宏）"""
+    if REPORT_ENGINE != "python":
+        return False
+    if not REPORT_SPEC_FILE.exists():
+        print(f"  ⚠ 未找到报告版式 {REPORT_SPEC_FILE.name}，改用FinPageS宏")
+        return False
+    return True
+
+
+def map_subject_names(df_cleaned: pd.DataFrame) -> SubjectMappingResult:
+    """科目名称映射（Python）：客户一级科目 -> 标准科目，别名库中已确认的映射优先"""
+    mapper = SubjectMapper(aliases=AliasStore(SUBJECT_ALIAS_FILE))
+    result = mapper.map_frame(df_cleaned)
+    counts = result.tier_counts()
+    print(f"  ✓ 科目映射: {result.total}个一级科目，"
+          f"精确{counts['exact']} 别名{counts['alias']} 前缀{counts['prefix']} 缩写{counts['abbrev']} "
+          f"模糊{counts['fuzzy']} 编码{counts['code']} 编码冲突{counts['conflict']} 未映射{counts['unmapped']}"
+          f"（{result.elapsed_ms:.1f}ms）")
+    if result.unmapped:
+        names = ", ".join(m.name for m in result.unmapped[:5])
+        print(f"  ⚠ 未映射科目: {names}{' 等' if len(result.unmapped) > 5 else ''}")
+    return result
+
+
+def write_subject_names(session: PipelineSession, df_cleaned: pd.DataFrame, mapping: SubjectMappingResult) -> None:
+    """标准科目名整列写入余额表（表头 + 每行，一次区域写入）"""
+    column = [["标准科目名称"]] + [[name] for name in standard_name_column(df_cleaned, mapping)]
+    session.backend.write_range("余额表", 1, SUBJECT_MAP_COLUMN, column)
+
+
+def run_allocation_python(session: PipelineSession, df_cleaned: pd.DataFrame, km=None) -> bool:
+    """
+    底稿分配（Python引擎）：按规则由KM表计算各底稿写入，暂停重算后批量提交
+    
+    Returns:
+        bool: 是否已完成分配（False时调用方执行newfenpenjxr宏）
+    """
+    if ALLOCATION_ENGINE != "python":
+        return False
+    if not ALLOCATION_RULES_FILE.exists():
+        print(f"  ⚠ 未找到分配规则 {ALLOCATION_RULES_FILE.name}，改用newfenpenjxr宏")
+        return False
+    
+    rules = load_allocation_rules(ALLOCATION_RULES_FILE)
+    absent = missing_sheets(session.backend, rules)
+    if absent:
+        print(f"  ⚠ 模板中缺少分配规则的工作表 {absent[:3]}，改用newfenpenjxr宏")
+        return False
     
-    # 保存【科目余额表】到输出目录
-    balance_output_name = f"【科目余额表】{company_name}({audit_year}).xlsx"
-    balance_output_path = OUTPUT_DIR / balance_output_name
-    df_cleaned.to_excel(balance_output_path, index=False)
-    print(f"  ✓ 保存科目余额表: {balance_output_name}")
+    with span("底稿分配(Python)", rules=len(rules)):
+        if km is None:
+            km = build_km_table(df_cleaned)
+        result = allocate(km.table, rules)
+        with session.manual_calculation():
+            blocks = result.plan.commit(session.backend)
+    print(f"  ✓ 底稿分配(Python): {result.accounts}个科目 → {len(result.sheets)}张底稿（{blocks}次区域写入）")
+    for rule_name, count in result.overflow:
+        print(f"  ⚠ {rule_name}: 明细行不足，{count}个科目未写入")
+    if len(result.unallocated):
+        codes = ", ".join(result.unallocated["科目编码"].head(5))
+        print(f"  ⚠ 有余额但未分配的一级科目 {len(result.unallocated)}个: {codes}")
+    return True
+
+
+def run_demo_v24(inputs: Optional[EngagementInputs] = None) -> Dict[str, Any]:
+    """
+    运行Demo V2.4完整流程
     
-    # Step 3: Ling注入 + VBA执行
-    print("\n【Step 3】Ling注入 + VBA执行")
+    Step 1~9 声明为阶段（输入/输出），由 StageScheduler 按依赖执行:
+    公司名称/报表解析/余额表清洗/工商查询/上年PDF解析互不等待，
+    操作底稿（COM）的阶段在主线程串行。
     
-    pythoncom.CoInitialize()
-    excel = None
-    wb = None
+    Args:
+        inputs: 项目输入文件，默认使用配置区的单个样本
     
-    try:
-        excel = win32com.client.Dispatch("Excel.Application")
-        excel.Visible = False
-        excel.DisplayAlerts = False
+    Returns:
+        Dict: 运行摘要（公司名称、各维度得分、总分、各阶段耗时、关键路径），供批量汇总使用
+    """
+    if inputs is None:
+        inputs = default_engagement_inputs()
+    
+    sample_dir = inputs.sample_dir
+    balance_file = inputs.balance_file
+    balance_sheet_file = inputs.balance_sheet_file
+    profit_statement_file = inputs.profit_statement_file
+    audit_report_pdf = inputs.audit_report_pdf
+    output_dir = inputs.output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    audit_year = "2024"  # 审计年度
+    
+    summary: Dict[str, Any] = {"status": "failed", "company_name": "", "timings": {}}
+    
+    print("=" * 70)
+    print("OpenCPAi Demo V2.4 - 完整审计底稿生成流程（纯Python版）")
+    print("=" * 70)
+    print(f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"输出目录: {output_dir}")
+    print()
+    print("⭐ V2.4新特性: Z10工商查询使用纯Python API（无VBA依赖）")
+    print()
+    
+    report_cache = None
+    if REPORT_CACHE_ENABLED:
+        report_cache = ReportCache(REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_MB * 1024 * 1024)
+    
+    # ⭐ 阶段输出缓存 + 运行清单（与上次清单对比，显示各阶段重跑原因）
+    #   缓存键含各阶段函数源码，阶段用到的辅助函数/映射表/开关在 Stage.fingerprint 中声明
+    stage_cache = None
+    if STAGE_CACHE_ENABLED:
+        stage_cache = StageCache(STAGE_CACHE_DIR, max_bytes=STAGE_CACHE_MAX_MB * 1024 * 1024)
+    manifest_path = output_dir / "【运行清单】.json"
+    previous_manifest = RunManifest.load(manifest_path)
+    
+    # ⭐ 流程会话：一个Excel进程 + 一个底稿句柄贯穿Step 3~9（仅在主线程的workbook阶段使用）
+    #   批量模式下从工作进程的Excel实例池租用预热实例，结束时归还
+    excel_pool = process_pool()
+    session = PipelineSession(pool=excel_pool, macro_timeout_s=EXCEL_MACRO_TIMEOUT_S)
+    
+    # 财审报告由Python提取时不执行FinPageS，报告阶段不占用底稿通道
+    python_report = use_python_report()
+    
+    # -------------------------------------------------------------------------
+    # 阶段定义
+    # -------------------------------------------------------------------------
+    
+    def stage_company_name() -> str:
+        # Step 1.1: 多来源提取公司名称（优先级：PDF > Excel > 文件名）
+        print("【Step 1】解析财务报表 + 提取公司名称")
+        print("  [1.1] 提取公司名称（多来源）")
+        with PdfDocumentCache(store=PdfTextStore(PDF_TEXT_CACHE_DIR)) as pdf_cache, span("公司名称多来源"):
+            company_name = get_company_name_multi_source(
+                balance_sheet_path=balance_sheet_file,
+                profit_statement_path=profit_statement_file,
+                audit_pdf_path=audit_report_pdf,
+                sample_dir=sample_dir,
+                pdf_cache=pdf_cache
+            )
+        
+        if not company_name:
+            # 备选：从目录名提取
+            company_name = extract_company_name_from_filename(sample_dir.name)
+            print(f"    备选来源: 目录名 -> {company_name}")
+        
+        if not company_name:
+            company_name = "保贝优创（深圳）科技有限公司"  # 最后兜底
+            print(f"    使用默认公司名称: {company_name}")
+        
+        print(f"  ✓ 最终公司名称: {company_name}")
+        summary["company_name"] = company_name
+        return company_name
+    
+    def stage_business_info(company_name: str) -> Optional[Future]:
+        # ⭐ 公司名确定后立即发起Z10工商查询，不在此等待：Step 3写入Z10时才取结果
+        return prefetch_business_info(company_name)
+    
+    def stage_statements(company_name: str) -> Dict[str, Any]:
+        # Step 1.2: 解析财务报表数据（与公司名称提取共用同一次读取）
+        print("  [1.2] 解析财务报表")
+        with span("解析资产负债表"):
+            balance_sheet_data, _ = parse_balance_sheet_excel(balance_sheet_file)
+        with span("解析利润表"):
+            income_statement_data, _ = parse_income_statement_excel(profit_statement_file)
+        return {"balance_sheet_data": balance_sheet_data, "income_statement_data": income_statement_data}
+    
+    def stage_fs_data_source(company_name, balance_sheet_data, income_statement_data) -> Path:
+        # ⭐ Step 1.3: 保存财务报表数据到JSON（作为数据源）
+        print("  [1.3] 保存财务报表数据源")
+        fs_data_source = {
+            "company_name": company_name,
+            "audit_year": audit_year,
+            "balance_sheet": balance_sheet_data,
+            "income_statement": income_statement_data,
+            "source_files": {
+                "balance_sheet": balance_sheet_file.name if balance_sheet_file else "",
+                "income_statement": profit_statement_file.name if profit_statement_file else ""
+            }
+        }
+        safe_name = company_name.replace('（', '(').replace('）', ')')
+        fs_json_path = output_dir / f"【数据源】财务报表_{safe_name[:10]}.json"
+        with open(fs_json_path, 'w', encoding='utf-8') as f:
+            json.dump(fs_data_source, f, ensure_ascii=False, indent=2)
+        print(f"  ✓ 财务报表数据源: {fs_json_path.name}")
+        return fs_json_path
+    
+    def stage_save_balance(company_name: str, df_cleaned: pd.DataFrame) -> Path:
+        # 保存【科目余额表】到输出目录
+        balance_output_name = f"【科目余额表】{company_name}({audit_year}).xlsx"
+        balance_output_path = output_dir / balance_output_name
+        write_frame_to_xlsx(df_cleaned, balance_output_path, max_block_bytes=BALANCE_BLOCK_MAX_BYTES)
+        print(f"  ✓ 保存科目余额表: {balance_output_name}")
+        return balance_output_path
+    
+    def stage_prior_report():
+        # ⭐ 上年审计报告PDF解析与底稿无关，流程开始即在后台进程启动
+        if not (audit_report_pdf and audit_report_pdf.exists()):
+            return None
+        future = None
+        if PRIOR_REPORT_PREFETCH:
+            future = start_prior_report_parse(audit_report_pdf, use_llm=True, cache=report_cache)
+        return join_prior_report(future, audit_report_pdf, use_llm=True, cache=report_cache)
+    
+    def stage_subject_mapping(company_name, df_cleaned) -> Dict[str, Any]:
+        # 科目名称映射（Python，毫秒级）：结果用于D3评分；未映射/待确认科目写出清单
+        print("\n【Step 3】科目名称映射")
+        with span("科目映射", rows=len(df_cleaned)) as s:
+            mapping = map_subject_names(df_cleaned)
+            s["unmapped"] = len(mapping.unmapped)
+        safe_company_name = company_name.replace('（', '(').replace('）', ')')
+        review_path = mapping.save_review(output_dir / f"【科目映射待确认】{safe_company_name}({audit_year}).csv")
+        if review_path:
+            print(f"  ✓ 待确认清单: {review_path.name}")
+        return {"subject_mapping": mapping, "subject_review": review_path}
+    
+    def stage_build_workpaper(company_name, df_cleaned, business_future, subject_mapping) -> Path:
+        # Step 3: Ling注入 + VBA执行
+        print("\n【Step 3】Ling注入 + VBA执行")
         
         # 打开模板
-        template_path = str(VBA_TEMPLATE.absolute())
-        excel.Workbooks.Open(template_path)
-        wb = excel.ActiveWorkbook
+        wb = session.open_workpaper(VBA_TEMPLATE)
         
         # 写入数据到余额表
         ws_balance = wb.Sheets("余额表")
         ws_balance.UsedRange.Delete()
         
-        data_array = [df_cleaned.columns.tolist()] + df_cleaned.values.tolist()
-        target_range = ws_balance.Range(
-            ws_balance.Cells(1, 1),
-            ws_balance.Cells(len(data_array), len(df_cleaned.columns))
-        )
-        target_range.Value = data_array
-        print(f"  ✓ 写入余额表: {len(df_cleaned)}行")
+        # 按内存上限分块写入（每块一次Range.Value），不生成整表二维列表
+        with span("写入余额表", rows=len(df_cleaned)):
+            ingest = write_frame_to_sheet(
+                session.backend, "余额表", df_cleaned, max_block_bytes=BALANCE_BLOCK_MAX_BYTES
+            )
+        print(f"  ✓ 写入余额表: {ingest.rows}行（{ingest.blocks}块，每块≤{ingest.rows_per_block}行）")
         
         # 写入首页公司名称
         ws_home = wb.Sheets("首页")
         ws_home.Cells(7, 6).Value = company_name
         print(f"  ✓ 写入首页F7: {company_name}")
         
-        # ⭐ Z10工商查询（与F7写入同时进行，在VBA宏执行之前）
+        # ⭐ Z10工商查询（与F7写入同时进行，在VBA宏执行之前；查询已在Step 1后提前发起）
         print("  写入Z10工商信息...")
-        query_business_registration_python(wb, company_name)
+        with span("写入Z10"):
+            query_business_registration_python(wb, company_name, prefetched=business_future)
         
         # 执行VBA宏
-        print("  执行KMSCB宏...")
-        excel.Application.Run("KMSCB")
-        print("  ✓ KMSCB完成")
-        
-        print("  执行newfenpenjxr宏...")
-        excel.Application.Run("newfenpenjxr")
-        print("  ✓ newfenpenjxr完成")
-        
-        # ⭐ 科目名称映射宏（在底稿分配之后执行）
-        print("  执行Auto_MapSubjectNames宏...")
-        try:
-            excel.Application.Run("Auto_MapSubjectNames")
-            print("  ✓ Auto_MapSubjectNames完成")
-        except Exception as e:
-            print(f"  ⚠ Auto_MapSubjectNames跳过: {str(e)[:50]}")
+        km = None
+        if KM_ENGINE == "python":
+            with span("KM表(Python)", rows=len(df_cleaned)):
+                km = build_km_table(df_cleaned)
+                write_km_table(session.backend, km.table, max_block_bytes=BALANCE_BLOCK_MAX_BYTES)
+            print(f"  ✓ KM表(Python): {len(km.table)}个科目，{len(km.first_level)}个一级科目")
+            if len(km.inconsistencies):
+                print(f"  ⚠ 上级科目与下级合计不一致: {km.inconsistencies['科目编码'].nunique()}个科目")
+        else:
+            print("  执行KMSCB宏...")
+            session.run_macro("KMSCB")
+            print("  ✓ KMSCB完成")
+        
+        if not run_allocation_python(session, df_cleaned, km):
+            print("  执行newfenpenjxr宏...")
+            session.run_macro("newfenpenjxr")
+            print("  ✓ newfenpenjxr完成")
+        
+        # ⭐ 科目名称映射（在底稿分配之后执行）
+        if SUBJECT_MAP_ENGINE == "python":
+            with span("科目映射写入"):
+                write_subject_names(session, df_cleaned, subject_mapping)
+            print(f"  ✓ 标准科目名称已写入余额表第{SUBJECT_MAP_COLUMN}列")
+        else:
+            print("  执行Auto_MapSubjectNames宏...")
+            try:
+                session.run_macro("Auto_MapSubjectNames")
+                print("  ✓ Auto_MapSubjectNames完成")
+            except Exception as e:
+                print(f"  ⚠ Auto_MapSubjectNames跳过: {str(e)[:50]}")
         
         # ⭐ 先保存财审底稿（FinPageS会读取ThisWorkbook.Path来保存报告）
         # 命名规则：【财审底稿】公司全名(年份).xlsm
         safe_company_name = company_name.replace('（', '(').replace('）', ')')
         workpaper_name = f"【财审底稿】{safe_company_name}({audit_year}).xlsm"
-        workpaper_path = OUTPUT_DIR / workpaper_name
-        wb.SaveAs(str(workpaper_path.absolute()), FileFormat=52)
+        workpaper_path = output_dir / workpaper_name
+        with span("保存底稿"):
+            session.save_workpaper(workpaper_path, file_format=52)
         print(f"  ✓ 保存底稿: {workpaper_path.name}")
         
         # ⭐ 执行FinPageS报告提取宏（底稿保存后执行，确保ThisWorkbook.Path正确）
-        print("  执行FinPageS宏...")
-        try:
-            excel.Application.Run("FinPageS")
-            print("  ✓ FinPageS完成")
-        except Exception as e:
-            print(f"  ⚠ FinPageS跳过: {str(e)[:50]}")
+        # Python提取时报告在底稿最终保存后由 step8_财审报告 生成
+        if not python_report:
+            print("  执行FinPageS宏...")
+            try:
+                session.run_macro("FinPageS")
+                print("  ✓ FinPageS完成")
+            except Exception as e:
+                print(f"  ⚠ FinPageS跳过: {str(e)[:50]}")
         
         # 重新获取workbook引用
-        wb = excel.ActiveWorkbook
-        
-        # Step 4: 解析上年审计报告PDF + 写入Z3-2上年数
+        session.reattach_active()
+        return workpaper_path
+    
+    def stage_prior_year_write(workpaper_path, prior_report) -> Dict[str, float]:
+        # Step 4: 上年审计报告PDF结果 + 写入Z3-2上年数
         print("\n【Step 4】解析上年审计报告PDF")
         
-        prior_balance_data = {}
-        prior_income_data = {}
-        prior_cashflow_data = {}
+        if prior_report is None:
+            print(f"  ⚠ 上年审计报告PDF不存在: {audit_report_pdf.name if audit_report_pdf else '（未提供）'}")
+            return {}
         
-        if AUDIT_REPORT_PDF.exists():
-            parser = AuditReportParser(verbose=False, use_llm=True)
-            pdf_result = parser.parse(str(AUDIT_REPORT_PDF))
-            
-            if pdf_result.is_success:
-                # 提取资产负债表（用于D6比对）- 注意：是期末数据
-                prior_balance_data = pdf_result.balance_sheet_current
-                print(f"  ✓ 资产负债表提取: {len(prior_balance_data)}项（用于D6比对）")
-                
-                # 提取利润表（写入Z3-2 D列）
-                prior_income_data = pdf_result.income_statement_current
-                print(f"  ✓ 利润表提取: {len(prior_income_data)}项")
-                
-                # 提取现金流量表（写入Z3-2 D列）
-                prior_cashflow_data = pdf_result.cash_flow_current
-                print(f"  ✓ 现金流量表提取: {len(prior_cashflow_data)}项")
-                
-                # ⭐ 写入利润表和现金流量表到Z3-2（只写入利润表和现金流量表，不写入资产负债表）
-                if prior_income_data or prior_cashflow_data:
-                    print("\n  写入上年利润表和现金流量表到Z3-2...")
-                    write_result = write_prior_year_income_cashflow_to_z32(
-                        wb, prior_income_data, prior_cashflow_data
-                    )
-                    print(f"  ✓ 写入完成: 利润表{write_result['income_written']}项 + 现金流量表{write_result['cashflow_written']}项")
-                    
-                    # 写入后重新保存底稿
-                    wb.Save()
-                    print("  ✓ 底稿已保存（含Z3-2上年数据）")
-            else:
-                print(f"  ⚠ PDF解析失败: {pdf_result.error_message or '未知错误'}")
+        if prior_report.from_cache:
+            summary["timings"]["prior_report_parse"] = 0.0
+            print("  ✓ PDF解析结果命中缓存（跳过解析）")
         else:
-            print(f"  ⚠ 上年审计报告PDF不存在: {AUDIT_REPORT_PDF.name}")
-        
+            summary["timings"]["prior_report_parse"] = prior_report.elapsed_s
+            print(f"  ✓ PDF解析耗时: {prior_report.elapsed_s:.1f}s（与Step 1~3并行）")
+        
+        if not prior_report.is_success:
+            print(f"  ⚠ PDF解析失败: {prior_report.error_message or '未知错误'}")
+            return {}
+        
+        # 提取资产负债表（用于D6比对）- 注意：是期末数据
+        prior_balance_data = prior_report.balance_sheet_current
+        print(f"  ✓ 资产负债表提取: {len(prior_balance_data)}项（用于D6比对）")
+        
+        # 提取利润表（写入Z3-2 D列）
+        prior_income_data = prior_report.income_statement_current
+        print(f"  ✓ 利润表提取: {len(prior_income_data)}项")
+        
+        # 提取现金流量表（写入Z3-2 D列）
+        prior_cashflow_data = prior_report.cash_flow_current
+        print(f"  ✓ 现金流量表提取: {len(prior_cashflow_data)}项")
+        
+        # ⭐ 写入利润表和现金流量表到Z3-2（只写入利润表和现金流量表，不写入资产负债表）
+        if prior_income_data or prior_cashflow_data:
+            print("\n  写入上年利润表和现金流量表到Z3-2...")
+            write_result = write_prior_year_income_cashflow_to_z32(
+                session.workbook, prior_income_data, prior_cashflow_data
+            )
+            print(f"  ✓ 写入完成: 利润表{write_result['income_written']}项 + 现金流量表{write_result['cashflow_written']}项")
+            
+            # 写入后重新保存底稿
+            session.save_workpaper()
+            print("  ✓ 底稿已保存（含Z3-2上年数据）")
+        return prior_balance_data
+    
+    def stage_comparisons(balance_sheet_data, income_statement_data, prior_balance_data) -> Dict[str, Any]:
         # Step 5: 对比检查
         print("\n【Step 5】对比检查")
+        wb = session.workbook
+        
+        # Z3-2 C7:D287 一次读入快照，两项对比共用
+        with span("Z3-2快照"):
+            z32_snapshot = load_z32_snapshot(wb)
         
         # 对比1: 财务报表 vs Z3-2期末（C列）
         fs_vs_z32_diffs = compare_z32_vs_financial_statements(
-            wb, balance_sheet_data, income_statement_data
+            wb, balance_sheet_data, income_statement_data, snapshot=z32_snapshot
         )
         
         # 对比2: 上年审计报告资产负债表期末 vs Z3-2期初（D列）
-        prior_vs_z32_diffs = compare_z32_vs_prior_audit(wb, prior_balance_data)
+        prior_vs_z32_diffs = compare_z32_vs_prior_audit(
+            wb, prior_balance_data, snapshot=z32_snapshot
+        )
         
         z35_diffs = detect_z35_differences(wb)
-        
-        # Step 6: 关闭审计底稿
-        print("\n【Step 6】关闭审计底稿")
+        return {
+            "fs_vs_z32_diffs": fs_vs_z32_diffs,
+            "prior_vs_z32_diffs": prior_vs_z32_diffs,
+            "z35_diffs": z35_diffs,
+        }
+    
+    def stage_save_workpaper(workpaper_path, z35_diffs) -> Path:
+        # Step 6: 保存审计底稿
+        # ⭐ 底稿保持打开，Step 9评分直接复用会话中的句柄，不再重新打开
+        print("\n【Step 6】保存审计底稿")
+        session.save_workpaper()
         print(f"  ✓ 底稿已保存: {workpaper_path}")
-        
-        # 关闭审计底稿
-        wb.Close(SaveChanges=True)
-        
+        return workpaper_path
+    
+    def stage_check_report(company_name, fs_vs_z32_diffs, prior_vs_z32_diffs, z35_diffs) -> Dict[str, Any]:
         # Step 7: 生成检查报告
         print("\n【Step 7】生成检查报告")
         check_excel, check_pdf = generate_comprehensive_check_report(
-            OUTPUT_DIR,
+            output_dir,
             fs_vs_z32_diffs,
             prior_vs_z32_diffs,
             z35_diffs,
             company_name,
-            audit_year
+            audit_year,
+            session=session,
+            pdf_engine=PDF_ENGINE,
+            layout=CHECK_REPORT_LAYOUT
         )
-        
-        # Step 8: 查找并导出财审报告PDF
-        # ⭐ FinPageS宏会在OUTPUT_DIR生成【财审报告】xxx.xlsx，基于此文件转PDF
-        print("\n【Step 8】导出财审报告PDF")
-        
-        audit_report_xlsx = None
-        
-        # 查找OUTPUT_DIR中FinPageS生成的【财审报告】文件（优先最新的）
-        xlsx_files = list(OUTPUT_DIR.glob("【财审报告】*.xlsx"))
-        if xlsx_files:
-            # 取最新生成的文件
-            audit_report_xlsx = max(xlsx_files, key=lambda f: f.stat().st_mtime)
-            print(f"  找到财审报告: {audit_report_xlsx.name}")
-        
-        if audit_report_xlsx:
-            # PDF与xlsx同名，放在同一目录
-            pdf_name = audit_report_xlsx.stem + ".pdf"
-            audit_report_pdf = OUTPUT_DIR / pdf_name
-            export_audit_report_to_pdf(audit_report_xlsx, audit_report_pdf)
-        else:
+        return {"check_excel": check_excel, "check_pdf": check_pdf}
+    
+    def stage_audit_report(company_name, saved_workpaper) -> Optional[Path]:
+        # Step 8: 财审报告xlsx
+        print("\n【Step 8】财审报告")
+        if python_report:
+            # ⭐ 由最终保存的底稿直接生成，返回路径（不再按通配查找）
+            with span("财审报告提取"):
+                report = extract_report(
+                    saved_workpaper, load_report_sections(REPORT_SPEC_FILE), output_dir, company_name, audit_year
+                )
+            hidden = sum(h for _, h in report.sections.values())
+            print(f"  ✓ 财审报告: {report.path.name}（{len(report.sections)}张表，隐藏空行{hidden}）")
+            if report.missing:
+                print(f"  ⚠ 底稿中缺少版式工作表: {report.missing}")
+            return report.path
+        
+        # ⭐ FinPageS宏会在OUTPUT_DIR生成【财审报告】xxx.xlsx（优先最新的）
+        xlsx_files = list(output_dir.glob("【财审报告】*.xlsx"))
+        if not xlsx_files:
             print("  ⚠️ 未找到【财审报告】Excel文件，跳过PDF导出")
             print("     提示：FinPageS宏执行后应在OUTPUT_DIR生成【财审报告】xxx.xlsx")
+            return None
+        audit_report_xlsx = max(xlsx_files, key=lambda f: f.stat().st_mtime)
+        print(f"  找到财审报告: {audit_report_xlsx.name}")
+        return audit_report_xlsx
+    
+    def stage_audit_report_pdf(audit_report_xlsx) -> Optional[Path]:
+        # Step 8: 导出财审报告PDF
+        if not audit_report_xlsx:
+            return None
         
-        print("\n" + "=" * 70)
-        print("✓ Demo V2.6 完成！")
-        print("=" * 70)
-        
+        # PDF与xlsx同名，放在同一目录
+        report_pdf_path = output_dir / (audit_report_xlsx.stem + ".pdf")
+        export_audit_report_to_pdf(audit_report_xlsx, report_pdf_path, session=session, engine=PDF_ENGINE)
+        return report_pdf_path
+    
+    def stage_scoring(saved_workpaper, subject_mapping, balance_sheet_data, prior_balance_data) -> Dict[str, Any]:
         # 执行6维度评分
+        # ⭐ openpyxl引擎只读打开已保存的底稿取快照（不占用Excel，与Step 7/8并行）；COM引擎复用会话句柄
         print("\n【Step 9】6维度评分")
-        scores = evaluate_6_dimensions(workpaper_path)
-        
-        # 输出评分结果
-        total_score = sum(s["actual"] for s in scores.values())
-        total_max = sum(s["max"] for s in scores.values())
-        accuracy = total_score / total_max * 100 if total_max > 0 else 0
-        
-        print("\n📊 6维度评分结果:")
-        for dim, data in scores.items():
-            status = "✅" if data["actual"] == data["max"] else "⚠️"
-            print(f"  {status} {dim}: {data['actual']}/{data['max']}")
-        
-        # 准确度等级
-        if accuracy >= 95:
-            level = "卓越"
-        elif accuracy >= 90:
-            level = "进取"
-        elif accuracy >= 85:
-            level = "基础"
+        return evaluate_6_dimensions(
+            saved_workpaper,
+            session=session if WORKBOOK_ENGINE == "com" else None,
+            subject_mapping=subject_mapping,
+            balance_sheet_data=balance_sheet_data,
+            prior_balance_data=prior_balance_data
+        )
+    
+    # 缓存键的额外依赖：阶段内直接使用的输入文件、模板、输出位置，以及调用的辅助函数、映射表与开关
+    #   （阶段函数自身的源码由调度器计入；修改其中一项只使用到它的阶段及下游重跑）
+    statement_files = (balance_sheet_file, profit_statement_file)
+    output_deps = (str(output_dir), audit_year)
+    workbook_deps = (VBA_TEMPLATE, WORKBOOK_ENGINE, ALLOCATION_RULES_FILE) + output_deps
+    z32_tables = (Z3_2_BALANCE_MAPPING, Z3_2_BALANCE_ALIASES)
+    name_deps = (get_company_name_multi_source, extract_company_name_from_pdf,
+                 extract_company_name_from_text, extract_company_name_from_filename)
+    statement_deps = (load_financial_statement, parse_balance_sheet_excel, parse_income_statement_excel,
+                      INCOME_STATEMENT_ITEMS) + z32_tables
+    build_deps = (query_business_registration_python, write_business_info_to_z10, write_mock_business_info_to_z10,
+                  MOCK_BUSINESS_DATA, USE_Z10_API, KM_ENGINE, ALLOCATION_ENGINE, run_allocation_python,
+                  SUBJECT_MAP_ENGINE, SUBJECT_MAP_COLUMN, write_subject_names, REPORT_ENGINE)
+    prior_write_deps = (write_prior_year_income_cashflow_to_z32, Z3_2_INCOME_MAPPING, Z3_2_CASHFLOW_MAPPING,
+                        Z3_2_FORMULA_ROWS, Z3_2_EMPTY_ROWS)
+    comparison_deps = (load_z32_snapshot, compare_z32_vs_financial_statements, compare_z32_vs_prior_audit,
+                       detect_z35_differences, Z3_2_SNAPSHOT_FIRST_ROW, Z3_2_SNAPSHOT_LAST_ROW,
+                       Z3_2_SNAPSHOT_FIRST_COL, Z3_2_SNAPSHOT_LAST_COL) + z32_tables
+    
+    stages = [
+        Stage("step1_公司名称", stage_company_name, outputs=("company_name",),
+              cache=True, fingerprint=statement_files + (audit_report_pdf, sample_dir.name) + name_deps),
+        Stage("step1_财务报表", stage_statements, inputs=("company_name",),
+              outputs=("balance_sheet_data", "income_statement_data"), cache=True,
+              fingerprint=statement_files + statement_deps),
+        Stage("step1_数据源", stage_fs_data_source,
+              inputs=("company_name", "balance_sheet_data", "income_statement_data"), outputs=("fs_json_path",),
+              cache=True, fingerprint=statement_files + output_deps),
+        # 工商查询有自己的磁盘缓存（按有效期），每次运行都经过它
+        Stage("z10_工商查询", stage_business_info, inputs=("company_name",), outputs=("business_future",)),
+        Stage("step2_清洗", clean_trial_balance, inputs=("balance_file",), outputs=("df_cleaned",), kind="cpu",
+              cache=True, fingerprint=(parser_version(CLEANER_MODULE),)),
+        Stage("step2_保存余额表", stage_save_balance, inputs=("company_name", "df_cleaned"),
+              outputs=("balance_output_path",), cache=True, fingerprint=output_deps),
+        Stage("step3_科目映射", stage_subject_mapping, inputs=("company_name", "df_cleaned"),
+              outputs=("subject_mapping", "subject_review"), cache=True,
+              fingerprint=(SUBJECT_ALIAS_FILE, map_subject_names) + output_deps),
+        Stage("step4_上年PDF解析", stage_prior_report, outputs=("prior_report",),
+              cache=True, fingerprint=(audit_report_pdf, parser_version())),
+        # 底稿通道：只能整体复用（见 StageScheduler），任一阶段未命中则从Step 3起重建底稿
+        # 工商查询Future不计入缓存键（查询由 company_name 决定，已计入）
+        Stage("step3_注入与宏", stage_build_workpaper, inputs=("company_name", "df_cleaned", "business_future", "subject_mapping"),
+              outputs=("workpaper_path",), kind="workbook", cache=True, fingerprint=workbook_deps + build_deps,
+              unkeyed_inputs=("business_future",)),
+        Stage("step4_写入上年数", stage_prior_year_write, inputs=("workpaper_path", "prior_report"),
+              outputs=("prior_balance_data",), kind="workbook", cache=True,
+              fingerprint=workbook_deps + prior_write_deps),
+        Stage("step5_对比检查", stage_comparisons,
+              inputs=("balance_sheet_data", "income_statement_data", "prior_balance_data"),
+              outputs=("fs_vs_z32_diffs", "prior_vs_z32_diffs", "z35_diffs"), kind="workbook",
+              cache=True, fingerprint=workbook_deps + comparison_deps),
+        # z35_diffs 仅用于排序：对比检查完成后再保存
+        Stage("step6_保存底稿", stage_save_workpaper, inputs=("workpaper_path", "z35_diffs"),
+              outputs=("saved_workpaper",), kind="workbook", cache=True, fingerprint=workbook_deps),
+        # 检查报告xlsx流式写出；PDF也由Python渲染时不需要Excel，在线程池中执行
+        Stage("step7_检查报告", stage_check_report,
+              inputs=("company_name", "fs_vs_z32_diffs", "prior_vs_z32_diffs", "z35_diffs"),
+              outputs=("check_excel", "check_pdf"), kind="io" if PDF_ENGINE == "python" else "workbook",
+              cache=True, fingerprint=workbook_deps + (PDF_ENGINE, CHECK_REPORT_LAYOUT,
+                                                        generate_comprehensive_check_report, check_report_tables)),
+        # Python提取只读已保存的底稿文件，在线程池中与检查报告并行
+        Stage("step8_财审报告", stage_audit_report, inputs=("company_name", "saved_workpaper"),
+              outputs=("audit_report_xlsx",), kind="io" if python_report else "workbook",
+              cache=True, fingerprint=workbook_deps + (REPORT_ENGINE, REPORT_SPEC_FILE)),
+        # Python渲染不需要Excel，在线程池中执行
+        Stage("step8_财审报告PDF", stage_audit_report_pdf, inputs=("audit_report_xlsx",),
+              outputs=("audit_report_pdf_path",), kind="io" if PDF_ENGINE == "python" else "workbook",
+              cache=True, fingerprint=workbook_deps + (PDF_ENGINE, export_audit_report_to_pdf)),
+        # 评分读取已保存底稿的快照；openpyxl引擎不需要Excel，在线程池中执行
+        Stage("step9_评分", stage_scoring,
+              inputs=("saved_workpaper", "subject_mapping", "balance_sheet_data", "prior_balance_data"),
+              outputs=("scores",), kind="io" if WORKBOOK_ENGINE == "openpyxl" else "workbook",
+              cache=True, fingerprint=workbook_deps + (SCORING_RULES_FILE, evaluate_6_dimensions, scoring_scheme)
+              + z32_tables),
+    ]
+    
+    def save_manifest(schedule_result) -> None:
+        manifest = RunManifest.from_result(schedule_result, run_id=inputs.name)
+        manifest.save(manifest_path)
+        cached = schedule_result.cached()
+        summary["cached_stages"] = cached
+        if cached:
+            print(f"\n♻ 复用上次结果: {len(cached)}个阶段（{', '.join(cached)}）")
+            if previous_manifest is not None:
+                for name, reasons in manifest.changed_inputs(previous_manifest).items():
+                    print(f"    重新执行 {name}: {', '.join(reasons)}")
+    
+    # ⭐ 运行追踪：每个阶段/子步骤/宏一个span，写入输出目录
+    trace_path = output_dir / f"【运行追踪】{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    tracer = Tracer(trace_path, run_id=inputs.name)
+    summary["trace"] = str(trace_path)
+    
+    try:
+        with tracer.activate(), span("run", engagement=inputs.name):
+            result = StageScheduler(
+                stages, io_workers=STAGE_IO_WORKERS, cpu_workers=STAGE_CPU_WORKERS, cache=stage_cache
+            ).run({"balance_file": balance_file})
+    except StageError as e:
+        save_manifest(e.result)
+        if isinstance(e.cause, TrialBalanceCleaningError):
+            summary["error"] = str(e.cause)
         else:
-            level = "不合格"
-        
-        print(f"\n🎯 最终得分: {total_score}/{total_max} ({accuracy:.1f}%) - {level}等级")
-        
-        # 输出文件清单
-        print("\n【输出文件】")
-        for f in OUTPUT_DIR.iterdir():
-            if f.is_file():
-                size_kb = f.stat().st_size / 1024
-                print(f"  - {f.name} ({size_kb:.1f} KB)")
-        
-    except Exception as e:
-        print(f"\n✗ 执行失败: {e}")
-        traceback.print_exc()
+            print(f"\n✗ 执行失败: {e}")
+            traceback.print_exception(type(e.cause), e.cause, e.cause.__traceback__)
+            summary["error"] = f"{type(e.cause).__name__}: {e.cause}"
+        summary["timings"].update(e.result.timings())
+        summary["critical_path"] = e.result.critical_path
+        return summary
     finally:
-        if excel:
-            try:
-                excel.Quit()
-            except:
-                pass
-        pythoncom.CoUninitialize()
+        # 关闭底稿并退出唯一的Excel进程（租用的实例归还到池）
+        session.close()
+        tracer.close()
+        if excel_pool is not None:
+            summary["excel_pool"] = excel_pool.stats()
+    
+    save_manifest(result)
+    values = result.values
+    scores = values["scores"]
+    workpaper_path = values["workpaper_path"]
+    summary["company_name"] = values["company_name"]
+    
+    print("\n" + "=" * 70)
+    print("✓ Demo V2.6 完成！")
+    print("=" * 70)
+    
+    # 输出评分结果
+    total_score = sum(s["actual"] for s in scores.values())
+    total_max = sum(s["max"] for s in scores.values())
+    accuracy = total_score / total_max * 100 if total_max > 0 else 0
+    
+    print("\n📊 6维度评分结果:")
+    for dim, data in scores.items():
+        status = "✅" if data["actual"] == data["max"] else "⚠️"
+        print(f"  {status} {dim}: {data['actual']}/{data['max']}")
+    
+    # 准确度等级
+    if accuracy >= 95:
+        level = "卓越"
+    elif accuracy >= 90:
+        level = "进取"
+    elif accuracy >= 85:
+        level = "基础"
+    else:
+        level = "不合格"
+    
+    print(f"\n🎯 最终得分: {total_score}/{total_max} ({accuracy:.1f}%) - {level}等级")
+    
+    summary["timings"].update(result.timings())
+    summary.update({
+        "status": "ok",
+        "scores": {dim: data["actual"] for dim, data in scores.items()},
+        "total_score": total_score,
+        "total_max": total_max,
+        "accuracy": round(accuracy, 1),
+        "level": level,
+        "workpaper": str(workpaper_path),
+        "fs_vs_z32_diffs": len(values["fs_vs_z32_diffs"]),
+        "prior_vs_z32_diffs": len(values["prior_vs_z32_diffs"]),
+        "z35_diffs": len(values["z35_diffs"]),
+        "wall_s": result.wall_s,
+        "critical_path": result.critical_path,
+    })
+    
+    # 关键路径：决定总耗时的阶段链
+    print(f"\n⏱ 总耗时 {result.wall_s:.1f}s，关键路径: {result.format_critical_path()}")
+    print(f"  追踪记录: {trace_path.name}")
+    
+    # 输出文件清单
+    print("\n【输出文件】")
+    for f in output_dir.iterdir():
+        if f.is_file():
+            size_kb = f.stat().st_size / 1024
+            print(f"  - {f.name} ({size_kb:.1f} KB)")
+    
+    return summary
+
+
+def main():
+    """命令行入口：默认运行单个样本，--batch 批量运行目录下所有公司"""
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description="OpenCPAi Demo V2.6 - 审计底稿生成")
+    arg_parser.add_argument("--batch", type=Path, help="批量模式：公司目录所在的根目录（如 样本30份）")
+    arg_parser.add_argument("--workers", type=int, default=None, help="批量并行度（默认min(CPU核数, 4)）")
+    arg_parser.add_argument("--output", type=Path, default=OUTPUT_DIR, help="输出目录")
+    args = arg_parser.parse_args()
+    
+    if args.batch:
+        engagements = discover_engagements(args.batch, args.output)
+        if not engagements:
+            print(f"✗ 未找到含科目余额表的公司目录: {args.batch}")
+            return
+        worker_initializer = None
+        if EXCEL_POOL_ENABLED:
+            worker_initializer = functools.partial(
+                init_process_pool, max_jobs=EXCEL_POOL_MAX_JOBS, macro_timeout_s=EXCEL_MACRO_TIMEOUT_S
+            )
+        run_batch(engagements, run_demo_v24, args.output, max_workers=args.workers,
+                  worker_initializer=worker_initializer)
+    else:
+        inputs = default_engagement_inputs()
+        inputs.output_dir = args.output
+        run_demo_v24(inputs)
 
 
 if __name__ == "__main__":
-    run_demo_v24()
+    main()
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试: 流程各函数在 1× / 10× / 100× 合成数据上的耗时与正确性
+
+不需要Excel、真实客户目录或外部解析器（jenny/core_v4）:
+    - 输入由 opencpai_pipeline.fixtures 按规模生成（固定种子，可重复）
+    - 底稿操作使用 openpyxl 后端
+    - 每项计时的同时对照已知答案校验结果（报表金额、差异项数、评分）
+
+计时项:
+    报表读取      - parse_balance_sheet_excel + parse_income_statement_excel（清空报表缓存后）
+    公司名称      - get_company_name_multi_source（PDF前2页 + 报表 + 目录名）
+    PDF逐页文本   - 上年审计报告全部页面解码（PdfDocument，无持久化缓存）
+    余额表读取    - pandas 读取合成科目余额表
+    余额表写入    - write_frame_to_sheet 写入底稿模板"余额表"
+    Z3-2比对      - load_z32_snapshot + 两项对比
+    Z3-5检测      - detect_z35_differences
+    上年数写入    - write_prior_year_income_cashflow_to_z32
+    评分          - evaluate_6_dimensions（openpyxl只读快照 + 评分规则，含D6报表比对）
+
+用法:
+    python scripts/experimental/bench_pipeline.py
+    python scripts/experimental/bench_pipeline.py --scales 1 10 --repeat 5 --json bench.json
+    python scripts/experimental/bench_pipeline.py --baseline bench.json --tolerance 1.5
+
+--baseline 时任一项比基线慢 tolerance 倍以上，或任一正确性校验失败，退出码为1。
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+WEB_ROOT = SCRIPT_DIR.parents[1]
+DEMO_SCRIPT = WEB_ROOT / "opencpai-app" / "src" / "versions" / "demo_v2_6_with_scoring_backup.py"
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import pandas as pd
+
+from opencpai_pipeline.balance_ingest import write_frame_to_sheet
+from opencpai_pipeline.fixtures import FixtureSet, generate_fixture_set
+from opencpai_pipeline.pdf_cache import PdfDocument
+from opencpai_pipeline.statements import clear_statement_cache
+from opencpai_pipeline.workbook_backend import open_workbook
+
+
+def load_demo():
+    """按文件路径加载Demo脚本（文件名不是合法模块名）"""
+    spec = importlib.util.spec_from_file_location("demo_v2_6", DEMO_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _close_enough(actual: Dict[str, float], expected: Dict[str, float]) -> bool:
+    return set(actual) == set(expected) and all(abs(actual[k] - expected[k]) < 0.01 for k in expected)
+
+
+class Bench:
+    """单个规模的计时 + 校验"""
+
+    def __init__(self, demo, fixture: FixtureSet, repeat: int, work_dir: Path):
+        self.demo = demo
+        self.fixture = fixture
+        self.repeat = repeat
+        self.work_dir = work_dir
+        self.timings: Dict[str, float] = {}
+        self.failures: List[str] = []
+
+    def time(self, label: str, func: Callable[[], Any], check: Optional[Callable[[Any], bool]] = None):
+        """执行 repeat 次取最小耗时（秒），demo 的进度输出被屏蔽"""
+        best = None
+        result = None
+        for _ in range(self.repeat):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                result = func()
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        self.timings[label] = best
+        if check is not None and not check(result):
+            self.failures.append(label)
+        return result
+
+    def workpaper_copy(self) -> Path:
+        """每次写入类计时使用模板的新副本"""
+        path = self.work_dir / f"wp_{time.perf_counter_ns()}.xlsx"
+        shutil.copy(self.fixture.template, path)
+        return path
+
+    def run(self) -> None:
+        demo, fx, expected = self.demo, self.fixture, self.fixture.expected
+
+        def parse_statements():
+            clear_statement_cache()
+            bs, _ = demo.parse_balance_sheet_excel(fx.balance_sheet)
+            income, _ = demo.parse_income_statement_excel(fx.income_statement)
+            return bs, income
+
+        def check_statements(result):
+            bs, income = result
+            income_expected = {k: v for k, v in expected["income_statement"].items()
+                               if k in demo.INCOME_STATEMENT_ITEMS}
+            return _close_enough(bs, expected["balance_sheet"]) and _close_enough(income, income_expected)
+
+        self.time("报表读取", parse_statements, check_statements)
+
+        def company_name():
+            clear_statement_cache()
+            return demo.get_company_name_multi_source(
+                fx.balance_sheet, fx.income_statement, fx.audit_pdf, fx.sample_dir
+            )
+
+        self.time("公司名称", company_name, lambda name: name == fx.company_name)
+
+        def decode_pdf():
+            doc = PdfDocument(fx.audit_pdf)
+            try:
+                return sum(len(doc.page_text(i)) for i in range(doc.page_count))
+            finally:
+                doc.close()
+
+        self.time("PDF逐页文本", decode_pdf, lambda chars: chars > 0)
+
+        df = self.time(
+            "余额表读取",
+            lambda: pd.read_excel(fx.trial_balance, header=2),
+            lambda frame: len(frame) == expected["trial_balance_rows"],
+        )
+
+        def write_balance():
+            backend = open_workbook(self.workpaper_copy(), writable=True)
+            try:
+                return write_frame_to_sheet(backend, "余额表", df)
+            finally:
+                backend.close(save=False)
+
+        self.time("余额表写入", write_balance, lambda stats: stats.rows == len(df))
+
+        backend = open_workbook(fx.template)
+        try:
+            def compare_z32():
+                snapshot = demo.load_z32_snapshot(backend)
+                fs_diffs = demo.compare_z32_vs_financial_statements(
+                    backend, expected["balance_sheet"], {}, snapshot=snapshot
+                )
+                prior_diffs = demo.compare_z32_vs_prior_audit(backend, expected["prior_balance"], snapshot=snapshot)
+                return len(fs_diffs), len(prior_diffs)
+
+            self.time(
+                "Z3-2比对", compare_z32,
+                lambda counts: counts == (expected["fs_vs_z32_diffs"], expected["prior_vs_z32_diffs"]),
+            )
+            self.time(
+                "Z3-5检测", lambda: demo.detect_z35_differences(backend),
+                lambda diffs: len(diffs) == expected["z35_diffs"],
+            )
+        finally:
+            backend.close(save=False)
+
+        def write_prior():
+            wp = open_workbook(self.workpaper_copy(), writable=True)
+            try:
+                return demo.write_prior_year_income_cashflow_to_z32(
+                    wp, expected["prior_income"], expected["prior_cashflow"]
+                )
+            finally:
+                wp.close(save=False)
+
+        income_rows = {demo.Z3_2_INCOME_MAPPING[k] for k in expected["prior_income"] if k in demo.Z3_2_INCOME_MAPPING}
+        self.time("上年数写入", write_prior, lambda r: r["income_written"] == len(income_rows))
+
+        def score():
+            scores = demo.evaluate_6_dimensions(
+                fx.template, engine="openpyxl",
+                balance_sheet_data=expected["balance_sheet"], prior_balance_data=expected["prior_balance"],
+            )
+            return {k: v["actual"] for k, v in scores.items()}
+
+        self.time("评分", score, lambda actual: actual == expected["scores"])
+
+
+def compare_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """返回比基线慢 tolerance 倍以上的项（"规模/项"）"""
+    regressions = []
+    for scale, timings in results.items():
+        base = baseline.get("timings", {}).get(scale, {})
+        for label, elapsed in timings.items():
+            ref = base.get(label)
+            # 极短耗时受计时噪声影响大，1ms以下不判定
+            if ref and max(elapsed, ref) > 0.001 and elapsed > ref * tolerance:
+                regressions.append(f"{scale}/{label}: {ref * 1000:.1f}ms -> {elapsed * 1000:.1f}ms")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="流程函数规模基准（无需Excel）")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="规模倍数")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最小值）")
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--keep", help="合成数据保存目录（默认临时目录，结束后删除）")
+    arg_parser.add_argument("--json", help="结果另存为JSON（可作为 --baseline）")
+    arg_parser.add_argument("--baseline", help="基线JSON，比较耗时回归")
+    arg_parser.add_argument("--tolerance", type=float, default=1.5, help="回归判定倍数")
+    args = arg_parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        demo = load_demo()
+
+    results: Dict[str, Dict[str, float]] = {}
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = Path(args.keep) if args.keep else Path(tmp)
+        for scale in args.scales:
+            start = time.perf_counter()
+            fixture = generate_fixture_set(
+                data_root / f"{scale}x", scale=scale, seed=args.seed,
+                balance_mapping=demo.Z3_2_BALANCE_MAPPING,
+                income_items=list(demo.Z3_2_INCOME_MAPPING),
+                cashflow_items=list(demo.Z3_2_CASHFLOW_MAPPING),
+            )
+            print(f"  生成 {scale}× 数据: {time.perf_counter() - start:.1f}s"
+                  f"（余额表 {fixture.expected['trial_balance_rows']} 行）")
+
+            work_dir = Path(tmp) / f"work_{scale}x"
+            work_dir.mkdir(parents=True, exist_ok=True)
+            bench = Bench(demo, fixture, args.repeat, work_dir)
+            bench.run()
+            results[f"{scale}x"] = bench.timings
+            failures.extend(f"{scale}x/{label}" for label in bench.failures)
+
+    labels = list(next(iter(results.values())))
+    print("\n" + "=" * 72)
+    print(f"流程函数基准（{platform.system()} / Python {platform.python_version()}，每项取{args.repeat}次最小值，ms）")
+    print("=" * 72)
+    print(f"{'':<14}" + "".join(f"{scale:>12}" for scale in results))
+    for label in labels:
+        print(f"{label:<14}" + "".join(f"{results[scale][label] * 1000:>12.1f}" for scale in results))
+
+    if failures:
+        print(f"\n✗ 正确性校验失败: {', '.join(failures)}")
+    else:
+        print("\n✓ 正确性校验全部通过")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"✗ 耗时回归（>{args.tolerance}×基线）:")
+            for line in regressions:
+                print(f"    {line}")
+        else:
+            print(f"✓ 无耗时回归（容差 {args.tolerance}×）")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "repeat": args.repeat,
+                "seed": args.seed,
+                "timings": results,
+                "failures": failures,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"✓ 已保存: {args.json}")
+
+    sys.exit(1 if failures or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
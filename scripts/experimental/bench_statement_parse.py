@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试: 财务报表项目金额提取 - 逐行循环 vs 向量化
+
+合成 N 行（默认2万行）的资产负债表式DataFrame，比较三种实现:
+    legacy     - 原 parse_balance_sheet_excel: iterrows + 逐项目子串判断 + 逐列 isinstance
+    rowwise    - LineItemMatcher + itertuples 逐行判断（向量化前的实现）
+    vectorized - ParsedStatement.extract_line_items（整列 to_numeric + NumPy 取首个数值列）
+
+rowwise 与 vectorized 结果必须一致；legacy 存在"非流动资产合计"误匹配"流动资产合计"
+及同名多行后者覆盖前者的问题，只比较耗时。
+
+用法:
+    python scripts/experimental/bench_statement_parse.py
+    python scripts/experimental/bench_statement_parse.py --rows 100000 --repeat 5
+"""
+
+import argparse
+import importlib.util
+import random
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+WEB_ROOT = SCRIPT_DIR.parents[1]
+DEMO_SCRIPT = WEB_ROOT / "opencpai-app" / "src" / "versions" / "demo_v2_6_with_scoring_backup.py"
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import pandas as pd
+
+from opencpai_pipeline.statements import AMOUNT_COLUMNS, ParsedStatement, _build_frame
+
+
+def load_demo():
+    """按文件路径加载Demo脚本（文件名不是合法模块名）"""
+    spec = importlib.util.spec_from_file_location("demo_v2_6", DEMO_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_rows(keys, n_rows: int, seed: int = 42):
+    """
+    合成报表行: 项目名 + 行次 + 期末 + 期初
+
+    混入全角括号/序号前缀/空白、文本金额、空金额、说明行，接近真实导出报表。
+    """
+    rng = random.Random(seed)
+    decorations = [
+        lambda k: k,
+        lambda k: f"  {k}",
+        lambda k: f"其中：{k}",
+        lambda k: f"（一）{k}",
+        lambda k: f"{k}（附注五）",
+    ]
+    rows = [("资产负债表",), ("编制单位：测试有限公司",), ("项目", "期末余额", "年初余额")]
+    for i in range(n_rows):
+        roll = rng.random()
+        if roll < 0.1:
+            rows.append((f"说明文字第{i}行", None, None, None))
+            continue
+        key = rng.choice(keys)
+        name = rng.choice(decorations)(key)
+        end_val = round(rng.uniform(-1e6, 1e8), 2)
+        begin_val = round(rng.uniform(-1e6, 1e8), 2)
+        if roll < 0.2:
+            rows.append((name, f"{end_val:,.2f}", None, begin_val))
+        elif roll < 0.3:
+            rows.append((name, None, None, None))
+        else:
+            rows.append((name, None, end_val, begin_val))
+    return rows
+
+
+def run_legacy(df: pd.DataFrame, keys):
+    """原实现（保留原样）"""
+    data = {}
+    for idx, row in df.iterrows():
+        item_name = str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else ""
+        for key in keys:
+            if key in item_name:
+                for col_idx in [1, 2, 3]:
+                    if col_idx < len(row):
+                        val = row.iloc[col_idx]
+                        if pd.notna(val) and isinstance(val, (int, float)):
+                            data[key] = float(val)
+                            break
+                break
+    return data
+
+
+def run_rowwise(df: pd.DataFrame, matcher):
+    """向量化前的逐行实现（精确优先，同级取首行）"""
+    data, data_rank = {}, {}
+    for row in df.itertuples(index=False, name=None):
+        item_name = str(row[0]).strip() if pd.notna(row[0]) else ""
+        match = matcher.match(item_name)
+        if match is None:
+            continue
+        rank = 0 if match.kind == "exact" else 1
+        if match.key in data_rank and data_rank[match.key] <= rank:
+            continue
+        for col_idx in AMOUNT_COLUMNS:
+            if col_idx < len(row):
+                val = row[col_idx]
+                if pd.notna(val) and isinstance(val, (int, float)):
+                    data[match.key] = float(val)
+                    data_rank[match.key] = rank
+                    break
+    return data
+
+
+def run_vectorized(df: pd.DataFrame, matcher):
+    statement = ParsedStatement(path=Path("synthetic.xlsx"), frame=df, header_cells=[])
+    return statement.extract_line_items(matcher).data
+
+
+def best_of(func, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="报表项目金额提取基准测试")
+    arg_parser.add_argument("--rows", type=int, default=20000, help="合成报表行数")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最快一次）")
+    args = arg_parser.parse_args()
+
+    demo = load_demo()
+    keys = list(demo.Z3_2_BALANCE_MAPPING.keys())
+    matcher = demo.BALANCE_SHEET_MATCHER
+    df = _build_frame(build_rows(keys, args.rows))
+
+    print(f"合成报表: {len(df)} 行 × {len(df.columns)} 列，项目 {len(keys)} 个\n")
+
+    legacy_s, legacy_data = best_of(lambda: run_legacy(df, keys), args.repeat)
+    rowwise_s, rowwise_data = best_of(lambda: run_rowwise(df, matcher), args.repeat)
+    # 每次新建ParsedStatement，避免命中提取结果缓存
+    vector_s, vector_data = best_of(lambda: run_vectorized(df, matcher), args.repeat)
+
+    print(f"  {'实现':<12}{'耗时(ms)':>12}{'加速比':>10}{'项目数':>8}")
+    for label, seconds, data in (
+        ("legacy", legacy_s, legacy_data),
+        ("rowwise", rowwise_s, rowwise_data),
+        ("vectorized", vector_s, vector_data),
+    ):
+        print(f"  {label:<12}{seconds * 1000:>12.1f}{legacy_s / seconds:>9.1f}x{len(data):>8}")
+
+    if rowwise_data != vector_data:
+        diff = {k for k in rowwise_data.keys() | vector_data.keys()
+                if rowwise_data.get(k) != vector_data.get(k)}
+        print(f"\n  ✗ rowwise 与 vectorized 结果不一致: {sorted(diff)[:10]}")
+        sys.exit(1)
+    print("\n  ✓ rowwise 与 vectorized 结果一致")
+
+
+if __name__ == "__main__":
+    main()
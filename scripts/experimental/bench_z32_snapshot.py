@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试: Z3-2 比对 - 逐单元格读取 vs 区域快照
+
+统计两种方式的后端调用次数与耗时。COM后端每次调用是一次跨进程往返，
+可用 --latency-ms 模拟单次往返延迟（默认0.5ms）。
+
+用法:
+    python scripts/experimental/bench_z32_snapshot.py
+    python scripts/experimental/bench_z32_snapshot.py --latency-ms 2 --repeat 5
+"""
+
+import argparse
+import importlib.util
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+WEB_ROOT = SCRIPT_DIR.parents[1]
+DEMO_SCRIPT = WEB_ROOT / "opencpai-app" / "src" / "versions" / "demo_v2_6_with_scoring_backup.py"
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from opencpai_pipeline.workbook_backend import CountingBackend, open_workbook
+
+
+def load_demo():
+    """按文件路径加载Demo脚本（文件名不是合法模块名）"""
+    spec = importlib.util.spec_from_file_location("demo_v2_6", DEMO_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LatencyBackend(CountingBackend):
+    """每次后端调用附加固定延迟，模拟COM跨进程往返"""
+
+    def __init__(self, inner, latency_s: float):
+        super().__init__(inner)
+        self.latency_s = latency_s
+
+    def _count(self, method):
+        super()._count(method)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+
+def build_z32_workbook(demo, path: Path) -> None:
+    """生成只含Z3-2的合成底稿（C/D列填入金额）"""
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Z3-2"
+    for item_name, row_num in demo.Z3_2_BALANCE_MAPPING.items():
+        ws.cell(row=row_num, column=1, value=item_name)
+        ws.cell(row=row_num, column=3, value=float(row_num * 1000))
+        ws.cell(row=row_num, column=4, value=float(row_num * 900))
+    wb.save(str(path))
+
+
+def run_per_cell(demo, backend):
+    """原实现的访问模式：C列、D列各按映射逐单元格读取一遍"""
+    for col in (3, 4):
+        for row_num in demo.Z3_2_BALANCE_MAPPING.values():
+            backend.read_cell("Z3-2", row_num, col)
+
+
+def run_snapshot(demo, backend, fs_data, prior_data):
+    """快照实现：一次区域读取，两项对比共用"""
+    snapshot = demo.load_z32_snapshot(backend)
+    demo.compare_z32_vs_financial_statements(backend, fs_data, {}, snapshot=snapshot)
+    demo.compare_z32_vs_prior_audit(backend, prior_data, snapshot=snapshot)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Z3-2快照基准测试")
+    arg_parser.add_argument("--latency-ms", type=float, default=0.5, help="模拟单次COM往返延迟（毫秒）")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = arg_parser.parse_args()
+
+    demo = load_demo()
+    latency_s = args.latency_ms / 1000
+
+    fs_data = {name: float(row * 1000 + 5) for name, row in demo.Z3_2_BALANCE_MAPPING.items()}
+    prior_data = {name: float(row * 900) for name, row in demo.Z3_2_BALANCE_MAPPING.items()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "z32_bench.xlsx"
+        build_z32_workbook(demo, path)
+        inner = open_workbook(path)
+
+        results = {}
+        for label in ("逐单元格", "区域快照"):
+            backend = LatencyBackend(inner, latency_s)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                if label == "逐单元格":
+                    run_per_cell(demo, backend)
+                else:
+                    run_snapshot(demo, backend, fs_data, prior_data)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            results[label] = (backend.total_calls // args.repeat, elapsed)
+
+        inner.close()
+
+    print("\n" + "=" * 60)
+    print(f"Z3-2比对基准（映射 {len(demo.Z3_2_BALANCE_MAPPING)} 项，模拟延迟 {args.latency_ms}ms/次）")
+    print("=" * 60)
+    for label, (calls, elapsed) in results.items():
+        print(f"  {label}: 后端调用 {calls} 次, 耗时 {elapsed * 1000:.1f} ms")
+    per_cell_calls, per_cell_time = results["逐单元格"]
+    snap_calls, snap_time = results["区域快照"]
+    print(f"  调用次数减少: {per_cell_calls} -> {snap_calls}")
+    if snap_time > 0:
+        print(f"  加速比: {per_cell_time / snap_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Golden校验: Python底稿分配（opencpai_pipeline.allocation）对照 newfenpenjxr 宏输出
+
+newfenpenjxr宏源码不在仓库中，分配规则须按模板整理为JSON；
+把 Demo 的 ALLOCATION_ENGINE 切换为 "python" 之前，须用已执行宏的底稿跑通本校验。
+
+用法:
+    # 已执行KMSCB + newfenpenjxr 的底稿（Demo输出的【财审底稿】*.xlsm）
+    python scripts/experimental/golden_allocation.py 底稿.xlsm --rules 底稿分配规则.json
+
+    # 以宏生成的KM表为输入（只校验分配，不含KM表生成）
+    python scripts/experimental/golden_allocation.py 底稿.xlsm --rules 规则.json --km-from-sheet
+
+    # 无宏底稿时：写入副本后读回对比（校验计划提交链路，Linux可用）
+    python scripts/experimental/golden_allocation.py 模板.xlsx --rules 规则.json --self-check
+
+退出码: 一致为0，有差异为1。
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import pandas as pd
+
+from opencpai_pipeline.allocation import allocate, compare_with_workbook, load_allocation_rules, missing_sheets
+from opencpai_pipeline.balance_ingest import STANDARD_COLUMNS
+from opencpai_pipeline.km_table import build_km_table
+from opencpai_pipeline.workbook_backend import open_workbook
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="底稿分配 Python引擎 vs newfenpenjxr宏 golden校验")
+    arg_parser.add_argument("workpaper", help="已执行newfenpenjxr的底稿（--self-check 时为模板）")
+    arg_parser.add_argument("--rules", required=True, help="分配规则JSON")
+    arg_parser.add_argument("--km-from-sheet", action="store_true", help="读取底稿KM表作为输入（默认由余额表生成）")
+    arg_parser.add_argument("--km-sheet", default="KM")
+    arg_parser.add_argument("--self-check", action="store_true", help="计划写入副本后读回对比")
+    args = arg_parser.parse_args()
+
+    workpaper = Path(args.workpaper)
+    rules = load_allocation_rules(Path(args.rules))
+    print(f"  分配规则: {len(rules)}条，{len({r.sheet for r in rules})}张底稿")
+
+    if args.km_from_sheet:
+        km_table = pd.read_excel(workpaper, sheet_name=args.km_sheet, dtype={"科目编码": str})
+    else:
+        balance = pd.read_excel(workpaper, sheet_name="余额表", dtype={"科目编码": str})
+        km_table = build_km_table(balance[[c for c in STANDARD_COLUMNS if c in balance.columns]]).table
+    print(f"  KM表: {len(km_table)}个科目")
+
+    start = time.perf_counter()
+    result = allocate(km_table, rules)
+    print(f"  ✓ 分配计算: {result.accounts}个科目，{len(result.plan.writes)}个单元格，"
+          f"{(time.perf_counter() - start) * 1000:.1f}ms")
+    for rule_name, count in result.overflow:
+        print(f"  ⚠ {rule_name}: 明细行不足，{count}个科目未写入")
+    if len(result.unallocated):
+        print(f"  ⚠ 有余额但未分配的一级科目: {', '.join(result.unallocated['科目编码'].head(10))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.self_check:
+            copy = Path(tmp) / workpaper.name
+            shutil.copy(workpaper, copy)
+            writer = open_workbook(copy, writable=True)
+            try:
+                blocks = result.plan.commit(writer)
+                writer.save()
+            finally:
+                writer.close(save=False)
+            print(f"  ✓ 已写入副本: {blocks}次区域写入")
+            workpaper = copy
+
+        backend = open_workbook(workpaper)
+        try:
+            absent = missing_sheets(backend, rules)
+            if absent:
+                print(f"✗ 底稿中缺少工作表: {absent}")
+                sys.exit(1)
+            mismatches = compare_with_workbook(result.plan, backend)
+        finally:
+            backend.close(save=False)
+
+    if not mismatches:
+        print(f"✓ 底稿分配一致（{len(result.plan.writes)}个单元格）")
+        sys.exit(0)
+
+    print(f"✗ 底稿分配存在差异: {len(mismatches)}个单元格")
+    for sheet, row, col, actual, planned in mismatches[:20]:
+        print(f"    {sheet} R{row}C{col}: 宏={actual!r} Python={planned!r}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
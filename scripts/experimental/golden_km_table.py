@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Golden校验: Python KM表（opencpai_pipeline.km_table）对照 KMSCB 宏输出
+
+KMSCB宏源码不在仓库中，km_table 的列布局与口径按余额表结构推断；
+把 Demo 的 KM_ENGINE 切换为 "python" 之前，须用已由宏生成KM表的底稿跑通本校验。
+
+两种来源:
+    1. 已执行过KMSCB的底稿（Demo输出的【财审底稿】*.xlsm）
+       python scripts/experimental/golden_km_table.py 底稿.xlsm
+    2. 模板 + 科目余额表，现场注入并执行宏（仅Windows + Excel）
+       python scripts/experimental/golden_km_table.py 模板.xlsm --balance 【科目余额表】xx.xlsx --run-macro
+
+选项:
+    --km-sheet 宏输出工作表名（默认 KM）
+    --km-header 宏输出表头所在行（从1起，默认1）
+    --rename 宏列名=KM列名（宏输出列名与 KM_COLUMNS 不同时逐个对应，可重复）
+    --columns 只对比指定列（默认两表共有列）
+    --self-check 用Python结果写入底稿副本再读回对比（无宏底稿时校验读写链路，Linux可用）
+
+退出码: 一致为0，有差异为1；差异明细可用 --csv 保存。
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import pandas as pd
+
+from opencpai_pipeline.balance_ingest import STANDARD_COLUMNS
+from opencpai_pipeline.km_table import KmLayout, build_km_table, compare_km_tables, write_km_table
+from opencpai_pipeline.workbook_backend import open_workbook
+
+
+def run_macro_on_template(template: Path, balance: pd.DataFrame, work_dir: Path) -> Path:
+    """模板副本中注入余额表并执行KMSCB，返回保存后的底稿路径"""
+    from opencpai_pipeline.balance_ingest import write_frame_to_sheet
+    from opencpai_pipeline.session import PipelineSession
+
+    workpaper = work_dir / f"golden_{template.stem}.xlsm"
+    with PipelineSession() as session:
+        wb = session.open_workpaper(template)
+        wb.Sheets("余额表").UsedRange.Delete()
+        write_frame_to_sheet(session.backend, "余额表", balance)
+        session.run_macro("KMSCB")
+        session.save_workpaper(workpaper, file_format=52)
+    return workpaper
+
+
+def self_check_workpaper(workpaper: Path, table: pd.DataFrame, sheet: str, work_dir: Path) -> Path:
+    """Python KM表写入底稿副本（openpyxl），用于校验写入与读回"""
+    copy = work_dir / f"self_{workpaper.name}"
+    shutil.copy(workpaper, copy)
+    backend = open_workbook(copy, writable=True)
+    try:
+        if not backend.has_sheet(sheet):
+            backend.workbook.create_sheet(sheet)
+        write_km_table(backend, table, KmLayout(sheet=sheet))
+        backend.save()
+    finally:
+        backend.close(save=False)
+    return copy
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="KM表 Python引擎 vs KMSCB宏 golden校验")
+    arg_parser.add_argument("workpaper", help="已执行KMSCB的底稿（--run-macro 时为模板）")
+    arg_parser.add_argument("--balance", help="科目余额表（标准8列，默认读取底稿的余额表）")
+    arg_parser.add_argument("--run-macro", action="store_true", help="注入余额表并现场执行KMSCB（Windows）")
+    arg_parser.add_argument("--km-sheet", default="KM")
+    arg_parser.add_argument("--km-header", type=int, default=1)
+    arg_parser.add_argument("--rename", action="append", default=[], metavar="宏列名=KM列名")
+    arg_parser.add_argument("--columns", nargs="+")
+    arg_parser.add_argument("--self-check", action="store_true", help="以Python结果写入副本后读回对比")
+    arg_parser.add_argument("--csv", help="差异明细另存为CSV")
+    args = arg_parser.parse_args()
+
+    workpaper = Path(args.workpaper)
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        if args.balance:
+            balance = pd.read_excel(args.balance, dtype={"科目编码": str})
+        else:
+            balance = pd.read_excel(workpaper, sheet_name="余额表", dtype={"科目编码": str})
+        balance = balance[[c for c in STANDARD_COLUMNS if c in balance.columns]]
+        print(f"  余额表: {len(balance)}行")
+
+        km = build_km_table(balance)
+        print(f"  ✓ Python KM表: {len(km.table)}个科目（无有效编码{km.dropped_rows}行），"
+              f"上下级不一致 {km.inconsistencies['科目编码'].nunique()}个科目")
+
+        if args.run_macro:
+            workpaper = run_macro_on_template(workpaper, balance, work_dir)
+            print(f"  ✓ KMSCB执行完成: {workpaper.name}")
+        elif args.self_check:
+            workpaper = self_check_workpaper(workpaper, km.table, args.km_sheet, work_dir)
+            print(f"  ✓ 已写入副本: {workpaper.name}")
+
+        try:
+            expected = pd.read_excel(workpaper, sheet_name=args.km_sheet, header=args.km_header - 1,
+                                     dtype={"科目编码": str})
+        except ValueError as e:
+            print(f"✗ 无法读取宏输出 {args.km_sheet}: {e}")
+            sys.exit(1)
+
+    renames = dict(item.split("=", 1) for item in args.rename)
+    expected = expected.rename(columns=renames)
+    if "科目编码" not in expected.columns:
+        print(f"✗ 宏输出中没有\"科目编码\"列（现有列: {list(expected.columns)[:12]}），请用 --rename 对应")
+        sys.exit(1)
+
+    missing = [c for c in km.table.columns if c not in expected.columns]
+    if missing:
+        print(f"  ⚠ 宏输出中没有以下列，不参与对比: {missing}")
+
+    diffs = compare_km_tables(expected, km.table, columns=args.columns)
+    if args.csv:
+        diffs.to_csv(args.csv, index=False, encoding="utf-8-sig")
+        print(f"  ✓ 差异明细已保存: {args.csv}")
+
+    if diffs.empty:
+        print(f"✓ KM表一致（{len(km.table)}个科目）")
+        sys.exit(0)
+
+    print(f"✗ KM表存在差异: {len(diffs)}项，涉及{diffs['科目编码'].nunique()}个科目")
+    for column, count in diffs["列"].value_counts().items():
+        print(f"    {column}: {count}")
+    print(diffs.head(20).to_string(index=False))
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+OpenCPAi Pipeline - 审计底稿生成流程的Python引擎模块
+
+版本: V2.7
+关联脚本: opencpai-app/src/versions/demo_v2_6_with_scoring_backup.py
+日期: 2026-10-17
+
+模块:
+    workbook_backend - 可插拔工作簿后端（openpyxl纯Python / win32com）及共用小工具（列号、原子写、文件sha256）
+    snapshot         - 工作表区域快照（一次区域读取，内存取值）
+    write_plan       - 批量写入计划（别名去重、跳过公式行、区域合并写入）
+    session          - 流程会话（一个Excel进程 + 一个底稿句柄贯穿Step 3~9）
+    excel_pool       - Excel实例池（预热实例租用、健康检查、到期回收、宏执行超时结束实例）
+    engagement       - 项目输入文件识别（按公司目录）
+    batch            - 批量项目运行器（进程池并发 + 汇总）
+    registration     - 工商信息查询客户端（连接池、磁盘缓存、请求合并）
+    statements       - 财务报表单次读取（表头、公司名称、项目金额，按文件缓存）
+    line_item_matcher - 报表项目名称匹配器（规范化 + 精确索引 + 最长子串，歧义标记）
+    balance_ingest   - 科目余额表分块写入（按内存上限切块写入余额表 / 流式写出xlsx）
+    prior_report     - 上年审计报告PDF解析（流程开始即在后台进程启动，Step 4取结果）
+    report_cache     - 审计报告解析结果缓存（PDF内容哈希+解析器版本，LRU限容，命令行管理）
+    pdf_cache        - PDF文档句柄与逐页文本缓存（每次运行只打开一次，按文件哈希持久化）
+    scheduler        - 流程阶段调度器（依赖图并发执行，底稿阶段串行，关键路径）
+    tracing          - 运行追踪（嵌套span：墙钟/CPU/峰值内存，JSONL输出，批量分位数汇总）
+    stage_cache      - 阶段输出缓存与运行清单（输入指纹不变的阶段复用上次输出，增量重跑）
+    km_table         - KM表生成（KMSCB宏的Python实现：编码级次、末级、方向、分组汇总，整表写入）
+    allocation       - 底稿分配（newfenpenjxr宏的Python实现：数据化规则、编码区间索引、WritePlan批量提交）
+    subject_mapper   - 科目名称映射（Auto_MapSubjectNames宏的Python实现：别名/精确/前缀/模糊/编码分层，别名库累积）
+    report_extract   - 财审报告提取（FinPageS宏的Python实现：按版式读取已保存底稿，隐藏空行，流式写出，第N版命名）
+    check_report     - 检查报告xlsx流式写出（write_only、样式只定义一次、预计算列宽，单表/分节版式）
+    pdf_render       - PDF渲染（检查报告/财审报告不经Excel：中文字体、表头跨页重复、隐藏行列、进程池并行）
+    scoring          - 6维度评分引擎（数据化规则，每表一次区域读取的底稿快照，进程池批量评分）
+    fixtures         - 合成测试数据（科目余额表、报表、上年审计报告PDF、最小底稿模板，按规模生成）
+"""
+
+from .workbook_backend import (
+    WorkbookBackend,
+    ComWorkbookBackend,
+    OpenpyxlWorkbookBackend,
+    CountingBackend,
+    open_workbook,
+    as_backend,
+    cell_ref_to_rowcol,
+    column_index,
+    atomic_write,
+    file_sha256,
+)
+from .snapshot import SheetSnapshot
+from .write_plan import WritePlan
+from .session import PipelineSession
+from .excel_pool import ExcelInstance, ExcelPool, MacroTimeoutError, init_process_pool, process_pool
+from .engagement import EngagementInputs, discover_engagement_inputs, discover_engagements
+from .batch import run_batch
+from .registration import BusinessRegistrationClient, RegistrationCache, normalize_company_name
+from .statements import ParsedStatement, LineItemExtraction, load_statement
+from .line_item_matcher import LineItemMatcher, LineItemMatch, normalize_item_name
+from .balance_ingest import IngestStats, write_frame_to_sheet, write_frame_to_xlsx
+from .prior_report import PriorYearReport, parse_prior_year_report, start_prior_report_parse, join_prior_report
+from .report_cache import ReportCache
+from .pdf_cache import PdfDocument, PdfDocumentCache, PdfTextStore
+from .scheduler import Stage, StageError, StageRecord, StageScheduler, ScheduleResult
+from .tracing import Tracer, span, aggregate_spans, load_spans
+from .stage_cache import RunManifest, StageCache, fingerprint_value
+from .km_table import KmLayout, KmResult, build_km_table, write_km_table
+from .allocation import AllocationRule, AllocationResult, allocate, load_allocation_rules
+from .subject_mapper import AliasStore, SubjectMapper, SubjectMatch, SubjectMappingResult
+from .report_extract import ReportResult, ReportSection, extract_report, load_report_sections
+from .check_report import ReportTable, write_check_report_xlsx
+from .pdf_render import render_check_report_pdf, render_workbook_pdf, render_workbook_pdfs
+from .scoring import (
+    ScoreCard,
+    ScoringRule,
+    ScoringScheme,
+    default_scheme,
+    load_scoring_scheme,
+    score_workpaper,
+    score_workpapers,
+)
+from .fixtures import FixtureSet, generate_fixture_set
+
+__all__ = [
+    "WorkbookBackend",
+    "ComWorkbookBackend",
+    "OpenpyxlWorkbookBackend",
+    "CountingBackend",
+    "open_workbook",
+    "as_backend",
+    "cell_ref_to_rowcol",
+    "column_index",
+    "atomic_write",
+    "file_sha256",
+    "SheetSnapshot",
+    "WritePlan",
+    "PipelineSession",
+    "ExcelInstance",
+    "ExcelPool",
+    "MacroTimeoutError",
+    "init_process_pool",
+    "process_pool",
+    "EngagementInputs",
+    "discover_engagement_inputs",
+    "discover_engagements",
+    "run_batch",
+    "BusinessRegistrationClient",
+    "RegistrationCache",
+    "normalize_company_name",
+    "ParsedStatement",
+    "LineItemExtraction",
+    "load_statement",
+    "LineItemMatcher",
+    "LineItemMatch",
+    "normalize_item_name",
+    "IngestStats",
+    "write_frame_to_sheet",
+    "write_frame_to_xlsx",
+    "PriorYearReport",
+    "parse_prior_year_report",
+    "start_prior_report_parse",
+    "join_prior_report",
+    "ReportCache",
+    "PdfDocument",
+    "PdfDocumentCache",
+    "PdfTextStore",
+    "Stage",
+    "StageError",
+    "StageRecord",
+    "StageScheduler",
+    "ScheduleResult",
+    "Tracer",
+    "span",
+    "aggregate_spans",
+    "load_spans",
+    "RunManifest",
+    "StageCache",
+    "fingerprint_value",
+    "KmLayout",
+    "KmResult",
+    "build_km_table",
+    "write_km_table",
+    "AllocationRule",
+    "AllocationResult",
+    "allocate",
+    "load_allocation_rules",
+    "AliasStore",
+    "SubjectMapper",
+    "SubjectMatch",
+    "SubjectMappingResult",
+    "ReportResult",
+    "ReportSection",
+    "extract_report",
+    "load_report_sections",
+    "ReportTable",
+    "write_check_report_xlsx",
+    "render_check_report_pdf",
+    "render_workbook_pdf",
+    "render_workbook_pdfs",
+    "ScoreCard",
+    "ScoringRule",
+    "ScoringScheme",
+    "default_scheme",
+    "load_scoring_scheme",
+    "score_workpaper",
+    "score_workpapers",
+    "FixtureSet",
+    "generate_fixture_set",
+]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+命令行入口
+
+    python -m opencpai_pipeline report-cache --dir <缓存目录> list|stats|purge
+    python -m opencpai_pipeline trace-summary <jsonl文件或目录> [--csv 输出.csv]
+    python -m opencpai_pipeline fixtures <输出目录> [--scale 10] [--seed 42]
+    python -m opencpai_pipeline subject-alias <别名库.json> list|add|remove|import
+    python -m opencpai_pipeline render-pdf <报告xlsx...> [--workers 4] [--out 输出目录]
+    python -m opencpai_pipeline score <底稿...> [--rules 规则.json | --mapping 映射.json] [--context 上下文.json] [--workers 8]
+"""
+
+import sys
+
+from . import fixtures, pdf_render, report_cache, scoring, subject_mapper, tracing
+
+
+COMMANDS = {
+    "report-cache": report_cache.main,
+    "trace-summary": tracing.main,
+    "fixtures": fixtures.main,
+    "subject-alias": subject_mapper.main,
+    "render-pdf": pdf_render.main,
+    "score": scoring.main,
+}
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS:
+        print("用法: python -m opencpai_pipeline <命令> [参数]")
+        print(f"命令: {', '.join(COMMANDS)}")
+        return 2
+    return COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+底稿分配（newfenpenjxr宏的Python实现）
+
+KMSCB 之后执行的 newfenpenjxr 宏把KM表中的科目余额逐个分配到各科目底稿，
+大型账套上是耗时最长的宏，且每写一个单元格都触发Excel重算。
+
+本模块由KM表（km_table.build_km_table 的输出）按数据化的分配规则计算各底稿的写入:
+    - 规则（AllocationRule）: 目标工作表、科目编码前缀、起始行、KM列 -> 目标列、行数上限、合计行
+      规则可从JSON加载（load_allocation_rules），不在代码中写死模板行列
+    - 查找: KM表按科目编码排序后建索引，前缀对应一段连续区间（searchsorted），不逐行扫描
+    - 合计: 合计行按规则选中的全部科目求和（明细行不足时溢出的科目也计入，与KM表余额一致）
+    - 输出: 所有写入收集为一个 WritePlan，由后端按列合并为区域写入一次提交
+      （COM后端在 PipelineSession.manual_calculation() 中提交，提交完成后只重算一次）
+
+宏源码不在仓库中，规则须按模板整理；与宏结果的一致性用
+scripts/experimental/golden_allocation.py 对照已执行宏的底稿校验。
+
+用法:
+    rules = load_allocation_rules(rules_path)
+    result = allocate(km.table, rules)
+    with session.manual_calculation():
+        result.plan.commit(session.backend)
+    result.unallocated        # 有余额但没有任何规则覆盖的一级科目
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .km_table import AMOUNT_TOLERANCE
+from .workbook_backend import WorkbookBackend, column_index
+from .write_plan import WritePlan
+
+
+BALANCE_COLUMNS = ("期初余额", "本期借方", "本期贷方", "期末余额")
+
+
+@dataclass
+class AllocationRule:
+    """
+    一条分配规则
+
+    Attributes:
+        sheet: 目标工作表（科目底稿）
+        prefixes: 科目编码前缀（如 ("1001", "1002", "1012") 对应货币资金底稿）
+        first_row: 明细起始行
+        columns: {KM列名: 目标列号}
+        max_rows: 明细区域行数（超出部分记入 overflow，仍计入合计行；未用满的行写空，清除模板残留）
+        level: 取的科目级次，None 为末级科目
+        total_row: 合计行（None不写）；合计列为 columns 中的金额列
+        skip_zero: 跳过期初、期末余额均为0的科目
+        name: 规则名称（报告用，默认为工作表名）
+    """
+    sheet: str
+    prefixes: Tuple[str, ...]
+    first_row: int
+    columns: Dict[str, int]
+    max_rows: Optional[int] = None
+    level: Optional[int] = None
+    total_row: Optional[int] = None
+    skip_zero: bool = True
+    name: str = ""
+
+    def __post_init__(self):
+        self.prefixes = tuple(str(p) for p in self.prefixes)
+        self.columns = {k: column_index(v) for k, v in self.columns.items()}
+        self.name = self.name or self.sheet
+
+
+@dataclass
+class SheetAllocation:
+    """单个工作表的计算结果"""
+    sheet: str
+    writes: List[Tuple[int, int, Any, str]] = field(default_factory=list)   # (行, 列, 值, 来源)
+    accounts: int = 0
+    codes: List[str] = field(default_factory=list)
+    overflow: List[Tuple[str, int]] = field(default_factory=list)           # (规则名, 未容纳科目数)
+
+
+@dataclass
+class AllocationResult:
+    """分配结果"""
+    plan: WritePlan
+    sheets: Dict[str, SheetAllocation]
+    unallocated: pd.DataFrame
+
+    @property
+    def accounts(self) -> int:
+        return sum(s.accounts for s in self.sheets.values())
+
+    @property
+    def overflow(self) -> List[Tuple[str, int]]:
+        return [item for s in self.sheets.values() for item in s.overflow]
+
+
+def load_allocation_rules(path: Path) -> List[AllocationRule]:
+    """
+    从JSON加载分配规则
+
+    格式: [{"sheet": "Z5-1货币资金", "prefixes": ["1001", "1002"], "first_row": 8,
+            "columns": {"科目编码": "A", "科目名称": "B", "期初余额": "D", "期末余额": "E"},
+            "max_rows": 20, "total_row": 28}, ...]
+    列可写列字母或列号。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [AllocationRule(**item) for item in data]
+
+
+# =============================================================================
+# 索引
+# =============================================================================
+
+class KmIndex:
+    """
+    KM表的编码索引（只读）
+
+    编码排序后，某前缀的全部科目是一段连续区间，
+    select 用两次二分查找定位区间，再按级次/末级筛选。
+    """
+
+    def __init__(self, km_table: pd.DataFrame):
+        table = km_table.copy()
+        table["科目编码"] = table["科目编码"].astype(str)
+        self.table = table.sort_values("科目编码", kind="mergesort").reset_index(drop=True)
+        self.codes = self.table["科目编码"].to_numpy(dtype=str)
+        self.levels = self.table["级次"].to_numpy()
+        self.leaf = (self.table["是否末级"] == "是").to_numpy()
+        balances = self.table[["期初余额", "期末余额"]].astype(float).abs().to_numpy()
+        self.nonzero = (balances >= AMOUNT_TOLERANCE).any(axis=1)
+
+    def span(self, prefix: str) -> Tuple[int, int]:
+        """前缀对应的行区间 [start, stop)"""
+        start = int(np.searchsorted(self.codes, prefix, side="left"))
+        # 数字编码中 ":" 排在 "9" 之后，prefix + ":" 即该前缀区间的上界
+        stop = int(np.searchsorted(self.codes, prefix + ":", side="left"))
+        return start, stop
+
+    def select(self, prefixes: Sequence[str], level: Optional[int] = None, skip_zero: bool = True) -> np.ndarray:
+        """前缀命中的行号（按编码顺序，去重）"""
+        positions = []
+        for prefix in prefixes:
+            start, stop = self.span(prefix)
+            if start == stop:
+                continue
+            mask = self.leaf[start:stop] if level is None else self.levels[start:stop] == level
+            if skip_zero:
+                mask = mask & self.nonzero[start:stop]
+            positions.append(np.arange(start, stop)[mask])
+        if not positions:
+            return np.array([], dtype=int)
+        return np.unique(np.concatenate(positions))
+
+
+# =============================================================================
+# 分配
+# =============================================================================
+
+def _allocate_sheet(index: KmIndex, sheet: str, rules: Sequence[AllocationRule]) -> SheetAllocation:
+    """计算一个工作表的全部写入（同一工作表的规则按顺序计算）"""
+    result = SheetAllocation(sheet)
+    for rule in rules:
+        selected = index.table.iloc[index.select(rule.prefixes, rule.level, rule.skip_zero)]
+        capacity = len(selected) if rule.max_rows is None else rule.max_rows
+        rows = selected
+        if len(selected) > capacity:
+            result.overflow.append((rule.name, len(selected) - capacity))
+            rows = selected.iloc[:capacity]
+
+        for column, target_col in rule.columns.items():
+            if column not in rows.columns:
+                values = [None] * len(rows)
+            elif pd.api.types.is_float_dtype(rows[column]):
+                values = rows[column].round(2).tolist()
+            else:
+                # tolist() 把 numpy 标量转为 Python 原生类型（COM写入不接受 numpy 类型）
+                values = rows[column].tolist()
+            result.writes.extend(
+                (rule.first_row + offset, target_col, value, rule.name) for offset, value in enumerate(values)
+            )
+            # 未用满的明细行写空，清除模板中上次运行的残留
+            for offset in range(len(rows), capacity):
+                result.writes.append((rule.first_row + offset, target_col, None, rule.name))
+
+        if rule.total_row is not None:
+            # 合计取全部选中科目（含溢出未写入明细的科目）
+            for column, target_col in rule.columns.items():
+                if column in BALANCE_COLUMNS:
+                    total = round(float(selected[column].astype(float).sum()), 2)
+                    result.writes.append((rule.total_row, target_col, total, f"{rule.name}:合计"))
+
+        result.accounts += len(rows)
+        result.codes.extend(rows["科目编码"].tolist())
+    return result
+
+
+def _unallocated(index: KmIndex, rules: Sequence[AllocationRule]) -> pd.DataFrame:
+    """有余额但没有任何规则前缀覆盖的一级科目"""
+    covered = np.zeros(len(index.codes), dtype=bool)
+    for rule in rules:
+        for prefix in rule.prefixes:
+            start, stop = index.span(prefix)
+            covered[start:stop] = True
+    mask = (index.levels == 1) & index.nonzero & ~covered
+    columns = [c for c in ("科目编码", "科目名称", "期初余额", "期末余额") if c in index.table.columns]
+    return index.table.loc[mask, columns].reset_index(drop=True)
+
+
+def allocate(
+    km_table: pd.DataFrame,
+    rules: Sequence[AllocationRule],
+    skip_rows: Optional[Mapping[str, Sequence[int]]] = None,
+) -> AllocationResult:
+    """
+    按规则计算各底稿写入
+
+    Args:
+        km_table: KM表（KM_COLUMNS）
+        rules: 分配规则
+        skip_rows: {工作表名: 公式行号}，计划中跳过（同 WritePlan）
+
+    Returns:
+        AllocationResult: plan（WritePlan，按规则顺序加入）、
+                          sheets（各工作表明细）、unallocated（未覆盖的有余额一级科目）
+    """
+    index = KmIndex(km_table)
+
+    groups: Dict[str, List[AllocationRule]] = {}
+    for rule in rules:
+        groups.setdefault(rule.sheet, []).append(rule)
+
+    # 计算量是每条规则两次二分查找加少量列表构建，顺序执行即可（线程池受GIL限制没有收益）
+    sheets = {sheet: _allocate_sheet(index, sheet, group) for sheet, group in groups.items()}
+
+    plan = WritePlan(skip_rows=skip_rows)
+    for sheet, allocation in sheets.items():
+        for row, col, value, source in allocation.writes:
+            plan.add(sheet, row, col, value, source)
+
+    return AllocationResult(plan=plan, sheets=sheets, unallocated=_unallocated(index, rules))
+
+
+def missing_sheets(backend: WorkbookBackend, rules: Sequence[AllocationRule]) -> List[str]:
+    """规则中底稿里不存在的工作表"""
+    return sorted({rule.sheet for rule in rules if not backend.has_sheet(rule.sheet)})
+
+
+def compare_with_workbook(plan: WritePlan, backend: WorkbookBackend) -> List[Tuple[str, int, int, Any, Any]]:
+    """
+    计划写入值与工作簿现有值对比（golden校验用：工作簿为已执行宏的底稿）
+
+    Returns:
+        [(工作表, 行, 列, 工作簿值, 计划值)]，数值按 AMOUNT_TOLERANCE 比较，空值与空串视为相同
+    """
+    mismatches = []
+    for block in plan.blocks():
+        existing = backend.read_range(block.sheet, block.first_row, block.col, block.last_row, block.col)
+        for row, value in block.values.items():
+            actual = existing[row - block.first_row][0]
+            if _same_value(actual, value):
+                continue
+            mismatches.append((block.sheet, row, block.col, actual, value))
+    return mismatches
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    if a in (None, "") and b in (None, ""):
+        return True
+    try:
+        return abs(float(a) - float(b)) < AMOUNT_TOLERANCE
+    except (TypeError, ValueError):
+        return str(a).strip() == str(b).strip()
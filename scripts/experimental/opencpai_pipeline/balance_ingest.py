@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+科目余额表分块写入
+
+原流程把清洗结果一次性转成 `[columns] + df.values.tolist()` 整表二维列表，
+再一次赋值给 Range.Value；【科目余额表】输出文件用 df.to_excel 构建完整对象模型。
+集团客户几十万行明细时，DataFrame 之外再复制一份Python对象列表，峰值内存翻倍。
+
+本模块按内存上限把 DataFrame 切成行块:
+    - write_frame_to_sheet: 逐块写入工作簿后端（COM下每块一次 Range.Value）
+    - write_frame_to_xlsx:  openpyxl write_only 流式写出 xlsx（不保留已写行）
+任一时刻只有一个行块被转换为Python对象。
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .workbook_backend import WorkbookBackend
+
+
+# 清洗后科目余额表的标准8列（UniversalCleanerV4_5 输出，写入底稿"余额表"）
+STANDARD_COLUMNS = ["科目编码", "科目名称", "期初借方", "期初贷方", "本期借方", "本期贷方", "期末借方", "期末贷方"]
+
+# 默认单块内存上限 32MB
+DEFAULT_MAX_BLOCK_BYTES = 32 * 1024 * 1024
+
+# 每个单元格除值本身外的开销估计：列表槽位 + COM VARIANT（16~24字节）
+_CELL_OVERHEAD_BYTES = 32
+
+# 估算行宽时的采样行数
+_SAMPLE_ROWS = 1000
+
+
+@dataclass
+class IngestStats:
+    """分块写入统计"""
+    rows: int = 0
+    blocks: int = 0
+    rows_per_block: int = 0
+    est_block_bytes: int = 0
+
+
+def estimate_row_bytes(df: pd.DataFrame) -> int:
+    """按前 _SAMPLE_ROWS 行估算一行转为Python对象后的字节数"""
+    if df.empty:
+        return 1
+    sample = df.head(_SAMPLE_ROWS)
+    value_bytes = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+    return max(1, int(value_bytes + _CELL_OVERHEAD_BYTES * len(df.columns)))
+
+
+def rows_per_block(df: pd.DataFrame, max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES) -> int:
+    """在内存上限内单块可容纳的行数（至少1行）"""
+    return max(1, int(max_block_bytes // estimate_row_bytes(df)))
+
+
+def _block_values(chunk: pd.DataFrame) -> List[List[Any]]:
+    """行块转二维列表：numpy标量转Python原生类型，NaN/NaT转None（写入为空单元格）"""
+    values = chunk.astype(object)
+    return values.where(chunk.notna(), None).to_numpy().tolist()
+
+
+def iter_row_blocks(
+    df: pd.DataFrame,
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES,
+    include_header: bool = True
+) -> Iterator[Tuple[int, List[List[Any]]]]:
+    """
+    逐块产出 (块内首行在输出中的偏移, 二维列表)
+
+    include_header=True 时表头作为第一块的首行（偏移0）。
+    """
+    block_rows = rows_per_block(df, max_block_bytes)
+    offset = 0
+    header = [list(map(str, df.columns))] if include_header else []
+
+    if df.empty:
+        if header:
+            yield 0, header
+        return
+
+    for start in range(0, len(df), block_rows):
+        block = _block_values(df.iloc[start:start + block_rows])
+        if start == 0 and header:
+            block = header + block
+        yield offset, block
+        offset += len(block)
+
+
+def write_frame_to_sheet(
+    backend: WorkbookBackend,
+    sheet: str,
+    df: pd.DataFrame,
+    first_row: int = 1,
+    first_col: int = 1,
+    include_header: bool = True,
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES
+) -> IngestStats:
+    """
+    DataFrame 分块写入工作表
+
+    Returns:
+        IngestStats: 数据行数（不含表头）、块数、每块行数、单块估算字节
+    """
+    stats = IngestStats(
+        rows=len(df),
+        rows_per_block=rows_per_block(df, max_block_bytes),
+    )
+    stats.est_block_bytes = stats.rows_per_block * estimate_row_bytes(df)
+
+    for offset, block in iter_row_blocks(df, max_block_bytes, include_header):
+        backend.write_range(sheet, first_row + offset, first_col, block)
+        stats.blocks += 1
+    return stats
+
+
+def write_frame_to_xlsx(
+    df: pd.DataFrame,
+    path: Path,
+    sheet_name: str = "Sheet1",
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES
+) -> IngestStats:
+    """
+    DataFrame 流式写出为 xlsx（替代 df.to_excel(path, index=False)）
+
+    openpyxl write_only 模式逐行写入临时文件，内存中不保留已写出的行。
+    """
+    import openpyxl
+
+    stats = IngestStats(
+        rows=len(df),
+        rows_per_block=rows_per_block(df, max_block_bytes),
+    )
+    stats.est_block_bytes = stats.rows_per_block * estimate_row_bytes(df)
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    for _, block in iter_row_blocks(df, max_block_bytes, include_header=True):
+        for row in block:
+            ws.append(row)
+        stats.blocks += 1
+    wb.save(str(path))
+    return stats
+
+
+def block_bytes_from_mb(mb: Optional[float]) -> int:
+    """配置值（MB）转字节，空值/非正数取默认"""
+    if not mb or mb <= 0:
+        return DEFAULT_MAX_BLOCK_BYTES
+    return int(mb * 1024 * 1024)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+批量项目运行器
+
+对目录下所有公司并发执行完整流程（进程池），汇总每个项目的评分与耗时。
+每个工作进程各自启动独立的Excel实例，互不干扰；传入 worker_initializer
+（如 excel_pool.init_process_pool）时在工作进程启动时预热Excel，各项目租用而不是冷启动。
+
+输出:
+    【批量汇总】YYYYmmdd_HHMMSS.json - 完整结果（含各步骤耗时、各span耗时分位数）
+    【批量汇总】YYYYmmdd_HHMMSS.csv  - 一行一个项目，便于Excel查看
+"""
+
+import csv
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .engagement import EngagementInputs
+from .tracing import aggregate_spans, load_spans
+
+
+def default_workers() -> int:
+    """默认并行度：CPU核数与4取小（每个工作进程占用一个Excel实例）"""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _run_one(run_engagement: Callable[[EngagementInputs], Dict[str, Any]], inputs: EngagementInputs) -> Dict[str, Any]:
+    """在工作进程中执行单个项目，异常转为失败结果"""
+    start = time.perf_counter()
+    try:
+        summary = dict(run_engagement(inputs) or {})
+        summary.setdefault("status", "ok")
+    except Exception as e:
+        summary = {
+            "status": "failed",
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": traceback.format_exc(),
+        }
+    summary["engagement"] = inputs.name
+    summary["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def run_batch(
+    engagements: List[EngagementInputs],
+    run_engagement: Callable[[EngagementInputs], Dict[str, Any]],
+    output_root: Path,
+    max_workers: Optional[int] = None,
+    worker_initializer: Optional[Callable[[], Any]] = None,
+) -> Dict[str, Any]:
+    """
+    并发执行一批项目
+
+    Args:
+        engagements: discover_engagements 得到的项目列表
+        run_engagement: 单项目入口（需为模块级函数，可被子进程pickle）
+        output_root: 汇总文件输出目录
+        max_workers: 并行度，默认 default_workers()
+        worker_initializer: 工作进程初始化函数（需可pickle，如 functools.partial(init_process_pool, ...)）
+
+    Returns:
+        Dict: {"results": [...], "wall_s": float, "sum_s": float, "summary_json": str, "summary_csv": str}
+    """
+    max_workers = max_workers or default_workers()
+    output_root = Path(output_root)
+    output_root.mkdir(parents=True, exist_ok=True)
+
+    print(f"【批量运行】{len(engagements)} 个项目，并行度 {max_workers}")
+
+    results: List[Dict[str, Any]] = []
+    batch_start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=worker_initializer) as pool:
+        futures = {pool.submit(_run_one, run_engagement, e): e for e in engagements}
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            mark = "✓" if result.get("status") == "ok" else "✗"
+            score = result.get("total_score", "-")
+            print(f"  {mark} [{len(results)}/{len(engagements)}] {result['engagement']} "
+                  f"得分 {score}，耗时 {result['elapsed_s']:.1f}s")
+
+    wall_s = time.perf_counter() - batch_start
+    sum_s = sum(r.get("elapsed_s", 0) for r in results)
+    results.sort(key=lambda r: r["engagement"])
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = output_root / f"【批量汇总】{stamp}.json"
+    csv_path = output_root / f"【批量汇总】{stamp}.csv"
+
+    batch_summary = {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "engagement_count": len(engagements),
+        "max_workers": max_workers,
+        "wall_s": round(wall_s, 3),
+        "sum_s": round(sum_s, 3),
+        "results": results,
+    }
+    # 各项目运行追踪（summary["trace"]）按span名汇总分位数
+    trace_paths = [Path(r["trace"]) for r in results if r.get("trace")]
+    if trace_paths:
+        batch_summary["trace_summary"] = aggregate_spans(load_spans(trace_paths))
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(batch_summary, f, ensure_ascii=False, indent=2, default=str)
+
+    _write_summary_csv(csv_path, results)
+
+    ok_count = sum(1 for r in results if r.get("status") == "ok")
+    print(f"\n  ✓ 完成 {ok_count}/{len(results)}，总耗时 {wall_s:.1f}s（串行累计 {sum_s:.1f}s）")
+    print(f"  ✓ 汇总: {json_path.name}")
+
+    batch_summary["summary_json"] = str(json_path)
+    batch_summary["summary_csv"] = str(csv_path)
+    return batch_summary
+
+
+def _write_summary_csv(path: Path, results: List[Dict[str, Any]]) -> None:
+    """一行一个项目：状态、公司名、各维度得分、总分、耗时"""
+    dimensions: List[str] = []
+    for r in results:
+        for dim in (r.get("scores") or {}):
+            if dim not in dimensions:
+                dimensions.append(dim)
+
+    headers = ["engagement", "status", "company_name", *dimensions,
+               "total_score", "accuracy", "level", "elapsed_s", "error"]
+
+    # utf-8-sig：Excel直接打开不乱码
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for r in results:
+            scores = r.get("scores") or {}
+            writer.writerow([
+                r.get("engagement", ""),
+                r.get("status", ""),
+                r.get("company_name", ""),
+                *[scores.get(dim, "") for dim in dimensions],
+                r.get("total_score", ""),
+                r.get("accuracy", ""),
+                r.get("level", ""),
+                r.get("elapsed_s", ""),
+                r.get("error", ""),
+            ])
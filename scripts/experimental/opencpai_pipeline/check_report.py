@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+检查报告xlsx流式写出
+
+原流程经COM逐个单元格写入检查报告：每个表头、每个值、每次 Font.Bold 都是一次跨进程调用，
+最后再执行 Columns("A:G").AutoFit()；批量运行中差异项达到数千条时非常慢，且必须启动Excel。
+
+本模块由检查结果（ReportTable 列表，与 pdf_render 共用）直接流式写出xlsx:
+    - openpyxl write_only 逐行写出，内存不保留已写出的行，耗时与写出行数成正比
+    - 样式只定义一次（NamedStyle 注册到工作簿，各单元格引用同一样式）
+    - 列宽按内容预先计算（中文按2个字符宽），代替 AutoFit
+    - 版式: "single" 三节写在同一工作表（同原报告）；"sections" 每节一个工作表（表头冻结、自动筛选）
+不需要Excel进程。
+
+用法:
+    tables = [ReportTable("一、财务报表 vs Z3-2期末 对比", ["项目", "财务报表", ...], rows), ...]
+    write_check_report_xlsx(path, "审计底稿检查报告 - 公司名", tables, subtitle="生成时间: ...")
+"""
+
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Sequence, Set
+
+from .tracing import span
+
+
+AMOUNT_FORMAT = "#,##0.00"
+MIN_COLUMN_WIDTH = 8
+MAX_COLUMN_WIDTH = 60
+LAYOUTS = ("single", "sections")
+
+# 样式名（NamedStyle，每个工作簿注册一次）
+STYLE_TITLE = "检查报告标题"
+STYLE_HEADING = "检查报告节标题"
+STYLE_HEADER = "检查报告表头"
+STYLE_TEXT = "检查报告文本"
+STYLE_AMOUNT = "检查报告金额"
+
+
+@dataclass
+class ReportTable:
+    """
+    检查报告中的一节
+
+    Attributes:
+        title: 节标题（"一、财务报表 vs Z3-2期末 对比"）
+        headers: 表头
+        rows: 数据行（金额为数值：xlsx中为数字+千分位格式，PDF中渲染为千分位文本）
+        empty_text: 没有数据行时显示的文字
+        sheet: "sections" 版式下的工作表名（默认取标题，截断为31个字符）
+    """
+    title: str
+    headers: Sequence[str]
+    rows: Sequence[Sequence[Any]]
+    empty_text: str = "✓ 无差异"
+    sheet: str = ""
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def display_width(value: Any) -> int:
+    """单元格显示宽度（字符数，全角/中文按2计；金额按千分位两位小数计）"""
+    if value is None:
+        return 0
+    text = f"{value:,.2f}" if _is_number(value) else str(value)
+    return sum(2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1 for ch in text)
+
+
+def column_widths(tables: Sequence[ReportTable]) -> List[float]:
+    """
+    各列宽度（预先计算，代替 AutoFit）
+
+    取表头与数据行的最大显示宽度 + 2，限制在 [MIN_COLUMN_WIDTH, MAX_COLUMN_WIDTH]；
+    节标题与空表提示文字较长，写在首列并向右溢出显示，不参与计算（空表也不写表头）。
+    """
+    widths: List[int] = []
+    for table in tables:
+        if not table.rows:
+            continue
+        for row in [table.headers, *table.rows]:
+            for j, value in enumerate(row):
+                if j >= len(widths):
+                    widths.append(0)
+                widths[j] = max(widths[j], display_width(value))
+    return [float(min(MAX_COLUMN_WIDTH, max(MIN_COLUMN_WIDTH, w + 2))) for w in widths]
+
+
+def _register_styles(wb) -> None:
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    thin = Side(style="thin", color="A6A6A6")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    styles = [
+        NamedStyle(STYLE_TITLE, font=Font(size=16, bold=True)),
+        NamedStyle(STYLE_HEADING, font=Font(size=12, bold=True)),
+        NamedStyle(STYLE_HEADER, font=Font(bold=True), border=border,
+                   fill=PatternFill("solid", fgColor="E8EEF7"), alignment=Alignment(horizontal="center")),
+        NamedStyle(STYLE_TEXT, border=border),
+        NamedStyle(STYLE_AMOUNT, border=border, number_format=AMOUNT_FORMAT),
+    ]
+    for style in styles:
+        wb.add_named_style(style)
+
+
+def _sheet_name(table: ReportTable, used: Set[str]) -> str:
+    """工作表名：替换非法字符、截断为31个字符；重名（Excel不区分大小写）时截断后加 "(2)" "(3)"..."""
+    base = (table.sheet or table.title)
+    for ch in '[]:*?/\\':
+        base = base.replace(ch, "_")
+    base = base[:31]
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        suffix = f"({n})"
+        name = base[:31 - len(suffix)] + suffix
+    used.add(name.lower())
+    return name
+
+
+def write_check_report_xlsx(
+    path: Path,
+    title: str,
+    tables: Sequence[ReportTable],
+    subtitle: str = "",
+    layout: str = "single",
+) -> Path:
+    """
+    流式写出检查报告xlsx
+
+    Args:
+        path: 输出文件
+        title: 报告标题（A1）
+        tables: 各节
+        subtitle: 标题下一行（生成时间等）
+        layout: "single" 三节依次写在"检查报告"工作表（节之间空一行）；"sections" 每节一个工作表
+
+    Raises:
+        ValueError: layout 不是 LAYOUTS 之一
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    if layout not in LAYOUTS:
+        raise ValueError(f"未知版式 {layout!r}，可选 {LAYOUTS}")
+
+    wb = openpyxl.Workbook(write_only=True)
+    _register_styles(wb)
+
+    def cell(ws, value, style):
+        c = WriteOnlyCell(ws, value=value)
+        c.style = style
+        return c
+
+    def new_sheet(name: str, widths_of: Sequence[ReportTable], freeze_row: int = 0):
+        ws = wb.create_sheet(name)
+        # write_only: 列宽、冻结窗格须在第一行写出之前设置
+        for j, width in enumerate(column_widths(widths_of), 1):
+            ws.column_dimensions[get_column_letter(j)].width = width
+        if freeze_row:
+            ws.freeze_panes = f"A{freeze_row + 1}"
+        ws.append([cell(ws, title, STYLE_TITLE)])
+        if subtitle:
+            ws.append([subtitle])
+        ws.append([])
+        return ws
+
+    def write_table(ws, table: ReportTable, with_heading: bool) -> None:
+        if with_heading:
+            ws.append([cell(ws, table.title, STYLE_HEADING)])
+        if not table.rows:
+            ws.append([table.empty_text])
+            return
+        ws.append([cell(ws, h, STYLE_HEADER) for h in table.headers])
+        for row in table.rows:
+            ws.append([cell(ws, v, STYLE_AMOUNT if _is_number(v) else STYLE_TEXT) for v in row])
+
+    with span("检查报告写出", layout=layout, tables=len(tables)):
+        if layout == "single":
+            ws = new_sheet("检查报告", tables)
+            for i, table in enumerate(tables):
+                if i:
+                    ws.append([])
+                write_table(ws, table, with_heading=True)
+        else:
+            used: Set[str] = set()
+            # 表头行：标题、副标题、空行、节标题之后
+            header_row = 4 + (1 if subtitle else 0)
+            for table in tables:
+                ws = new_sheet(_sheet_name(table, used), [table], freeze_row=header_row if table.rows else 0)
+                ws.append([cell(ws, table.title, STYLE_HEADING)])
+                if table.rows:
+                    last_col = get_column_letter(max(1, len(table.headers)))
+                    ws.auto_filter.ref = f"A{header_row}:{last_col}{header_row + len(table.rows)}"
+                write_table(ws, table, with_heading=False)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        wb.save(str(path))
+    return path
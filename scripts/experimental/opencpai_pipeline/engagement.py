@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+审计项目（engagement）输入文件识别
+
+每个公司目录即一个项目，按文件名关键字识别输入:
+    1、科目余额表.xlsx                  -> balance_file（必需）
+    3.1、2024年12月利润表.xlsx           -> profit_statement_file
+    3.2、2024年12月资产负债表.xlsx       -> balance_sheet_file
+    4、【财审报告】xxx(2023).pdf         -> audit_report_pdf（上年审计报告）
+    5、【财审报告】xxx(2024).xlsx        -> manual_audit_report_xlsx（人工版本，D6比对）
+"""
+
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+EXCEL_SUFFIXES = {".xlsx", ".xls", ".xlsm"}
+
+# 财审报告/审计报告关键字
+AUDIT_REPORT_KEYWORDS = ("财审报告", "审计报告")
+
+
+@dataclass
+class EngagementInputs:
+    """单个项目的输入文件集合（name 为批量汇总行与运行追踪的 run_id，默认取目录名）"""
+    sample_dir: Path
+    balance_file: Path
+    output_dir: Path
+    balance_sheet_file: Optional[Path] = None
+    profit_statement_file: Optional[Path] = None
+    audit_report_pdf: Optional[Path] = None
+    manual_audit_report_xlsx: Optional[Path] = None
+    name: str = ""
+
+    def __post_init__(self):
+        self.name = self.name or Path(self.sample_dir).name
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: (str(v) if v is not None else None) for k, v in asdict(self).items()}
+
+
+def _is_temp_file(path: Path) -> bool:
+    """Excel打开时生成的 ~$xxx.xlsx 临时文件"""
+    return path.name.startswith("~$")
+
+
+def discover_engagement_inputs(sample_dir: Path, output_dir: Path, name: str = "") -> EngagementInputs:
+    """
+    识别单个公司目录的输入文件
+
+    Args:
+        name: 项目名（默认取目录名）
+
+    Raises:
+        FileNotFoundError: 目录中没有科目余额表
+    """
+    sample_dir = Path(sample_dir)
+    files = sorted(
+        (p for p in sample_dir.iterdir() if p.is_file() and not _is_temp_file(p)),
+        key=lambda p: p.name
+    )
+
+    balance_file = None
+    balance_sheet_file = None
+    profit_statement_file = None
+    audit_report_pdf = None
+    manual_audit_report_xlsx = None
+
+    for path in files:
+        file_name = path.name
+        suffix = path.suffix.lower()
+
+        if suffix == ".pdf":
+            if audit_report_pdf is None and any(k in file_name for k in AUDIT_REPORT_KEYWORDS):
+                audit_report_pdf = path
+            continue
+
+        if suffix not in EXCEL_SUFFIXES:
+            continue
+
+        if "科目余额表" in file_name:
+            balance_file = balance_file or path
+        elif "资产负债表" in file_name:
+            balance_sheet_file = balance_sheet_file or path
+        elif "利润表" in file_name:
+            profit_statement_file = profit_statement_file or path
+        elif any(k in file_name for k in AUDIT_REPORT_KEYWORDS):
+            manual_audit_report_xlsx = manual_audit_report_xlsx or path
+
+    if balance_file is None:
+        raise FileNotFoundError(f"未找到科目余额表: {sample_dir}")
+
+    return EngagementInputs(
+        sample_dir=sample_dir,
+        balance_file=balance_file,
+        output_dir=Path(output_dir),
+        balance_sheet_file=balance_sheet_file,
+        profit_statement_file=profit_statement_file,
+        audit_report_pdf=audit_report_pdf,
+        manual_audit_report_xlsx=manual_audit_report_xlsx,
+        name=name,
+    )
+
+
+def discover_engagements(root: Path, output_root: Path) -> List[EngagementInputs]:
+    """
+    识别根目录下所有公司目录（含科目余额表的目录，递归查找）
+
+    每个项目的输出目录为 output_root / 公司目录相对root的路径（不同子目录下的同名目录互不覆盖），
+    root本身为项目时输出到 output_root / root目录名；项目名取同一相对路径（"2024/深圳测试科技有限公司"）
+    """
+    root = Path(root)
+    candidates = [root] + sorted(p for p in root.rglob("*") if p.is_dir())
+    engagements = []
+    for sample_dir in candidates:
+        relative = sample_dir.relative_to(root) if sample_dir != root else Path(root.name)
+        try:
+            engagements.append(
+                discover_engagement_inputs(sample_dir, Path(output_root) / relative, name=relative.as_posix())
+            )
+        except FileNotFoundError:
+            continue
+    return engagements
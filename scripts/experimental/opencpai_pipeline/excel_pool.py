@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+Excel实例池（仍须在Excel中执行VBA宏的阶段使用）
+
+只要还有宏必须在Excel中执行，每个项目都要付出 DispatchEx 启动 → 打开模板 → Quit 的冷启动成本；
+一个Excel实例崩溃或卡死（模态对话框、宏死循环）还会让整个运行停在 Application.Run 上。
+
+ExcelPool 管理若干预启动、相互隔离的Excel实例（DispatchEx，每个实例一个独立进程）:
+    - 租用: acquire()/lease() 取出一个空闲实例独占使用；归还时关闭残留工作簿、恢复屏幕刷新
+    - 健康检查: 租出前检查进程存活且在时限内响应；失效实例退出并由新实例替换
+    - 回收: 实例服务 max_jobs 次租用或运行超过 max_age_s 秒后退出并替换（长时间运行的Excel内存与句柄增长）
+    - 超时: ExcelInstance.run_macro 由看门狗计时，超时即结束该Excel进程，阻塞中的COM调用随之返回，
+            抛出 MacroTimeoutError；实例标记为失效，归还时替换，不影响后续项目
+
+COM对象只能在创建它的线程中使用，池及其实例属于创建它们的线程（Demo中为主线程）。
+批量模式下每个工作进程持有一个进程级池（init_process_pool 作为 ProcessPoolExecutor 的 initializer），
+Excel在工作进程启动时预热，之后的项目直接租用：吞吐随预热实例数增长，而不受冷启动时间限制。
+
+用法:
+    with ExcelPool(size=1, max_jobs=20, macro_timeout_s=1800) as pool:
+        with PipelineSession(pool=pool) as session:
+            session.open_workpaper(template)
+            session.run_macro("KMSCB")        # 超时抛出 MacroTimeoutError
+        print(pool.stats())
+"""
+
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .tracing import span
+
+
+DEFAULT_MAX_JOBS = 20
+DEFAULT_MAX_AGE_S = 4 * 3600
+HEALTH_CHECK_TIMEOUT_S = 10.0
+QUIT_TIMEOUT_S = 5.0
+
+_STILL_ACTIVE = 259                        # GetExitCodeProcess: 进程仍在运行
+_PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+
+class MacroTimeoutError(TimeoutError):
+    """COM调用（宏）超时，对应的Excel进程已被结束"""
+
+
+# =============================================================================
+# 进程工具
+# =============================================================================
+
+def _excel_pid(excel) -> Optional[int]:
+    """Excel.Application 对应的进程ID（由主窗口句柄取得，失败返回None）"""
+    try:
+        import win32process
+        _, pid = win32process.GetWindowThreadProcessId(excel.Hwnd)
+        return int(pid) or None
+    except Exception:
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        try:
+            import win32api
+            import win32process
+            handle = win32api.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        except Exception:
+            return False
+        try:
+            return win32process.GetExitCodeProcess(handle) == _STILL_ACTIVE
+        finally:
+            win32api.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+# =============================================================================
+# 单个实例
+# =============================================================================
+
+class ExcelInstance:
+    """
+    一个独立进程的Excel实例
+
+    Attributes:
+        excel: Excel.Application COM对象
+        pid: Excel进程ID（取不到时为None，此时超时无法结束进程）
+        jobs: 已服务的租用次数
+        broken: 已失效（超时被结束、进程退出、重置失败），归还时替换
+    """
+
+    def __init__(self, visible: bool = False):
+        self.visible = visible
+        self.excel = None
+        self.pid: Optional[int] = None
+        self.jobs = 0
+        self.broken = False
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        """启动Excel进程（重复调用直接返回已启动的实例）"""
+        if self.excel is not None:
+            return self.excel
+
+        import win32com.client
+
+        with span("excel:start"):
+            # DispatchEx 总是启动独立的Excel进程，不会附着到用户或其他实例
+            self.excel = win32com.client.DispatchEx("Excel.Application")
+            self.excel.Visible = self.visible
+            self.excel.DisplayAlerts = False
+        self.pid = _excel_pid(self.excel)
+        self.started_at = time.monotonic()
+        return self.excel
+
+    @property
+    def age_s(self) -> float:
+        return 0.0 if self.started_at is None else time.monotonic() - self.started_at
+
+    def is_alive(self) -> bool:
+        if self.excel is None:
+            return False
+        return True if self.pid is None else _pid_alive(self.pid)
+
+    def call(self, func: Callable[[], Any], timeout_s: Optional[float] = None, description: str = "COM调用") -> Any:
+        """
+        执行一次COM调用；超过 timeout_s 由看门狗结束Excel进程，阻塞的调用随之返回
+
+        Raises:
+            MacroTimeoutError: 超时（实例已失效）
+        """
+        expired = threading.Event()
+        timer = None
+        if timeout_s:
+            def on_timeout():
+                expired.set()
+                self.kill()
+            timer = threading.Timer(timeout_s, on_timeout)
+            timer.daemon = True
+            timer.start()
+        try:
+            return func()
+        except Exception as e:
+            if expired.is_set():
+                raise MacroTimeoutError(
+                    f"{description} 超过{timeout_s:g}s未返回，已结束Excel进程(pid={self.pid})"
+                ) from e
+            # 宏内运行时错误不影响实例；进程已退出（崩溃）时标记失效
+            if not self.is_alive():
+                self.broken = True
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def run_macro(self, name: str, *args, timeout_s: Optional[float] = None):
+        """执行VBA宏（Application.Run），timeout_s 为None时不限时"""
+        return self.call(lambda: self.excel.Application.Run(name, *args), timeout_s, f"宏 {name}")
+
+    def healthy(self, timeout_s: float = HEALTH_CHECK_TIMEOUT_S) -> bool:
+        """进程存活，且在时限内响应并处于就绪状态"""
+        if self.broken or not self.is_alive():
+            return False
+        try:
+            return bool(self.call(lambda: self.excel.Ready, timeout_s, "健康检查"))
+        except Exception:
+            self.broken = True
+            return False
+
+    def reset(self, timeout_s: float = HEALTH_CHECK_TIMEOUT_S) -> None:
+        """归还前清理：关闭全部工作簿（不保存）、恢复屏幕刷新与提示设置"""
+        def _reset():
+            workbooks = self.excel.Workbooks
+            for i in range(workbooks.Count, 0, -1):
+                workbooks(i).Close(SaveChanges=False)
+            self.excel.ScreenUpdating = True
+            self.excel.DisplayAlerts = False
+            self.excel.Visible = self.visible
+        try:
+            self.call(_reset, timeout_s, "重置")
+        except Exception:
+            self.broken = True
+
+    def kill(self) -> None:
+        """强制结束Excel进程（Windows上 os.kill 即 TerminateProcess）"""
+        self.broken = True
+        if self.pid is not None:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def quit(self, timeout_s: float = QUIT_TIMEOUT_S) -> None:
+        """退出Excel；时限内进程未退出（仍有COM引用或卡死）则强制结束"""
+        if self.excel is None:
+            return
+        if not self.broken:
+            try:
+                self.call(self.excel.Quit, timeout_s, "退出")
+            except Exception:
+                pass
+        self.excel = None
+        if self.pid is None:
+            return
+        deadline = time.monotonic() + timeout_s
+        while _pid_alive(self.pid) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if _pid_alive(self.pid):
+            self.kill()
+
+
+# =============================================================================
+# 实例池
+# =============================================================================
+
+class ExcelPool:
+    """
+    预启动Excel实例池（线程内使用，不跨线程共享）
+
+    Args:
+        size: 实例数（同一线程中可同时租出的上限）
+        max_jobs: 每个实例服务的租用次数上限，达到后回收
+        max_age_s: 实例运行时长上限（秒），None不限
+        macro_timeout_s: 租用方（PipelineSession）执行宏的默认时限，None不限
+        visible: Excel窗口是否可见
+        prestart: start() 时预热全部实例，回收后立即补充
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        max_age_s: Optional[float] = DEFAULT_MAX_AGE_S,
+        macro_timeout_s: Optional[float] = None,
+        visible: bool = False,
+        prestart: bool = True,
+    ):
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.max_age_s = max_age_s
+        self.macro_timeout_s = macro_timeout_s
+        self.visible = visible
+        self.prestart = prestart
+        self._idle: List[ExcelInstance] = []
+        self._leased: List[ExcelInstance] = []
+        self._owner: Optional[int] = None
+        self._com_initialized = False
+        self._closed = False
+        self._stats = {"started": 0, "leases": 0, "warm_leases": 0, "recycled": 0, "replaced": 0}
+
+    # -------------------------------------------------------------------------
+    # 生命周期
+    # -------------------------------------------------------------------------
+
+    def _init_com(self) -> None:
+        """在所属线程初始化COM（首次调用的线程即为池的所属线程）"""
+        if self._owner is None:
+            import pythoncom
+            pythoncom.CoInitialize()
+            self._com_initialized = True
+            self._owner = threading.get_ident()
+        self._check_thread()
+
+    def start(self) -> "ExcelPool":
+        """初始化COM并预热实例（prestart=False 时按需启动）"""
+        self._init_com()
+        if self.prestart:
+            with span("excel_pool:warmup", size=self.size):
+                while len(self._idle) + len(self._leased) < self.size:
+                    self._idle.append(self._spawn())
+        return self
+
+    def close(self) -> None:
+        """退出全部实例（含未归还的）"""
+        if self._closed:
+            return
+        self._closed = True
+        for instance in self._idle + self._leased:
+            instance.quit()
+        self._idle.clear()
+        self._leased.clear()
+        if self._com_initialized:
+            import pythoncom
+            pythoncom.CoUninitialize()
+            self._com_initialized = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _check_thread(self) -> None:
+        if self._owner is not None and threading.get_ident() != self._owner:
+            raise RuntimeError("ExcelPool 只能在创建它的线程中使用（COM单线程套间）")
+
+    def _spawn(self) -> ExcelInstance:
+        instance = ExcelInstance(visible=self.visible)
+        instance.start()
+        self._stats["started"] += 1
+        return instance
+
+    def _expired(self, instance: ExcelInstance) -> bool:
+        if self.max_jobs and instance.jobs >= self.max_jobs:
+            return True
+        return bool(self.max_age_s) and instance.age_s >= self.max_age_s
+
+    def _retire(self, instance: ExcelInstance, reason: str) -> None:
+        pid = instance.pid
+        instance.quit()
+        if reason == "回收":
+            self._stats["recycled"] += 1
+        else:
+            self._stats["replaced"] += 1
+            print(f"  ⚠ Excel实例(pid={pid}){reason}，已退出并替换")
+
+    # -------------------------------------------------------------------------
+    # 租用
+    # -------------------------------------------------------------------------
+
+    def acquire(self) -> ExcelInstance:
+        """
+        租出一个健康的实例（无空闲实例时按需启动）
+
+        Raises:
+            RuntimeError: 池已关闭、跨线程调用，或 size 个实例均已租出
+        """
+        if self._closed:
+            raise RuntimeError("ExcelPool 已关闭")
+        self._init_com()
+
+        instance = None
+        while self._idle:
+            candidate = self._idle.pop()
+            if self._expired(candidate):
+                self._retire(candidate, "回收")
+            elif not candidate.healthy():
+                self._retire(candidate, "健康检查未通过")
+            else:
+                instance = candidate
+                self._stats["warm_leases"] += 1
+                break
+        if instance is None:
+            if len(self._leased) >= self.size:
+                raise RuntimeError(f"ExcelPool 的{self.size}个实例均已租出")
+            instance = self._spawn()
+
+        instance.jobs += 1
+        self._leased.append(instance)
+        self._stats["leases"] += 1
+        return instance
+
+    def release(self, instance: ExcelInstance) -> None:
+        """归还实例：重置后放回；失效或到期的实例退出，prestart 时立即补充新实例"""
+        if instance in self._leased:
+            self._leased.remove(instance)
+        if self._closed:
+            instance.quit()
+            return
+
+        if not instance.broken:
+            instance.reset()
+        if instance.broken:
+            self._retire(instance, "已失效")
+        elif self._expired(instance):
+            self._retire(instance, "回收")
+        else:
+            self._idle.append(instance)
+            return
+
+        if self.prestart:
+            try:
+                self._idle.append(self._spawn())
+            except Exception as e:
+                print(f"  ⚠ Excel实例补充失败（下次租用时重试）: {e}")
+
+    @contextmanager
+    def lease(self) -> Iterator[ExcelInstance]:
+        """租用上下文：退出时归还"""
+        instance = self.acquire()
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def stats(self) -> Dict[str, int]:
+        """启动次数、租用次数（其中预热实例）、到期回收、失效替换、当前空闲/租出数"""
+        return {**self._stats, "idle": len(self._idle), "leased": len(self._leased)}
+
+
+# =============================================================================
+# 进程级池（批量模式的工作进程）
+# =============================================================================
+
+_PROCESS_POOL: Optional[ExcelPool] = None
+
+
+def init_process_pool(**options) -> Optional[ExcelPool]:
+    """
+    创建并预热当前进程的Excel实例池（ProcessPoolExecutor 的 initializer）
+
+    预热失败（如非Windows环境）只打印提示，之后的租用按需启动；
+    工作进程退出时由 multiprocessing 的退出钩子关闭实例。
+    """
+    global _PROCESS_POOL
+    if _PROCESS_POOL is not None:
+        return _PROCESS_POOL
+
+    from multiprocessing import util
+
+    pool = ExcelPool(**options)
+    try:
+        pool.start()
+    except Exception as e:
+        print(f"  ⚠ Excel实例预热失败（租用时按需启动）: {e}")
+    _PROCESS_POOL = pool
+    util.Finalize(pool, pool.close, exitpriority=10)
+    return pool
+
+
+def process_pool() -> Optional[ExcelPool]:
+    """当前进程的Excel实例池（未初始化时为None，由调用方自行启动Excel）"""
+    return _PROCESS_POOL
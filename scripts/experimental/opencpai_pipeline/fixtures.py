@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+"""
+合成测试数据生成（科目余额表、财务报表、上年审计报告PDF、最小底稿模板）
+
+流程原先只能在 OpenCPAi测试 下的真实客户目录上运行，无法在Linux/无Excel环境下
+按规模复现耗时。本模块按种子生成一套可重复的输入，文件命名与真实项目目录一致
+（discover_engagement_inputs 可直接识别），并返回已知答案用于正确性校验。
+
+规模 scale=1 时约为一个中小客户；10×/100× 按比例放大余额表行数、报表明细行数和PDF页数，
+底稿模板（Z3-2行号固定）不随规模变化。
+
+用法:
+    fixture = generate_fixture_set(out_dir, scale=10, seed=42,
+                                   balance_mapping=Z3_2_BALANCE_MAPPING)
+    fixture.inputs()            # EngagementInputs
+    fixture.expected            # 已知答案（报表金额、差异项数、评分）
+
+    python -m opencpai_pipeline fixtures <输出目录> [--scale 10] [--seed 42]
+
+PDF使用 reportlab 内置的 STSong-Light 中文字体（CID字体，无需安装字体文件）。
+"""
+
+import argparse
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .balance_ingest import STANDARD_COLUMNS
+from .engagement import EngagementInputs
+
+# 一级科目（编码, 名称, 余额方向）
+FIRST_LEVEL_ACCOUNTS: List[Tuple[str, str, str]] = [
+    ("1001", "库存现金", "借"),
+    ("1002", "银行存款", "借"),
+    ("1012", "其他货币资金", "借"),
+    ("1122", "应收账款", "借"),
+    ("1123", "预付账款", "借"),
+    ("1221", "其他应收款", "借"),
+    ("1403", "原材料", "借"),
+    ("1405", "库存商品", "借"),
+    ("1601", "固定资产", "借"),
+    ("1602", "累计折旧", "贷"),
+    ("1701", "无形资产", "借"),
+    ("1702", "累计摊销", "贷"),
+    ("1801", "长期待摊费用", "借"),
+    ("2001", "短期借款", "贷"),
+    ("2202", "应付账款", "贷"),
+    ("2203", "预收账款", "贷"),
+    ("2211", "应付职工薪酬", "贷"),
+    ("2221", "应交税费", "贷"),
+    ("2241", "其他应付款", "贷"),
+    ("2501", "长期借款", "贷"),
+    ("4001", "实收资本", "贷"),
+    ("4002", "资本公积", "贷"),
+    ("4101", "盈余公积", "贷"),
+    ("4104", "利润分配", "贷"),
+    ("6001", "主营业务收入", "贷"),
+    ("6051", "其他业务收入", "贷"),
+    ("6401", "主营业务成本", "借"),
+    ("6403", "税金及附加", "借"),
+    ("6601", "销售费用", "借"),
+    ("6602", "管理费用", "借"),
+    ("6603", "财务费用", "借"),
+    ("6801", "所得税费用", "借"),
+]
+
+# 未传入 balance_mapping 时使用的资产负债表项目（行号与Demo的 Z3_2_BALANCE_MAPPING 一致）
+DEFAULT_BALANCE_MAPPING: Dict[str, int] = {
+    "货币资金": 7, "应收账款": 11, "预付款项": 13, "其他应收款": 14, "存货": 15,
+    "流动资产合计": 20, "固定资产": 31, "无形资产": 36, "长期待摊费用": 39,
+    "非流动资产合计": 42, "资产总计": 43,
+    "短期借款": 45, "应付账款": 49, "预收款项": 50, "应付职工薪酬": 52, "应交税费": 53,
+    "其他应付款": 54, "流动负债合计": 58, "长期借款": 60, "非流动负债合计": 68, "负债合计": 69,
+    "实收资本": 71, "资本公积": 73, "盈余公积": 77, "未分配利润": 78,
+    "所有者权益合计": 79, "负债和所有者权益总计": 80,
+}
+
+DEFAULT_INCOME_ITEMS: List[str] = [
+    "营业收入", "营业成本", "税金及附加", "销售费用", "管理费用", "财务费用",
+    "营业利润", "营业外收入", "营业外支出", "利润总额", "所得税费用", "净利润",
+]
+
+DEFAULT_CASHFLOW_ITEMS: List[str] = [
+    "销售商品、提供劳务收到的现金", "购买商品、接受劳务支付的现金",
+    "支付给职工以及为职工支付的现金", "支付的各项税费",
+    "经营活动产生的现金流量净额", "投资活动产生的现金流量净额", "筹资活动产生的现金流量净额",
+]
+
+# 各规模的基础量（scale=1）
+BASE_TRIAL_BALANCE_ROWS = 200
+BASE_STATEMENT_DETAIL_ROWS = 20
+BASE_NOTE_PAGES = 4
+
+# Z3-5 附注检查区域（与评分D5一致：第7~49行，A列项目，I列差异）
+Z3_5_FIRST_ROW = 7
+Z3_5_LAST_ROW = 49
+
+
+@dataclass
+class FixtureSet:
+    """一套合成输入及其已知答案"""
+    root: Path
+    sample_dir: Path
+    company_name: str
+    scale: int
+    seed: int
+    trial_balance: Path
+    balance_sheet: Path
+    income_statement: Path
+    audit_pdf: Path
+    template: Path
+    expected: Dict[str, Any] = field(default_factory=dict)
+
+    def inputs(self, output_dir: Optional[Path] = None) -> EngagementInputs:
+        return EngagementInputs(
+            sample_dir=self.sample_dir,
+            balance_file=self.trial_balance,
+            output_dir=Path(output_dir) if output_dir else self.root / "outputs" / self.sample_dir.name,
+            balance_sheet_file=self.balance_sheet,
+            profit_statement_file=self.income_statement,
+            audit_report_pdf=self.audit_pdf,
+        )
+
+
+# =============================================================================
+# 数据
+# =============================================================================
+
+def _amount(rng: random.Random, low: float = 1e4, high: float = 5e7) -> float:
+    return round(rng.uniform(low, high), 2)
+
+
+def synth_trial_balance(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    合成标准8列科目余额表（一级科目 + 明细科目，借贷平衡）
+
+    明细科目编码为 一级编码 + 两位序号；一级科目行金额为其明细之和。
+    最后追加一行"合计"，期初/本期/期末借贷方各自相等。
+    """
+    rng = random.Random(seed)
+    n_first = len(FIRST_LEVEL_ACCOUNTS)
+    details_per_account = max(1, (n_rows - n_first) // n_first)
+
+    rows = []
+    totals = {col: 0.0 for col in STANDARD_COLUMNS[2:]}
+    for code, name, direction in FIRST_LEVEL_ACCOUNTS:
+        detail_rows = []
+        for i in range(1, details_per_account + 1):
+            opening = _amount(rng, 1e3, 5e6)
+            debit = _amount(rng, 1e3, 3e6)
+            credit = _amount(rng, 1e3, 3e6)
+            if direction == "借":
+                closing = round(opening + debit - credit, 2)
+                values = [opening, 0.0, debit, credit, max(closing, 0.0), max(-closing, 0.0)]
+            else:
+                closing = round(opening + credit - debit, 2)
+                values = [0.0, opening, debit, credit, max(-closing, 0.0), max(closing, 0.0)]
+            detail_rows.append([f"{code}{i:02d}", f"{name}-明细{i:02d}"] + values)
+
+        summed = [round(sum(r[j] for r in detail_rows), 2) for j in range(2, 8)]
+        rows.append([code, name] + summed)
+        rows.extend(detail_rows)
+        for col, value in zip(STANDARD_COLUMNS[2:], summed):
+            totals[col] += value
+
+    df = pd.DataFrame(rows, columns=STANDARD_COLUMNS)
+
+    # 平衡行：把借贷差额记入"利润分配-未分配利润"明细，使期初/期末借贷相等
+    balance_row = ["410499", "利润分配-未分配利润(平衡)"] + [0.0] * 6
+    for debit_col, credit_col in (("期初借方", "期初贷方"), ("本期借方", "本期贷方"), ("期末借方", "期末贷方")):
+        gap = round(totals[debit_col] - totals[credit_col], 2)
+        i, j = STANDARD_COLUMNS.index(debit_col), STANDARD_COLUMNS.index(credit_col)
+        if gap > 0:
+            balance_row[j] = gap
+            totals[credit_col] += gap
+        else:
+            balance_row[i] = -gap
+            totals[debit_col] -= gap
+    df.loc[len(df)] = balance_row
+    df.loc[len(df)] = ["", "合计"] + [round(totals[c], 2) for c in STANDARD_COLUMNS[2:]]
+    return df
+
+
+def synth_statement_values(items: Sequence[str], seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    return {item: _amount(rng) for item in items}
+
+
+# =============================================================================
+# 文件
+# =============================================================================
+
+def write_trial_balance(path: Path, df: pd.DataFrame, company_name: str, period: str = "2024年1-12月") -> Path:
+    """写出科目余额表（标题行 + 编制单位行 + 表头 + 明细，openpyxl write_only）"""
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("科目余额表")
+    ws.append(["科目余额表"])
+    ws.append([f"编制单位：{company_name}", None, None, None, period])
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append(list(row))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(str(path))
+    return path
+
+
+def write_statement(
+    path: Path,
+    title: str,
+    company_name: str,
+    values: Mapping[str, float],
+    prior_values: Mapping[str, float],
+    detail_rows: int = 0,
+    seed: int = 42,
+    column_labels: Tuple[str, str] = ("期末余额", "年初余额"),
+) -> Path:
+    """
+    写出报表Excel（项目 | 本期 | 上期）
+
+    detail_rows: 在项目之间穿插的"其中：明细"与说明行数（不匹配任何项目，模拟真实导出的噪声）
+    """
+    import openpyxl
+
+    rng = random.Random(seed)
+    items = list(values)
+    noise_after = sorted(rng.randrange(len(items)) for _ in range(detail_rows)) if items else []
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append([title])
+    ws.append([f"编制单位：{company_name}", None, "单位：元"])
+    ws.append(["项目", column_labels[0], column_labels[1]])
+    noise_idx = 0
+    for i, item in enumerate(items):
+        ws.append([item, values[item], prior_values.get(item)])
+        while noise_idx < len(noise_after) and noise_after[noise_idx] == i:
+            if noise_idx % 4 == 0:
+                ws.append([f"注：第{noise_idx + 1}项说明", None, None])
+            else:
+                ws.append([f"  其中：明细项{noise_idx + 1}", _amount(rng, 1e2, 1e5), _amount(rng, 1e2, 1e5)])
+            noise_idx += 1
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(str(path))
+    return path
+
+
+def _register_cjk_font() -> str:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+    font_name = "STSong-Light"
+    if font_name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(font_name))
+    return font_name
+
+
+def write_audit_report_pdf(
+    path: Path,
+    company_name: str,
+    audit_year: str,
+    balance_values: Mapping[str, float],
+    income_values: Mapping[str, float],
+    cashflow_values: Mapping[str, float],
+    note_pages: int = BASE_NOTE_PAGES,
+) -> Path:
+    """
+    写出上年审计报告PDF
+
+    第1页审计意见（"xxx全体股东："），随后资产负债表、利润表、现金流量表各一节（按页续排），
+    最后 note_pages 页附注正文。
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    font = _register_cjk_font()
+    width, height = A4
+    margin = 60
+    line_height = 18
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    c = canvas.Canvas(str(path), pagesize=A4)
+
+    def new_page(title: str):
+        c.setFont(font, 14)
+        c.drawCentredString(width / 2, height - margin, title)
+        c.setFont(font, 10)
+        c.drawString(margin, height - margin - 24, f"编制单位：{company_name}")
+        c.drawRightString(width - margin, height - margin - 24, "单位：元")
+        return height - margin - 54
+
+    # 审计意见
+    c.setFont(font, 16)
+    c.drawCentredString(width / 2, height - margin, "审 计 报 告")
+    c.setFont(font, 11)
+    y = height - margin - 50
+    for line in (
+        f"{company_name}全体股东：",
+        "一、审计意见",
+        f"我们审计了{company_name}财务报表，包括{audit_year}年12月31日的资产负债表，",
+        f"{audit_year}年度的利润表、现金流量表以及相关财务报表附注。",
+        "我们认为，后附的财务报表在所有重大方面按照企业会计准则的规定编制，",
+        f"公允反映了{company_name}{audit_year}年12月31日的财务状况。",
+    ):
+        c.drawString(margin, y, line)
+        y -= line_height + 4
+    c.showPage()
+
+    # 报表
+    for title, values in (("资产负债表", balance_values), ("利润表", income_values), ("现金流量表", cashflow_values)):
+        y = new_page(title)
+        c.drawString(margin, y, "项目")
+        c.drawRightString(width - margin, y, "期末余额" if title == "资产负债表" else "本期金额")
+        y -= line_height
+        for item, value in values.items():
+            if y < margin:
+                c.showPage()
+                y = new_page(f"{title}（续）")
+            c.drawString(margin, y, item)
+            c.drawRightString(width - margin, y, f"{value:,.2f}")
+            y -= line_height
+        c.showPage()
+
+    # 附注
+    rng = random.Random(len(company_name) + note_pages)
+    for page in range(note_pages):
+        y = new_page("财务报表附注")
+        while y > margin:
+            c.drawString(margin, y, f"附注{page + 1}.{int(y)}  本期发生额{_amount(rng):,.2f}元，按会计政策确认。")
+            y -= line_height
+        c.showPage()
+
+    c.save()
+    return path
+
+
+def write_workpaper_template(
+    path: Path,
+    company_name: str,
+    balance_mapping: Mapping[str, int],
+    z32_end: Mapping[str, float],
+    z32_begin: Mapping[str, float],
+    z35_diffs: Mapping[str, float],
+) -> Path:
+    """
+    最小底稿模板: 首页 / 余额表 / KM / Z3-2 / Z3-4 / Z3-5 / Z7 / Z10
+
+    Z3-2按映射行号填入C列（年末）与D列（年初）；Z3-5第7~49行A列项目、I列差异；
+    Z7的I4/I5/J4/J5为勾稽结果文字；Z3-4的A7/A10为基本情况文字。
+    """
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    wb.active.title = "首页"
+    home = wb["首页"]
+    home["A1"] = "财务报表审计底稿"
+    home["A3"] = "被审计单位"
+    home["B3"] = company_name
+
+    balance_sheet = wb.create_sheet("余额表")
+    balance_sheet.append(STANDARD_COLUMNS)
+    wb.create_sheet("KM")
+
+    z32 = wb.create_sheet("Z3-2")
+    z32["A5"] = "项目"
+    z32["C5"] = "年末余额"
+    z32["D5"] = "年初余额"
+    for item, row in balance_mapping.items():
+        z32.cell(row=row, column=1, value=item)
+        if item in z32_end:
+            z32.cell(row=row, column=3, value=z32_end[item])
+        if item in z32_begin:
+            z32.cell(row=row, column=4, value=z32_begin[item])
+
+    z34 = wb.create_sheet("Z3-4")
+    z34["A7"] = f"{company_name}成立于2015年，注册资本人民币1000万元。"
+    z34["A10"] = "公司主要从事技术开发、技术服务。"
+
+    z35 = wb.create_sheet("Z3-5")
+    z35["A5"] = "附注项目"
+    z35["I5"] = "差异"
+    z35["J5"] = "说明"
+    diff_items = list(z35_diffs.items())
+    for offset, row in enumerate(range(Z3_5_FIRST_ROW, Z3_5_LAST_ROW + 1)):
+        if offset < len(diff_items):
+            name, diff = diff_items[offset]
+            z35.cell(row=row, column=1, value=name)
+            z35.cell(row=row, column=9, value=diff)
+            z35.cell(row=row, column=10, value="待核实")
+        else:
+            z35.cell(row=row, column=1, value=f"附注项目{offset + 1}")
+            z35.cell(row=row, column=9, value=0)
+
+    z7 = wb.create_sheet("Z7")
+    for ref in ("I4", "J4"):
+        z7[ref] = "勾稽正确"
+    for ref in ("I5", "J5"):
+        z7[ref] = "报表平衡"
+
+    z10 = wb.create_sheet("Z10")
+    z10["A1"] = "工商信息"
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(str(path))
+    return path
+
+
+# =============================================================================
+# 整套
+# =============================================================================
+
+def generate_fixture_set(
+    root: Path,
+    scale: int = 1,
+    seed: int = 42,
+    company_name: str = "深圳合成测试科技有限公司",
+    audit_year: str = "2024",
+    balance_mapping: Optional[Mapping[str, int]] = None,
+    income_items: Optional[Sequence[str]] = None,
+    cashflow_items: Optional[Sequence[str]] = None,
+    n_z32_diffs: int = 3,
+    n_z35_diffs: int = 2,
+) -> FixtureSet:
+    """
+    生成一套输入（公司目录）+ 底稿模板，返回路径与已知答案
+
+    已知答案 expected:
+        balance_sheet / balance_sheet_prior / income_statement - 报表文件中的项目金额
+        prior_balance / prior_income / prior_cashflow          - 上年审计报告PDF中的金额
+        fs_vs_z32_diffs / prior_vs_z32_diffs / z35_diffs        - 模板中故意制造的差异项数
+        scores                                                  - 模板的6维度评分（scoring.default_scheme(balance_mapping)，
+                                                                  上下文为 balance_sheet / prior_balance 的金额）
+    """
+    balance_mapping = dict(balance_mapping or DEFAULT_BALANCE_MAPPING)
+    income_items = list(income_items or DEFAULT_INCOME_ITEMS)
+    cashflow_items = list(cashflow_items or DEFAULT_CASHFLOW_ITEMS)
+    prior_year = str(int(audit_year) - 1)
+
+    root = Path(root)
+    sample_dir = root / f"1、{company_name}"
+    sample_dir.mkdir(parents=True, exist_ok=True)
+
+    balance_items = list(balance_mapping)
+    bs_end = synth_statement_values(balance_items, seed)
+    bs_begin = synth_statement_values(balance_items, seed + 1)
+    is_current = synth_statement_values(income_items, seed + 2)
+    is_prior = synth_statement_values(income_items, seed + 3)
+    cf_prior = synth_statement_values(cashflow_items, seed + 4)
+
+    # 模板Z3-2：C列=本年报表数，D列=上年审计数；前 n 项人为制造差异
+    rng = random.Random(seed + 5)
+    z32_end = dict(bs_end)
+    z32_begin = dict(bs_begin)
+    for item in balance_items[:n_z32_diffs]:
+        z32_end[item] = round(z32_end[item] + 1000, 2)
+    for item in balance_items[-n_z32_diffs:] if n_z32_diffs else []:
+        z32_begin[item] = round(z32_begin[item] - 500, 2)
+    z35_diffs = {f"附注差异项{i + 1}": _amount(rng, 10, 1e4) for i in range(n_z35_diffs)}
+
+    df = synth_trial_balance(BASE_TRIAL_BALANCE_ROWS * scale, seed=seed)
+    trial_balance = write_trial_balance(sample_dir / "1、科目余额表.xlsx", df, company_name)
+    income_statement = write_statement(
+        sample_dir / f"3.1、{audit_year}年12月利润表.xlsx", "利润表", company_name, is_current, is_prior,
+        detail_rows=BASE_STATEMENT_DETAIL_ROWS * scale, seed=seed, column_labels=("本期金额", "上期金额"),
+    )
+    balance_sheet = write_statement(
+        sample_dir / f"3.2、{audit_year}年12月资产负债表.xlsx", "资产负债表", company_name, bs_end, bs_begin,
+        detail_rows=BASE_STATEMENT_DETAIL_ROWS * scale, seed=seed,
+    )
+    audit_pdf = write_audit_report_pdf(
+        sample_dir / f"4、【财审报告】{company_name}({prior_year}).pdf", company_name, prior_year,
+        bs_begin, is_prior, cf_prior, note_pages=BASE_NOTE_PAGES * scale,
+    )
+    template = write_workpaper_template(
+        root / "templates" / "【财审底稿】合成模板.xlsx", company_name, balance_mapping,
+        z32_end, z32_begin, z35_diffs,
+    )
+
+    expected = {
+        "trial_balance_rows": len(df),
+        "balance_sheet": bs_end,
+        "balance_sheet_prior": bs_begin,
+        "income_statement": is_current,
+        "prior_balance": bs_begin,
+        "prior_income": is_prior,
+        "prior_cashflow": cf_prior,
+        "fs_vs_z32_diffs": min(n_z32_diffs, len(balance_items)),
+        "prior_vs_z32_diffs": min(n_z32_diffs, len(balance_items)),
+        "z35_diffs": n_z35_diffs,
+        "scores": {
+            "D1_报表平衡": 30, "D2_表格表头": 10, "D3_科目映射": 10,
+            "D4_基本情况": 10, "D5_附注平衡": max(0, 10 - n_z35_diffs),
+            # C列、D列各有 n_z32_diffs 项与报表/上年审计金额不一致
+            "D6_数据比对": round(30 * (len(balance_items) - min(n_z32_diffs, len(balance_items))) / len(balance_items)),
+        },
+    }
+    return FixtureSet(
+        root=root, sample_dir=sample_dir, company_name=company_name, scale=scale, seed=seed,
+        trial_balance=trial_balance, balance_sheet=balance_sheet, income_statement=income_statement,
+        audit_pdf=audit_pdf, template=template, expected=expected,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m opencpai_pipeline fixtures", description="生成合成测试数据（一个公司目录 + 底稿模板）"
+    )
+    arg_parser.add_argument("out_dir", help="输出目录")
+    arg_parser.add_argument("--scale", type=int, default=1, help="规模倍数（余额表行数/报表明细/PDF页数）")
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--company", default="深圳合成测试科技有限公司", help="公司名称")
+    args = arg_parser.parse_args(argv)
+
+    fixture = generate_fixture_set(Path(args.out_dir), scale=args.scale, seed=args.seed, company_name=args.company)
+    print(f"✓ 已生成 {fixture.company_name}（{fixture.scale}×，种子{fixture.seed}）")
+    for label, path in (
+        ("科目余额表", fixture.trial_balance),
+        ("资产负债表", fixture.balance_sheet),
+        ("利润表", fixture.income_statement),
+        ("上年审计报告", fixture.audit_pdf),
+        ("底稿模板", fixture.template),
+    ):
+        print(f"  {label}: {path} ({path.stat().st_size / 1024:.1f} KB)")
+    return 0
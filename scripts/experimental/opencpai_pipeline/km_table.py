@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+KM表生成（KMSCB宏的Python实现）
+
+原流程在余额表注入后执行 KMSCB 宏，由VBA逐行遍历"余额表"生成科目表（KM）。
+宏单线程运行，Python侧看不到进度，且必须启动Excel。
+
+本模块直接由清洗后的标准8列余额表（df_cleaned）生成KM表:
+    - 科目编码规范化（去空白、去".0"、去分隔符），按 4-2-2-2 编码规则推断级次与上级科目
+    - 末级标记: 排序后与下一编码做前缀比较（整列一次完成，不逐行查找下级）
+    - 余额方向: 按一级科目汇总的期末（其次期初）借贷方向，均为0时按科目类别默认
+    - 期初/期末余额按方向取净额，本期借贷方原样保留
+    - 上级科目金额与其直接下级合计不一致的记入 inconsistencies（groupby 汇总比对）
+写入时整表一次区域写入（write_frame_to_sheet，按内存上限分块）。
+
+KM表列顺序见 KM_COLUMNS。宏源码不在仓库中，列布局按余额表结构推断；
+与宏输出的一致性由 scripts/experimental/golden_km_table.py 对照已由宏生成KM表的底稿校验。
+
+用法:
+    km = build_km_table(df_cleaned)
+    write_km_table(session.backend, km.table)
+    km.inconsistencies        # 上级科目与下级合计不一致的行
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .balance_ingest import DEFAULT_MAX_BLOCK_BYTES, STANDARD_COLUMNS, IngestStats, write_frame_to_sheet
+from .workbook_backend import WorkbookBackend
+
+
+KM_COLUMNS = [
+    "科目编码", "科目名称", "级次", "一级科目编码", "一级科目名称", "方向",
+    "期初余额", "本期借方", "本期贷方", "期末余额", "是否末级",
+]
+
+AMOUNT_COLUMNS = STANDARD_COLUMNS[2:]
+
+# 一级科目编码长度与各下级段长（财政部会计科目编码 4-2-2-2）
+FIRST_LEVEL_LENGTH = 4
+SUB_LEVEL_LENGTH = 2
+
+# 金额比对容差（元）
+AMOUNT_TOLERANCE = 0.01
+
+_CODE_SEPARATORS = re.compile(r"[\s.\-_/\\]")
+
+
+@dataclass
+class KmLayout:
+    """KM表在底稿中的位置"""
+    sheet: str = "KM"
+    first_row: int = 1
+    first_col: int = 1
+    include_header: bool = True
+
+
+@dataclass
+class KmResult:
+    """KM表生成结果"""
+    table: pd.DataFrame
+    first_level: pd.DataFrame
+    inconsistencies: pd.DataFrame = field(default_factory=pd.DataFrame)
+    dropped_rows: int = 0
+
+
+# =============================================================================
+# 编码
+# =============================================================================
+
+def normalize_account_codes(codes: pd.Series) -> pd.Series:
+    """
+    科目编码规范化（整列字符串操作）
+
+    - 数值读入的编码去掉 ".0"（100201.0 -> "100201"）
+    - 去空白与分隔符（"1002.01" / "1002-01" -> "100201"）
+    - 非数字编码（合计行、说明行）返回空串
+    """
+    text = codes.astype("string").fillna("").str.strip()
+    text = text.str.replace(r"\.0+$", "", regex=True)
+    text = text.str.replace(_CODE_SEPARATORS, "", regex=True)
+    return text.where(text.str.fullmatch(r"\d+"), "").astype(object)
+
+
+def account_levels(codes: pd.Series) -> pd.Series:
+    """级次：4位为1级，此后每2位一级（长度不足4位的按1级处理）"""
+    lengths = codes.str.len()
+    extra = (lengths - FIRST_LEVEL_LENGTH).clip(lower=0)
+    return (1 + np.ceil(extra / SUB_LEVEL_LENGTH)).astype(int)
+
+
+def parent_codes(codes: pd.Series, levels: pd.Series) -> pd.Series:
+    """上级科目编码（1级为空串）"""
+    parent_length = FIRST_LEVEL_LENGTH + (levels - 2).clip(lower=0) * SUB_LEVEL_LENGTH
+    parents = [code[:n] for code, n in zip(codes, parent_length)]
+    return pd.Series(parents, index=codes.index).where(levels > 1, "")
+
+
+def leaf_flags(codes: pd.Series) -> pd.Series:
+    """
+    末级标记
+
+    编码按字符串排序后，科目的全部下级紧随其后；
+    只需判断下一个编码是否以本编码为前缀且更长。
+    """
+    ordered = codes.sort_values(kind="mergesort")
+    following = ordered.shift(-1).fillna("")
+    has_child = [len(nxt) > len(code) and nxt.startswith(code) for code, nxt in zip(ordered, following)]
+    return pd.Series(np.logical_not(has_child), index=ordered.index).reindex(codes.index)
+
+
+def default_direction(first_level_code: str) -> str:
+    """
+    按科目类别的默认余额方向
+
+    1资产/5成本为借，2负债/3共同/4权益为贷；6损益类中收入（60/61/63开头）为贷，其余为借。
+    """
+    head = first_level_code[:1]
+    if head in ("1", "5"):
+        return "借"
+    if head in ("2", "3", "4"):
+        return "贷"
+    if head == "6":
+        return "贷" if first_level_code[:2] in ("60", "61", "63") else "借"
+    return "借"
+
+
+# =============================================================================
+# 生成
+# =============================================================================
+
+def _prepare(df_cleaned: pd.DataFrame) -> pd.DataFrame:
+    missing = [c for c in STANDARD_COLUMNS if c not in df_cleaned.columns]
+    if missing:
+        raise ValueError(f"余额表缺少列: {missing}")
+
+    frame = df_cleaned[STANDARD_COLUMNS].copy()
+    frame["科目编码"] = normalize_account_codes(frame["科目编码"])
+    frame["科目名称"] = frame["科目名称"].astype("string").fillna("").str.strip().astype(object)
+    for col in AMOUNT_COLUMNS:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce").fillna(0.0)
+
+    frame = frame[frame["科目编码"] != ""]
+    # 同一编码出现多次（分页导出的重复表头后数据等）保留第一行
+    return frame.drop_duplicates("科目编码", keep="first")
+
+
+def _directions(frame: pd.DataFrame) -> pd.Series:
+    """一级科目编码 -> 方向（按末级明细合计：期末净额，其次期初净额，其次类别默认）"""
+    leaves = frame[frame["是否末级"]]
+    sums = leaves.groupby("一级科目编码")[AMOUNT_COLUMNS].sum()
+    closing = sums["期末借方"] - sums["期末贷方"]
+    opening = sums["期初借方"] - sums["期初贷方"]
+    net = closing.where(closing.abs() >= AMOUNT_TOLERANCE, opening)
+
+    first_codes = pd.Index(frame["一级科目编码"].unique())
+    defaults = pd.Series([default_direction(c) for c in first_codes], index=first_codes)
+    net = net.reindex(first_codes).fillna(0.0)
+    by_balance = pd.Series(np.where(net > 0, "借", "贷"), index=first_codes)
+    return by_balance.where(net.abs() >= AMOUNT_TOLERANCE, defaults)
+
+
+def _inconsistencies(frame: pd.DataFrame) -> pd.DataFrame:
+    """非末级科目金额与其直接下级合计的差异"""
+    children = frame[frame["上级科目编码"] != ""]
+    child_sums = children.groupby("上级科目编码")[AMOUNT_COLUMNS].sum()
+    parents = frame[~frame["是否末级"]].set_index("科目编码")
+    parents = parents[parents.index.isin(child_sums.index)]
+    if parents.empty:
+        return pd.DataFrame(columns=["科目编码", "科目名称", "列", "本级金额", "下级合计", "差异"])
+
+    diff = parents[AMOUNT_COLUMNS] - child_sums.loc[parents.index, AMOUNT_COLUMNS]
+    stacked = diff.stack()
+    stacked = stacked[stacked.abs() >= AMOUNT_TOLERANCE]
+    if stacked.empty:
+        return pd.DataFrame(columns=["科目编码", "科目名称", "列", "本级金额", "下级合计", "差异"])
+
+    codes = stacked.index.get_level_values(0)
+    cols = stacked.index.get_level_values(1)
+    own = parents[AMOUNT_COLUMNS].stack().loc[stacked.index]
+    return pd.DataFrame({
+        "科目编码": codes,
+        "科目名称": parents.loc[codes, "科目名称"].values,
+        "列": cols,
+        "本级金额": own.values.round(2),
+        "下级合计": (own - stacked).values.round(2),
+        "差异": stacked.values.round(2),
+    })
+
+
+def build_km_table(df_cleaned: pd.DataFrame) -> KmResult:
+    """
+    由标准8列余额表生成KM表
+
+    Args:
+        df_cleaned: 清洗后的余额表（STANDARD_COLUMNS）
+
+    Returns:
+        KmResult: table（KM_COLUMNS，按科目编码排序）、first_level（一级科目汇总）、
+                  inconsistencies（上级与下级合计不一致）、dropped_rows（无有效编码的行数）
+    """
+    frame = _prepare(df_cleaned)
+    dropped = len(df_cleaned) - len(frame)
+    frame = frame.sort_values("科目编码", kind="mergesort").reset_index(drop=True)
+
+    codes = frame["科目编码"]
+    frame["级次"] = account_levels(codes)
+    frame["上级科目编码"] = parent_codes(codes, frame["级次"])
+    frame["是否末级"] = leaf_flags(codes)
+    frame["一级科目编码"] = codes.str[:FIRST_LEVEL_LENGTH]
+
+    first_names = frame[frame["级次"] == 1].set_index("科目编码")["科目名称"]
+    frame["一级科目名称"] = frame["一级科目编码"].map(first_names).fillna("")
+
+    directions = _directions(frame)
+    frame["方向"] = frame["一级科目编码"].map(directions)
+    debit_side = frame["方向"] == "借"
+    opening_net = frame["期初借方"] - frame["期初贷方"]
+    closing_net = frame["期末借方"] - frame["期末贷方"]
+    frame["期初余额"] = np.where(debit_side, opening_net, -opening_net).round(2)
+    frame["期末余额"] = np.where(debit_side, closing_net, -closing_net).round(2)
+
+    table = frame[KM_COLUMNS].copy()
+    table["是否末级"] = np.where(table["是否末级"], "是", "否")
+
+    leaves = frame[frame["是否末级"]]
+    first_level = (
+        leaves.groupby("一级科目编码")[["期初余额", "本期借方", "本期贷方", "期末余额"]].sum().round(2)
+        .join(pd.DataFrame({"一级科目名称": first_names}).rename_axis("一级科目编码"), how="left")
+        .join(directions.rename("方向"), how="left")
+        .reset_index()
+    )
+    first_level["一级科目名称"] = first_level["一级科目名称"].fillna("")
+    first_level = first_level[["一级科目编码", "一级科目名称", "方向", "期初余额", "本期借方", "本期贷方", "期末余额"]]
+
+    return KmResult(
+        table=table,
+        first_level=first_level,
+        inconsistencies=_inconsistencies(frame),
+        dropped_rows=dropped,
+    )
+
+
+def write_km_table(
+    backend: WorkbookBackend,
+    table: pd.DataFrame,
+    layout: Optional[KmLayout] = None,
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES
+) -> IngestStats:
+    """
+    KM表整表写入底稿（按内存上限分块，每块一次区域写入）
+
+    模板中的KM表须为空表（与宏执行前一致）；KM工作表不存在时抛出 ValueError。
+    """
+    layout = layout or KmLayout()
+    if not backend.has_sheet(layout.sheet):
+        raise ValueError(f"底稿中没有工作表: {layout.sheet}")
+    return write_frame_to_sheet(
+        backend, layout.sheet, table,
+        first_row=layout.first_row,
+        first_col=layout.first_col,
+        include_header=layout.include_header,
+        max_block_bytes=max_block_bytes,
+    )
+
+
+def compare_km_tables(expected: pd.DataFrame, actual: pd.DataFrame,
+                      columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    按科目编码对比两张KM表（golden校验用）
+
+    Args:
+        expected: 基准表（宏生成）
+        actual: 待校验表（Python生成）
+        columns: 对比的列，默认两表共有的 KM_COLUMNS
+
+    Returns:
+        差异明细 DataFrame(科目编码, 列, 基准, 实际)；缺行记为列 "<缺行>" / "<多行>"
+    """
+    if columns is None:
+        columns = [c for c in KM_COLUMNS[1:] if c in expected.columns and c in actual.columns]
+
+    def keyed(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.copy()
+        df["科目编码"] = normalize_account_codes(df["科目编码"])
+        return df[df["科目编码"] != ""].drop_duplicates("科目编码").set_index("科目编码")
+
+    left, right = keyed(expected), keyed(actual)
+    rows = [(code, "<缺行>", None, None) for code in left.index.difference(right.index)]
+    rows += [(code, "<多行>", None, None) for code in right.index.difference(left.index)]
+
+    common = left.index.intersection(right.index)
+    for col in columns:
+        a, b = left.loc[common, col], right.loc[common, col]
+        a_num, b_num = pd.to_numeric(a, errors="coerce"), pd.to_numeric(b, errors="coerce")
+        numeric = a_num.notna() & b_num.notna()
+        differs = np.where(
+            numeric,
+            (a_num.fillna(0) - b_num.fillna(0)).abs() >= AMOUNT_TOLERANCE,
+            a.fillna("").astype(str).str.strip() != b.fillna("").astype(str).str.strip(),
+        )
+        rows += [(code, col, a[code], b[code]) for code in common[differs]]
+
+    return pd.DataFrame(rows, columns=["科目编码", "列", "基准", "实际"])
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+报表项目名称匹配器
+
+原实现对每一行遍历全部项目名做 `key in item_name`，复杂度 O(行数 × 项目数)，
+且按字典顺序取第一个命中：如"非流动资产合计"会先命中"流动资产合计"。
+
+LineItemMatcher 预编译一次，逐行线性匹配:
+    1. 规范化：去空白、全角标点转半角、去行首序号（"一、" "（二）" "1."）
+    2. 精确索引：规范化名称（含别名）哈希查找，命中即为最具体匹配
+    3. 子串匹配：Aho–Corasick 自动机一次扫描找出全部候选，取最长者
+       最长候选不唯一时取最左者，并标记为歧义行供人工复核
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+_FULLWIDTH_TABLE = str.maketrans({
+    '（': '(', '）': ')', '：': ':', '，': ',', '；': ';', '－': '-', '—': '-',
+})
+
+# 行首序号：一、 二、 （一） (1) 1. 1、
+_LEADING_ORDINAL = re.compile(r'^(?:[一二三四五六七八九十]+[、.]|\([一二三四五六七八九十\d]+\)|\d+[、.])')
+
+
+def normalize_item_name(text: str) -> str:
+    """规范化报表项目名称（项目名与别名、被匹配文本使用同一规则）"""
+    if not text:
+        return ""
+    text = re.sub(r'\s+', '', str(text)).translate(_FULLWIDTH_TABLE)
+    return _LEADING_ORDINAL.sub('', text)
+
+
+@dataclass
+class LineItemMatch:
+    """单行匹配结果"""
+    key: str                   # 标准项目名
+    kind: str                  # "exact" / "substring"
+    ambiguous: bool = False    # 最长候选不唯一
+    candidates: List[str] = field(default_factory=list)
+
+
+class _AhoCorasick:
+    """多模式子串匹配自动机（模式 -> 标准项目名）"""
+
+    def __init__(self, patterns: Dict[str, str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]  # (模式, 标准项目名)
+
+        for pattern, key in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((pattern, key))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> List[Tuple[int, str, str]]:
+        """返回全部命中 (起始位置, 模式, 标准项目名)"""
+        hits = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern, key in self._out[node]:
+                hits.append((i - len(pattern) + 1, pattern, key))
+        return hits
+
+
+class LineItemMatcher:
+    """
+    报表项目匹配器（编译一次，可重复使用）
+
+    Args:
+        keys: 标准项目名（如 Z3_2_BALANCE_MAPPING 的键）
+        aliases: {别名: 标准项目名}，如 {"预收账款": "预收款项"}
+    """
+
+    def __init__(self, keys: Iterable[str], aliases: Optional[Dict[str, str]] = None):
+        self.keys: Tuple[str, ...] = tuple(keys)
+        patterns: Dict[str, str] = {}
+        for key in self.keys:
+            patterns.setdefault(normalize_item_name(key), key)
+        for alias, key in (aliases or {}).items():
+            patterns.setdefault(normalize_item_name(alias), key)
+        patterns.pop("", None)
+
+        self._exact = patterns
+        self._automaton = _AhoCorasick(patterns)
+
+    def match(self, text: str) -> Optional[LineItemMatch]:
+        """匹配单个项目名称，未命中返回None"""
+        name = normalize_item_name(text)
+        if not name:
+            return None
+
+        key = self._exact.get(name)
+        if key is not None:
+            return LineItemMatch(key=key, kind="exact", candidates=[key])
+
+        hits = self._automaton.find_all(name)
+        if not hits:
+            return None
+
+        longest = max(len(pattern) for _, pattern, _ in hits)
+        best = sorted((start, key) for start, pattern, key in hits if len(pattern) == longest)
+        best_keys = list(dict.fromkeys(key for _, key in best))
+        all_keys = list(dict.fromkeys(key for _, _, key in sorted(hits)))
+        return LineItemMatch(
+            key=best_keys[0],
+            kind="substring",
+            ambiguous=len(best_keys) > 1,
+            candidates=all_keys,
+        )
+
+    def classify(self, texts: Iterable[str]) -> List[Optional[LineItemMatch]]:
+        """逐行分类（一次遍历）"""
+        return [self.match(text) for text in texts]
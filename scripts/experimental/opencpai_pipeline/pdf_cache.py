@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+PDF文档句柄与逐页文本缓存
+
+公司名称提取每次运行都要 pdfplumber.open 上年审计报告并解码前几页文本。
+
+PdfDocumentCache 每次运行每个PDF只打开一次，逐页文本按需解码并记住；
+配合 PdfTextStore 把已解码的页面文本按文件内容哈希持久化，重复运行时不必再打开PDF。
+
+示例:
+    with PdfDocumentCache(store=PdfTextStore(cache_dir)) as pdf_cache:
+        doc = pdf_cache.get(pdf_path)
+        text = doc.page_text(0)
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .workbook_backend import atomic_write, file_sha256
+
+
+STORE_FORMAT = 1
+
+
+class PdfTextStore:
+    """
+    逐页文本持久化（一个PDF一个JSON文件，按内容sha256命名）
+
+    Args:
+        cache_dir: 缓存目录
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, file_hash: str) -> Path:
+        return self.cache_dir / f"{file_hash}.json"
+
+    def load(self, file_hash: str) -> Dict[str, Any]:
+        """返回 {"page_count", "texts"}，无缓存时为空结构"""
+        empty = {"page_count": None, "texts": {}}
+        try:
+            with open(self._path(file_hash), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return empty
+        if entry.get("format") != STORE_FORMAT:
+            return empty
+        return {
+            "page_count": entry.get("page_count"),
+            "texts": {int(k): v for k, v in entry.get("texts", {}).items()},
+        }
+
+    def save(self, file_hash: str, page_count: Optional[int], texts: Dict[int, str]) -> None:
+        entry = {
+            "format": STORE_FORMAT,
+            "page_count": page_count,
+            "texts": {str(k): v for k, v in texts.items()},
+        }
+        atomic_write(self._path(file_hash), json.dumps(entry, ensure_ascii=False))
+
+
+class PdfDocument:
+    """
+    单个PDF：延迟打开，逐页文本按需解码并缓存
+
+    只有缓存未命中的页面才会打开PDF；全部命中时PDF不会被打开。
+    """
+
+    def __init__(self, path: Path, store: Optional[PdfTextStore] = None):
+        self.path = Path(path)
+        self.store = store
+        self.file_hash = file_sha256(self.path) if store is not None else ""
+        self._pdf = None
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.decoded_pages = 0
+
+        cached = store.load(self.file_hash) if store is not None else {}
+        self._page_count: Optional[int] = cached.get("page_count")
+        self._texts: Dict[int, str] = cached.get("texts", {})
+
+    def _open(self):
+        if self._pdf is None:
+            import pdfplumber
+            self._pdf = pdfplumber.open(str(self.path))
+        return self._pdf
+
+    @property
+    def page_count(self) -> int:
+        with self._lock:
+            if self._page_count is None:
+                self._page_count = len(self._open().pages)
+                self._dirty = True
+            return self._page_count
+
+    def page_text(self, page_num: int) -> str:
+        """第 page_num 页（0起始）的文本，页码越界返回空字符串"""
+        with self._lock:
+            if page_num in self._texts:
+                return self._texts[page_num]
+            if page_num >= self.page_count:
+                return ""
+            text = self._open().pages[page_num].extract_text() or ""
+            self._texts[page_num] = text
+            self.decoded_pages += 1
+            self._dirty = True
+            return text
+
+    def flush(self) -> None:
+        """把新解码的页面写入持久化缓存"""
+        with self._lock:
+            if self.store is not None and self._dirty:
+                self.store.save(self.file_hash, self._page_count, self._texts)
+                self._dirty = False
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._pdf is not None:
+                try:
+                    self._pdf.close()
+                except Exception:
+                    pass
+                self._pdf = None
+
+
+class PdfDocumentCache:
+    """
+    一次运行内的PDF文档注册表（同一路径只打开一次）
+
+    Args:
+        store: 持久化文本缓存，None时仅在内存中缓存
+    """
+
+    def __init__(self, store: Optional[PdfTextStore] = None):
+        self.store = store
+        self._docs: Dict[str, PdfDocument] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> PdfDocument:
+        key = str(Path(path).resolve())
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is None:
+                doc = PdfDocument(Path(path), store=self.store)
+                self._docs[key] = doc
+            return doc
+
+    def close(self) -> None:
+        with self._lock:
+            for doc in self._docs.values():
+                doc.close()
+            self._docs.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
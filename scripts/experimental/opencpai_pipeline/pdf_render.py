@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+"""
+PDF渲染（检查报告、财审报告，不经Excel）
+
+原流程的检查报告与财审报告PDF都经COM调用 ExportAsFixedFormat：只能在Windows上、
+在持有Excel的主线程中串行执行，每份文档数秒。本模块用 reportlab 直接排版:
+    - 中文字体: 优先嵌入TrueType字体（环境变量 OPENCPAI_PDF_FONT 或系统常见中文字体），
+      找不到时使用 reportlab 内置的 STSong-Light CID字体（无需字体文件）
+    - 表格分页: LongTable 自动跨页，表头行每页重复（repeatRows）；列宽超出版心时按比例缩放（同 fitToWidth=1）
+    - 检查报告: 由 ReportTable 列表（check_report，与xlsx共用）直接生成
+    - 财审报告: 读取报告xlsx，每个工作表另起一页，跳过隐藏的行/列（yincang），
+      打印标题行（或冻结窗格以上的行）每页重复，合并单元格、列宽、金额千分位/百分比按工作表设置；
+      宽表自动横向
+    - 单元格: 单行且放得下的文本直接用字符串（不建Paragraph），需要换行的才用Paragraph
+    - 大表: 检查报告的表格分块排版（ChunkedTable），每次跨页只对前 TABLE_CHUNK_ROWS 行计算高度并拆分，
+      不再对剩余全部行反复重建表格（LongTable 直接拆分数万行时为平方复杂度）
+    - 并行: render_workbook_pdfs 在进程池中渲染多份报告（reportlab 为纯Python，CPU密集）
+不依赖Excel与Windows，Linux工作进程可用。
+
+命令行（批量重新生成PDF）:
+    python -m opencpai_pipeline render-pdf 【财审报告】*.xlsx [--workers 4] [--out 输出目录]
+"""
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from .check_report import ReportTable
+from .tracing import span
+
+
+# TrueType中文字体候选（名称, 路径）；reportlab 不支持CFF轮廓的OTF/TTC（如 Noto Sans CJK）
+FONT_CANDIDATES = (
+    ("SimSun", "C:/Windows/Fonts/simsun.ttc"),
+    ("MicrosoftYaHei", "C:/Windows/Fonts/msyh.ttc"),
+    ("SimHei", "C:/Windows/Fonts/simhei.ttf"),
+    ("WenQuanYiMicroHei", "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc"),
+    ("WenQuanYiZenHei", "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc"),
+    ("ARPLUMing", "/usr/share/fonts/truetype/arphic/uming.ttc"),
+)
+CID_FALLBACK_FONT = "STSong-Light"
+
+PAGE_MARGIN = 36                  # 页边距（pt）
+POINTS_PER_CHAR = 5.6             # Excel列宽1个字符约合的磅数（Calibri 11 为7px）
+DEFAULT_COLUMN_WIDTH = 8.43
+FONT_SIZE = 9
+CELL_PADDING = 12                 # 表格单元格左右内边距之和（reportlab默认各6pt）
+TABLE_CHUNK_ROWS = 60             # 大表分块行数（约一页；每次跨页只对这些行排版）
+AMOUNT_FORMAT = "{:,.2f}"
+
+# CID字体没有的符号（控制台标记）换为字体中有的字符
+_GLYPH_FALLBACK = str.maketrans({"✓": "√", "✗": "×", "⚠": "!", "✅": "√", "❌": "×"})
+
+_FONT_CACHE: Dict[str, str] = {}
+
+
+# =============================================================================
+# 字体
+# =============================================================================
+
+def register_cjk_font(font_path: Optional[str] = None) -> str:
+    """
+    注册中文字体（每个进程只注册一次），返回字体名
+
+    顺序: font_path 参数 > OPENCPAI_PDF_FONT 环境变量 > FONT_CANDIDATES > STSong-Light（CID，不嵌入）
+    """
+    font_path = font_path or os.getenv("OPENCPAI_PDF_FONT") or ""
+    if font_path in _FONT_CACHE:
+        return _FONT_CACHE[font_path]
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    candidates = [(Path(font_path).stem, font_path)] if font_path else []
+    candidates += [c for c in FONT_CANDIDATES if Path(c[1]).exists()]
+    name = None
+    for candidate_name, path in candidates:
+        try:
+            if candidate_name not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(TTFont(candidate_name, path, subfontIndex=0))
+            name = candidate_name
+            break
+        except Exception as e:
+            print(f"  ⚠ 字体不可用 {path}: {e}")
+    if name is None:
+        # CID字体不嵌入PDF，字形由阅读器提供；Linux工作进程建议安装 fonts-wqy-microhei
+        print(f"  ⚠ 未找到可嵌入的中文TrueType字体，使用{CID_FALLBACK_FONT}（不嵌入）")
+        name = CID_FALLBACK_FONT
+        if name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(UnicodeCIDFont(name))
+    _FONT_CACHE[font_path] = name
+    return name
+
+
+def _pdf_text(value: Any, font: str) -> str:
+    text = "" if value is None else str(value)
+    return text.translate(_GLYPH_FALLBACK) if font == CID_FALLBACK_FONT else text
+
+
+def _styles(font: str) -> Dict[str, Any]:
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import ParagraphStyle
+
+    return {
+        "title": ParagraphStyle("title", fontName=font, fontSize=16, leading=22, alignment=TA_CENTER, spaceAfter=6),
+        "subtitle": ParagraphStyle("subtitle", fontName=font, fontSize=9, leading=13, spaceAfter=10),
+        "heading": ParagraphStyle("heading", fontName=font, fontSize=12, leading=18, spaceBefore=10, spaceAfter=4),
+        "body": ParagraphStyle("body", fontName=font, fontSize=FONT_SIZE, leading=FONT_SIZE + 3),
+        "cell": ParagraphStyle("cell", fontName=font, fontSize=FONT_SIZE, leading=FONT_SIZE + 2),
+    }
+
+
+def _page_number(canvas, doc) -> None:
+    canvas.saveState()
+    canvas.setFont(doc.cjk_font, 8)
+    canvas.drawCentredString(doc.pagesize[0] / 2, PAGE_MARGIN / 2, f"第 {doc.page} 页")
+    canvas.restoreState()
+
+
+def _document(path: Path, font: str, title: str, first: str = "portrait"):
+    """纵向/横向两种页面模板的文档（首页为 first，之后由 NextPageTemplate 切换）"""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = BaseDocTemplate(str(path), pagesize=A4, title=title, leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN,
+                          topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN)
+    doc.cjk_font = font
+    templates = []
+    for template_id, size in (("portrait", A4), ("landscape", landscape(A4))):
+        frame = Frame(PAGE_MARGIN, PAGE_MARGIN, size[0] - 2 * PAGE_MARGIN, size[1] - 2 * PAGE_MARGIN, id=template_id)
+        templates.append(PageTemplate(id=template_id, frames=[frame], pagesize=size, onPage=_page_number))
+    # 文档从第一个模板开始
+    doc.addPageTemplates(templates if first == "portrait" else templates[::-1])
+    return doc
+
+
+def _frame_width(orientation: str) -> float:
+    from reportlab.lib.pagesizes import A4, landscape
+
+    size = landscape(A4) if orientation == "landscape" else A4
+    return size[0] - 2 * PAGE_MARGIN
+
+
+def _cell_text(text: str, font: str, styles: Dict[str, Any], width: float) -> Any:
+    """单元格内容：单行且宽度放得下时为字符串，否则为可换行的Paragraph"""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.platypus import Paragraph
+
+    text = _pdf_text(text, font)
+    if not text:
+        return ""
+    if "\n" not in text and stringWidth(text, font, FONT_SIZE) <= width - CELL_PADDING:
+        return text
+    return Paragraph(escape(text), styles["cell"])
+
+
+def _format_amount(value: Any, number_format: str = "#,##0.00") -> str:
+    if "%" in number_format:
+        match = re.search(r"0\.(0+)", number_format)
+        decimals = len(match.group(1)) if match else 0
+        return f"{value * 100:.{decimals}f}%"
+    if "0.00" in number_format:
+        return AMOUNT_FORMAT.format(value)
+    if "#,##0" in number_format:
+        return f"{value:,.0f}"
+    return f"{value:.15g}" if isinstance(value, float) else str(value)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+@lru_cache(maxsize=None)
+def _chunked_table_class():
+    """ChunkedTable 类（reportlab 延迟导入）"""
+    from reportlab.platypus import Flowable, LongTable
+
+    class ChunkedTable(Flowable):
+        """
+        表头行 + 数据行的分块表格（表头每页重复）
+
+        样式命令只能按列/表头行给出（行号随拆分变化）。
+        """
+
+        def __init__(self, header, rows, col_widths, style, chunk_rows=TABLE_CHUNK_ROWS):
+            super().__init__()
+            self.header, self.rows = header, rows
+            self.col_widths, self.style, self.chunk_rows = col_widths, style, chunk_rows
+            self._head = None
+            self._wrapped = None
+
+        def _table(self, rows):
+            return LongTable([self.header] + rows, colWidths=self.col_widths, repeatRows=1, style=self.style)
+
+        def _wrap_head(self, availWidth, availHeight):
+            # 首块表格按可用尺寸排版（wrap 与随后的 split 共用）
+            if self._wrapped is None or self._wrapped[:2] != (availWidth, availHeight):
+                self._head = self._table(self.rows[:self.chunk_rows])
+                self._wrapped = (availWidth, availHeight) + self._head.wrap(availWidth, availHeight)
+            return self._head, self._wrapped[2], self._wrapped[3]
+
+        def wrap(self, availWidth, availHeight):
+            _, width, height = self._wrap_head(availWidth, availHeight)
+            if len(self.rows) > self.chunk_rows:
+                # 还有后续分块：高度至少超出可用高度，由 split 拆分
+                height = max(height, availHeight + 1)
+            return width, height
+
+        def split(self, availWidth, availHeight):
+            head, _, height = self._wrap_head(availWidth, availHeight)
+            if height <= availHeight:
+                done, parts = min(len(self.rows), self.chunk_rows), [head]
+            else:
+                parts = head.split(availWidth, availHeight)
+                if not parts:
+                    return []
+                parts = parts[:1]
+                done = len(parts[0]._cellvalues) - 1
+            if done < len(self.rows):
+                parts.append(ChunkedTable(self.header, self.rows[done:], self.col_widths, self.style,
+                                          self.chunk_rows))
+            return parts
+
+        def draw(self):
+            self._head.drawOn(self.canv, 0, 0)
+
+    return ChunkedTable
+
+
+# =============================================================================
+# 检查报告
+# =============================================================================
+
+def render_check_report_pdf(
+    path: Path,
+    title: str,
+    tables: Sequence[ReportTable],
+    subtitle: str = "",
+    font_path: Optional[str] = None,
+) -> Path:
+    """
+    由检查结果直接生成检查报告PDF
+
+    Args:
+        path: 输出PDF
+        title: 报告标题（"审计底稿检查报告 - 公司名"）
+        tables: 各节（ReportTable）
+        subtitle: 标题下一行（生成时间等）
+    """
+    from reportlab.lib import colors
+    from reportlab.platypus import Paragraph, TableStyle
+
+    font = register_cjk_font(font_path)
+    styles = _styles(font)
+    width = _frame_width("portrait")
+    chunked_table = _chunked_table_class()
+
+    story = [Paragraph(escape(_pdf_text(title, font)), styles["title"])]
+    if subtitle:
+        story.append(Paragraph(escape(_pdf_text(subtitle, font)), styles["subtitle"]))
+
+    for table in tables:
+        story.append(Paragraph(escape(_pdf_text(table.title, font)), styles["heading"]))
+        if not table.rows:
+            story.append(Paragraph(escape(_pdf_text(table.empty_text, font)), styles["body"]))
+            continue
+        # 首列（项目名称）占40%，其余列均分
+        n = len(table.headers)
+        col_widths = [width * 0.4] + [width * 0.6 / (n - 1)] * (n - 1) if n > 1 else [width]
+        header = [_cell_text(str(h), font, styles, w) for h, w in zip(table.headers, col_widths)]
+        data = []
+        amount_cols = set()
+        for row in table.rows:
+            cells = []
+            for c, value in enumerate(row):
+                if _is_number(value):
+                    cells.append(_format_amount(value))
+                    amount_cols.add(c)
+                else:
+                    text = "" if value is None else str(value)
+                    cells.append(_cell_text(text, font, styles, col_widths[min(c, n - 1)]))
+            data.append(cells)
+        style = [
+            ("FONTNAME", (0, 0), (-1, -1), font),
+            ("FONTSIZE", (0, 0), (-1, -1), FONT_SIZE),
+            ("GRID", (0, 0), (-1, -1), 0.4, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E8EEF7")),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]
+        # 按列设置右对齐（逐单元格的样式命令在每次跨页拆分时都要重新应用）
+        style += [("ALIGN", (c, 1), (c, -1), "RIGHT") for c in sorted(amount_cols)]
+        story.append(chunked_table(header, data, col_widths, TableStyle(style)))
+
+    with span("PDF渲染", path=Path(path).name):
+        _document(Path(path), font, title).build(story)
+    return Path(path)
+
+
+# =============================================================================
+# 财审报告（工作簿版式）
+# =============================================================================
+
+def _title_rows(ws) -> int:
+    """每页重复的表头行数：打印标题行（"1:3"）优先，其次冻结窗格以上的行"""
+    titles = ws.print_title_rows or ""
+    match = re.search(r"(\d+):\$?(\d+)", titles)
+    if match and int(match.group(1)) == 1:
+        return int(match.group(2))
+    if ws.freeze_panes:
+        row = int(re.sub(r"[A-Z]+", "", ws.freeze_panes) or 1)
+        return max(0, row - 1)
+    return 0
+
+
+def _display_value(cell) -> Tuple[str, bool]:
+    """(显示文本, 是否右对齐)"""
+    value = cell.value
+    if value is None:
+        return "", False
+    if _is_number(value):
+        return _format_amount(value, cell.number_format or "General"), True
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d"), False
+    if isinstance(value, date):
+        return value.isoformat(), False
+    return str(value), False
+
+
+def _sheet_flowables(ws, font: str, styles: Dict[str, Any]) -> Tuple[Optional[Any], str]:
+    """一个工作表的表格（LongTable）与页面方向；工作表没有可见内容时返回 (None, "")"""
+    from openpyxl.utils import get_column_letter
+    from reportlab.lib import colors
+    from reportlab.platypus import LongTable, TableStyle
+
+    max_row, max_col = ws.max_row, ws.max_column
+    rows = [r for r in range(1, max_row + 1) if not ws.row_dimensions[r].hidden]
+    cols = [c for c in range(1, max_col + 1) if not ws.column_dimensions[get_column_letter(c)].hidden]
+    if not rows or not cols:
+        return None, ""
+
+    widths = [(ws.column_dimensions[get_column_letter(c)].width or DEFAULT_COLUMN_WIDTH) * POINTS_PER_CHAR
+              for c in cols]
+    orientation = ws.page_setup.orientation or ""
+    if orientation not in ("portrait", "landscape"):
+        orientation = "landscape" if sum(widths) > _frame_width("portrait") * 1.1 else "portrait"
+    frame_width = _frame_width(orientation)
+    if sum(widths) > frame_width:
+        scale = frame_width / sum(widths)
+        widths = [w * scale for w in widths]
+
+    data, right_aligned = [], []
+    grid = {(r, c): cell for r, row in enumerate(ws.iter_rows(min_row=1, max_row=max_row, max_col=max_col), 1)
+            for c, cell in enumerate(row, 1)}
+    for i, r in enumerate(rows):
+        cells = []
+        for j, c in enumerate(cols):
+            cell = grid.get((r, c))
+            text, right = _display_value(cell) if cell is not None else ("", False)
+            if right:
+                cells.append(text)
+                right_aligned.append((j, i))
+            else:
+                cells.append(_cell_text(text, font, styles, widths[j]))
+        data.append(cells)
+    # 去掉末尾的空行
+    while data and all(v == "" for v in data[-1]):
+        data.pop()
+    if not data:
+        return None, ""
+    right_aligned = [(j, i) for j, i in right_aligned if i < len(data)]
+
+    style = [
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTSIZE", (0, 0), (-1, -1), FONT_SIZE),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 1),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
+    ]
+    style += [("ALIGN", cell, cell, "RIGHT") for cell in right_aligned]
+    # 合并单元格：映射到可见行列后设置SPAN（被隐藏行列切断的部分按可见范围合并）
+    row_index = {r: i for i, r in enumerate(rows[:len(data)])}
+    col_index = {c: j for j, c in enumerate(cols)}
+    for merged in ws.merged_cells.ranges:
+        visible_rows = [row_index[r] for r in range(merged.min_row, merged.max_row + 1) if r in row_index]
+        visible_cols = [col_index[c] for c in range(merged.min_col, merged.max_col + 1) if c in col_index]
+        if visible_rows and visible_cols and (len(visible_rows) > 1 or len(visible_cols) > 1):
+            style.append(("SPAN", (visible_cols[0], visible_rows[0]), (visible_cols[-1], visible_rows[-1])))
+
+    header_rows = min(sum(1 for r in rows if r <= _title_rows(ws)), len(data))
+    if header_rows:
+        style.append(("LINEBELOW", (0, header_rows - 1), (-1, header_rows - 1), 0.6, colors.black))
+    table = LongTable(data, colWidths=widths, repeatRows=header_rows, style=TableStyle(style))
+    return table, orientation
+
+
+def render_workbook_pdf(xlsx_path: Path, pdf_path: Optional[Path] = None, font_path: Optional[str] = None) -> Path:
+    """
+    按工作表版式渲染报告xlsx（每个工作表另起一页），返回PDF路径（默认与xlsx同名）
+
+    Raises:
+        ValueError: 工作簿中没有可见内容
+    """
+    import openpyxl
+    from reportlab.platypus import NextPageTemplate, PageBreak
+
+    xlsx_path = Path(xlsx_path)
+    pdf_path = Path(pdf_path) if pdf_path else xlsx_path.with_suffix(".pdf")
+    font = register_cjk_font(font_path)
+    styles = _styles(font)
+
+    with span("PDF版式读取", path=xlsx_path.name):
+        wb = openpyxl.load_workbook(str(xlsx_path), data_only=True)
+        try:
+            sheets = [_sheet_flowables(ws, font, styles) for ws in wb.worksheets if ws.sheet_state == "visible"]
+        finally:
+            wb.close()
+    sheets = [(table, orientation) for table, orientation in sheets if table is not None]
+    if not sheets:
+        raise ValueError(f"工作簿中没有可见内容: {xlsx_path.name}")
+
+    doc = _document(pdf_path, font, xlsx_path.stem, first=sheets[0][1])
+    story: List[Any] = []
+    for i, (table, orientation) in enumerate(sheets):
+        if i:
+            story += [NextPageTemplate(orientation), PageBreak()]
+        story.append(table)
+
+    with span("PDF渲染", path=pdf_path.name):
+        doc.build(story)
+    return pdf_path
+
+
+def _render_one(xlsx_path: str, pdf_path: Optional[str], font_path: Optional[str]) -> Tuple[str, Optional[str]]:
+    """进程池任务：返回 (PDF路径, 错误)"""
+    try:
+        return str(render_workbook_pdf(Path(xlsx_path), Path(pdf_path) if pdf_path else None, font_path)), None
+    except Exception as e:
+        return str(pdf_path or Path(xlsx_path).with_suffix(".pdf")), f"{type(e).__name__}: {e}"
+
+
+def render_workbook_pdfs(
+    jobs: Sequence[Tuple[Path, Optional[Path]]],
+    max_workers: Optional[int] = None,
+    font_path: Optional[str] = None,
+) -> List[Tuple[Path, Optional[str]]]:
+    """
+    并行渲染多份报告（进程池，每个进程各自注册字体）
+
+    Args:
+        jobs: [(xlsx路径, PDF路径或None)]
+        max_workers: 进程数，默认CPU核数；<=1 时在当前进程顺序渲染
+
+    Returns:
+        [(PDF路径, 错误信息或None)]，顺序同 jobs
+    """
+    args = [(str(x), str(p) if p else None, font_path) for x, p in jobs]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers <= 1 or len(args) <= 1:
+        results = [_render_one(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(args))) as pool:
+            results = list(pool.map(_render_one, *zip(*args)))
+    return [(Path(path), error) for path, error in results]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行: 批量渲染报告xlsx为PDF"""
+    arg_parser = argparse.ArgumentParser(prog="python -m opencpai_pipeline render-pdf",
+                                         description="报告xlsx渲染为PDF（不需要Excel）")
+    arg_parser.add_argument("files", nargs="+", type=Path, help="报告xlsx")
+    arg_parser.add_argument("--out", type=Path, help="PDF输出目录（默认与xlsx同目录）")
+    arg_parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认CPU核数）")
+    arg_parser.add_argument("--font", help="TrueType中文字体文件（默认自动查找）")
+    args = arg_parser.parse_args(argv)
+
+    jobs = [(f, args.out / f.with_suffix(".pdf").name if args.out else None) for f in args.files]
+    results = render_workbook_pdfs(jobs, max_workers=args.workers, font_path=args.font)
+    failed = 0
+    for path, error in results:
+        if error:
+            failed += 1
+            print(f"  ✗ {path.name}: {error}")
+        else:
+            print(f"  ✓ {path.name}")
+    print(f"完成 {len(results) - failed}/{len(results)}")
+    return 1 if failed else 0
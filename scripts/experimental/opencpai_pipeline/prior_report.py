@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+上年审计报告PDF解析（提前启动、后台进程）
+
+原流程在Step 4（宏执行完毕后）才构造 AuditReportParser 并解析PDF，
+而解析本身与底稿无关。PDF解析 + LLM调用是最慢的一步，放在关键路径上。
+
+start_prior_report_parse() 在流程开始时把解析提交到独立进程（不受主进程GIL影响），
+Step 4 写入Z3-2前再调用 join_prior_report() 取结果。
+后台进程不可用（进程池启动失败/子进程崩溃）时自动回退为当前进程内解析。
+
+解析器结果对象不保证可pickle，子进程中转换为 PriorYearReport 再返回。
+
+传入 cache（report_cache.ReportCache）时先按PDF内容查缓存，命中则不启动子进程。
+"""
+
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+@dataclass
+class PriorYearReport:
+    """上年审计报告解析结果（可跨进程传递）"""
+    is_success: bool
+    error_message: str = ""
+    balance_sheet_current: Dict[str, float] = field(default_factory=dict)
+    income_statement_current: Dict[str, float] = field(default_factory=dict)
+    cash_flow_current: Dict[str, float] = field(default_factory=dict)
+    elapsed_s: float = 0.0
+    from_cache: bool = False
+
+
+def parse_prior_year_report(
+    pdf_path: Path,
+    use_llm: bool = True,
+    sys_paths: Sequence[str] = (),
+    cache=None,
+    cache_key: Optional[str] = None
+) -> PriorYearReport:
+    """
+    解析上年审计报告PDF（可在子进程中执行）
+
+    Args:
+        pdf_path: PDF路径
+        use_llm: 是否启用LLM辅助识别
+        sys_paths: 需加入 sys.path 的目录（子进程中定位 jenny 包）
+        cache: ReportCache，命中直接返回，解析成功后写入
+        cache_key: 已算好的缓存键（避免重复计算PDF哈希）
+    """
+    for path in sys_paths:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    if cache is not None:
+        cache_key = cache_key or cache.key_for(pdf_path, use_llm=use_llm)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached.from_cache = True
+            return cached
+
+    start = time.perf_counter()
+    try:
+        from jenny.parsers.document.audit_report_parser import AuditReportParser
+
+        parser = AuditReportParser(verbose=False, use_llm=use_llm)
+        pdf_result = parser.parse(str(pdf_path))
+        report = PriorYearReport(
+            is_success=bool(pdf_result.is_success),
+            error_message=pdf_result.error_message or "",
+            balance_sheet_current=dict(pdf_result.balance_sheet_current or {}),
+            income_statement_current=dict(pdf_result.income_statement_current or {}),
+            cash_flow_current=dict(pdf_result.cash_flow_current or {}),
+        )
+    except Exception as e:
+        report = PriorYearReport(is_success=False, error_message=f"{type(e).__name__}: {e}")
+    report.elapsed_s = round(time.perf_counter() - start, 3)
+
+    if cache is not None:
+        cache.put(cache_key, report, pdf_path=pdf_path, use_llm=use_llm)
+    return report
+
+
+def start_prior_report_parse(
+    pdf_path: Optional[Path],
+    use_llm: bool = True,
+    sys_paths: Optional[List[str]] = None,
+    cache=None
+) -> Optional[Future]:
+    """
+    在后台进程中开始解析（立即返回）
+
+    Returns:
+        Future[PriorYearReport]（缓存命中时为已完成的Future）；
+        PDF不存在或进程池无法启动时返回None
+    """
+    if pdf_path is None or not Path(pdf_path).exists():
+        return None
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key_for(Path(pdf_path), use_llm=use_llm)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached.from_cache = True
+            future: Future = Future()
+            future.set_result(cached)
+            return future
+
+    sys_paths = list(sys.path if sys_paths is None else sys_paths)
+    try:
+        executor = ProcessPoolExecutor(max_workers=1)
+        future = executor.submit(
+            parse_prior_year_report, Path(pdf_path), use_llm, sys_paths, cache, cache_key
+        )
+    except Exception as e:
+        print(f"  ⚠ 上年PDF后台解析未启动（{type(e).__name__}），将在Step 4解析")
+        return None
+
+    # 已提交的任务在 shutdown(wait=False) 后继续执行，子进程随任务结束退出
+    executor.shutdown(wait=False)
+    return future
+
+
+def join_prior_report(
+    future: Optional[Future],
+    pdf_path: Optional[Path],
+    use_llm: bool = True,
+    cache=None
+) -> Optional[PriorYearReport]:
+    """
+    取后台解析结果；没有后台任务或后台失败时在当前进程解析
+
+    Returns:
+        PriorYearReport；PDF不存在时返回None
+    """
+    if pdf_path is None or not Path(pdf_path).exists():
+        return None
+
+    if future is not None:
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"  ⚠ 上年PDF后台解析失败（{type(e).__name__}: {e}），改为当前进程解析")
+
+    return parse_prior_year_report(Path(pdf_path), use_llm=use_llm, cache=cache)
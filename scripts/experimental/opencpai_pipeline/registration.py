@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+工商登记信息查询客户端（百度企业工商标准版API）
+
+特性:
+    1. 连接池：复用 requests.Session，不再每次新建连接
+    2. 磁盘缓存：按规范化公司名缓存查询结果，支持TTL与主动失效（付费API，避免重复计费）
+    3. 请求合并：同一进程内对同一公司的并发查询共用一次HTTP请求
+    4. 提前发起：submit() 立即返回Future，查询在后台线程进行，
+       流程在Step 1拿到公司名后即可发起，Step 3写入Z10时再取结果
+
+api_url 可指向本地桩服务器进行测试。
+"""
+
+import contextvars
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .tracing import span
+from .workbook_backend import atomic_write
+
+
+def normalize_company_name(name: str) -> str:
+    """
+    规范化公司名称（缓存键）
+
+    - 全角括号转半角
+    - 去除所有空白
+    """
+    if not name:
+        return ""
+    name = name.replace('（', '(').replace('）', ')')
+    return re.sub(r'\s+', '', name)
+
+
+# =============================================================================
+# 磁盘缓存
+# =============================================================================
+
+class RegistrationCache:
+    """
+    工商信息磁盘缓存（一个公司一个JSON文件）
+
+    Args:
+        cache_dir: 缓存目录
+        ttl_seconds: 有效期（秒），过期条目视为未命中
+    """
+
+    def __init__(self, cache_dir: Path, ttl_seconds: float = 30 * 24 * 3600):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, company_name: str) -> Path:
+        key = hashlib.sha1(normalize_company_name(company_name).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, company_name: str) -> Optional[Dict[str, Any]]:
+        path = self._path(company_name)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        return entry.get("data")
+
+    def put(self, company_name: str, data: Dict[str, Any]) -> None:
+        entry = {
+            "company_name": normalize_company_name(company_name),
+            "fetched_at": time.time(),
+            "data": data,
+        }
+        atomic_write(self._path(company_name), json.dumps(entry, ensure_ascii=False))
+
+    def invalidate(self, company_name: Optional[str] = None) -> int:
+        """
+        删除缓存条目
+
+        Args:
+            company_name: 指定公司；为None时清空全部
+
+        Returns:
+            int: 删除的条目数
+        """
+        if company_name is not None:
+            path = self._path(company_name)
+            if path.exists():
+                path.unlink()
+                return 1
+            return 0
+
+        removed = 0
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink()
+            removed += 1
+        return removed
+
+
+# =============================================================================
+# 查询客户端
+# =============================================================================
+
+class BusinessRegistrationClient:
+    """
+    工商信息查询客户端
+
+    Args:
+        api_url: API地址
+        app_code: AppCode（X-Bce-Signature）
+        cache: 磁盘缓存，None时不缓存
+        timeout: 单次请求超时（秒）
+        pool_size: 连接池大小
+        max_workers: 后台查询线程数
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        app_code: str,
+        cache: Optional[RegistrationCache] = None,
+        timeout: float = 30,
+        pool_size: int = 8,
+        max_workers: int = 4
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.api_url = api_url
+        self.app_code = app_code
+        self.cache = cache
+        self.timeout = timeout
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            'Content-Type': 'application/json;charset=UTF-8',
+            'X-Bce-Signature': f'AppCode/{app_code}'
+        })
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="z10-api")
+        self._inflight: Dict[str, Future] = {}
+        # 可重入锁：Future已完成时 add_done_callback 会在持锁线程中立即回调 _forget
+        self._lock = threading.RLock()
+
+    def submit(self, company_name: str) -> Future:
+        """
+        发起查询（立即返回Future，结果为企业信息dict或None）
+
+        缓存命中时返回已完成的Future；同一公司的并发查询共用同一个Future。
+        """
+        key = normalize_company_name(company_name)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                future: Future = Future()
+                future.set_result(cached)
+                return future
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                # 复制上下文：查询span挂在发起查询的span下
+                ctx = contextvars.copy_context()
+                future = self._executor.submit(ctx.run, self._fetch_and_cache, company_name)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _f, k=key: self._forget(k))
+            return future
+
+    def lookup(self, company_name: str) -> Optional[Dict[str, Any]]:
+        """同步查询（submit后等待结果）"""
+        return self.submit(company_name).result()
+
+    def invalidate(self, company_name: Optional[str] = None) -> int:
+        """删除缓存（company_name为None时清空）"""
+        if self.cache is None:
+            return 0
+        return self.cache.invalidate(company_name)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def _fetch_and_cache(self, company_name: str) -> Optional[Dict[str, Any]]:
+        with span("api:工商查询") as attrs:
+            company_data = self._fetch(company_name)
+            attrs["found"] = bool(company_data)
+        # 仅缓存成功结果，查无记录/错误下次重新查询
+        if company_data and self.cache is not None:
+            self.cache.put(company_name, company_data)
+        return company_data
+
+    def _fetch(self, company_name: str) -> Optional[Dict[str, Any]]:
+        """调用API，返回 data.data（企业信息）或None"""
+        import requests
+
+        try:
+            print(f"    正在查询API: {company_name[:20]}...")
+            response = self._session.get(
+                self.api_url, params={'keyword': company_name}, timeout=self.timeout
+            )
+
+            if response.status_code != 200:
+                print(f"    API HTTP错误: {response.status_code}")
+                return None
+
+            result = response.json()
+            success = result.get('success', False)
+            code = result.get('code')
+
+            if success and code == 200:
+                data = result.get('data', {})
+                company_data = data.get('data', {})
+
+                if company_data:
+                    print(f"    ✓ 查询成功: {company_data.get('companyName', '')[:20]}")
+                    return company_data
+                print("    查无记录")
+                return None
+
+            print(f"    API业务错误: code={code}, msg={result.get('msg', '')}")
+            return None
+
+        except requests.exceptions.Timeout:
+            print(f"    API超时（{self.timeout:.0f}秒）")
+            return None
+        except requests.exceptions.ConnectionError:
+            print("    网络连接失败")
+            return None
+        except Exception as e:
+            print(f"    API查询异常: {e}")
+            return None
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+上年审计报告解析结果缓存（按内容寻址）
+
+use_llm=True 时解析一份审计报告是整个流程最慢、最贵的一步；
+调模板时同一项目反复运行，每次都在重新解析同一份PDF。
+
+缓存键 = sha256(PDF内容) + 解析器版本 + 解析选项:
+    - PDF改名/移动仍命中，内容变化即失效
+    - 解析器版本取解析器源文件的哈希，解析器代码更新后自动失效
+只缓存解析成功的结果。按最近使用时间做LRU淘汰，总大小不超过上限。
+
+命令行:
+    python -m opencpai_pipeline report-cache --dir <缓存目录> list
+    python -m opencpai_pipeline report-cache --dir <缓存目录> stats
+    python -m opencpai_pipeline report-cache --dir <缓存目录> purge [--key 前缀] [--older-than 天数]
+    （--dir 缺省读取环境变量 OPENCPAI_REPORT_CACHE_DIR）
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .prior_report import PriorYearReport
+from .workbook_backend import atomic_write, file_sha256
+
+
+CACHE_FORMAT = 1
+PARSER_MODULE = "jenny.parsers.document.audit_report_parser"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def parser_version(module_name: str = PARSER_MODULE) -> str:
+    """
+    解析器版本：解析器源文件内容的哈希（前12位）
+
+    不导入解析器模块本身；找不到时返回 "unknown"。
+    """
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None or not spec.origin or not os.path.exists(spec.origin):
+        return "unknown"
+    with open(spec.origin, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目元数据（list/stats 使用）"""
+    key: str
+    path: Path
+    size: int
+    last_used: float
+    pdf_name: str = ""
+    parser_version: str = ""
+    options: Optional[Dict[str, Any]] = None
+    created_at: float = 0.0
+
+
+class ReportCache:
+    """
+    审计报告解析结果磁盘缓存（一个结果一个JSON文件）
+
+    Args:
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限，超出时按最近使用时间淘汰
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+    # 键
+    # -------------------------------------------------------------------------
+
+    def key_for(self, pdf_path: Path, use_llm: bool = True) -> str:
+        """PDF内容 + 解析器版本 + 选项 -> 缓存键"""
+        material = {
+            "format": CACHE_FORMAT,
+            "pdf_sha256": file_sha256(pdf_path),
+            "parser_version": parser_version(),
+            "options": {"use_llm": use_llm},
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    # -------------------------------------------------------------------------
+    # 读写
+    # -------------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[PriorYearReport]:
+        """命中返回解析结果（并刷新最近使用时间），未命中返回None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("format") != CACHE_FORMAT:
+            return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return PriorYearReport(**entry["report"])
+
+    def put(self, key: str, report: PriorYearReport, pdf_path: Optional[Path] = None, use_llm: bool = True) -> None:
+        """写入解析结果（失败结果不缓存），写入后按大小上限淘汰"""
+        if not report.is_success:
+            return
+        entry = {
+            "format": CACHE_FORMAT,
+            "created_at": time.time(),
+            "pdf_name": Path(pdf_path).name if pdf_path else "",
+            "parser_version": parser_version(),
+            "options": {"use_llm": use_llm},
+            "report": asdict(report),
+        }
+        atomic_write(self._path(key), json.dumps(entry, ensure_ascii=False))
+        self.evict()
+
+    # -------------------------------------------------------------------------
+    # 管理
+    # -------------------------------------------------------------------------
+
+    def entries(self) -> List[CacheEntry]:
+        """全部条目，最近使用的在前"""
+        result = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            result.append(CacheEntry(
+                key=path.stem,
+                path=path,
+                size=stat.st_size,
+                last_used=stat.st_mtime,
+                pdf_name=entry.get("pdf_name", ""),
+                parser_version=entry.get("parser_version", ""),
+                options=entry.get("options"),
+                created_at=entry.get("created_at", 0.0),
+            ))
+        result.sort(key=lambda e: e.last_used, reverse=True)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.entries()
+        return {
+            "cache_dir": str(self.cache_dir),
+            "entries": len(entries),
+            "total_bytes": sum(e.size for e in entries),
+            "max_bytes": self.max_bytes,
+            "parser_versions": sorted({e.parser_version for e in entries}),
+        }
+
+    def evict(self) -> int:
+        """按LRU淘汰至总大小不超过上限，返回删除条目数"""
+        entries = self.entries()
+        total = sum(e.size for e in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            oldest = entries.pop()
+            try:
+                oldest.path.unlink()
+            except OSError:
+                continue
+            total -= oldest.size
+            removed += 1
+        return removed
+
+    def purge(self, key_prefix: Optional[str] = None, older_than_days: Optional[float] = None) -> int:
+        """
+        删除条目
+
+        Args:
+            key_prefix: 仅删除键以此开头的条目
+            older_than_days: 仅删除超过N天未使用的条目
+            两者都为None时清空全部
+
+        Returns:
+            int: 删除的条目数
+        """
+        cutoff = time.time() - older_than_days * 24 * 3600 if older_than_days is not None else None
+        removed = 0
+        for entry in self.entries():
+            if key_prefix and not entry.key.startswith(key_prefix):
+                continue
+            if cutoff is not None and entry.last_used >= cutoff:
+                continue
+            try:
+                entry.path.unlink()
+            except OSError:
+                continue
+            removed += 1
+        return removed
+
+
+# =============================================================================
+# 命令行
+# =============================================================================
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m opencpai_pipeline report-cache", description="上年审计报告解析结果缓存管理"
+    )
+    arg_parser.add_argument("--dir", default=os.getenv("OPENCPAI_REPORT_CACHE_DIR"), help="缓存目录")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出缓存条目（最近使用在前）")
+    sub.add_parser("stats", help="缓存统计")
+    purge_parser = sub.add_parser("purge", help="删除缓存条目（不带条件时清空）")
+    purge_parser.add_argument("--key", help="键前缀")
+    purge_parser.add_argument("--older-than", type=float, help="超过N天未使用")
+    args = arg_parser.parse_args(argv)
+
+    if not args.dir:
+        print("✗ 请通过 --dir 或环境变量 OPENCPAI_REPORT_CACHE_DIR 指定缓存目录")
+        return 2
+
+    cache = ReportCache(Path(args.dir))
+
+    if args.command == "list":
+        entries = cache.entries()
+        for e in entries:
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(e.last_used))
+            print(f"{e.key[:16]}  {_format_bytes(e.size):>8}  {used}  解析器{e.parser_version}  {e.pdf_name}")
+        print(f"共 {len(entries)} 条")
+    elif args.command == "stats":
+        stats = cache.stats()
+        print(f"缓存目录: {stats['cache_dir']}")
+        print(f"条目数: {stats['entries']}")
+        print(f"总大小: {_format_bytes(stats['total_bytes'])} / 上限 {_format_bytes(stats['max_bytes'])}")
+        print(f"解析器版本: {', '.join(stats['parser_versions']) or '-'}")
+    elif args.command == "purge":
+        removed = cache.purge(key_prefix=args.key, older_than_days=args.older_than)
+        print(f"✓ 已删除 {removed} 条")
+    return 0
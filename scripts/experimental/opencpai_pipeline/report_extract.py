@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+财审报告提取（FinPageS宏的Python实现）
+
+原流程在底稿保存后执行 FinPageS 宏：宏依赖 ThisWorkbook.Path 把【财审报告】xlsx 存到输出目录，
+内部再调用 zhankai（展开分组）与 yincang（隐藏空行）排版；Step 8 只能按
+`【财审报告】*.xlsx` 通配查找、取修改时间最新的文件。
+
+本模块直接读取已保存的底稿，按版式（ReportSection 列表）一次流式写出报告并返回路径:
+    - 只读流式打开底稿，每个区域一次读取值与数字格式（快照），区域内全部行列都读出，相当于 zhankai 展开后的内容
+    - 区域内的合并单元格与数字格式（百分比、日期等）照搬到报告；金额列未设格式时用千分位
+    - yincang: 金额列全为空或0的行隐藏（row_dimensions.hidden），标题/表头等 keep_rows 始终显示
+    - openpyxl write_only 逐行写出，不在内存中保留整本工作簿
+    - 版本号: 输出目录中已有 "(年份第N版)" 时取 N+1
+只读底稿文件、不需要Excel，可与检查报告等阶段并行执行。
+
+底稿须由Excel保存过（openpyxl读取公式的缓存值）。宏源码不在仓库中，
+报告版式（取哪些工作表、哪些区域）由 JSON 配置给出（load_report_sections）。
+
+用法:
+    sections = load_report_sections(spec_path)
+    result = extract_report(workpaper_path, sections, output_dir, company_name, "2024")
+    result.path   # 【财审报告】公司全名(2024第3版).xlsx
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .tracing import span
+from .workbook_backend import column_index, open_workbook
+
+
+AMOUNT_FORMAT = "#,##0.00"
+ZERO_TOLERANCE = 0.005
+
+
+@dataclass
+class ReportSection:
+    """
+    报告中的一个工作表（取自底稿的一个矩形区域）
+
+    Attributes:
+        source_sheet: 底稿工作表
+        first_row / last_row / first_col / last_col: 区域（列可写列字母）
+        target_sheet: 报告中的工作表名（默认同 source_sheet）
+        amount_cols: 金额列（底稿列号/列字母）；yincang 按这些列判断空行，底稿未设格式时用千分位
+        keep_rows: 始终显示的行（底稿行号：标题、表头、合计行）
+        header_rows: 表头行数（打印时每页重复，冻结窗格）
+        hide_empty_rows: 是否执行 yincang（金额列全为空/0的行隐藏）
+        column_widths: {列字母: 宽度}（报告中的列，A起）
+    """
+    source_sheet: str
+    first_row: int
+    last_row: int
+    first_col: Union[int, str] = 1
+    last_col: Union[int, str] = 1
+    target_sheet: str = ""
+    amount_cols: Sequence[Union[int, str]] = ()
+    keep_rows: Sequence[int] = ()
+    header_rows: int = 0
+    hide_empty_rows: bool = True
+    column_widths: Dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.first_col = column_index(self.first_col)
+        self.last_col = column_index(self.last_col)
+        self.amount_cols = tuple(column_index(c) for c in self.amount_cols)
+        self.keep_rows = tuple(self.keep_rows)
+        self.target_sheet = self.target_sheet or self.source_sheet
+
+
+@dataclass
+class SectionBlock:
+    """从底稿读出的一个区域（值、数字格式、区域内的合并单元格，坐标均为报告中的行列，1起）"""
+    section: ReportSection
+    values: List[List[Any]]
+    formats: List[List[str]]
+    merged: List[Tuple[int, int, int, int]] = field(default_factory=list)
+
+
+@dataclass
+class ReportResult:
+    """报告提取结果"""
+    path: Path
+    version: int
+    sections: Dict[str, Tuple[int, int]] = field(default_factory=dict)   # 工作表 -> (总行数, 隐藏行数)
+    missing: List[str] = field(default_factory=list)                     # 底稿中不存在的工作表
+
+
+def load_report_sections(path: Path) -> List[ReportSection]:
+    """
+    从JSON加载报告版式
+
+    格式: [{"source_sheet": "审计报告", "first_row": 1, "last_row": 60, "first_col": "A", "last_col": "D",
+            "amount_cols": ["C", "D"], "keep_rows": [1, 2, 3], "header_rows": 3,
+            "column_widths": {"A": 36, "C": 16, "D": 16}}, ...]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [ReportSection(**item) for item in data]
+
+
+# =============================================================================
+# 文件名与版本
+# =============================================================================
+
+def report_file_name(company_name: str, audit_year: str, version: int) -> str:
+    """【财审报告】公司全名(年份第N版).xlsx（全角括号转半角，与底稿命名一致）"""
+    safe_company_name = company_name.replace('（', '(').replace('）', ')')
+    return f"【财审报告】{safe_company_name}({audit_year}第{version}版).xlsx"
+
+
+def next_report_version(output_dir: Path, company_name: str, audit_year: str) -> int:
+    """输出目录中已有版本的最大值 + 1（没有时为1）"""
+    safe_company_name = company_name.replace('（', '(').replace('）', ')')
+    pattern = re.compile(
+        re.escape(f"【财审报告】{safe_company_name}({audit_year}第") + r"(\d+)" + re.escape("版)") + r"\.(?:xlsx|pdf)$"
+    )
+    matches = (pattern.match(p.name) for p in Path(output_dir).iterdir()) if Path(output_dir).is_dir() else ()
+    return max((int(m.group(1)) for m in matches if m), default=0) + 1
+
+
+# =============================================================================
+# 排版
+# =============================================================================
+
+def _is_blank(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        text = value.strip().replace(",", "")
+        if not text or text in ("-", "—"):
+            return True
+        try:
+            return abs(float(text)) < ZERO_TOLERANCE
+        except ValueError:
+            return False
+    if isinstance(value, (int, float)):
+        return abs(value) < ZERO_TOLERANCE
+    return False
+
+
+def section_merges(section: ReportSection, merged: Sequence[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    """底稿合并区域中完全落在版式区域内的部分，换算为报告坐标 (first_row, first_col, last_row, last_col)"""
+    result = []
+    for first_row, first_col, last_row, last_col in merged:
+        if (first_row >= section.first_row and last_row <= section.last_row
+                and first_col >= section.first_col and last_col <= section.last_col):
+            result.append((first_row - section.first_row + 1, first_col - section.first_col + 1,
+                           last_row - section.first_row + 1, last_col - section.first_col + 1))
+    return result
+
+
+def hidden_rows(section: ReportSection, values: List[List[Any]]) -> List[int]:
+    """
+    yincang：金额列全为空/0的行（返回报告中的行号，1起）
+
+    未指定金额列时按整行判断；keep_rows 与表头行不隐藏。
+    """
+    if not section.hide_empty_rows:
+        return []
+    offsets = [c - section.first_col for c in section.amount_cols] or None
+    keep = {row - section.first_row for row in section.keep_rows}
+    hidden = []
+    for i, row in enumerate(values):
+        if i < section.header_rows or i in keep:
+            continue
+        cells = [row[j] if j < len(row) else None for j in offsets] if offsets else row
+        if all(_is_blank(v) for v in cells):
+            hidden.append(i + 1)
+    return hidden
+
+
+# =============================================================================
+# 提取
+# =============================================================================
+
+def extract_report(
+    workpaper_path: Path,
+    sections: Sequence[ReportSection],
+    output_dir: Path,
+    company_name: str,
+    audit_year: str,
+    version: Optional[int] = None,
+    engine: str = "openpyxl",
+) -> ReportResult:
+    """
+    由已保存的底稿生成财审报告xlsx（流式写出）
+
+    Args:
+        workpaper_path: 已保存的底稿（Excel保存，含公式缓存值）
+        sections: 报告版式
+        output_dir: 输出目录
+        version: 版本号，None时按输出目录中已有版本递增
+
+    Returns:
+        ReportResult: 报告路径、版本号、各工作表行数/隐藏行数、底稿中缺失的工作表
+
+    Raises:
+        ValueError: 版式中的工作表在底稿中都不存在
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.worksheet.cell_range import CellRange
+    from openpyxl.worksheet.properties import PageSetupProperties
+
+    output_dir = Path(output_dir)
+    if version is None:
+        version = next_report_version(output_dir, company_name, audit_year)
+    path = output_dir / report_file_name(company_name, audit_year, version)
+    result = ReportResult(path=path, version=version)
+
+    source = open_workbook(workpaper_path, engine=engine, read_only=True)
+    try:
+        # 先读出全部区域（每区域一次读取），再关闭底稿写报告
+        blocks: List[SectionBlock] = []
+        merged_by_sheet: Dict[str, List[Tuple[int, int, int, int]]] = {}
+        with span("报告区域读取", sections=len(sections)):
+            for section in sections:
+                if not source.has_sheet(section.source_sheet):
+                    result.missing.append(section.source_sheet)
+                    continue
+                values, formats = source.read_range_with_formats(
+                    section.source_sheet, section.first_row, section.first_col, section.last_row, section.last_col
+                )
+                if section.source_sheet not in merged_by_sheet:
+                    merged_by_sheet[section.source_sheet] = source.merged_ranges(section.source_sheet)
+                merged = section_merges(section, merged_by_sheet[section.source_sheet])
+                blocks.append(SectionBlock(section, values, formats, merged))
+    finally:
+        source.close(save=False)
+    if not blocks:
+        raise ValueError(f"底稿中没有报告版式中的工作表: {result.missing}")
+
+    wb = openpyxl.Workbook(write_only=True)
+    with span("报告写出", path=path.name):
+        for block in blocks:
+            section, values = block.section, block.values
+            ws = wb.create_sheet(section.target_sheet[:31])
+            for letter, width in section.column_widths.items():
+                ws.column_dimensions[letter].width = width
+            hidden = hidden_rows(section, values)
+            for row in hidden:
+                ws.row_dimensions[row].hidden = True
+            if section.header_rows:
+                ws.freeze_panes = f"A{section.header_rows + 1}"
+                ws.print_title_rows = f"1:{section.header_rows}"
+            ws.sheet_properties.pageSetUpPr = PageSetupProperties(fitToPage=True)
+            ws.page_setup.fitToWidth = 1
+            ws.page_setup.fitToHeight = 0
+
+            for first_row, first_col, last_row, last_col in block.merged:
+                ws.merged_cells.add(CellRange(min_row=first_row, min_col=first_col,
+                                              max_row=last_row, max_col=last_col))
+
+            amount_offsets = {c - section.first_col for c in section.amount_cols}
+            for row, formats in zip(values, block.formats):
+                cells = []
+                for j, value in enumerate(row):
+                    number_format = formats[j] if j < len(formats) else "General"
+                    if number_format == "General" and j in amount_offsets and isinstance(value, (int, float)):
+                        number_format = AMOUNT_FORMAT
+                    if value is not None and number_format != "General":
+                        cell = WriteOnlyCell(ws, value=value)
+                        cell.number_format = number_format
+                        cells.append(cell)
+                    else:
+                        cells.append(value)
+                ws.append(cells)
+            result.sections[section.target_sheet] = (len(values), len(hidden))
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        wb.save(str(path))
+    return result
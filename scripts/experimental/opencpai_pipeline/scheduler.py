@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+流程阶段调度器（依赖图）
+
+把 Step 1~9 声明为阶段（Stage），每个阶段给出输入/输出名称，调度器按数据依赖执行:
+    - kind="io"       线程池（文件读写、网络、等待后台进程）
+    - kind="cpu"      进程池（纯计算；函数须为模块级、参数可pickle，否则退回线程池）
+    - kind="workbook" 在调用 run() 的线程上串行执行（COM对象只能在创建它的线程使用）
+互不依赖的阶段并发执行；workbook 阶段同一时刻只有一个，按声明顺序取就绪者。
+
+运行结束后给出各阶段起止时间与关键路径（决定总耗时的阶段链）。
+有激活的 Tracer 时每个阶段记录一个以阶段名命名的span（线程阶段继承调用方上下文）。
+
+传入 StageCache 时，cache=True 的阶段按输入指纹取缓存输出（状态 cached，不执行）；
+阶段函数自身的源码与 Stage.fingerprint 一并计入缓存键。
+workbook 阶段共用同一个打开的底稿，只能整体复用：通道中第一个未命中的阶段之前
+已按缓存跳过的 workbook 阶段会先按顺序重新执行（重放），此后通道内不再查缓存。
+
+示例:
+    stages = [
+        Stage("company_name", find_name, outputs=("company_name",)),
+        Stage("statements", parse, inputs=("company_name",), outputs=("bs", "is")),
+        Stage("workpaper", build, inputs=("company_name",), outputs=("workpaper_path",), kind="workbook"),
+    ]
+    result = StageScheduler(stages).run()
+    print(result.values["workpaper_path"], result.critical_path)
+"""
+
+import contextvars
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .stage_cache import StageCache, fingerprint_value, function_version
+from .tracing import current_span_id, current_tracer, span
+
+
+STAGE_KINDS = ("io", "cpu", "workbook")
+
+
+@dataclass
+class Stage:
+    """
+    流程阶段
+
+    Attributes:
+        name: 阶段名（唯一）
+        func: 以输入名为关键字参数调用；单输出时返回值即输出，多输出时返回 {输出名: 值}
+        inputs: 依赖的数据名
+        outputs: 产出的数据名
+        kind: "io" / "cpu" / "workbook"
+        cache: 是否可按输入指纹复用上次输出（需配合 StageScheduler(cache=...)）
+        fingerprint: 额外依赖（阶段内使用但未声明为输入的文件、映射表、配置、辅助函数/模块），计入缓存键
+        unkeyed_inputs: 不计入缓存键的输入（如仍在进行的工商查询Future，由产生它的输入代替计入）
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    kind: str = "io"
+    cache: bool = False
+    fingerprint: Tuple[Any, ...] = ()
+    unkeyed_inputs: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageRecord:
+    """阶段执行记录（时间为相对调度开始的秒数）"""
+    name: str
+    kind: str
+    status: str = "pending"     # pending / ok / failed / skipped / cached
+    start: float = 0.0
+    end: float = 0.0
+    error: str = ""
+    executor: str = ""          # thread / process / caller / cache
+    exception: Optional[BaseException] = field(default=None, repr=False)
+    cache_key: str = ""
+    replayed: bool = False      # 缓存命中但因底稿通道后续阶段未命中而重新执行
+    input_fingerprints: Dict[str, str] = field(default_factory=dict)
+    output_fingerprints: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.end - self.start)
+
+
+@dataclass
+class ScheduleResult:
+    values: Dict[str, Any]
+    records: Dict[str, StageRecord]
+    critical_path: List[str]
+    wall_s: float
+
+    def timings(self) -> Dict[str, float]:
+        """{阶段名: 耗时秒}（仅已执行的阶段）"""
+        return {name: round(r.duration, 3) for name, r in self.records.items() if r.status in ("ok", "failed")}
+
+    def cached(self) -> List[str]:
+        """取缓存输出、未执行的阶段"""
+        return [name for name, r in self.records.items() if r.status == "cached"]
+
+    def format_critical_path(self) -> str:
+        return " → ".join(f"{name}({self.records[name].duration:.1f}s)" for name in self.critical_path)
+
+
+class StageError(RuntimeError):
+    """阶段执行失败（其后依赖它的阶段均被跳过）"""
+
+    def __init__(self, stage: str, cause: BaseException, result: ScheduleResult):
+        super().__init__(f"阶段 {stage} 失败: {type(cause).__name__}: {cause}")
+        self.stage = stage
+        self.cause = cause
+        self.result = result
+
+
+def _call_stage(func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+    """进程池入口（模块级，可pickle）"""
+    return func(**kwargs)
+
+
+def _is_picklable(obj: Any) -> bool:
+    try:
+        pickle.dumps(obj)
+        return True
+    except Exception:
+        return False
+
+
+class StageScheduler:
+    """
+    依赖图调度器
+
+    Args:
+        stages: 阶段列表（声明顺序即同时就绪时 workbook 阶段的执行顺序）
+        io_workers: 线程池大小
+        cpu_workers: 进程池大小（0 表示 cpu 阶段也走线程池）
+        cache: 阶段输出缓存（None 时全部执行）
+    """
+
+    def __init__(self, stages: Sequence[Stage], io_workers: int = 4, cpu_workers: int = 2,
+                 cache: Optional[StageCache] = None):
+        self.stages = list(stages)
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.cache = cache
+        self._by_name = {s.name: s for s in self.stages}
+        self._producer: Dict[str, str] = {}
+        self._validate()
+
+    # -------------------------------------------------------------------------
+    # 校验
+    # -------------------------------------------------------------------------
+
+    def _validate(self) -> None:
+        if len(self._by_name) != len(self.stages):
+            raise ValueError("阶段名重复")
+        for stage in self.stages:
+            if stage.kind not in STAGE_KINDS:
+                raise ValueError(f"阶段 {stage.name} 的 kind 无效: {stage.kind}")
+            for output in stage.outputs:
+                if output in self._producer:
+                    raise ValueError(f"数据 {output} 由多个阶段产出: {self._producer[output]}, {stage.name}")
+                self._producer[output] = stage.name
+
+        # 环检测（DFS三色）
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: List[str]) -> None:
+            if state.get(name) == 1:
+                raise ValueError(f"阶段依赖成环: {' → '.join(path + [name])}")
+            if state.get(name) == 2:
+                return
+            state[name] = 1
+            for dep in self.dependencies(name):
+                visit(dep, path + [name])
+            state[name] = 2
+
+        for stage in self.stages:
+            visit(stage.name, [])
+
+    def dependencies(self, name: str) -> List[str]:
+        """阶段直接依赖的阶段（由输入反查产出者；初始值提供的输入不计）"""
+        stage = self._by_name[name]
+        return list(dict.fromkeys(self._producer[i] for i in stage.inputs if i in self._producer))
+
+    # -------------------------------------------------------------------------
+    # 执行
+    # -------------------------------------------------------------------------
+
+    def run(self, initial: Optional[Dict[str, Any]] = None) -> ScheduleResult:
+        """
+        执行全部阶段
+
+        Raises:
+            StageError: 任一阶段失败（等待已启动的阶段结束后抛出，result 含已完成部分）
+        """
+        values: Dict[str, Any] = dict(initial or {})
+        for stage in self.stages:
+            missing = [i for i in stage.inputs if i not in self._producer and i not in values]
+            if missing:
+                raise ValueError(f"阶段 {stage.name} 的输入无来源: {', '.join(missing)}")
+
+        records = {s.name: StageRecord(name=s.name, kind=s.kind) for s in self.stages}
+        pending = [s.name for s in self.stages]
+        running: Dict[Future, str] = {}
+        failure: Optional[Tuple[str, BaseException]] = None
+        t0 = time.perf_counter()
+        lock = threading.Lock()
+
+        def now() -> float:
+            return time.perf_counter() - t0
+
+        def ready(name: str) -> bool:
+            return all(i in values for i in self._by_name[name].inputs)
+
+        # 数据指纹（仅启用缓存时计算；产出时即计算，后续阶段修改同一文件不影响）
+        fingerprints: Dict[str, Optional[str]] = {}
+
+        def value_fingerprint(data_name: str) -> Optional[str]:
+            if data_name not in fingerprints:
+                fingerprints[data_name] = fingerprint_value(values[data_name])
+            return fingerprints[data_name]
+
+        def lookup(name: str, use_hit: bool = True) -> Optional[Dict[str, Any]]:
+            """
+            可缓存且指纹完整时记录缓存键（执行完按此键写入）；use_hit 时查缓存并返回命中结果
+            """
+            stage = self._by_name[name]
+            if self.cache is None or not stage.cache:
+                return None
+            record = records[name]
+            inputs_fp = {i: value_fingerprint(i) for i in stage.inputs if i not in stage.unkeyed_inputs}
+            code_fp = function_version(stage.func)
+            extra_fp = fingerprint_value(stage.fingerprint)
+            if extra_fp is None or any(fp is None for fp in inputs_fp.values()):
+                return None
+            record.input_fingerprints = dict(inputs_fp, **{"<阶段代码>": code_fp, "<额外依赖>": extra_fp})
+            record.cache_key = self.cache.key_for(name, inputs_fp, [code_fp, extra_fp])
+            return self.cache.get(record.cache_key) if use_hit else None
+
+        def serve(name: str, hit: Dict[str, Any]) -> None:
+            record = records[name]
+            values.update(hit["outputs"])
+            fingerprints.update(hit["fingerprints"])
+            record.output_fingerprints = dict(hit["fingerprints"])
+            record.status = "cached"
+            record.executor = "cache"
+            record.start = record.end = now()
+            if tracer is not None:
+                tracer.record_span(name, t0_wall + record.start, 0.0, parent_id=parent_span,
+                                   status="cached", kind=self._by_name[name].kind, executor="cache")
+
+        def store(name: str, result: Any) -> None:
+            stage = self._by_name[name]
+            if len(stage.outputs) == 1:
+                values[stage.outputs[0]] = result
+            elif stage.outputs:
+                result = result or {}
+                missing = [o for o in stage.outputs if o not in result]
+                if missing:
+                    raise ValueError(f"阶段 {name} 未返回输出: {', '.join(missing)}")
+                for output in stage.outputs:
+                    values[output] = result[output]
+            if self.cache is None:
+                return
+            record = records[name]
+            for output in stage.outputs:
+                fingerprints.pop(output, None)
+            output_fp = {o: value_fingerprint(o) for o in stage.outputs}
+            record.output_fingerprints = {o: fp for o, fp in output_fp.items() if fp is not None}
+            if record.cache_key and len(record.output_fingerprints) == len(stage.outputs):
+                self.cache.put(record.cache_key, {o: values[o] for o in stage.outputs}, output_fp)
+
+        def timed(name: str, func, kwargs):
+            # 线程池中执行：起止时间在实际执行时记录（排队时间不计入阶段耗时）
+            with lock:
+                records[name].start = now()
+            try:
+                with span(name, kind=self._by_name[name].kind, executor="thread"):
+                    return func(**kwargs)
+            finally:
+                with lock:
+                    records[name].end = now()
+
+        tracer = current_tracer()
+        parent_span = current_span_id()
+        t0_wall = time.time()
+
+        def trace_process_stage(name: str) -> None:
+            # 子进程中的阶段：父进程按起止时间补记span（无CPU时间）
+            record = records[name]
+            if tracer is not None:
+                tracer.record_span(
+                    name, t0_wall + record.start, record.duration, parent_id=parent_span,
+                    status=record.status, error=record.error, kind="cpu", executor="process"
+                )
+
+        lane_live = False
+        lane_cached: List[str] = []
+
+        def run_workbook(name: str) -> Optional[Tuple[str, BaseException]]:
+            stage = self._by_name[name]
+            record = records[name]
+            record.executor = "caller"
+            record.status = "pending"
+            record.start = now()
+            try:
+                with span(name, kind="workbook", executor="caller"):
+                    output = stage.func(**{i: values[i] for i in stage.inputs})
+                store(name, output)
+                record.status = "ok"
+                return None
+            except BaseException as e:
+                record.status = "failed"
+                record.error = f"{type(e).__name__}: {e}"
+                record.exception = e
+                return name, e
+            finally:
+                record.end = now()
+
+        thread_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="stage")
+        process_pool: Optional[ProcessPoolExecutor] = None
+
+        try:
+            while pending or running:
+                # 1. 提交就绪的线程/进程阶段（命中缓存的直接填入输出）
+                served = False
+                if failure is None:
+                    for name in [n for n in pending if self._by_name[n].kind != "workbook" and ready(n)]:
+                        stage = self._by_name[name]
+                        pending.remove(name)
+                        hit = lookup(name)
+                        if hit is not None:
+                            serve(name, hit)
+                            served = True
+                            continue
+                        kwargs = {i: values[i] for i in stage.inputs}
+                        if stage.kind == "cpu" and self.cpu_workers and _is_picklable(stage.func):
+                            if process_pool is None:
+                                process_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+                            records[name].executor = "process"
+                            records[name].start = now()
+                            running[process_pool.submit(_call_stage, stage.func, kwargs)] = name
+                        else:
+                            records[name].executor = "thread"
+                            # 复制上下文：阶段内的span挂在当前span下
+                            ctx = contextvars.copy_context()
+                            running[thread_pool.submit(ctx.run, timed, name, stage.func, kwargs)] = name
+
+                # 2. 在当前线程执行一个就绪的 workbook 阶段
+                workbook_ready = [] if failure else [
+                    n for n in pending if self._by_name[n].kind == "workbook" and ready(n)
+                ]
+                if workbook_ready:
+                    name = workbook_ready[0]
+                    pending.remove(name)
+                    hit = lookup(name, use_hit=not lane_live)
+                    if not lane_live:
+                        if hit is not None:
+                            serve(name, hit)
+                            lane_cached.append(name)
+                            continue
+                        # 未命中：底稿需从头构建，先重放已按缓存跳过的 workbook 阶段
+                        lane_live = True
+                        for replay_name in lane_cached:
+                            records[replay_name].replayed = True
+                            failure = failure or run_workbook(replay_name)
+                        lane_cached.clear()
+                    if failure is None:
+                        failure = run_workbook(name)
+                    else:
+                        records[name].status = "skipped"
+                    self._collect(running, records, store, block=False, now=now, on_process_done=trace_process_stage)
+                    failure = failure or self._first_failure(records)
+                    continue
+
+                # 缓存输出可能使下游阶段就绪
+                if served:
+                    continue
+
+                # 3. 等待线程/进程阶段完成
+                if running:
+                    self._collect(running, records, store, block=True, now=now, on_process_done=trace_process_stage)
+                    failure = failure or self._first_failure(records)
+                    continue
+
+                # 没有在运行的阶段，剩余阶段无法就绪（上游失败）
+                for name in pending:
+                    records[name].status = "skipped"
+                pending.clear()
+        finally:
+            thread_pool.shutdown(wait=True)
+            if process_pool is not None:
+                process_pool.shutdown(wait=True)
+
+        if self.cache is not None:
+            # 输出文件以运行结束时的内容为准（后续阶段可能再次保存同一文件）
+            for name, record in records.items():
+                if record.cache_key and record.status in ("ok", "cached"):
+                    self.cache.record_files(record.cache_key, {o: values.get(o) for o in self._by_name[name].outputs})
+
+        result = ScheduleResult(
+            values=values,
+            records=records,
+            critical_path=self.critical_path(records),
+            wall_s=round(now(), 3),
+        )
+        if failure is not None:
+            raise StageError(failure[0], failure[1], result)
+        return result
+
+    def _collect(self, running, records, store, block: bool, now, on_process_done=None) -> None:
+        """收集已完成的线程/进程阶段"""
+        if not running:
+            return
+        done, _ = wait(list(running), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            record = records[name]
+            if record.executor == "process":
+                record.end = now()
+            try:
+                store(name, future.result())
+                record.status = "ok"
+            except BaseException as e:
+                record.status = "failed"
+                record.error = f"{type(e).__name__}: {e}"
+                record.exception = e
+            if record.executor == "process" and on_process_done is not None:
+                on_process_done(name)
+
+    @staticmethod
+    def _first_failure(records) -> Optional[Tuple[str, BaseException]]:
+        for record in records.values():
+            if record.status == "failed" and record.exception is not None:
+                return record.name, record.exception
+        return None
+
+    # -------------------------------------------------------------------------
+    # 关键路径
+    # -------------------------------------------------------------------------
+
+    def critical_path(self, records: Dict[str, StageRecord]) -> List[str]:
+        """
+        关键路径：从最后结束的阶段出发，逐级回溯"最后放行它的前驱"
+
+        前驱 = 数据依赖的阶段；workbook 阶段还包括它之前最近结束的 workbook 阶段（串行通道）。
+        """
+        executed = {n: r for n, r in records.items() if r.status in ("ok", "failed")}
+        if not executed:
+            return []
+
+        path = [max(executed.values(), key=lambda r: r.end).name]
+        while True:
+            current = executed[path[-1]]
+            preds = [d for d in self.dependencies(current.name) if d in executed]
+            if current.kind == "workbook":
+                lane = [r for r in executed.values()
+                        if r.kind == "workbook" and r.name != current.name and r.end <= current.start + 1e-6]
+                if lane:
+                    preds.append(max(lane, key=lambda r: r.end).name)
+            preds = [p for p in preds if p not in path]
+            if not preds:
+                break
+            path.append(max(preds, key=lambda p: executed[p].end))
+        path.reverse()
+        return path
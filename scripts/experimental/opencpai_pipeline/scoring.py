@@ -0,0 +1,617 @@
+# -*- coding: utf-8 -*-
+"""
+6维度评分引擎（数据化规则 + 底稿快照）
+
+原 evaluate_6_dimensions 在新的Excel实例中重新打开底稿，D5逐单元格读取Z3-5第7~49行，
+其余维度多为写死的分数: D2恒为10、D3只检查Z3-2是否存在、D6固定24分（"默认评分"）。
+
+本模块把评分拆为两步:
+    - 快照: 规则声明各自读取的单元格，按工作表合并为一个矩形区域，每个工作表一次 read_range
+      （openpyxl只读流式打开，只解析 Z7 / Z3-2 / Z3-4 / Z3-5；COM后端每表一次Range.Value）
+    - 规则: ScoringRule 为数据（可从JSON加载），各规则在快照上求出得分率（0~1），
+      维度得分 = 满分 × 规则得分率的加权平均；缺少输入的规则（如无上年数据）不参与平均
+
+检查类型（ScoringRule.check）:
+    contains      - 单元格文字包含关键词之一且不含否定词（D1: Z7勾稽结果，"不平衡"不通过）
+    headers       - 表头单元格包含预期文字（D2: Z3-2 / Z3-5表头）
+    item_names    - 映射行号上的项目名称与映射一致（D3: Z3-2项目行，捕捉行号偏移）
+    text_clean    - 单元格非空且无乱码/错误值（D4: Z3-4基本情况）
+    diff_count    - 区域内超出容差的差异数，每处扣减 penalty（D5: Z3-5 I列）
+    compare       - 上下文中的报表金额与底稿列比对，一致项占比（D6: 报表 vs Z3-2 C列、上年审计 vs D列）
+    context_ratio - 直接取上下文中的得分率（D3: 科目名称映射得分率）
+
+上下文（context）键: balance_sheet / prior_balance（{项目: 金额}），subject_mapping_ratio（0~1）。
+
+用法:
+    scheme = default_scheme(Z3_2_BALANCE_MAPPING, Z3_2_BALANCE_ALIASES)   # 或 load_scoring_scheme(path)
+    card = score_workpaper(workpaper_path, scheme, {"balance_sheet": bs, "prior_balance": prior})
+    card.as_dict()      # {维度: {"max", "actual", "details"}}
+    score_workpapers([(path, context), ...], scheme, max_workers=8)    # 批量，进程池
+
+    python -m opencpai_pipeline score <底稿...> [--rules 规则.json | --mapping 映射.json] [--context 上下文.json] [--workers 8]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .line_item_matcher import normalize_item_name
+from .snapshot import SheetSnapshot
+from .tracing import span
+from .workbook_backend import WorkbookBackend, cell_ref_to_rowcol, column_index, open_workbook
+
+
+# 维度满分（评分体系 V1.1，总分100）
+DIMENSIONS: Dict[str, int] = {
+    "D1_报表平衡": 30,
+    "D2_表格表头": 10,
+    "D3_科目映射": 10,
+    "D4_基本情况": 10,
+    "D5_附注平衡": 10,
+    "D6_数据比对": 30,
+}
+
+SPECIAL_CHARS = ("\ufffd", "\x00")
+ERROR_VALUES = ("#REF!", "#VALUE!", "#N/A", "#DIV/0!", "#NAME?", "#NUM!", "#NULL!")
+MAX_DETAILS = 5     # 每条规则最多列出的问题项
+
+# Z3-2 资产负债表区域（compare 未给出 items 时按A列项目名定位行）
+Z3_2_BALANCE_FIRST_ROW = 7
+Z3_2_BALANCE_LAST_ROW = 80
+
+
+@dataclass
+class ScoringRule:
+    """
+    一条评分规则（字段按检查类型取用，见模块说明）
+
+    Attributes:
+        dimension: 所属维度（DIMENSIONS 的键）
+        check: 检查类型
+        sheet: 工作表
+        cells: 单元格地址（contains / text_clean）
+        keywords: 关键词，包含任一即通过（contains）
+        rejects: 否定词，包含任一即不通过（contains，优先于 keywords）
+        expected: {地址: 应包含的文字}（headers）
+        items: {项目名: 行号}（item_names / compare）
+        aliases: {别名: 标准项目名}（item_names / compare）
+        first_row / last_row: 区域行（diff_count；compare 未给出 items 时的定位区域）
+        column: 取值列（diff_count 差异列 / compare 比对列，列号或列字母）
+        name_column: 项目名称列
+        context: 上下文键（compare / context_ratio）
+        tolerance: 金额容差（元）
+        penalty: 每处差异扣减的得分率（diff_count；0 时按无差异行占比）
+        weight: 在维度内的权重
+        name: 规则名称（明细用，默认为 check + 工作表）
+    """
+    dimension: str
+    check: str
+    sheet: str = ""
+    cells: Sequence[str] = ()
+    keywords: Sequence[str] = ()
+    rejects: Sequence[str] = ()
+    expected: Dict[str, str] = field(default_factory=dict)
+    items: Dict[str, int] = field(default_factory=dict)
+    aliases: Dict[str, str] = field(default_factory=dict)
+    first_row: int = 0
+    last_row: int = 0
+    column: Union[int, str] = 0
+    name_column: Union[int, str] = 1
+    context: str = ""
+    tolerance: float = 1.0
+    penalty: float = 0.0
+    weight: float = 1.0
+    name: str = ""
+
+    def __post_init__(self):
+        if self.check not in _CHECKS:
+            raise ValueError(f"未知检查类型 {self.check!r}，可选 {tuple(_CHECKS)}")
+        self.cells = tuple(str(c).upper() for c in self.cells)
+        self.keywords = tuple(self.keywords)
+        self.rejects = tuple(self.rejects)
+        self.expected = {str(k).upper(): v for k, v in self.expected.items()}
+        self.column = column_index(self.column)
+        self.name_column = column_index(self.name_column)
+        self.name = self.name or (f"{self.check}:{self.sheet}" if self.sheet else self.check)
+
+    def region(self) -> Optional[Tuple[str, int, int, int, int]]:
+        """规则读取的单元格范围 (工作表, 首行, 首列, 末行, 末列)；不读取底稿时为None"""
+        if self.check in ("contains", "text_clean"):
+            coords = [cell_ref_to_rowcol(ref) for ref in self.cells]
+        elif self.check == "headers":
+            coords = [cell_ref_to_rowcol(ref) for ref in self.expected]
+        elif self.check == "item_names":
+            coords = [(row, self.name_column) for row in self.items.values()]
+        elif self.check == "diff_count":
+            coords = [(self.first_row, self.name_column), (self.last_row, self.column)]
+        elif self.check == "compare":
+            if self.items:
+                coords = [(row, self.column) for row in self.items.values()]
+            else:
+                coords = [(self.first_row, self.name_column), (self.last_row, self.column)]
+        else:
+            return None
+        if not coords:
+            return None
+        rows = [r for r, _ in coords]
+        cols = [c for _, c in coords]
+        return self.sheet, min(rows), min(cols), max(rows), max(cols)
+
+
+@dataclass
+class ScoringScheme:
+    """评分方案: 规则 + 维度满分"""
+    rules: List[ScoringRule]
+    dimensions: Dict[str, int] = field(default_factory=lambda: dict(DIMENSIONS))
+
+    def __post_init__(self):
+        unknown = sorted({r.dimension for r in self.rules} - set(self.dimensions))
+        if unknown:
+            raise ValueError(f"规则中的维度未定义满分: {unknown}")
+
+    def regions(self) -> Dict[str, Tuple[int, int, int, int]]:
+        """各工作表需要读取的区域（该表全部规则区域的外接矩形）"""
+        regions: Dict[str, Tuple[int, int, int, int]] = {}
+        for rule in self.rules:
+            region = rule.region()
+            if region is None:
+                continue
+            sheet, r1, c1, r2, c2 = region
+            if sheet in regions:
+                o1, p1, o2, p2 = regions[sheet]
+                r1, c1, r2, c2 = min(r1, o1), min(c1, p1), max(r2, o2), max(c2, p2)
+            regions[sheet] = (r1, c1, r2, c2)
+        return regions
+
+
+def default_scheme(
+    balance_mapping: Optional[Mapping[str, int]] = None,
+    aliases: Optional[Mapping[str, str]] = None,
+) -> ScoringScheme:
+    """
+    默认评分规则（底稿模板版式）
+
+    Args:
+        balance_mapping: Z3-2资产负债表 {项目名: 行号}；给出时检查项目行（D3）并按行号比对（D6），
+                         否则D6按Z3-2 A列项目名定位行
+        aliases: 报表项目别名 {别名: Z3-2标准项目名}
+    """
+    items = dict(balance_mapping or {})
+    aliases = dict(aliases or {})
+    balance_range = {} if items else {"first_row": Z3_2_BALANCE_FIRST_ROW, "last_row": Z3_2_BALANCE_LAST_ROW}
+    rules = [
+        ScoringRule("D1_报表平衡", "contains", "Z7", cells=("I4", "I5", "J4", "J5"), keywords=("正确", "平衡"),
+                    rejects=("不", "错误", "未"), name="Z7勾稽结果"),
+        ScoringRule("D2_表格表头", "headers", "Z3-2", expected={"A5": "项目", "C5": "年末", "D5": "年初"},
+                    name="Z3-2表头"),
+        ScoringRule("D2_表格表头", "headers", "Z3-5", expected={"A5": "项目", "I5": "差异", "J5": "说明"},
+                    name="Z3-5表头"),
+        ScoringRule("D3_科目映射", "context_ratio", context="subject_mapping_ratio", name="一级科目映射"),
+        ScoringRule("D4_基本情况", "text_clean", "Z3-4", cells=("A7", "A10"), name="Z3-4基本情况"),
+        ScoringRule("D5_附注平衡", "diff_count", "Z3-5", first_row=7, last_row=49, column="I", name_column="A",
+                    tolerance=1.0, penalty=0.1, name="Z3-5差异"),
+        ScoringRule("D6_数据比对", "compare", "Z3-2", items=items, aliases=aliases, column="C",
+                    context="balance_sheet", name="财务报表 vs Z3-2期末", **balance_range),
+        ScoringRule("D6_数据比对", "compare", "Z3-2", items=items, aliases=aliases, column="D",
+                    context="prior_balance", name="上年审计报告 vs Z3-2期初", **balance_range),
+    ]
+    if items:
+        rules.insert(3, ScoringRule("D3_科目映射", "item_names", "Z3-2", items=items, aliases=aliases,
+                                    name="Z3-2项目行"))
+    return ScoringScheme(rules)
+
+
+def load_scoring_scheme(path: Path) -> ScoringScheme:
+    """
+    从JSON加载评分方案
+
+    格式: {"dimensions": {"D1_报表平衡": 30, ...},        （可省略，默认 DIMENSIONS）
+           "rules": [{"dimension": "D1_报表平衡", "check": "contains", "sheet": "Z7",
+                      "cells": ["I4", "J4"], "keywords": ["正确"]}, ...]}
+    也可直接是规则列表。列可写列字母或列号。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"rules": data}
+    rules = [ScoringRule(**item) for item in data["rules"]]
+    return ScoringScheme(rules, dict(data.get("dimensions") or DIMENSIONS))
+
+
+# =============================================================================
+# 快照
+# =============================================================================
+
+class ScoringSnapshot:
+    """评分用的底稿快照（每个工作表一个 SheetSnapshot），缺失的工作表记入 missing"""
+
+    def __init__(self, sheets: Dict[str, SheetSnapshot], missing: Iterable[str] = ()):
+        self.sheets = sheets
+        self.missing = set(missing)
+
+    @classmethod
+    def load(cls, backend: WorkbookBackend, regions: Mapping[str, Tuple[int, int, int, int]]) -> "ScoringSnapshot":
+        """每个工作表一次区域读取"""
+        sheets, missing = {}, []
+        for sheet, (r1, c1, r2, c2) in regions.items():
+            if backend.has_sheet(sheet):
+                sheets[sheet] = SheetSnapshot.load(backend, sheet, r1, c1, r2, c2)
+            else:
+                missing.append(sheet)
+        return cls(sheets, missing)
+
+    def has_sheet(self, sheet: str) -> bool:
+        return sheet in self.sheets
+
+    def value(self, sheet: str, row: int, col: int) -> Any:
+        snapshot = self.sheets.get(sheet)
+        return snapshot.value(row, col) if snapshot else None
+
+    def ref(self, sheet: str, ref: str) -> Any:
+        return self.value(sheet, *cell_ref_to_rowcol(ref))
+
+
+def load_scoring_snapshot(
+    source: Union[str, Path, WorkbookBackend],
+    scheme: ScoringScheme,
+    engine: str = "openpyxl",
+) -> ScoringSnapshot:
+    """
+    读取评分快照
+
+    Args:
+        source: 底稿路径（openpyxl只读打开，读完即关闭）或已打开的后端（如会话中的COM底稿，不关闭）
+    """
+    if isinstance(source, WorkbookBackend):
+        return ScoringSnapshot.load(source, scheme.regions())
+    backend = open_workbook(source, engine=engine, read_only=True)
+    try:
+        return ScoringSnapshot.load(backend, scheme.regions())
+    finally:
+        backend.close(save=False)
+
+
+# =============================================================================
+# 检查
+# =============================================================================
+
+CheckResult = Tuple[Optional[float], List[str]]   # (得分率，None为缺少输入不参与评分; 明细)
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip().replace(",", ""))
+        except ValueError:
+            return None
+    return None
+
+
+def _ratio(passed: int, total: int) -> float:
+    return passed / total if total else 1.0
+
+
+def _check_contains(rule: ScoringRule, snap: ScoringSnapshot, context: Mapping[str, Any]) -> CheckResult:
+    details, passed = [], 0
+    for ref in rule.cells:
+        text = _text(snap.ref(rule.sheet, ref))
+        if any(k in text for k in rule.keywords) and not any(k in text for k in rule.rejects):
+            passed += 1
+            details.append(f"{ref}: {text}")
+        else:
+            details.append(f"{ref}: 未显示{'/'.join(rule.keywords)}（{text or '空'}）")
+    return _ratio(passed, len(rule.cells)), details
+
+
+def _check_headers(rule: ScoringRule, snap: ScoringSnapshot, context: Mapping[str, Any]) -> CheckResult:
+    failures = []
+    for ref, keyword in rule.expected.items():
+        text = _text(snap.ref(rule.sheet, ref))
+        if keyword not in text:
+            failures.append(f"{rule.sheet}!{ref} 应含“{keyword}”（{text or '空'}）")
+    passed = len(rule.expected) - len(failures)
+    details = failures[:MAX_DETAILS] if failures else [f"{rule.sheet}表头完整"]
+    return _ratio(passed, len(rule.expected)), details
+
+
+def _alias_index(aliases: Mapping[str, str]) -> Dict[str, str]:
+    return {normalize_item_name(alias): normalize_item_name(item) for alias, item in aliases.items()}
+
+
+def _check_item_names(rule: ScoringRule, snap: ScoringSnapshot, context: Mapping[str, Any]) -> CheckResult:
+    alias_index = _alias_index(rule.aliases)
+    failures = []
+    for item, row in rule.items.items():
+        text = _text(snap.value(rule.sheet, row, rule.name_column))
+        name = normalize_item_name(text)
+        if alias_index.get(name, name) != normalize_item_name(item):
+            failures.append(f"第{row}行应为{item}（{text or '空'}）")
+    passed = len(rule.items) - len(failures)
+    details = [f"{rule.name}: {passed}/{len(rule.items)}项与映射一致"] + failures[:MAX_DETAILS]
+    return _ratio(passed, len(rule.items)), details
+
+
+def _check_text_clean(rule: ScoringRule, snap: ScoringSnapshot, context: Mapping[str, Any]) -> CheckResult:
+    failures = []
+    for ref in rule.cells:
+        text = _text(snap.ref(rule.sheet, ref))
+        if not text:
+            failures.append(f"{ref}: 为空")
+        elif any(c in text for c in SPECIAL_CHARS):
+            failures.append(f"{ref}: 发现特殊字符")
+        elif text in ERROR_VALUES:
+            failures.append(f"{ref}: 错误值{text}")
+    passed = len(rule.cells) - len(failures)
+    return _ratio(passed, len(rule.cells)), failures or [f"{rule.name}检查通过"]
+
+
+def _check_diff_count(rule: ScoringRule, snap: ScoringSnapshot, context: Mapping[str, Any]) -> CheckResult:
+    failures = []
+    for row in range(rule.first_row, rule.last_row + 1):
+        raw = snap.value(rule.sheet, row, rule.column)
+        if raw is None or _text(raw) == "":
+            continue
+        number = _as_number(raw)
+        label = _text(snap.value(rule.sheet, row, rule.name_column)) or f"第{row}行"
+        if number is None:
+            failures.append(f"{label}: {_text(raw)}")
+        elif abs(number) > rule.tolerance:
+            failures.append(f"{label}: {number:,.2f}")
+    if rule.penalty:
+        ratio = max(0.0, 1 - len(failures) * rule.penalty)
+    else:
+        ratio = 1 - _ratio(len(failures), rule.last_row - rule.first_row + 1)
+    details = [f"发现{len(failures)}处差异"] + failures[:MAX_DETAILS] if failures else [f"{rule.name}: 无差异"]
+    return ratio, details
+
+
+def _check_compare(rule: ScoringRule, snap: ScoringSnapshot, context: Mapping[str, Any]) -> CheckResult:
+    data = context.get(rule.context)
+    if not data:
+        return None, [f"{rule.name}: 缺少比对数据，未评分"]
+    alias_index = _alias_index(rule.aliases)
+    if rule.items:
+        rows = {normalize_item_name(item): row for item, row in rule.items.items()}
+    else:
+        rows = {}
+        for row in range(rule.first_row, rule.last_row + 1):
+            name = normalize_item_name(_text(snap.value(rule.sheet, row, rule.name_column)))
+            if name:
+                rows.setdefault(alias_index.get(name, name), row)
+
+    compared, failures = 0, []
+    for item, value in data.items():
+        name = normalize_item_name(item)
+        row = rows.get(alias_index.get(name, name))
+        if row is None or _as_number(value) is None:
+            continue
+        raw = snap.value(rule.sheet, row, rule.column)
+        # 空单元格按0比对；表头等文字跳过（与 compare_z32_* 一致）
+        target = 0.0 if raw is None else _as_number(raw)
+        if target is None:
+            continue
+        compared += 1
+        diff = _as_number(value) - target
+        if abs(diff) > rule.tolerance:
+            failures.append(f"{item}: 差异{diff:,.2f}")
+    if not compared:
+        return None, [f"{rule.name}: 无可比对项目，未评分"]
+    passed = compared - len(failures)
+    return _ratio(passed, compared), [f"{rule.name}: {passed}/{compared}项一致"] + failures[:MAX_DETAILS]
+
+
+def _check_context_ratio(rule: ScoringRule, snap: ScoringSnapshot, context: Mapping[str, Any]) -> CheckResult:
+    value = context.get(rule.context)
+    if value is None:
+        return None, []
+    ratio = min(1.0, max(0.0, float(value)))
+    return ratio, [f"{rule.name}: 得分率{ratio:.0%}"]
+
+
+_CHECKS: Dict[str, Callable[[ScoringRule, ScoringSnapshot, Mapping[str, Any]], CheckResult]] = {
+    "contains": _check_contains,
+    "headers": _check_headers,
+    "item_names": _check_item_names,
+    "text_clean": _check_text_clean,
+    "diff_count": _check_diff_count,
+    "compare": _check_compare,
+    "context_ratio": _check_context_ratio,
+}
+
+
+# =============================================================================
+# 评分
+# =============================================================================
+
+@dataclass
+class RuleResult:
+    """单条规则的结果（ratio为None: 缺少输入，不参与维度得分）"""
+    name: str
+    ratio: Optional[float]
+    details: List[str] = field(default_factory=list)
+    weight: float = 1.0
+
+
+@dataclass
+class DimensionScore:
+    """单个维度的得分"""
+    name: str
+    max: int
+    actual: int = 0
+    details: List[str] = field(default_factory=list)
+    rules: List[RuleResult] = field(default_factory=list)
+
+
+@dataclass
+class ScoreCard:
+    """一份底稿的评分结果"""
+    dimensions: Dict[str, DimensionScore]
+    path: Optional[Path] = None
+    error: Optional[str] = None
+    elapsed_s: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(d.actual for d in self.dimensions.values())
+
+    @property
+    def total_max(self) -> int:
+        return sum(d.max for d in self.dimensions.values())
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """{维度: {"max", "actual", "details"}}（evaluate_6_dimensions 的返回格式）"""
+        return {
+            name: {"max": d.max, "actual": d.actual, "details": list(d.details)}
+            for name, d in self.dimensions.items()
+        }
+
+    @classmethod
+    def empty(cls, scheme: ScoringScheme, path: Optional[Path] = None, error: Optional[str] = None) -> "ScoreCard":
+        """全部维度0分（评分失败时）"""
+        dimensions = {name: DimensionScore(name, maximum) for name, maximum in scheme.dimensions.items()}
+        return cls(dimensions, path=path, error=error)
+
+
+def score_snapshot(
+    snapshot: ScoringSnapshot,
+    scheme: ScoringScheme,
+    context: Optional[Mapping[str, Any]] = None,
+) -> ScoreCard:
+    """在快照上执行全部规则，按维度汇总"""
+    context = context or {}
+    card = ScoreCard.empty(scheme)
+    for rule in scheme.rules:
+        if rule.sheet and rule.region() is not None and not snapshot.has_sheet(rule.sheet):
+            ratio, details = 0.0, [f"{rule.sheet}工作表不存在"]
+        else:
+            ratio, details = _CHECKS[rule.check](rule, snapshot, context)
+        card.dimensions[rule.dimension].rules.append(RuleResult(rule.name, ratio, details, rule.weight))
+
+    for dim in card.dimensions.values():
+        scored = [r for r in dim.rules if r.ratio is not None]
+        total_weight = sum(r.weight for r in scored)
+        for r in dim.rules:
+            dim.details.extend(r.details)
+        if total_weight > 0:
+            dim.actual = round(dim.max * sum(r.weight * r.ratio for r in scored) / total_weight)
+        else:
+            dim.details.append("缺少评分输入，未评分")
+    return card
+
+
+def score_workpaper(
+    source: Union[str, Path, WorkbookBackend],
+    scheme: ScoringScheme,
+    context: Optional[Mapping[str, Any]] = None,
+    engine: str = "openpyxl",
+) -> ScoreCard:
+    """
+    评分一份底稿
+
+    Args:
+        source: 已由Excel保存的底稿路径（读取公式缓存值），或已打开的后端
+        context: 比对数据与科目映射得分率（见模块说明）
+    """
+    start = time.perf_counter()
+    path = None if isinstance(source, WorkbookBackend) else Path(source)
+    with span("评分", path=path.name if path else "session"):
+        with span("评分快照"):
+            snapshot = load_scoring_snapshot(source, scheme, engine=engine)
+        card = score_snapshot(snapshot, scheme, context)
+    card.path = path
+    card.elapsed_s = time.perf_counter() - start
+    return card
+
+
+def _score_one(path: str, scheme: ScoringScheme, context: Optional[Mapping[str, Any]]) -> ScoreCard:
+    try:
+        return score_workpaper(path, scheme, context)
+    except Exception as e:
+        return ScoreCard.empty(scheme, path=Path(path), error=f"{type(e).__name__}: {e}")
+
+
+def score_workpapers(
+    jobs: Sequence[Tuple[Path, Optional[Mapping[str, Any]]]],
+    scheme: ScoringScheme,
+    max_workers: Optional[int] = None,
+) -> List[ScoreCard]:
+    """
+    批量评分（进程池，每份底稿一次只读打开）
+
+    Args:
+        jobs: [(底稿路径, 上下文或None)]
+        max_workers: 进程数，默认CPU核数；<=1 时在当前进程顺序评分
+
+    Returns:
+        ScoreCard 列表，顺序同 jobs；失败的底稿 error 非空、各维度0分
+    """
+    args = [(str(path), scheme, context) for path, context in jobs]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers <= 1 or len(args) <= 1:
+        return [_score_one(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(args))) as pool:
+        return list(pool.map(_score_one, *zip(*args)))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """命令行: 批量评分底稿"""
+    arg_parser = argparse.ArgumentParser(prog="python -m opencpai_pipeline score",
+                                         description="底稿6维度评分（不需要Excel）")
+    arg_parser.add_argument("files", nargs="+", type=Path, help="已由Excel保存的底稿")
+    arg_parser.add_argument("--rules", type=Path, help="评分规则JSON（默认内置规则）")
+    arg_parser.add_argument("--mapping", type=Path,
+                            help="Z3-2资产负债表映射JSON {项目: 行号}（内置规则用；不给出时D3只取上下文中的映射得分率）")
+    arg_parser.add_argument("--context", type=Path,
+                            help="上下文JSON（balance_sheet / prior_balance / subject_mapping_ratio），各底稿共用")
+    arg_parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认CPU核数）")
+    arg_parser.add_argument("--json", type=Path, help="结果另存为JSON")
+    args = arg_parser.parse_args(argv)
+
+    if args.rules:
+        scheme = load_scoring_scheme(args.rules)
+    else:
+        mapping = None
+        if args.mapping:
+            with open(args.mapping, "r", encoding="utf-8") as f:
+                mapping = json.load(f)
+        scheme = default_scheme(mapping)
+    context = None
+    if args.context:
+        with open(args.context, "r", encoding="utf-8") as f:
+            context = json.load(f)
+
+    start = time.perf_counter()
+    cards = score_workpapers([(f, context) for f in args.files], scheme, max_workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for card in cards:
+        if card.error:
+            failed += 1
+            print(f"  ✗ {card.path.name}: {card.error}")
+            continue
+        dims = " ".join(f"{name.split('_')[0]}={d.actual}" for name, d in card.dimensions.items())
+        print(f"  ✓ {card.path.name}: {card.total}/{card.total_max}（{dims}）")
+    print(f"完成 {len(cards) - failed}/{len(cards)}，耗时 {elapsed:.2f}s")
+
+    if args.json:
+        payload = [
+            {"path": str(c.path), "error": c.error, "total": c.total, "total_max": c.total_max,
+             "elapsed_s": round(c.elapsed_s, 3), "scores": c.as_dict()}
+            for c in cards
+        ]
+        args.json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 1 if failed else 0
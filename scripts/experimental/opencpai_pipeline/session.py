@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+流程会话：一个Excel进程 + 一个底稿句柄贯穿 Step 3~9
+
+原流程中检查报告、财审报告PDF导出、6维度评分各自
+CoInitialize → Dispatch("Excel.Application") → Quit，评分还要重新打开刚关闭的底稿。
+PipelineSession 统一持有Excel进程与已打开的底稿，作为参数传给各步骤。
+
+传入 pool（excel_pool.ExcelPool）时从池中租用预热的Excel实例，close() 归还而不退出；
+macro_timeout_s 限制每次宏执行的时长，超时结束该Excel实例并抛出 MacroTimeoutError。
+
+示例:
+    with PipelineSession() as session:
+        session.open_workpaper(template_path)
+        session.run_macro("KMSCB")
+        ...
+        scores = evaluate_6_dimensions(workpaper_path, session=session)
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .excel_pool import ExcelInstance, ExcelPool
+from .tracing import span
+from .workbook_backend import ComWorkbookBackend
+
+
+# Excel 计算模式常量（XlCalculation）
+XL_CALCULATION_MANUAL = -4135
+XL_CALCULATION_AUTOMATIC = -4105
+
+
+class PipelineSession:
+    """
+    持有Excel.Application与底稿工作簿的会话
+
+    Attributes:
+        excel: Excel.Application COM对象（start后可用）
+        workbook: 当前底稿COM工作簿
+        backend: 底稿的工作簿后端（ComWorkbookBackend）
+        workpaper_path: 底稿最近一次保存的路径
+        instance: 当前使用的Excel实例（自行启动或从池中租用）
+    """
+
+    def __init__(self, visible: bool = False, pool: Optional[ExcelPool] = None,
+                 macro_timeout_s: Optional[float] = None):
+        self.visible = visible
+        self.pool = pool
+        self.macro_timeout_s = macro_timeout_s if macro_timeout_s is not None else (
+            pool.macro_timeout_s if pool is not None else None)
+        self.instance: Optional[ExcelInstance] = None
+        self.excel = None
+        self.workbook = None
+        self.backend: Optional[ComWorkbookBackend] = None
+        self.workpaper_path: Optional[Path] = None
+        self._com_initialized = False
+
+    # -------------------------------------------------------------------------
+    # 生命周期
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """启动Excel进程或从池中租用实例（重复调用直接返回已有的实例）"""
+        if self.excel is not None:
+            return self.excel
+
+        if self.pool is not None:
+            self.instance = self.pool.acquire()
+        else:
+            import pythoncom
+
+            pythoncom.CoInitialize()
+            self._com_initialized = True
+
+            # 独立的Excel进程：不会附着到用户已打开的Excel，批量模式下各工作进程的实例也互不干扰
+            self.instance = ExcelInstance(visible=self.visible)
+            self.instance.start()
+        self.excel = self.instance.excel
+        return self.excel
+
+    def close(self) -> None:
+        """关闭底稿（不保存）、退出Excel（租用的实例归还到池）并释放COM"""
+        if self.workbook is not None:
+            try:
+                self.workbook.Close(SaveChanges=False)
+            except Exception:
+                pass
+            self.workbook = None
+            self.backend = None
+
+        if self.instance is not None:
+            # 先释放本会话的引用，Excel进程才能在退出时结束
+            self.excel = None
+            instance, self.instance = self.instance, None
+            if self.pool is not None:
+                self.pool.release(instance)
+            else:
+                instance.quit()
+
+        if self._com_initialized:
+            import pythoncom
+            pythoncom.CoUninitialize()
+            self._com_initialized = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # -------------------------------------------------------------------------
+    # 底稿操作
+    # -------------------------------------------------------------------------
+
+    @property
+    def has_workpaper(self) -> bool:
+        return self.workbook is not None
+
+    def _attach(self, workbook) -> None:
+        self.workbook = workbook
+        self.backend = ComWorkbookBackend(workbook)
+
+    def open_workpaper(self, path: Path):
+        """打开底稿（模板）并作为会话底稿"""
+        self.start()
+        self.excel.Workbooks.Open(str(Path(path).absolute()))
+        self._attach(self.excel.ActiveWorkbook)
+        return self.workbook
+
+    def reattach_active(self):
+        """宏执行后重新获取活动工作簿引用"""
+        self._attach(self.excel.ActiveWorkbook)
+        return self.workbook
+
+    def save_workpaper(self, path: Optional[Path] = None, file_format: Optional[int] = None) -> None:
+        """保存底稿；传入path时另存为（file_format=52 为 .xlsm）"""
+        if path is None:
+            self.workbook.Save()
+            return
+        if file_format is None:
+            self.workbook.SaveAs(str(Path(path).absolute()))
+        else:
+            self.workbook.SaveAs(str(Path(path).absolute()), FileFormat=file_format)
+        self.workpaper_path = Path(path)
+
+    def run_macro(self, name: str):
+        """
+        执行底稿中的VBA宏（记录 macro:<宏名> span）
+
+        Raises:
+            MacroTimeoutError: 超过 macro_timeout_s（Excel实例已结束，会话不可继续使用）
+        """
+        self.start()
+        with span(f"macro:{name}"):
+            return self.instance.run_macro(name, timeout_s=self.macro_timeout_s)
+
+    @contextmanager
+    def manual_calculation(self) -> Iterator[None]:
+        """
+        批量写入期间暂停自动重算与屏幕刷新，退出时恢复原设置并重算一次
+
+        WritePlan 提交多个区域时，自动重算模式下每次区域写入都会触发一次全簿重算。
+        """
+        self.start()
+        previous = self.excel.Calculation
+        updating = self.excel.ScreenUpdating
+        self.excel.Calculation = XL_CALCULATION_MANUAL
+        self.excel.ScreenUpdating = False
+        try:
+            yield
+        finally:
+            self.excel.ScreenUpdating = updating
+            self.excel.Calculation = previous
+            if previous == XL_CALCULATION_AUTOMATIC:
+                self.excel.Calculate()
+
+    # -------------------------------------------------------------------------
+    # 其他工作簿（检查报告/财审报告），共用同一Excel进程
+    # -------------------------------------------------------------------------
+
+    def add_workbook(self):
+        """新建工作簿"""
+        self.start()
+        return self.excel.Workbooks.Add()
+
+    def open_workbook(self, path: Path):
+        """打开其他工作簿（调用方负责Close）"""
+        self.start()
+        return self.excel.Workbooks.Open(str(Path(path).absolute()))
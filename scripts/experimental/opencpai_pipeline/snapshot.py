@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+工作表区域快照
+
+一次区域读取（COM一次Range.Value / openpyxl一次遍历）把矩形区域读入内存，
+之后所有比对与评分检查都从快照取值，不再逐单元格访问后端。
+
+示例:
+    snapshot = SheetSnapshot.load(backend, "Z3-2", 7, 3, 287, 4)   # C7:D287
+    snapshot.value(20, 3)   # C20
+"""
+
+from typing import Any, Dict, List
+
+from .workbook_backend import WorkbookBackend, cell_ref_to_rowcol
+
+
+class SheetSnapshot:
+    """
+    工作表矩形区域的内存快照（行号/列号为工作表绝对坐标，1起始）
+
+    区域外的坐标返回None，与空单元格一致。
+    """
+
+    def __init__(self, sheet: str, first_row: int, first_col: int, values: List[List[Any]]):
+        self.sheet = sheet
+        self.first_row = first_row
+        self.first_col = first_col
+        self.values = values
+        self.last_row = first_row + len(values) - 1
+        self.last_col = first_col + (max((len(r) for r in values), default=0)) - 1
+
+    @classmethod
+    def load(
+        cls,
+        backend: WorkbookBackend,
+        sheet: str,
+        first_row: int,
+        first_col: int,
+        last_row: int,
+        last_col: int
+    ) -> "SheetSnapshot":
+        """一次区域读取生成快照"""
+        values = backend.read_range(sheet, first_row, first_col, last_row, last_col)
+        return cls(sheet, first_row, first_col, values)
+
+    def contains(self, row: int, col: int) -> bool:
+        return self.first_row <= row <= self.last_row and self.first_col <= col <= self.last_col
+
+    def value(self, row: int, col: int) -> Any:
+        if not self.contains(row, col):
+            return None
+        row_values = self.values[row - self.first_row]
+        offset = col - self.first_col
+        return row_values[offset] if offset < len(row_values) else None
+
+    def ref(self, ref: str) -> Any:
+        """按地址取值，如 snapshot.ref("C20")"""
+        return self.value(*cell_ref_to_rowcol(ref))
+
+    def column(self, col: int) -> Dict[int, Any]:
+        """返回某列 {行号: 值}"""
+        return {
+            self.first_row + i: self.value(self.first_row + i, col)
+            for i in range(len(self.values))
+        }
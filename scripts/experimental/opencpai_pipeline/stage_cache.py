@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+阶段输出缓存与运行清单（增量重跑）
+
+修正一个输入文件后重跑项目，原流程把清洗、宏、PDF解析、工商查询、比对、报告导出全部重做一遍。
+
+每个可缓存阶段（Stage(cache=True)）的缓存键:
+    sha256(阶段名 + 阶段函数源码指纹 + 阶段额外依赖的指纹 + 各输入值的指纹)
+    - 文件（Path）按内容sha256，DataFrame 按 pandas 行哈希，其余值按规范化JSON/pickle
+    - 函数按源码哈希（function_version），模块按源文件sha256
+    - 额外依赖（Stage.fingerprint）用于阶段闭包中使用、但未声明为输入的文件、映射表、辅助函数与模块
+重跑时输入指纹不变的阶段直接取缓存输出，只有下游受影响的阶段重新执行；
+修改某个阶段（或它声明依赖的函数/映射表）只使该阶段及其下游失效，不再因任意代码改动全部重跑。
+
+阶段输出中的文件（Path）在命中时校验：文件须存在且内容与上次运行结束时一致，否则视为未命中。
+
+运行清单（RunManifest）记录每个阶段的缓存键、状态、输入/输出指纹，
+与上一次的清单对比即可看出哪些阶段因哪些输入变化而重跑。
+"""
+
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import time
+import types
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .workbook_backend import atomic_write, file_sha256
+
+
+CACHE_FORMAT = 2
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class Unfingerprintable(ValueError):
+    """值无法生成稳定指纹（依赖它的阶段不缓存）"""
+
+
+# =============================================================================
+# 指纹
+# =============================================================================
+
+_digest_memo: Dict[tuple, str] = {}
+_digest_lock = threading.Lock()
+
+
+def _file_digest(path: Path) -> Optional[str]:
+    """文件内容sha256（按 路径+修改时间+大小 记忆，同一次运行中多个阶段依赖同一文件时只读一次）"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if not path.is_file():
+        return None
+    memo_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest is None:
+        digest = file_sha256(path)
+        with _digest_lock:
+            _digest_memo[memo_key] = digest
+    return digest
+
+
+def _canonical(value: Any) -> Any:
+    """转为可稳定序列化的结构"""
+    import numpy as np
+    import pandas as pd
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Path):
+        return {"path": str(value), "sha256": _file_digest(value)}
+    if isinstance(value, pd.DataFrame):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        digest.update(repr((list(value.columns), [str(t) for t in value.dtypes])).encode("utf-8"))
+        return {"frame": digest.hexdigest()}
+    if isinstance(value, pd.Series):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        return {"series": digest.hexdigest(), "name": str(value.name)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(v) for v in value), key=repr)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {"dataclass": type(value).__qualname__,
+                "fields": {f.name: _canonical(getattr(value, f.name)) for f in dataclasses.fields(value)}}
+    if isinstance(value, types.FunctionType):
+        return {"function": value.__qualname__, "source": function_version(value)}
+    if isinstance(value, types.ModuleType):
+        return {"module": value.__name__, "sha256": _file_digest(Path(value.__file__))}
+    if isinstance(value, Future):
+        # 已完成的Future（如提前发起的工商查询）按结果计算
+        if not value.done() or value.exception() is not None:
+            raise Unfingerprintable("Future未完成或失败")
+        return {"future": _canonical(value.result())}
+    try:
+        return {"pickle": hashlib.sha256(pickle.dumps(value)).hexdigest()}
+    except Exception as e:
+        raise Unfingerprintable(f"{type(value).__name__}: {e}")
+
+
+def fingerprint_value(value: Any) -> Optional[str]:
+    """值的指纹（sha256前16位）；无法生成时返回None"""
+    try:
+        material = json.dumps(_canonical(value), sort_keys=True, ensure_ascii=False, default=repr)
+    except (Unfingerprintable, TypeError, ValueError, OSError):
+        return None
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def function_version(func: Callable[..., Any]) -> str:
+    """函数版本：源码的哈希（前12位）；取不到源码时按字节码与常量"""
+    func = inspect.unwrap(func)
+    try:
+        material = inspect.getsource(func)
+    except (OSError, TypeError):
+        code = getattr(func, "__code__", None)
+        material = repr((code.co_code, code.co_consts)) if code is not None else repr(func)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:12]
+
+
+def _output_files(outputs: Dict[str, Any]) -> List[Path]:
+    """输出值中的文件路径（顶层及一层容器内）"""
+    files = []
+    for value in outputs.values():
+        items = value.values() if isinstance(value, dict) else value if isinstance(value, (list, tuple)) else [value]
+        files.extend(Path(v) for v in items if isinstance(v, Path))
+    return files
+
+
+# =============================================================================
+# 阶段缓存
+# =============================================================================
+
+class StageCache:
+    """
+    阶段输出磁盘缓存（一个缓存键一个pickle文件 + 输出文件校验表）
+
+    Args:
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限，超出时按最近使用时间淘汰
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key_for(self, stage_name: str, input_fingerprints: Dict[str, str], extra_fingerprints: List[str]) -> str:
+        material = {
+            "format": CACHE_FORMAT,
+            "stage": stage_name,
+            "inputs": input_fingerprints,
+            "extra": extra_fingerprints,
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def _files_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.files.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        命中返回 {"outputs": {输出名: 值}, "fingerprints": {输出名: 指纹}}，未命中返回None
+
+        输出中的文件须存在且内容与上次记录一致。
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            with open(self._files_path(key), "r", encoding="utf-8") as f:
+                files = json.load(f)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        if entry.get("format") != CACHE_FORMAT:
+            return None
+        for file, sha in files.items():
+            if _file_digest(Path(file)) != sha:
+                return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return {"outputs": entry["outputs"], "fingerprints": entry["fingerprints"]}
+
+    def put(self, key: str, outputs: Dict[str, Any], fingerprints: Dict[str, str]) -> bool:
+        """写入阶段输出（不可pickle时不缓存），返回是否写入"""
+        entry = {"format": CACHE_FORMAT, "created_at": time.time(), "outputs": outputs, "fingerprints": fingerprints}
+        try:
+            data = pickle.dumps(entry)
+        except Exception:
+            return False
+        atomic_write(self._path(key), data)
+        self.record_files(key, outputs)
+        self.evict()
+        return True
+
+    def record_files(self, key: str, outputs: Dict[str, Any]) -> None:
+        """记录输出文件的当前内容哈希（运行结束时再记录一次：后续阶段可能修改了同一文件）"""
+        if not self._path(key).exists():
+            return
+        files = {str(p): _file_digest(p) for p in _output_files(outputs) if p.is_file()}
+        atomic_write(self._files_path(key), json.dumps(files, ensure_ascii=False).encode("utf-8"))
+
+    def evict(self) -> int:
+        """按LRU淘汰至总大小不超过上限，返回删除条目数"""
+        entries = []
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(reverse=True)
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            _, size, path = entries.pop()
+            for victim in (path, self._files_path(path.stem)):
+                try:
+                    victim.unlink()
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+
+# =============================================================================
+# 运行清单
+# =============================================================================
+
+class RunManifest:
+    """
+    一次运行的阶段清单（JSON）
+
+    stages: {阶段名: {"status", "key", "inputs": {输入名: 指纹}, "outputs": {输出名: 指纹}}}
+    status: ok（执行）/ cached（取缓存）/ failed / skipped；replayed 表示底稿通道重放
+    """
+
+    def __init__(self, run_id: str = "", stages: Optional[Dict[str, Dict[str, Any]]] = None,
+                 created_at: Optional[float] = None):
+        self.run_id = run_id
+        self.stages = stages or {}
+        self.created_at = created_at or time.time()
+
+    @classmethod
+    def from_result(cls, result, run_id: str = "") -> "RunManifest":
+        """由 ScheduleResult 生成"""
+        stages = {}
+        for name, record in result.records.items():
+            stages[name] = {
+                "status": record.status,
+                "key": record.cache_key,
+                "replayed": record.replayed,
+                "inputs": dict(record.input_fingerprints),
+                "outputs": dict(record.output_fingerprints),
+            }
+        return cls(run_id=run_id, stages=stages)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["RunManifest"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(data.get("run_id", ""), data.get("stages", {}), data.get("created_at"))
+
+    def save(self, path: Path) -> None:
+        data = {
+            "run_id": self.run_id,
+            "created_at": self.created_at,
+            "stages": self.stages,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def changed_inputs(self, previous: "RunManifest") -> Dict[str, List[str]]:
+        """
+        本次重新执行的阶段 -> 原因
+
+        原因为与上次相比指纹变化的输入名（含 "<阶段代码>" / "<额外依赖>"），
+        或 "<不缓存>" / "<新阶段>" / "<底稿通道重放>"
+        """
+        changed = {}
+        for name, entry in self.stages.items():
+            if entry["status"] != "ok":
+                continue
+            before = previous.stages.get(name)
+            if not entry["key"]:
+                changed[name] = ["<不缓存>"]
+            elif before is None:
+                changed[name] = ["<新阶段>"]
+            elif entry.get("replayed"):
+                changed[name] = ["<底稿通道重放>"]
+            else:
+                diff = [i for i, fp in entry["inputs"].items() if before["inputs"].get(i) != fp]
+                changed[name] = diff or ["<缓存已失效>"]
+        return changed
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+财务报表（资产负债表/利润表 Excel）单次读取
+
+同一份报表原先被读取两次：公司名称提取一次、报表解析一次，
+两次都扫描左上角5×5单元格。ParsedStatement 一次读取同时提供:
+    - header_cells: 左上角5×5中的文本单元格（行优先）
+    - company_name: 从表头提取的公司名称
+    - line_items(): 按项目名匹配的金额（LineItemMatcher）
+
+读取方式: .xlsx/.xlsm 用 openpyxl 只读流式读取（不构建完整对象模型），
+.xls 回退到 pandas.read_excel。结果按 (路径, mtime, 文件大小) 缓存。
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .line_item_matcher import LineItemMatcher
+
+
+HEADER_SCAN_ROWS = 5
+HEADER_SCAN_COLS = 5
+
+# 金额候选列（A列为项目名，B~D列依次尝试）
+AMOUNT_COLUMNS = (1, 2, 3)
+
+# 视为金额的单元格类型（openpyxl 读出 int/float，pandas 读出 numpy 数值）
+_NUMBER_TYPES = (int, float, np.int64, np.float64)
+
+
+@dataclass
+class LineItemExtraction:
+    """项目金额提取结果"""
+    data: Dict[str, float]
+    # 歧义行: (行号(0起始), 原始项目名, 候选项目名)
+    ambiguous_rows: List[Tuple[int, str, List[str]]] = field(default_factory=list)
+    matched_rows: int = 0
+
+
+@dataclass
+class ParsedStatement:
+    """单次读取的财务报表"""
+    path: Path
+    frame: pd.DataFrame
+    header_cells: List[str]
+    company_name: str = ""
+    _extraction_cache: Dict[LineItemMatcher, LineItemExtraction] = field(default_factory=dict, repr=False)
+
+    @property
+    def row_count(self) -> int:
+        return len(self.frame)
+
+    def extract_line_items(self, matcher: LineItemMatcher) -> LineItemExtraction:
+        """
+        按匹配器提取项目金额（向量化）
+
+        - A列项目名只规范化一次，按去重后的名称调用 matcher（精确 > 最长子串）
+        - B~D列整列 to_numeric，逐行取第一个数值列（NumPy argmax）
+        - 同一项目多行命中时，精确匹配优先；匹配质量相同取最先出现的行
+        同一matcher重复调用直接返回缓存结果。
+        """
+        cached = self._extraction_cache.get(matcher)
+        if cached is not None:
+            return cached
+
+        frame = self.frame
+        if frame.empty:
+            extraction = LineItemExtraction(data={})
+            self._extraction_cache[matcher] = extraction
+            return extraction
+
+        # 1. 项目名：去空白后按唯一值匹配（factorize 得到每行的名称编号）
+        names = frame.iloc[:, 0]
+        names = names.where(names.notna(), "").astype(str).str.strip()
+        codes, uniques = pd.factorize(names)
+        unique_matches = [matcher.match(name) for name in uniques]
+        unique_matched = np.array([m is not None for m in unique_matches], dtype=bool)
+        unique_rank = np.array([0 if m is not None and m.kind == "exact" else 1 for m in unique_matches])
+        matched_mask = unique_matched[codes]
+
+        # 2. 金额：候选列批量转数值，文本单元格不视为金额
+        amounts = _amount_matrix(frame)
+        valid = ~np.isnan(amounts)
+        has_amount = valid.any(axis=1)
+        first_col = valid.argmax(axis=1)
+        row_amount = amounts[np.arange(len(frame)), first_col]
+
+        # 3. 每个项目取优先级最高的行：按 (匹配优先级, 行号) 排序后每个名称编号取首行，
+        #    同一项目可能对应多个名称（别名/修饰），再按项目合并
+        ambiguous_rows = []
+        for code in np.flatnonzero([m is not None and m.ambiguous for m in unique_matches]):
+            for idx in np.flatnonzero(codes == code):
+                ambiguous_rows.append((int(idx), uniques[code], unique_matches[code].candidates))
+        ambiguous_rows.sort()
+
+        candidate_idx = np.flatnonzero(matched_mask & has_amount)
+        candidate_idx = candidate_idx[np.lexsort((candidate_idx, unique_rank[codes[candidate_idx]]))]
+        _, first = np.unique(codes[candidate_idx], return_index=True)
+        data: Dict[str, float] = {}
+        for idx in candidate_idx[np.sort(first)]:
+            data.setdefault(unique_matches[codes[idx]].key, float(row_amount[idx]))
+
+        extraction = LineItemExtraction(
+            data=data, ambiguous_rows=ambiguous_rows, matched_rows=int(matched_mask.sum())
+        )
+        self._extraction_cache[matcher] = extraction
+        return extraction
+
+    def line_items(self, matcher: LineItemMatcher) -> Dict[str, float]:
+        """按匹配器提取项目金额 {标准项目名: 金额}"""
+        return dict(self.extract_line_items(matcher).data)
+
+
+def _amount_matrix(frame: pd.DataFrame) -> np.ndarray:
+    """
+    候选金额列转为 float 矩阵（行数 × len(AMOUNT_COLUMNS)），非金额为NaN
+
+    与原逐行判断一致：只有数值单元格算金额，文本（含数字文本）和布尔值不算。
+    """
+    matrix = np.full((len(frame), len(AMOUNT_COLUMNS)), np.nan)
+    for j, col_idx in enumerate(AMOUNT_COLUMNS):
+        if col_idx >= len(frame.columns):
+            continue
+        col = frame.iloc[:, col_idx]
+        is_number = col.map(type).isin(_NUMBER_TYPES).to_numpy()
+        values = pd.to_numeric(col.where(is_number), errors="coerce").to_numpy(dtype=float)
+        matrix[:, j] = values
+    return matrix
+
+
+# =============================================================================
+# 读取
+# =============================================================================
+
+def _read_rows(path: Path) -> List[Tuple[Any, ...]]:
+    """读取第一个工作表的所有行（值）"""
+    if path.suffix.lower() in (".xlsx", ".xlsm"):
+        import openpyxl
+
+        wb = openpyxl.load_workbook(str(path), read_only=True, data_only=True)
+        try:
+            ws = wb.worksheets[0]
+            return [tuple(row) for row in ws.iter_rows(values_only=True)]
+        finally:
+            wb.close()
+
+    df = pd.read_excel(path, header=None)
+    return [tuple(row) for row in df.itertuples(index=False, name=None)]
+
+
+def _build_frame(rows: List[Tuple[Any, ...]]) -> pd.DataFrame:
+    """对齐行宽后构建object类型DataFrame（保留原始Python类型，不做整列类型推断）"""
+    width = max((len(r) for r in rows), default=0)
+    padded = [tuple(r) + (None,) * (width - len(r)) for r in rows]
+    return pd.DataFrame(padded, dtype=object)
+
+
+def _scan_header(frame: pd.DataFrame) -> List[str]:
+    """左上角5×5中的文本单元格（行优先）"""
+    cells = []
+    for i in range(min(HEADER_SCAN_ROWS, len(frame))):
+        for j in range(min(HEADER_SCAN_COLS, len(frame.columns))):
+            val = frame.iat[i, j]
+            if isinstance(val, str):
+                cells.append(val)
+    return cells
+
+
+def parse_statement_file(
+    path: Path,
+    name_extractor: Optional[Callable[[str], str]] = None
+) -> ParsedStatement:
+    """读取并解析一份报表（不走缓存）"""
+    path = Path(path)
+    frame = _build_frame(_read_rows(path))
+    header_cells = _scan_header(frame)
+
+    company_name = ""
+    if name_extractor is not None:
+        for text in header_cells:
+            company_name = name_extractor(text)
+            if company_name:
+                break
+
+    return ParsedStatement(path=path, frame=frame, header_cells=header_cells, company_name=company_name)
+
+
+# =============================================================================
+# 缓存（路径 + mtime + 大小）
+# =============================================================================
+
+_CACHE_MAX_ENTRIES = 64
+_cache: "OrderedDict[Tuple[str, int, int], ParsedStatement]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def load_statement(
+    path: Path,
+    name_extractor: Optional[Callable[[str], str]] = None
+) -> ParsedStatement:
+    """
+    读取报表（带缓存）
+
+    文件修改后 mtime/大小变化，自动重新读取。
+    同一进程内应使用同一个 name_extractor。
+    """
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    statement = parse_statement_file(path, name_extractor=name_extractor)
+
+    with _cache_lock:
+        _cache[key] = statement
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return statement
+
+
+def clear_statement_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""
+科目名称映射（Auto_MapSubjectNames宏的Python实现）
+
+原流程在底稿分配后执行 Auto_MapSubjectNames 宏，失败时只打印"⚠ 跳过"，
+既不知道哪些科目没有映射，D3 科目映射评分也只检查 Z3-2 工作表是否存在。
+
+SubjectMapper 预编译一次标准科目索引，逐个客户一级科目按层级匹配:
+    1. alias  - 已确认的别名（AliasStore，JSON持久化，由确认过的映射累积）
+    2. exact  - 规范化名称精确命中标准科目名
+    3. prefix - 客户名称以标准科目名开头（"银行存款-基本户"）
+    4. abbrev - 客户名称为标准名的前缀缩写（"其他应收"）；4位编码对应同一科目时按 prefix 计
+    5. fuzzy  - 字符二元组倒排索引筛候选，difflib 相似度 ≥ fuzzy_cutoff（"应收帐款"）
+    6. code   - 名称均未命中时按4位科目编码对应（旧科目体系编码含义不同，仅作提示）
+prefix / abbrev / fuzzy 的结果与4位编码对应的标准科目不一致时记为 conflict（建议取编码对应的科目，
+候选中保留名称匹配结果）：如 "存货"(1405) 缩写命中"存货跌价准备"、"营业收入"(6001) 模糊命中"营业外收入"。
+abbrev / fuzzy / code / conflict 为待确认映射，与未映射科目一起写入待确认清单，不写入余额表；
+清单中填写"确认标准科目"后导入别名库，下次运行即为 alias 命中:
+
+    python -m opencpai_pipeline subject-alias <别名库.json> import <待确认清单.csv>
+    python -m opencpai_pipeline subject-alias <别名库.json> list
+    python -m opencpai_pipeline subject-alias <别名库.json> add 银行存款（基本户） 银行存款
+
+规范化规则与报表项目匹配一致（line_item_matcher.normalize_item_name）。
+"""
+
+import argparse
+import difflib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from .km_table import FIRST_LEVEL_LENGTH, account_levels, normalize_account_codes
+from .line_item_matcher import normalize_item_name
+from .workbook_backend import atomic_write
+
+
+# 企业会计准则一级科目（编码, 名称）
+STANDARD_SUBJECTS: List[Tuple[str, str]] = [
+    ("1001", "库存现金"), ("1002", "银行存款"), ("1012", "其他货币资金"),
+    ("1101", "交易性金融资产"), ("1121", "应收票据"), ("1122", "应收账款"), ("1123", "预付账款"),
+    ("1131", "应收股利"), ("1132", "应收利息"), ("1221", "其他应收款"), ("1231", "坏账准备"),
+    ("1401", "材料采购"), ("1402", "在途物资"), ("1403", "原材料"), ("1404", "材料成本差异"),
+    ("1405", "库存商品"), ("1406", "发出商品"), ("1407", "商品进销差价"), ("1408", "委托加工物资"),
+    ("1411", "周转材料"), ("1471", "存货跌价准备"),
+    ("1501", "债权投资"), ("1503", "其他债权投资"), ("1511", "长期股权投资"),
+    ("1512", "长期股权投资减值准备"), ("1521", "投资性房地产"), ("1531", "长期应收款"),
+    ("1601", "固定资产"), ("1602", "累计折旧"), ("1603", "固定资产减值准备"),
+    ("1604", "在建工程"), ("1605", "工程物资"), ("1606", "固定资产清理"),
+    ("1701", "无形资产"), ("1702", "累计摊销"), ("1703", "无形资产减值准备"),
+    ("1711", "商誉"), ("1801", "长期待摊费用"), ("1811", "递延所得税资产"), ("1901", "待处理财产损溢"),
+    ("2001", "短期借款"), ("2101", "交易性金融负债"), ("2201", "应付票据"), ("2202", "应付账款"),
+    ("2203", "预收账款"), ("2204", "合同负债"), ("2211", "应付职工薪酬"), ("2221", "应交税费"),
+    ("2231", "应付利息"), ("2232", "应付股利"), ("2241", "其他应付款"), ("2401", "递延收益"),
+    ("2501", "长期借款"), ("2502", "应付债券"), ("2701", "长期应付款"), ("2801", "预计负债"),
+    ("2901", "递延所得税负债"),
+    ("4001", "实收资本"), ("4002", "资本公积"), ("4003", "其他综合收益"), ("4101", "盈余公积"),
+    ("4103", "本年利润"), ("4104", "利润分配"), ("4201", "库存股"),
+    ("5001", "生产成本"), ("5101", "制造费用"), ("5201", "劳务成本"), ("5301", "研发支出"),
+    ("6001", "主营业务收入"), ("6051", "其他业务收入"), ("6101", "公允价值变动损益"),
+    ("6111", "投资收益"), ("6115", "资产处置损益"), ("6117", "其他收益"), ("6301", "营业外收入"),
+    ("6401", "主营业务成本"), ("6402", "其他业务成本"), ("6403", "税金及附加"),
+    ("6601", "销售费用"), ("6602", "管理费用"), ("6603", "财务费用"), ("6604", "研发费用"),
+    ("6701", "资产减值损失"), ("6702", "信用减值损失"), ("6711", "营业外支出"),
+    ("6801", "所得税费用"), ("6901", "以前年度损益调整"),
+]
+
+TIERS = ("alias", "exact", "prefix", "abbrev", "fuzzy", "code", "conflict")
+# 待确认层级（D3按半数计分，写入待确认清单，不写入余额表）
+TENTATIVE_TIERS = ("abbrev", "fuzzy", "code", "conflict")
+
+DEFAULT_FUZZY_CUTOFF = 0.6
+# 前缀缩写至少2个字（"其他" 不匹配任何科目）
+MIN_PREFIX_LENGTH = 2
+
+REVIEW_COLUMNS = ["客户科目编码", "客户科目名称", "建议标准科目", "匹配方式", "相似度", "确认标准科目"]
+
+
+@dataclass
+class SubjectMatch:
+    """单个客户科目的映射结果"""
+    code: str
+    name: str
+    standard: Optional[str]
+    tier: Optional[str]            # TIERS 之一，未映射为None
+    score: float = 0.0
+    candidates: List[str] = field(default_factory=list)
+
+    @property
+    def mapped(self) -> bool:
+        return self.standard is not None
+
+    @property
+    def tentative(self) -> bool:
+        return self.tier in TENTATIVE_TIERS
+
+
+@dataclass
+class SubjectMappingResult:
+    """一个账套的映射结果"""
+    matches: List[SubjectMatch]
+    elapsed_ms: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.matches)
+
+    @property
+    def unmapped(self) -> List[SubjectMatch]:
+        return [m for m in self.matches if not m.mapped]
+
+    @property
+    def tentative(self) -> List[SubjectMatch]:
+        return [m for m in self.matches if m.tentative]
+
+    def tier_counts(self) -> Dict[str, int]:
+        counts = {tier: 0 for tier in TIERS}
+        counts["unmapped"] = 0
+        for m in self.matches:
+            counts[m.tier or "unmapped"] += 1
+        return counts
+
+    @property
+    def score_ratio(self) -> float:
+        """映射得分率：确定映射计1，待确认计0.5，未映射计0（无科目时为1）"""
+        if not self.matches:
+            return 1.0
+        points = sum(0.5 if m.tentative else 1.0 for m in self.matches if m.mapped)
+        return points / len(self.matches)
+
+    def standard_by_code(self, include_tentative: bool = False) -> Dict[str, str]:
+        """客户一级科目编码 -> 标准科目名（默认只含确定映射，待确认的须确认后再写入）"""
+        return {
+            m.code: m.standard for m in self.matches
+            if m.mapped and m.code and (include_tentative or not m.tentative)
+        }
+
+    def review_frame(self) -> pd.DataFrame:
+        """待确认清单（未映射 + 待确认），"确认标准科目"列留空供填写"""
+        rows = [
+            [m.code, m.name, m.standard or "", m.tier or "未映射", round(m.score, 2), ""]
+            for m in self.matches if not m.mapped or m.tentative
+        ]
+        return pd.DataFrame(rows, columns=REVIEW_COLUMNS)
+
+    def save_review(self, path: Path) -> Optional[Path]:
+        """写出待确认清单CSV（utf-8-sig，Excel直接打开）；无待确认项时不写出"""
+        frame = self.review_frame()
+        if frame.empty:
+            return None
+        frame.to_csv(path, index=False, encoding="utf-8-sig")
+        return path
+
+
+# =============================================================================
+# 别名库
+# =============================================================================
+
+class AliasStore:
+    """
+    已确认别名库（规范化客户科目名 -> 标准科目名，JSON持久化）
+
+    批量模式下多个进程可能同时保存：保存时先重新读取磁盘内容再合并，临时文件替换写入。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.aliases: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._dirty: Set[str] = set()
+        if self.path is not None:
+            self.aliases = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, object]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("aliases", {})
+        except (OSError, ValueError):
+            return {}
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+    def get(self, name: str) -> Optional[str]:
+        entry = self.aliases.get(normalize_item_name(name))
+        return entry["standard"] if entry else None
+
+    def learn(self, name: str, standard: str) -> bool:
+        """记录一条确认映射，返回是否有变化"""
+        key = normalize_item_name(name)
+        if not key or not standard:
+            return False
+        with self._lock:
+            entry = self.aliases.get(key)
+            if entry and entry["standard"] == standard:
+                entry["count"] = int(entry.get("count", 1)) + 1
+            else:
+                entry = {"standard": standard, "count": 1}
+                self.aliases[key] = entry
+            entry["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._dirty.add(key)
+        return True
+
+    def forget(self, name: str) -> bool:
+        key = normalize_item_name(name)
+        with self._lock:
+            removed = self.aliases.pop(key, None) is not None
+            if removed:
+                self._dirty.add(key)
+        return removed
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            merged = self._read()
+            for key in self._dirty:
+                if key in self.aliases:
+                    merged[key] = self.aliases[key]
+                else:
+                    merged.pop(key, None)
+            self.aliases = merged
+            self._dirty.clear()
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.path, json.dumps({"format": 1, "aliases": merged},
+                                               ensure_ascii=False, indent=2, sort_keys=True))
+
+    def import_review(self, path: Path, standard_names: Optional[Iterable[str]] = None) -> Tuple[int, List[str]]:
+        """
+        导入已填写的待确认清单（"确认标准科目"非空的行）
+
+        Returns:
+            (导入条数, 被拒绝的行说明)：确认名称不是标准科目时拒绝
+        """
+        valid = set(standard_names) if standard_names is not None else None
+        frame = pd.read_csv(path, dtype=str, encoding="utf-8-sig").fillna("")
+        learned, rejected = 0, []
+        for _, row in frame.iterrows():
+            confirmed = row.get("确认标准科目", "").strip()
+            if not confirmed:
+                continue
+            if valid is not None and confirmed not in valid:
+                rejected.append(f"{row['客户科目名称']} -> {confirmed}（不是标准科目）")
+                continue
+            if self.learn(row["客户科目名称"], confirmed):
+                learned += 1
+        return learned, rejected
+
+
+# =============================================================================
+# 映射器
+# =============================================================================
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+class SubjectMapper:
+    """
+    科目名称映射器（编译一次，可重复使用）
+
+    Args:
+        standard: 标准科目 [(编码, 名称)]
+        aliases: 已确认别名库
+        fuzzy_cutoff: 模糊匹配最低相似度
+    """
+
+    def __init__(
+        self,
+        standard: Sequence[Tuple[str, str]] = STANDARD_SUBJECTS,
+        aliases: Optional[AliasStore] = None,
+        fuzzy_cutoff: float = DEFAULT_FUZZY_CUTOFF,
+    ):
+        self.aliases = aliases or AliasStore()
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.standard_names: Tuple[str, ...] = tuple(name for _, name in standard)
+        self._by_code: Dict[str, str] = {code: name for code, name in standard}
+        self._exact: Dict[str, str] = {normalize_item_name(name): name for name in self.standard_names}
+        # 前缀匹配按名称长度降序，先命中最具体的（"其他应收款" 先于 "应收款"类）
+        self._by_length = sorted(self._exact.items(), key=lambda kv: len(kv[0]), reverse=True)
+        self._bigram_index: Dict[str, Set[str]] = {}
+        for norm in self._exact:
+            for gram in _bigrams(norm):
+                self._bigram_index.setdefault(gram, set()).add(norm)
+
+    def _prefix(self, name: str) -> Tuple[Optional[str], Optional[str], List[str]]:
+        """返回 (标准科目, 层级 "prefix"/"abbrev", 候选)"""
+        hits = [std for norm, std in self._by_length if name.startswith(norm)]
+        if hits:
+            return hits[0], "prefix", hits
+        if len(name) >= MIN_PREFIX_LENGTH:
+            hits = [std for norm, std in self._by_length if norm.startswith(name)]
+            # 缩写须唯一（"应收" 同时是 应收票据/应收账款 的前缀，不映射）
+            if len(hits) == 1:
+                return hits[0], "abbrev", hits
+            return None, None, hits
+        return None, None, []
+
+    def _fuzzy(self, name: str) -> Tuple[Optional[str], float, List[str]]:
+        pool = set()
+        for gram in _bigrams(name):
+            pool |= self._bigram_index.get(gram, set())
+        if not pool:
+            return None, 0.0, []
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(name)
+        scored = []
+        for norm in pool:
+            matcher.set_seq1(norm)
+            if matcher.real_quick_ratio() < self.fuzzy_cutoff or matcher.quick_ratio() < self.fuzzy_cutoff:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= self.fuzzy_cutoff:
+                scored.append((ratio, self._exact[norm]))
+        if not scored:
+            return None, 0.0, []
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        candidates = [std for _, std in scored[:3]]
+        # 最高相似度并列时不映射（留待确认）
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < 1e-9:
+            return None, scored[0][0], candidates
+        return scored[0][1], scored[0][0], candidates
+
+    def map_name(self, name: str, code: str = "") -> SubjectMatch:
+        """映射单个科目（名称优先，编码兜底）"""
+        norm = normalize_item_name(name)
+        code = str(code or "")
+
+        standard = self.aliases.get(name) if norm else None
+        if standard:
+            return SubjectMatch(code, name, standard, "alias", 1.0, [standard])
+
+        code_standard = self._by_code.get(code[:FIRST_LEVEL_LENGTH])
+        if norm:
+            standard = self._exact.get(norm)
+            if standard:
+                return SubjectMatch(code, name, standard, "exact", 1.0, [standard])
+
+            standard, tier, hits = self._prefix(norm)
+            if standard:
+                shorter, longer = sorted((len(norm), len(normalize_item_name(standard))))
+                if tier == "abbrev" and standard == code_standard:
+                    tier = "prefix"
+                return self._check_code(SubjectMatch(code, name, standard, tier, shorter / longer, hits), code_standard)
+
+            # 缩写对应多个标准科目时不再模糊匹配（模糊匹配只会在这几个里任选一个）
+            if not hits:
+                standard, ratio, hits = self._fuzzy(norm)
+                if standard:
+                    return self._check_code(SubjectMatch(code, name, standard, "fuzzy", ratio, hits), code_standard)
+        else:
+            hits = []
+
+        if code_standard:
+            return SubjectMatch(code, name, code_standard, "code", 0.5, [code_standard])
+        return SubjectMatch(code, name, None, None, 0.0, hits)
+
+    @staticmethod
+    def _check_code(match: SubjectMatch, code_standard: Optional[str]) -> SubjectMatch:
+        """名称匹配与4位编码对应的标准科目不一致时改为 conflict（建议编码对应的科目，留待确认）"""
+        if not code_standard or code_standard == match.standard:
+            return match
+        candidates = [code_standard] + [c for c in match.candidates if c != code_standard]
+        return SubjectMatch(match.code, match.name, code_standard, "conflict", match.score, candidates)
+
+    def map_subjects(self, subjects: Iterable[Tuple[str, str]]) -> SubjectMappingResult:
+        """映射 [(编码, 名称)]（同名科目只计算一次）"""
+        start = time.perf_counter()
+        memo: Dict[Tuple[str, str], SubjectMatch] = {}
+        matches = []
+        for code, name in subjects:
+            key = (normalize_item_name(name), str(code)[:FIRST_LEVEL_LENGTH])
+            cached = memo.get(key)
+            if cached is None:
+                cached = memo[key] = self.map_name(name, code)
+                matches.append(cached)
+            else:
+                matches.append(SubjectMatch(str(code), name, cached.standard, cached.tier,
+                                            cached.score, cached.candidates))
+        return SubjectMappingResult(matches, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+    def map_frame(self, df: pd.DataFrame) -> SubjectMappingResult:
+        """
+        映射余额表（标准8列或KM表）中的一级科目
+
+        只取1级科目行；余额表没有1级行（仅明细）时按编码前4位去重取首个名称。
+        """
+        codes = normalize_account_codes(df["科目编码"])
+        names = df["科目名称"].astype("string").fillna("").str.strip()
+        frame = pd.DataFrame({"code": codes, "name": names})
+        frame = frame[frame["code"] != ""]
+        first = frame[account_levels(frame["code"]) == 1]
+        missing = frame.assign(first=frame["code"].str[:FIRST_LEVEL_LENGTH])
+        missing = missing[~missing["first"].isin(first["code"])].drop_duplicates("first")
+        subjects = list(zip(first["code"], first["name"])) + list(zip(missing["first"], missing["name"]))
+        return self.map_subjects(subjects)
+
+
+def standard_name_column(df: pd.DataFrame, result: SubjectMappingResult) -> List[Optional[str]]:
+    """余额表逐行的标准科目名（按一级科目编码），与 df 行顺序一致"""
+    by_code = result.standard_by_code()
+    codes = normalize_account_codes(df["科目编码"]).str[:FIRST_LEVEL_LENGTH]
+    return [by_code.get(code) for code in codes]
+
+
+# =============================================================================
+# 命令行
+# =============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m opencpai_pipeline subject-alias", description="科目映射别名库管理"
+    )
+    arg_parser.add_argument("store", help="别名库JSON")
+    sub = arg_parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("list", help="列出别名")
+    add = sub.add_parser("add", help="添加别名")
+    add.add_argument("name", help="客户科目名称")
+    add.add_argument("standard", help="标准科目名称")
+    remove = sub.add_parser("remove", help="删除别名")
+    remove.add_argument("name")
+    imp = sub.add_parser("import", help="导入已填写\"确认标准科目\"的待确认清单CSV")
+    imp.add_argument("review", nargs="+")
+    args = arg_parser.parse_args(argv)
+
+    store = AliasStore(Path(args.store))
+    standard_names = [name for _, name in STANDARD_SUBJECTS]
+
+    if args.action == "list":
+        for key, entry in sorted(store.aliases.items()):
+            print(f"  {key:<24} -> {entry['standard']:<12} 确认{entry.get('count', 1)}次  {entry.get('updated_at', '')}")
+        print(f"共 {len(store)} 条")
+        return 0
+
+    if args.action == "add":
+        if args.standard not in standard_names:
+            print(f"✗ 不是标准科目: {args.standard}")
+            return 1
+        store.learn(args.name, args.standard)
+        store.save()
+        print(f"✓ {args.name} -> {args.standard}")
+        return 0
+
+    if args.action == "remove":
+        if not store.forget(args.name):
+            print(f"⚠ 别名不存在: {args.name}")
+            return 1
+        store.save()
+        print(f"✓ 已删除: {args.name}")
+        return 0
+
+    total = 0
+    for review in args.review:
+        learned, rejected = store.import_review(Path(review), standard_names)
+        total += learned
+        print(f"  {Path(review).name}: 导入{learned}条")
+        for line in rejected:
+            print(f"    ⚠ {line}")
+    store.save()
+    print(f"✓ 共导入 {total} 条，别名库 {len(store)} 条")
+    return 0
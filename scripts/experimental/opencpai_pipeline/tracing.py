@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+运行追踪：嵌套span，记录墙钟时间、CPU时间、峰值内存，写出JSON Lines
+
+原流程只有 print（"✓ KMSCB完成"），看不出慢项目的时间花在清洗、宏、PDF解析还是工商API。
+
+用法:
+    tracer = Tracer(output_dir / "【运行追踪】20261017_101500.jsonl", run_id="项目A")
+    with tracer.activate():
+        with span("step3_注入与宏"):
+            with span("macro:KMSCB"):
+                ...
+    tracer.close()
+
+    # 批量汇总（各span名的分位数）
+    python -m opencpai_pipeline trace-summary <jsonl文件或目录> [--csv 输出.csv]
+
+span() 使用当前激活的 Tracer（contextvars），未激活时为空操作，
+因此各函数可直接打点而不必逐层传递 tracer。
+线程池中执行的函数需用 contextvars.copy_context().run 提交才能继承父span
+（StageScheduler 已处理）；子进程中的span不记录，由父进程记录整段耗时。
+
+每行一个span:
+    {"type": "span", "run_id", "span_id", "parent_id", "name", "start",
+     "wall_s", "cpu_s", "rss_mb", "peak_rss_mb", "thread", "status", "error", "attrs"}
+    cpu_s 为该线程内的CPU时间（time.thread_time），不含其他线程/子进程。
+    peak_rss_mb 为span结束时进程的内存峰值（进程级高水位）。
+"""
+
+import argparse
+import contextvars
+import csv
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+_current_tracer: contextvars.ContextVar = contextvars.ContextVar("opencpai_tracer", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("opencpai_span", default=None)
+
+
+# =============================================================================
+# 内存
+# =============================================================================
+
+def _rss_mb() -> Optional[float]:
+    """当前常驻内存（MB），无法获取时返回None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except Exception:
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """进程内存峰值（MB）：Linux/macOS 用 resource，Windows 用 psutil 的 peak_wset"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为KB
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+    except Exception:
+        return None
+
+
+def _round(value: Optional[float], digits: int = 3) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+# =============================================================================
+# Tracer
+# =============================================================================
+
+class Tracer:
+    """
+    span记录器（线程安全），每个结束的span立即追加一行到JSONL
+
+    Args:
+        path: JSONL输出路径，None时只保存在内存（self.spans）
+        run_id: 运行标识（项目名），写入每一行便于批量汇总
+    """
+
+    def __init__(self, path: Optional[Path] = None, run_id: str = ""):
+        self.path = Path(path) if path else None
+        self.run_id = run_id
+        # fork 出的子进程会继承 tracer（含文件句柄），只在创建它的进程中记录
+        self.pid = os.getpid()
+        self.spans: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        record = {"type": "span", "run_id": self.run_id, **record}
+        with self._lock:
+            self.spans.append(record)
+            if self._file is not None:
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                self._file.flush()
+
+    def record_span(self, name: str, start: float, wall_s: float, parent_id: Optional[int] = None,
+                    status: str = "ok", error: str = "", **attrs) -> None:
+        """记录一段已结束的区间（如子进程中执行的阶段，只有墙钟时间）"""
+        self.emit({
+            "span_id": self.next_id(),
+            "parent_id": parent_id,
+            "name": name,
+            "start": round(start, 6),
+            "wall_s": round(wall_s, 6),
+            "cpu_s": None,
+            "rss_mb": _round(_rss_mb(), 1),
+            "peak_rss_mb": _round(_peak_rss_mb(), 1),
+            "thread": threading.current_thread().name,
+            "status": status,
+            "error": error,
+            "attrs": attrs,
+        })
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """设为当前上下文的 tracer（span() 记录到这里）"""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _current_tracer.get()
+
+
+def current_span_id() -> Optional[int]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict[str, Any]]:
+    """
+    记录一个span（嵌套自动关联父span）；没有激活的 tracer 时为空操作
+
+    yield 的 dict 可在span内补充属性: `with span("x") as s: s["rows"] = n`
+    """
+    tracer = _current_tracer.get()
+    if tracer is None or tracer.pid != os.getpid():
+        yield attrs
+        return
+
+    span_id = tracer.next_id()
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    status, error = "ok", ""
+    try:
+        yield attrs
+    except BaseException as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.emit({
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start": round(start, 6),
+            "wall_s": round(time.perf_counter() - wall_start, 6),
+            "cpu_s": round(time.thread_time() - cpu_start, 6),
+            "rss_mb": _round(_rss_mb(), 1),
+            "peak_rss_mb": _round(_peak_rss_mb(), 1),
+            "thread": threading.current_thread().name,
+            "status": status,
+            "error": error,
+            "attrs": attrs,
+        })
+
+
+# =============================================================================
+# 汇总
+# =============================================================================
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def iter_trace_files(paths: Iterable[Path]) -> Iterator[Path]:
+    """展开目录（递归查找 *.jsonl）"""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.jsonl"))
+        elif path.exists():
+            yield path
+
+
+def load_spans(paths: Iterable[Path]) -> List[Dict[str, Any]]:
+    spans = []
+    for path in iter_trace_files(paths):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("type") == "span":
+                    spans.append(record)
+    return spans
+
+
+def percentile(values: List[float], p: float) -> float:
+    """线性插值分位数（values 非空）"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def aggregate_spans(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    按span名汇总
+
+    Returns:
+        {name: {"count", "runs", "failed", "wall_p50".., "wall_max", "wall_mean",
+                "cpu_p50".., "peak_rss_max"}}
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for record in spans:
+        groups.setdefault(record["name"], []).append(record)
+
+    summary = {}
+    for name, records in groups.items():
+        walls = [r["wall_s"] for r in records if r.get("wall_s") is not None]
+        cpus = [r["cpu_s"] for r in records if r.get("cpu_s") is not None]
+        peaks = [r["peak_rss_mb"] for r in records if r.get("peak_rss_mb") is not None]
+        row: Dict[str, Any] = {
+            "count": len(records),
+            "runs": len({r.get("run_id") for r in records}),
+            "failed": sum(1 for r in records if r.get("status") == "failed"),
+        }
+        for label, values in (("wall", walls), ("cpu", cpus)):
+            for p in PERCENTILES:
+                row[f"{label}_p{p}"] = round(percentile(values, p), 3) if values else None
+            row[f"{label}_max"] = round(max(values), 3) if values else None
+            row[f"{label}_mean"] = round(sum(values) / len(values), 3) if values else None
+        row["peak_rss_max"] = round(max(peaks), 1) if peaks else None
+        summary[name] = row
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m opencpai_pipeline trace-summary", description="运行追踪分位数汇总"
+    )
+    arg_parser.add_argument("paths", nargs="+", help="JSONL文件或目录（递归查找*.jsonl）")
+    arg_parser.add_argument("--csv", help="汇总结果另存为CSV")
+    args = arg_parser.parse_args(argv)
+
+    spans = load_spans(Path(p) for p in args.paths)
+    if not spans:
+        print("✗ 未找到追踪记录")
+        return 1
+
+    summary = aggregate_spans(spans)
+    ordered = sorted(summary.items(), key=lambda kv: kv[1]["wall_p50"] or 0, reverse=True)
+
+    print(f"{'span':<28}{'次数':>6}{'项目':>6}{'失败':>6}{'p50(s)':>10}{'p90(s)':>10}"
+          f"{'p99(s)':>10}{'max(s)':>10}{'CPU p50':>10}{'峰值MB':>10}")
+    for name, row in ordered:
+        def fmt(value, width=10, digits=2):
+            return f"{'-':>{width}}" if value is None else f"{value:>{width}.{digits}f}"
+        print(f"{name[:28]:<28}{row['count']:>6}{row['runs']:>6}{row['failed']:>6}"
+              f"{fmt(row['wall_p50'])}{fmt(row['wall_p90'])}{fmt(row['wall_p99'])}{fmt(row['wall_max'])}"
+              f"{fmt(row['cpu_p50'])}{fmt(row['peak_rss_max'], digits=0)}")
+
+    if args.csv:
+        columns = ["name"] + list(next(iter(summary.values())).keys())
+        # utf-8-sig：Excel直接打开不乱码
+        with open(args.csv, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for name, row in ordered:
+                writer.writerow([name] + [row[c] for c in columns[1:]])
+        print(f"\n✓ 已保存: {args.csv}")
+    return 0
@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+"""
+可插拔工作簿后端
+
+同一套读写接口，两种实现:
+    1. OpenpyxlWorkbookBackend - 纯Python（openpyxl），Linux可用，进程内运行
+    2. ComWorkbookBackend      - win32com包装，用于仍需VBA宏的步骤
+
+行号/列号均为1起始，与COM的 Cells(row, col) 保持一致。
+
+另含各模块共用的小工具：列号解析（column_index）、原子写文件（atomic_write）、文件sha256（file_sha256）。
+
+注意:
+    - openpyxl读取公式单元格时，data_only=True 返回Excel上次保存时的缓存值，
+      因此读取/比对/评分步骤应针对Excel保存过的底稿
+    - openpyxl写入后公式不会重算，保存时设置 fullCalcOnLoad，
+      下次由Excel打开时自动全量重算
+"""
+
+import hashlib
+import os
+from abc import ABC, abstractmethod
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+_CELL_REF_PATTERN = re.compile(r'^\$?([A-Za-z]{1,3})\$?(\d+)$')
+
+
+def column_letter_to_index(letters: str) -> int:
+    """列字母转列号（A -> 1, AA -> 27）"""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord('A') + 1)
+    return index
+
+
+def column_index(column: Union[int, str]) -> int:
+    """列号或列字母转列号（3 / "3" / "C" -> 3）"""
+    if isinstance(column, int):
+        return column
+    text = str(column).strip()
+    return int(text) if text.isdigit() else column_letter_to_index(text)
+
+
+def atomic_write(path: Path, data: Union[str, bytes]) -> None:
+    """写入文件（str按UTF-8编码）"""
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    # 先写临时文件再替换，并发进程不会读到半个文件
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """文件内容sha256（分块读取）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cell_ref_to_rowcol(ref: str) -> Tuple[int, int]:
+    """
+    单元格地址转 (行号, 列号)
+
+    示例:
+    - "C7" -> (7, 3)
+    - "$I$4" -> (4, 9)
+    """
+    match = _CELL_REF_PATTERN.match(ref.strip())
+    if not match:
+        raise ValueError(f"无效的单元格地址: {ref}")
+    return int(match.group(2)), column_letter_to_index(match.group(1))
+
+
+class WorkbookBackend(ABC):
+    """
+    工作簿后端基类
+
+    子类须实现抽象方法: sheet_names / read_range / write_range / save / close（缺少时实例化即报错）
+    单元格读写默认基于区域读写实现，子类可按需覆盖以减少开销。
+    """
+
+    engine = "base"
+
+    @abstractmethod
+    def sheet_names(self) -> List[str]:
+        """全部工作表名"""
+
+    def has_sheet(self, sheet: str) -> bool:
+        return sheet in self.sheet_names()
+
+    @abstractmethod
+    def read_range(
+        self,
+        sheet: str,
+        first_row: int,
+        first_col: int,
+        last_row: int,
+        last_col: int
+    ) -> List[List[Any]]:
+        """读取矩形区域，返回二维列表（行优先）"""
+
+    @abstractmethod
+    def write_range(
+        self,
+        sheet: str,
+        first_row: int,
+        first_col: int,
+        values: List[List[Any]]
+    ) -> None:
+        """从 (first_row, first_col) 开始写入二维列表"""
+
+    def read_formulas(
+        self,
+        sheet: str,
+        first_row: int,
+        first_col: int,
+        last_row: int,
+        last_col: int
+    ) -> List[List[Any]]:
+        """
+        读取区域的公式（非公式单元格返回常量）
+
+        与 write_formulas 配合，可整块回写而不破坏其中的公式单元格。
+        默认实现等同 read_range（适用于保留公式方式打开的后端）。
+        """
+        return self.read_range(sheet, first_row, first_col, last_row, last_col)
+
+    def write_formulas(
+        self,
+        sheet: str,
+        first_row: int,
+        first_col: int,
+        values: List[List[Any]]
+    ) -> None:
+        """整块写入公式/常量（"="开头视为公式），默认实现等同 write_range"""
+        self.write_range(sheet, first_row, first_col, values)
+
+    def read_range_with_formats(
+        self,
+        sheet: str,
+        first_row: int,
+        first_col: int,
+        last_row: int,
+        last_col: int
+    ) -> Tuple[List[List[Any]], List[List[str]]]:
+        """
+        读取区域的值与数字格式（两个同形二维列表）
+
+        默认实现数字格式全为 "General"（后端不支持读取格式时）。
+        """
+        values = self.read_range(sheet, first_row, first_col, last_row, last_col)
+        return values, [["General"] * len(row) for row in values]
+
+    def merged_ranges(self, sheet: str) -> List[Tuple[int, int, int, int]]:
+        """工作表中的合并区域 [(first_row, first_col, last_row, last_col)]，默认实现返回空列表"""
+        return []
+
+    def read_cell(self, sheet: str, row: int, col: int) -> Any:
+        return self.read_range(sheet, row, col, row, col)[0][0]
+
+    def write_cell(self, sheet: str, row: int, col: int, value: Any) -> None:
+        self.write_range(sheet, row, col, [[value]])
+
+    def read_ref(self, sheet: str, ref: str) -> Any:
+        """按地址读取单元格，如 read_ref("Z7", "I4")"""
+        return self.read_cell(sheet, *cell_ref_to_rowcol(ref))
+
+    def write_ref(self, sheet: str, ref: str, value: Any) -> None:
+        """按地址写入单元格，如 write_ref("Z10", "C7", "有限责任公司")"""
+        self.write_cell(sheet, *cell_ref_to_rowcol(ref), value)
+
+    @abstractmethod
+    def save(self, path: Optional[Path] = None) -> None:
+        """保存（path为None时保存到原文件）"""
+
+    @abstractmethod
+    def close(self, save: bool = False) -> None:
+        """关闭工作簿（save=True 时先保存）"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(save=False)
+        return False
+
+
+# =============================================================================
+# openpyxl 实现（纯Python）
+# =============================================================================
+
+class OpenpyxlWorkbookBackend(WorkbookBackend):
+    """
+    基于openpyxl的纯Python后端
+
+    Args:
+        path: 工作簿路径（.xlsx / .xlsm）
+        writable: False时以 data_only 读取公式缓存值（读取/比对/评分）；
+                  True时保留公式与VBA工程（写入Z3-2/Z10等）
+        read_only: 只读流式打开（只解析被读取的工作表，适合批量评分等只读几个区域的场景；
+                   只读模式下按行遍历，read_range 之外的逐单元格读取较慢）
+    """
+
+    engine = "openpyxl"
+
+    def __init__(self, path: Union[str, Path], writable: bool = False, read_only: bool = False):
+        import openpyxl
+
+        if writable and read_only:
+            raise ValueError("writable 与 read_only 不能同时为True")
+        self.path = Path(path)
+        self.writable = writable
+        self._wb = openpyxl.load_workbook(
+            str(self.path),
+            read_only=read_only,
+            data_only=not writable,
+            keep_vba=self.path.suffix.lower() == ".xlsm" and not read_only,
+        )
+
+    @property
+    def workbook(self):
+        """底层openpyxl Workbook对象"""
+        return self._wb
+
+    def sheet_names(self) -> List[str]:
+        return list(self._wb.sheetnames)
+
+    def _sheet(self, sheet: str):
+        if sheet not in self._wb.sheetnames:
+            raise KeyError(f"工作表不存在: {sheet}")
+        return self._wb[sheet]
+
+    def read_range(self, sheet, first_row, first_col, last_row, last_col):
+        ws = self._sheet(sheet)
+        return [
+            list(row)
+            for row in ws.iter_rows(
+                min_row=first_row, max_row=last_row,
+                min_col=first_col, max_col=last_col,
+                values_only=True,
+            )
+        ]
+
+    def read_range_with_formats(self, sheet, first_row, first_col, last_row, last_col):
+        ws = self._sheet(sheet)
+        values, formats = [], []
+        # 一次遍历同时取值与格式（只读模式下不重复解析工作表XML）
+        for row in ws.iter_rows(min_row=first_row, max_row=last_row, min_col=first_col, max_col=last_col):
+            values.append([cell.value for cell in row])
+            formats.append([getattr(cell, "number_format", None) or "General" for cell in row])
+        return values, formats
+
+    def merged_ranges(self, sheet):
+        ws = self._sheet(sheet)
+        if hasattr(ws, "merged_cells"):
+            return [(r.min_row, r.min_col, r.max_row, r.max_col) for r in ws.merged_cells.ranges]
+        # 只读模式不解析合并单元格：流式扫描工作表XML中的 <mergeCell ref="A1:D1"/>
+        from xml.etree.ElementTree import iterparse
+        from openpyxl.utils.cell import range_boundaries
+
+        ranges = []
+        with ws._get_source() as src:
+            for _, element in iterparse(src):
+                if element.tag.endswith("}mergeCell"):
+                    min_col, min_row, max_col, max_row = range_boundaries(element.get("ref"))
+                    ranges.append((min_row, min_col, max_row, max_col))
+                element.clear()
+        return ranges
+
+    def read_cell(self, sheet, row, col):
+        return self._sheet(sheet).cell(row=row, column=col).value
+
+    def write_range(self, sheet, first_row, first_col, values):
+        self._check_writable()
+        ws = self._sheet(sheet)
+        for r_offset, row_values in enumerate(values):
+            for c_offset, value in enumerate(row_values):
+                ws.cell(row=first_row + r_offset, column=first_col + c_offset, value=value)
+
+    def _check_writable(self):
+        if not self.writable:
+            raise RuntimeError("工作簿以只读(data_only)方式打开，写入会丢失公式，请使用 writable=True")
+
+    def save(self, path: Optional[Path] = None) -> None:
+        self._check_writable()
+        # 写入后公式缓存值失效，交由Excel下次打开时全量重算
+        self._wb.calculation.fullCalcOnLoad = True
+        self._wb.save(str(path or self.path))
+
+    def close(self, save: bool = False) -> None:
+        if save:
+            self.save()
+        self._wb.close()
+
+
+# =============================================================================
+# win32com 实现（仍需VBA宏的步骤）
+# =============================================================================
+
+class ComWorkbookBackend(WorkbookBackend):
+    """
+    包装已打开的COM工作簿对象
+
+    不负责Excel进程的启动与退出，由调用方管理生命周期。
+    """
+
+    engine = "com"
+
+    def __init__(self, workbook):
+        self._wb = workbook
+        self._sheets: Dict[str, Any] = {}
+
+    @property
+    def workbook(self):
+        """底层COM Workbook对象"""
+        return self._wb
+
+    def sheet_names(self) -> List[str]:
+        return [ws.Name for ws in self._wb.Worksheets]
+
+    def has_sheet(self, sheet: str) -> bool:
+        try:
+            self._sheet(sheet)
+            return True
+        except Exception:
+            return False
+
+    def _sheet(self, sheet: str):
+        if sheet not in self._sheets:
+            self._sheets[sheet] = self._wb.Sheets(sheet)
+        return self._sheets[sheet]
+
+    def read_range(self, sheet, first_row, first_col, last_row, last_col):
+        ws = self._sheet(sheet)
+        raw = ws.Range(ws.Cells(first_row, first_col), ws.Cells(last_row, last_col)).Value
+        # 单个单元格时COM直接返回标量
+        if not isinstance(raw, tuple):
+            return [[raw]]
+        return [list(row) for row in raw]
+
+    def read_cell(self, sheet, row, col):
+        return self._sheet(sheet).Cells(row, col).Value
+
+    def write_range(self, sheet, first_row, first_col, values):
+        if not values:
+            return
+        ws = self._sheet(sheet)
+        last_row = first_row + len(values) - 1
+        last_col = first_col + max(len(r) for r in values) - 1
+        ws.Range(ws.Cells(first_row, first_col), ws.Cells(last_row, last_col)).Value = values
+
+    def write_cell(self, sheet, row, col, value):
+        self._sheet(sheet).Cells(row, col).Value = value
+
+    def read_formulas(self, sheet, first_row, first_col, last_row, last_col):
+        ws = self._sheet(sheet)
+        raw = ws.Range(ws.Cells(first_row, first_col), ws.Cells(last_row, last_col)).Formula
+        if not isinstance(raw, tuple):
+            return [[raw]]
+        return [list(row) for row in raw]
+
+    def write_formulas(self, sheet, first_row, first_col, values):
+        if not values:
+            return
+        ws = self._sheet(sheet)
+        last_row = first_row + len(values) - 1
+        last_col = first_col + max(len(r) for r in values) - 1
+        ws.Range(ws.Cells(first_row, first_col), ws.Cells(last_row, last_col)).Formula = values
+
+    def save(self, path: Optional[Path] = None) -> None:
+        if path is None:
+            self._wb.Save()
+        else:
+            self._wb.SaveAs(str(Path(path).absolute()))
+
+    def close(self, save: bool = False) -> None:
+        self._wb.Close(SaveChanges=save)
+
+
+# =============================================================================
+# 工厂函数
+# =============================================================================
+
+def open_workbook(
+    path: Union[str, Path],
+    engine: str = "openpyxl",
+    writable: bool = False,
+    excel=None,
+    read_only: bool = False
+) -> WorkbookBackend:
+    """
+    打开工作簿并返回后端
+
+    Args:
+        path: 工作簿路径
+        engine: "openpyxl"（默认，无需Excel）或 "com"
+        writable: 是否需要写入（仅openpyxl区分）
+        excel: engine="com" 时使用的Excel.Application对象
+        read_only: openpyxl只读流式打开（仅读取少数区域时更快）
+    """
+    if engine == "openpyxl":
+        return OpenpyxlWorkbookBackend(path, writable=writable, read_only=read_only)
+    if engine == "com":
+        if excel is None:
+            raise ValueError("engine='com' 需要传入已启动的Excel.Application")
+        return ComWorkbookBackend(excel.Workbooks.Open(str(Path(path).absolute())))
+    raise ValueError(f"未知的工作簿引擎: {engine}")
+
+
+def as_backend(workbook) -> WorkbookBackend:
+    """已是后端则原样返回，否则视为COM工作簿对象进行包装"""
+    if isinstance(workbook, WorkbookBackend):
+        return workbook
+    return ComWorkbookBackend(workbook)
+
+
+# =============================================================================
+# 调用计数包装（基准测试/诊断用）
+# =============================================================================
+
+class CountingBackend(WorkbookBackend):
+    """
+    统计后端调用次数的包装器
+
+    COM后端每次调用都是一次跨进程往返，调用次数即主要开销。
+    calls 记录各方法的调用次数，如 {"read_cell": 140, "read_range": 1}。
+    """
+
+    def __init__(self, inner: WorkbookBackend):
+        self.inner = inner
+        self.engine = inner.engine
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, method: str) -> None:
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+    def sheet_names(self):
+        self._count("sheet_names")
+        return self.inner.sheet_names()
+
+    def has_sheet(self, sheet):
+        self._count("has_sheet")
+        return self.inner.has_sheet(sheet)
+
+    def read_range(self, sheet, first_row, first_col, last_row, last_col):
+        self._count("read_range")
+        return self.inner.read_range(sheet, first_row, first_col, last_row, last_col)
+
+    def read_cell(self, sheet, row, col):
+        self._count("read_cell")
+        return self.inner.read_cell(sheet, row, col)
+
+    def read_range_with_formats(self, sheet, first_row, first_col, last_row, last_col):
+        self._count("read_range_with_formats")
+        return self.inner.read_range_with_formats(sheet, first_row, first_col, last_row, last_col)
+
+    def merged_ranges(self, sheet):
+        self._count("merged_ranges")
+        return self.inner.merged_ranges(sheet)
+
+    def read_formulas(self, sheet, first_row, first_col, last_row, last_col):
+        self._count("read_formulas")
+        return self.inner.read_formulas(sheet, first_row, first_col, last_row, last_col)
+
+    def write_formulas(self, sheet, first_row, first_col, values):
+        self._count("write_formulas")
+        self.inner.write_formulas(sheet, first_row, first_col, values)
+
+    def write_range(self, sheet, first_row, first_col, values):
+        self._count("write_range")
+        self.inner.write_range(sheet, first_row, first_col, values)
+
+    def write_cell(self, sheet, row, col, value):
+        self._count("write_cell")
+        self.inner.write_cell(sheet, row, col, value)
+
+    def save(self, path=None):
+        self._count("save")
+        self.inner.save(path)
+
+    def close(self, save=False):
+        self._count("close")
+        self.inner.close(save=save)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+批量写入计划
+
+把逐单元格写入收集为计划，提交时合并为区域写入:
+    1. 别名解析：多个项目名映射到同一行时只写一次（后写入的覆盖先写入的）
+    2. 公式行跳过：小计/净额等公式计算行不写入
+    3. 区域合并：同一列相邻行合并为一次区域写入；
+       允许 max_gap 行以内的间隔，但间隔行必须全部是公式行或已知空行，
+       间隔行先读取公式再原样回写（其余间隔不跨越，避免改写未知单元格的值/格式）
+
+示例:
+    plan = WritePlan(skip_rows={"Z3-2": {166, 201}})
+    plan.add_mapped("Z3-2", 4, income_data, Z3_2_INCOME_MAPPING, source="利润表")
+    plan.commit(backend, max_gap=20)
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .workbook_backend import WorkbookBackend
+
+
+@dataclass
+class PlannedWrite:
+    """计划写入的单元格"""
+    sheet: str
+    row: int
+    col: int
+    value: Any
+    sources: List[str] = field(default_factory=list)
+
+
+@dataclass
+class WriteBlock:
+    """合并后的区域写入（单列连续行）"""
+    sheet: str
+    col: int
+    first_row: int
+    last_row: int
+    values: Dict[int, Any]
+
+    @property
+    def row_count(self) -> int:
+        return self.last_row - self.first_row + 1
+
+    @property
+    def has_gaps(self) -> bool:
+        return len(self.values) < self.row_count
+
+
+class WritePlan:
+    """
+    单元格写入计划
+
+    Args:
+        skip_rows: {工作表名: 行号集合}，这些行为公式计算行，计划中直接跳过
+        empty_rows: {工作表名: 行号集合}，模板中已知为空的行，区域合并时可跨越
+    """
+
+    def __init__(
+        self,
+        skip_rows: Optional[Dict[str, Iterable[int]]] = None,
+        empty_rows: Optional[Dict[str, Iterable[int]]] = None
+    ):
+        self.skip_rows: Dict[str, Set[int]] = {
+            sheet: set(rows) for sheet, rows in (skip_rows or {}).items()
+        }
+        self.empty_rows: Dict[str, Set[int]] = {
+            sheet: set(rows) for sheet, rows in (empty_rows or {}).items()
+        }
+        self.writes: Dict[Tuple[str, int, int], PlannedWrite] = {}
+        self.skipped: List[Tuple[str, str]] = []  # (来源项目, 原因)
+        self.duplicates: List[Tuple[str, int, List[str]]] = []  # 别名重复命中
+
+    def add(self, sheet: str, row: int, col: int, value: Any, source: str = "") -> bool:
+        """
+        加入一个单元格写入
+
+        Returns:
+            bool: 是否加入计划（公式行返回False）
+        """
+        if row in self.skip_rows.get(sheet, ()):
+            self.skipped.append((source, f"{sheet}行{row}为公式行"))
+            return False
+
+        key = (sheet, row, col)
+        planned = self.writes.get(key)
+        if planned is None:
+            self.writes[key] = PlannedWrite(sheet, row, col, value, [source])
+        else:
+            planned.value = value
+            planned.sources.append(source)
+        return True
+
+    def add_mapped(
+        self,
+        sheet: str,
+        col: int,
+        data: Dict[str, Any],
+        mapping: Dict[str, int],
+        source: str = ""
+    ) -> Set[int]:
+        """
+        按 {项目名: 行号} 映射加入一组数据
+
+        Returns:
+            Set[int]: 本组实际命中的目标行（已按别名去重）
+        """
+        rows: Set[int] = set()
+        for item_name, value in data.items():
+            row = mapping.get(item_name)
+            if row is None:
+                continue
+            label = f"{source}:{item_name}" if source else item_name
+            if self.add(sheet, row, col, value, label):
+                rows.add(row)
+        return rows
+
+    def _collect_duplicates(self) -> None:
+        self.duplicates = [
+            (w.sheet, w.row, list(w.sources))
+            for w in self.writes.values()
+            if len(w.sources) > 1
+        ]
+
+    def blocks(self, max_gap: int = 0) -> List[WriteBlock]:
+        """
+        合并为单列区域写入
+
+        Args:
+            max_gap: 允许合并的最大间隔行数（0=仅合并严格相邻行）；
+                     间隔行须全部为公式行（skip_rows）或已知空行（empty_rows）
+        """
+        by_column: Dict[Tuple[str, int], List[PlannedWrite]] = {}
+        for w in self.writes.values():
+            by_column.setdefault((w.sheet, w.col), []).append(w)
+
+        blocks: List[WriteBlock] = []
+        for (sheet, col), writes in by_column.items():
+            bridgeable = self.skip_rows.get(sheet, set()) | self.empty_rows.get(sheet, set())
+            writes.sort(key=lambda w: w.row)
+            current: Optional[WriteBlock] = None
+            for w in writes:
+                if current is not None and self._can_bridge(current.last_row, w.row, max_gap, bridgeable):
+                    current.last_row = w.row
+                    current.values[w.row] = w.value
+                else:
+                    current = WriteBlock(sheet, col, w.row, w.row, {w.row: w.value})
+                    blocks.append(current)
+        return blocks
+
+    @staticmethod
+    def _can_bridge(last_row: int, row: int, max_gap: int, bridgeable: Set[int]) -> bool:
+        gap = row - last_row - 1
+        if gap > max_gap:
+            return False
+        return all(r in bridgeable for r in range(last_row + 1, row))
+
+    def commit(self, backend: WorkbookBackend, max_gap: int = 0) -> int:
+        """
+        提交写入计划
+
+        含间隔的区域先读取该区域公式，间隔行（公式行/空行）原样回写。
+
+        Returns:
+            int: 区域写入次数
+        """
+        self._collect_duplicates()
+        blocks = self.blocks(max_gap=max_gap)
+
+        for block in blocks:
+            if block.has_gaps:
+                existing = backend.read_formulas(
+                    block.sheet, block.first_row, block.col, block.last_row, block.col
+                )
+                column_values = [
+                    [block.values[row]] if row in block.values else [existing[row - block.first_row][0]]
+                    for row in range(block.first_row, block.last_row + 1)
+                ]
+                backend.write_formulas(block.sheet, block.first_row, block.col, column_values)
+            else:
+                column_values = [
+                    [block.values[row]] for row in range(block.first_row, block.last_row + 1)
+                ]
+                backend.write_range(block.sheet, block.first_row, block.col, column_values)
+
+        return len(blocks)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""opencpai_pipeline 测试（python -m pytest tests）：包位于 scripts/experimental 下，不需要安装"""
+
+import sys
+from pathlib import Path
+
+PIPELINE_ROOT = Path(__file__).resolve().parents[1] / "scripts" / "experimental"
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+if str(PIPELINE_ROOT) not in sys.path:
+    sys.path.insert(0, str(PIPELINE_ROOT))
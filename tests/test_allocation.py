@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""底稿分配：前缀选取、明细行容量、合计行含溢出科目"""
+
+import pytest
+
+from opencpai_pipeline.allocation import AllocationRule, allocate
+from opencpai_pipeline.fixtures import synth_trial_balance
+from opencpai_pipeline.km_table import build_km_table
+
+
+@pytest.fixture(scope="module")
+def km():
+    return build_km_table(synth_trial_balance(2000, seed=7)).table
+
+
+def _leaf_rows(km, prefixes):
+    codes = km["科目编码"].astype(str)
+    mask = (km["是否末级"] == "是") & codes.str.startswith(tuple(prefixes))
+    mask &= (km[["期初余额", "期末余额"]].astype(float).abs() >= 0.01).any(axis=1)
+    return km[mask].sort_values("科目编码")
+
+
+def test_overflow_total_includes_all_selected_accounts(km):
+    prefixes = ("1001", "1002", "1012")
+    expected = _leaf_rows(km, prefixes)
+    assert len(expected) > 5
+    rule = AllocationRule("货币资金", prefixes, first_row=8, columns={"科目编码": "A", "期末余额": "E"},
+                          max_rows=5, total_row=20)
+    result = allocate(km, [rule])
+
+    assert result.overflow == [("货币资金", len(expected) - 5)]
+    assert result.sheets["货币资金"].accounts == 5
+    writes = result.plan.writes
+    assert [writes[("货币资金", 8 + i, 1)].value for i in range(5)] == expected["科目编码"].head(5).tolist()
+    total = writes[("货币资金", 20, 5)].value
+    assert total == pytest.approx(round(expected["期末余额"].astype(float).sum(), 2))
+
+
+def test_unused_detail_rows_are_cleared(km):
+    rule = AllocationRule("固定资产", ("1601",), first_row=10, columns={"期末余额": 5}, max_rows=200)
+    result = allocate(km, [rule])
+    n = result.sheets["固定资产"].accounts
+    writes = result.plan.writes
+    assert 0 < n < 200
+    assert all(writes[("固定资产", 10 + i, 5)].value is None for i in range(n, 200))
+
+
+def test_unallocated_first_level_accounts(km):
+    result = allocate(km, [AllocationRule("货币资金", ("1001", "1002"), 8, {"期末余额": "E"})])
+    first = km[(km["级次"] == 1) & (km[["期初余额", "期末余额"]].astype(float).abs() >= 0.01).any(axis=1)]
+    expected = set(first["科目编码"].astype(str)) - {"1001", "1002"}
+    assert set(result.unallocated["科目编码"]) == expected
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""检查报告xlsx：两种版式读回校验冻结窗格、自动筛选、金额格式与工作表名去重"""
+
+import openpyxl
+import pytest
+
+from opencpai_pipeline.check_report import AMOUNT_FORMAT, ReportTable, write_check_report_xlsx
+
+HEADERS = ["项目", "财务报表", "Z3-2", "差异"]
+ROWS = [["货币资金", 1200.0, 1100.0, 100.0], ["应收账款", 2500.0, 2500.5, -0.5]]
+LONG_TITLE = "一、财务报表 vs Z3-2期末 对比（资产负债表全部项目）"
+
+
+def _tables():
+    return [
+        ReportTable(LONG_TITLE, HEADERS, ROWS),
+        ReportTable(LONG_TITLE, HEADERS, ROWS[:1]),
+        ReportTable("二、上年审计报告 vs Z3-2期初 对比", HEADERS, []),
+        ReportTable("x", HEADERS, ROWS, sheet="Z3-5/附注"),
+        ReportTable("y", HEADERS, ROWS, sheet="z3-5_附注"),
+    ]
+
+
+@pytest.mark.parametrize("subtitle", ["", "生成时间: 2024-03-01 10:00"])
+def test_sections_layout(tmp_path, subtitle):
+    path = write_check_report_xlsx(tmp_path / "检查报告.xlsx", "审计底稿检查报告", _tables(),
+                                   subtitle=subtitle, layout="sections")
+    wb = openpyxl.load_workbook(path)
+    # 截断到31个字符后重名加序号；Excel工作表名不区分大小写
+    assert wb.sheetnames == [
+        LONG_TITLE[:31], LONG_TITLE[:28] + "(2)", "二、上年审计报告 vs Z3-2期初 对比", "Z3-5_附注", "z3-5_附注(2)",
+    ]
+
+    header_row = 5 if subtitle else 4
+    ws = wb[LONG_TITLE[:31]]
+    assert [c.value for c in ws[header_row]] == HEADERS
+    assert ws.freeze_panes == f"A{header_row + 1}"
+    assert ws.auto_filter.ref == f"A{header_row}:D{header_row + 2}"
+    assert ws.cell(header_row + 1, 2).value == 1200.0
+    assert ws.cell(header_row + 1, 2).number_format == AMOUNT_FORMAT
+    assert ws.cell(header_row + 1, 1).number_format == "General"
+    assert wb[LONG_TITLE[:28] + "(2)"].auto_filter.ref == f"A{header_row}:D{header_row + 1}"
+
+    # 无数据的节：只有提示文字，不冻结、不筛选
+    empty = wb["二、上年审计报告 vs Z3-2期初 对比"]
+    assert empty.freeze_panes is None
+    assert empty.auto_filter.ref is None
+    assert empty.cell(header_row, 1).value == "✓ 无差异"
+
+
+@pytest.mark.parametrize("subtitle", ["", "生成时间: 2024-03-01 10:00"])
+def test_single_layout(tmp_path, subtitle):
+    tables = _tables()[2:4]
+    path = write_check_report_xlsx(tmp_path / "检查报告.xlsx", "审计底稿检查报告", tables, subtitle=subtitle)
+    wb = openpyxl.load_workbook(path)
+    assert wb.sheetnames == ["检查报告"]
+    ws = wb["检查报告"]
+    assert ws.freeze_panes is None
+
+    values = [[c.value for c in row] for row in ws.iter_rows()]
+    offset = 1 if subtitle else 0
+    assert values[0][0] == "审计底稿检查报告"
+    assert values[2 + offset][0] == "二、上年审计报告 vs Z3-2期初 对比"
+    assert values[3 + offset][0] == "✓ 无差异"
+    # 节之间空一行
+    assert values[5 + offset][0] == "x"
+    assert values[6 + offset] == HEADERS
+    assert ws.cell(8 + offset, 4).number_format == AMOUNT_FORMAT
+
+
+def test_unknown_layout(tmp_path):
+    with pytest.raises(ValueError):
+        write_check_report_xlsx(tmp_path / "检查报告.xlsx", "标题", _tables(), layout="grid")
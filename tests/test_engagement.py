@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""批量项目识别：输出目录与项目名按相对路径区分同名公司目录"""
+
+from opencpai_pipeline.engagement import discover_engagements
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+
+
+def test_same_named_dirs_in_different_subtrees_get_distinct_outputs(tmp_path):
+    root = tmp_path / "样本"
+    for group in ("2023", "2024"):
+        _touch(root / group / "深圳测试科技有限公司" / "科目余额表.xlsx")
+        _touch(root / group / "深圳测试科技有限公司" / "~$科目余额表.xlsx")
+    _touch(root / "科目余额表.xlsx")
+
+    engagements = discover_engagements(root, tmp_path / "输出")
+    outputs = sorted(e.output_dir for e in engagements)
+    assert outputs == sorted([
+        tmp_path / "输出" / "样本",
+        tmp_path / "输出" / "2023" / "深圳测试科技有限公司",
+        tmp_path / "输出" / "2024" / "深圳测试科技有限公司",
+    ])
+    assert all(not e.balance_file.name.startswith("~$") for e in engagements)
+    # 项目名（汇总行、run_id）同样按相对路径区分
+    assert sorted(e.name for e in engagements) == ["2023/深圳测试科技有限公司", "2024/深圳测试科技有限公司", "样本"]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Excel实例池：租用上限、到期回收、失效替换、宏超时（假Excel实例，不需要Windows）"""
+
+import sys
+import threading
+import types
+
+import pytest
+
+from opencpai_pipeline import excel_pool
+from opencpai_pipeline.excel_pool import ExcelInstance, ExcelPool, MacroTimeoutError
+
+
+class _FakeWorkbooks:
+    Count = 0
+
+
+class _FakeExcel:
+    """Excel.Application 替身：Run 在 block 置位时阻塞，直到进程被结束"""
+
+    def __init__(self):
+        self.Ready = True
+        self.Workbooks = _FakeWorkbooks()
+        self.Application = self
+        self.block = False
+        self.killed = threading.Event()
+        self.quit_called = False
+
+    def Run(self, name, *args):
+        if self.block:
+            self.killed.wait(5)
+            raise RuntimeError("RPC服务器不可用")
+        return name
+
+    def Quit(self):
+        self.quit_called = True
+
+
+class _FakeInstance(ExcelInstance):
+    def start(self):
+        if self.excel is None:
+            self.excel = _FakeExcel()
+        return self.excel
+
+    def kill(self):
+        super().kill()
+        self.excel.killed.set()
+
+
+@pytest.fixture(autouse=True)
+def fake_excel(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pythoncom", types.SimpleNamespace(CoInitialize=lambda: None,
+                                                                        CoUninitialize=lambda: None))
+    monkeypatch.setattr(excel_pool, "ExcelInstance", _FakeInstance)
+
+
+def test_instances_are_recycled_after_max_jobs():
+    with ExcelPool(size=1, max_jobs=2) as pool:
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            pass
+        assert second is first
+        assert first.excel is None        # 第2次租用后到期退出
+        with pool.lease() as third:
+            assert third is not first
+        stats = pool.stats()
+    # 回收后立即补充预热实例，3次租用均为预热实例
+    assert (stats["started"], stats["recycled"], stats["warm_leases"], stats["idle"]) == (2, 1, 3, 1)
+
+
+def test_broken_instance_is_replaced_on_release():
+    with ExcelPool(size=1) as pool:
+        with pool.lease() as instance:
+            excel = instance.excel
+            instance.broken = True
+        assert excel.quit_called is False       # 失效实例不再发起COM调用，直接结束
+        assert pool.stats()["replaced"] == 1
+        with pool.lease() as replacement:
+            assert replacement is not instance
+
+        # 空闲实例健康检查未通过：租用时替换
+        pool._idle[0].excel.Ready = False
+        with pool.lease():
+            pass
+        assert pool.stats()["replaced"] == 2
+
+
+def test_size_limit_and_closed_pool():
+    pool = ExcelPool(size=1, prestart=False).start()
+    instance = pool.acquire()
+    with pytest.raises(RuntimeError, match="均已租出"):
+        pool.acquire()
+    pool.release(instance)
+    assert pool.acquire() is instance
+    pool.close()
+    with pytest.raises(RuntimeError, match="已关闭"):
+        pool.acquire()
+
+
+def test_macro_timeout_kills_instance():
+    with ExcelPool(size=1) as pool:
+        with pool.lease() as instance:
+            assert instance.run_macro("KMSCB", timeout_s=5) == "KMSCB"
+            instance.excel.block = True
+            with pytest.raises(MacroTimeoutError, match="宏 KMSCB"):
+                instance.run_macro("KMSCB", timeout_s=0.05)
+            assert instance.broken
+        stats = pool.stats()
+    assert (stats["replaced"], stats["started"]) == (1, 2)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+KM表：手工计算的回归样本（fixtures/km_small.xlsx）、上下级合计校验
+
+样本中的KM表按 km_table 推断的列布局与口径手工算出，不是KMSCB宏的输出，只防止引擎口径被意外改动；
+与宏的一致性仍以 scripts/experimental/golden_km_table.py 对照宏生成的底稿为准（KM_ENGINE 切换为 "python" 之前）。
+"""
+
+import pandas as pd
+import pytest
+
+from conftest import FIXTURES_DIR
+from opencpai_pipeline.km_table import build_km_table, compare_km_tables
+
+KM_FIXTURE = FIXTURES_DIR / "km_small.xlsx"
+
+
+@pytest.fixture(scope="module")
+def balance():
+    return pd.read_excel(KM_FIXTURE, sheet_name="余额表", dtype={"科目编码": str})
+
+
+def test_matches_hand_computed_km_table(balance):
+    expected = pd.read_excel(KM_FIXTURE, sheet_name="KM", dtype={"科目编码": str})
+    km = build_km_table(balance)
+
+    assert compare_km_tables(expected, km.table).empty
+    assert len(km.table) == len(expected)
+    # 合计行无编码，不进入KM表
+    assert km.dropped_rows == 1
+    assert km.inconsistencies.empty
+
+
+def test_first_level_summary_uses_leaf_accounts(balance):
+    first = build_km_table(balance).first_level.set_index("一级科目编码")
+    assert first.loc["1002", "期末余额"] == pytest.approx(8500)
+    assert first.loc["1122", ["期初余额", "期末余额"]].tolist() == pytest.approx([1700, 2000])
+    # 期末为0时按期初方向，期初也为0时按科目类别
+    assert first.loc[["2221", "6001", "6602"], "方向"].tolist() == ["贷", "贷", "借"]
+
+
+def test_parent_mismatch_is_reported(balance):
+    broken = balance.copy()
+    broken.loc[broken["科目编码"] == "1002", "期末借方"] = 8600
+    diffs = build_km_table(broken).inconsistencies
+    assert diffs[["科目编码", "列"]].values.tolist() == [["1002", "期末借方"]]
+    assert diffs["差异"].tolist() == pytest.approx([100])
+
+
+def test_compare_reports_missing_and_changed_rows(balance):
+    table = build_km_table(balance).table
+    changed = table[table["科目编码"] != "4001"].copy()
+    changed.loc[changed["科目编码"] == "1001", "期末余额"] = 1300
+    diffs = compare_km_tables(table, changed)
+    assert diffs[["科目编码", "列"]].values.tolist() == [["4001", "<缺行>"], ["1001", "期末余额"]]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""报表项目匹配：规范化、精确优先、最长子串、歧义标记"""
+
+import pytest
+
+from opencpai_pipeline.line_item_matcher import LineItemMatcher, normalize_item_name
+
+KEYS = ["货币资金", "应收账款", "流动资产合计", "非流动资产合计", "预收款项", "资产总计", "其他应收款"]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return LineItemMatcher(KEYS, aliases={"预收账款": "预收款项"})
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("  货币 资金 ", "货币资金"),
+    ("一、流动资产合计", "流动资产合计"),
+    ("（二）应收账款", "应收账款"),
+    ("1.应收账款", "应收账款"),
+    ("应收账款（净额）", "应收账款(净额)"),
+])
+def test_normalize(text, expected):
+    assert normalize_item_name(text) == expected
+
+
+@pytest.mark.parametrize("text, key, kind", [
+    ("货币资金", "货币资金", "exact"),
+    ("三、非流动资产合计", "非流动资产合计", "exact"),
+    ("预收账款", "预收款项", "exact"),
+    # 子串匹配取最长候选："非流动资产合计" 不会落到 "流动资产合计"
+    ("其中：非流动资产合计数", "非流动资产合计", "substring"),
+    ("其他应收款-关联方", "其他应收款", "substring"),
+])
+def test_match(matcher, text, key, kind):
+    match = matcher.match(text)
+    assert (match.key, match.kind, match.ambiguous) == (key, kind, False)
+
+
+def test_ambiguous_longest_candidates_take_leftmost(matcher):
+    match = matcher.match("应收账款及货币资金")
+    assert match.key == "应收账款"
+    assert match.ambiguous
+    assert match.candidates == ["应收账款", "货币资金"]
+
+
+def test_no_match(matcher):
+    assert matcher.classify(["", "未分配利润", None]) == [None, None, None]
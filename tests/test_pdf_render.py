@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""PDF渲染：数字格式（百分比/千分位）、短单元格不建Paragraph、大表分块跨页"""
+
+import re
+
+import pytest
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate
+
+from opencpai_pipeline.check_report import ReportTable
+from opencpai_pipeline.pdf_render import (
+    _cell_text,
+    _format_amount,
+    _styles,
+    register_cjk_font,
+    render_check_report_pdf,
+)
+
+
+@pytest.mark.parametrize("value, number_format, expected", [
+    (0.125, "0.00%", "12.50%"),
+    (0.0312, "0.0%", "3.1%"),
+    (0.5, "0%", "50%"),
+    (1234.5, "#,##0.00", "1,234.50"),
+    (1234.5, "#,##0", "1,234"),
+    (1234.5, "General", "1234.5"),
+])
+def test_format_amount(value, number_format, expected):
+    assert _format_amount(value, number_format) == expected
+
+
+def test_short_cells_are_plain_strings():
+    font = register_cjk_font()
+    styles = _styles(font)
+    assert _cell_text("货币资金", font, styles, 200) == "货币资金"
+    assert _cell_text("", font, styles, 200) == ""
+    assert isinstance(_cell_text("货币资金" * 20, font, styles, 200), Paragraph)
+    assert isinstance(_cell_text("第一行\n第二行", font, styles, 200), Paragraph)
+
+
+def _page_count(path):
+    return len(re.findall(rb"/Type /Page\b", path.read_bytes()))
+
+
+def test_chunked_table_paginates_like_long_table(tmp_path):
+    headers = ["项目", "财务报表", "Z3-2期末", "差异", "说明"]
+    rows = [[f"应收账款{i}", 1234.5 * i, 1000.0, 0.5, "长说明文字需要换行显示" * 4 if i % 37 == 0 else "差异"]
+            for i in range(1500)]
+    chunked = render_check_report_pdf(tmp_path / "chunked.pdf", "检查报告", [ReportTable("对比", headers, rows)])
+
+    # 对照：同样的单元格放进一个 LongTable
+    font = register_cjk_font()
+    styles = _styles(font)
+    width = 595.27 - 72
+    col_widths = [width * 0.4] + [width * 0.15] * 4
+    data = [[_cell_text(str(v) if not isinstance(v, float) else _format_amount(v), font, styles, w)
+             for v, w in zip(row, col_widths)] for row in [headers] + rows]
+    reference = tmp_path / "reference.pdf"
+    doc = SimpleDocTemplate(str(reference), leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36)
+    doc.build([Paragraph("检查报告", styles["title"]), Paragraph("对比", styles["heading"]),
+               LongTable(data, colWidths=col_widths, repeatRows=1,
+                         style=[("FONTNAME", (0, 0), (-1, -1), font), ("FONTSIZE", (0, 0), (-1, -1), 9)])])
+
+    assert _page_count(chunked) == _page_count(reference) > 20
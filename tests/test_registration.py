@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""工商查询客户端：并发请求合并、缓存有效期、主动失效（本地HTTP桩服务器）"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from opencpai_pipeline.registration import BusinessRegistrationClient, RegistrationCache
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        keyword = parse_qs(urlparse(self.path).query).get("keyword", [""])[0]
+        with server.lock:
+            server.hits.append(keyword)
+        # 放行前阻塞，保证并发查询在同一请求进行中到达
+        server.release.wait(5)
+        body = json.dumps({
+            "success": True,
+            "code": 200,
+            "data": {"data": {"companyName": keyword, "creditNo": "91440300TEST"}},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.hits = []
+    server.lock = threading.Lock()
+    server.release = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_client(stub_server, tmp_path):
+    clients = []
+
+    def _make(ttl_seconds=3600):
+        cache = RegistrationCache(tmp_path / "z10", ttl_seconds=ttl_seconds)
+        client = BusinessRegistrationClient(f"http://127.0.0.1:{stub_server.server_port}/", "test", cache=cache)
+        clients.append(client)
+        return client
+
+    yield _make
+    for client in clients:
+        client.close()
+
+
+def test_concurrent_submits_share_one_request(stub_server, make_client):
+    client = make_client()
+    names = ["深圳测试（香港）科技有限公司"] * 5 + ["深圳测试(香港)科技有限公司", " 深圳测试（香港）科技 有限公司"]
+    futures = [client.submit(name) for name in names]
+    # 规范化后同一公司：请求进行中共用一个Future
+    assert len({id(f) for f in futures}) == 1
+
+    stub_server.release.set()
+    results = [f.result(timeout=5) for f in futures]
+    assert all(r["creditNo"] == "91440300TEST" for r in results)
+    assert stub_server.hits == ["深圳测试（香港）科技有限公司"]
+    # 完成后移出进行中表，再查走磁盘缓存
+    assert client.lookup("深圳测试(香港)科技有限公司") is not None
+    assert len(stub_server.hits) == 1
+
+
+def test_cache_hit_skips_api_and_ttl_expiry_refetches(stub_server, make_client):
+    stub_server.release.set()
+    client = make_client(ttl_seconds=3600)
+    assert client.lookup("深圳测试科技有限公司")["companyName"] == "深圳测试科技有限公司"
+    assert client.lookup("深圳测试科技有限公司") is not None
+    assert len(stub_server.hits) == 1
+
+    expired = make_client(ttl_seconds=0.05)
+    time.sleep(0.1)
+    assert expired.lookup("深圳测试科技有限公司") is not None
+    assert len(stub_server.hits) == 2
+
+
+def test_invalidate_forces_new_request(stub_server, make_client):
+    stub_server.release.set()
+    client = make_client()
+    client.lookup("深圳测试科技有限公司")
+    client.lookup("广州测试贸易有限公司")
+    assert len(stub_server.hits) == 2
+
+    assert client.invalidate("深圳测试科技有限公司") == 1
+    assert client.invalidate("深圳测试科技有限公司") == 0
+    client.lookup("深圳测试科技有限公司")
+    client.lookup("广州测试贸易有限公司")
+    assert len(stub_server.hits) == 3
+
+    assert client.invalidate() == 2
+    client.lookup("广州测试贸易有限公司")
+    assert len(stub_server.hits) == 4
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""财审报告提取：只读打开底稿，区域内的合并单元格与数字格式照搬到报告"""
+
+import openpyxl
+
+from opencpai_pipeline.report_extract import ReportSection, extract_report
+
+
+def _workpaper(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "审计报告"
+    ws["A1"] = "资产负债表"
+    ws.merge_cells("A1:C1")
+    ws.merge_cells("A20:C21")       # 区域外，不复制
+    ws.merge_cells("B3:D3")         # 跨出区域，不复制
+    ws.append([])
+    ws["A4"], ws["B4"], ws["C4"] = "货币资金", 1234.5, 0.125
+    ws["C4"].number_format = "0.00%"
+    ws["A5"], ws["B5"], ws["C5"] = "应收账款", 0, None
+    ws["A6"], ws["B6"] = "合计", 1234.5
+    ws["B6"].number_format = "#,##0"
+    wb.save(path)
+
+
+def test_extract_copies_merges_and_number_formats(tmp_path):
+    source = tmp_path / "底稿.xlsx"
+    _workpaper(source)
+    section = ReportSection("审计报告", first_row=1, last_row=6, first_col="A", last_col="C",
+                            amount_cols=["B"], keep_rows=[1, 6], header_rows=1)
+
+    result = extract_report(source, [section], tmp_path / "out", "深圳测试科技有限公司", "2024")
+    assert result.path.name == "【财审报告】深圳测试科技有限公司(2024第1版).xlsx"
+    assert result.sections["审计报告"] == (6, 3)
+
+    ws = openpyxl.load_workbook(result.path)["审计报告"]
+    assert [str(r) for r in ws.merged_cells.ranges] == ["A1:C1"]
+    assert ws["C4"].number_format == "0.00%"
+    assert ws["B4"].number_format == "#,##0.00"
+    assert ws["B6"].number_format == "#,##0"
+    assert ws.row_dimensions[5].hidden and not ws.row_dimensions[4].hidden
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""阶段调度器：并发执行、workbook阶段在调用线程串行、失败传播、输入校验、底稿通道缓存重放"""
+
+import threading
+import time
+
+import pytest
+
+from opencpai_pipeline.scheduler import Stage, StageError, StageScheduler
+from opencpai_pipeline.stage_cache import StageCache
+
+
+def test_independent_stages_run_concurrently():
+    # 两个阶段须同时到达屏障才能继续：串行执行时屏障超时
+    barrier = threading.Barrier(2, timeout=5)
+
+    def left():
+        barrier.wait()
+        return "L"
+
+    def right():
+        barrier.wait()
+        time.sleep(0.05)
+        return "R"
+
+    stages = [
+        Stage("left", left, outputs=("l",)),
+        Stage("right", right, outputs=("r",)),
+        Stage("join", lambda l, r: l + r, inputs=("l", "r"), outputs=("lr",)),
+    ]
+    result = StageScheduler(stages, io_workers=2).run()
+    assert result.values["lr"] == "LR"
+    assert {r.executor for r in result.records.values()} == {"thread"}
+    # 较慢的 right 放行了 join
+    assert result.critical_path == ["right", "join"]
+
+
+def test_workbook_stages_run_on_caller_thread_in_order():
+    threads, order = [], []
+
+    def workbook_stage(tag):
+        def run(**kwargs):
+            threads.append(threading.current_thread().name)
+            order.append(tag)
+            return tag
+        return run
+
+    stages = [
+        Stage("open", workbook_stage("open"), outputs=("wb",), kind="workbook"),
+        Stage("parse", lambda: "parsed", outputs=("data",)),
+        Stage("write", workbook_stage("write"), inputs=("wb", "data"), outputs=("written",), kind="workbook"),
+        Stage("save", workbook_stage("save"), inputs=("written",), outputs=("path",), kind="workbook"),
+    ]
+    result = StageScheduler(stages).run()
+    assert threads == [threading.current_thread().name] * 3
+    assert order == ["open", "write", "save"]
+    assert [result.records[n].executor for n in ("open", "write", "save")] == ["caller"] * 3
+
+
+def test_failing_stage_raises_stage_error_and_skips_dependents():
+    def broken(text):
+        raise KeyError("营业收入")
+
+    stages = [
+        Stage("read", lambda: "text", outputs=("text",)),
+        Stage("parse", broken, inputs=("text",), outputs=("rows",)),
+        Stage("write", lambda rows: rows, inputs=("rows",), outputs=("written",), kind="workbook"),
+        Stage("other", lambda: 1, outputs=("other",)),
+    ]
+    with pytest.raises(StageError) as info:
+        StageScheduler(stages).run()
+    error = info.value
+    assert error.stage == "parse"
+    assert isinstance(error.cause, KeyError)
+    records = error.result.records
+    assert (records["read"].status, records["parse"].status, records["write"].status) == ("ok", "failed", "skipped")
+    assert error.result.values["text"] == "text"
+
+
+def test_invalid_graphs_are_rejected():
+    stages = [Stage("parse", lambda text: text, inputs=("text",), outputs=("rows",))]
+    with pytest.raises(ValueError, match="输入无来源"):
+        StageScheduler(stages).run()
+    assert StageScheduler(stages).run({"text": "a"}).values["rows"] == "a"
+
+    with pytest.raises(ValueError, match="多个阶段产出"):
+        StageScheduler([Stage("a", lambda: 1, outputs=("x",)), Stage("b", lambda: 2, outputs=("x",))])
+    with pytest.raises(ValueError, match="成环"):
+        StageScheduler([
+            Stage("a", lambda y: y, inputs=("y",), outputs=("x",)),
+            Stage("b", lambda x: x, inputs=("x",), outputs=("y",)),
+        ])
+
+
+def test_workbook_lane_replays_cached_stages_after_a_miss(tmp_path):
+    calls = []
+
+    def open_workpaper(template):
+        calls.append("open")
+        return f"{template}+opened"
+
+    def write_prior(workpaper, prior):
+        calls.append("write")
+        return f"{workpaper}+{prior}"
+
+    def run(prior):
+        calls.clear()
+        stages = [
+            Stage("open", open_workpaper, inputs=("template",), outputs=("workpaper",), kind="workbook", cache=True),
+            Stage("write", write_prior, inputs=("workpaper", "prior"), outputs=("written",), kind="workbook",
+                  cache=True),
+        ]
+        return StageScheduler(stages, cache=StageCache(tmp_path / "cache")).run({"template": "T", "prior": prior})
+
+    run("2023")
+    assert calls == ["open", "write"]
+
+    cached = run("2023")
+    assert calls == []
+    assert cached.cached() == ["open", "write"]
+
+    # write 未命中：底稿须从头构建，已命中缓存的 open 先重放
+    result = run("2023修正")
+    assert calls == ["open", "write"]
+    assert (result.records["open"].status, result.records["open"].replayed) == ("ok", True)
+    assert result.values["written"] == "T+opened+2023修正"
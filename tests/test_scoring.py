@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""评分引擎：默认规则在小底稿上的各维度得分、缺失工作表与比对差异、JSON方案、批量评分"""
+
+import json
+
+import openpyxl
+import pytest
+
+from opencpai_pipeline.scoring import default_scheme, load_scoring_scheme, score_workpaper, score_workpapers
+
+MAPPING = {"货币资金": 7, "应收账款": 8, "预收款项": 9}
+BALANCE = {"货币资金": 1200.0, "应收账款": 2500.0, "预收账款": 500.0}
+
+
+def _workpaper(path, z35_diffs=0, drop=()):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    z7 = wb.create_sheet("Z7")
+    for ref in ("I4", "I5", "J4", "J5"):
+        z7[ref] = "勾稽正确"
+
+    z32 = wb.create_sheet("Z3-2")
+    z32["A5"], z32["C5"], z32["D5"] = "项目", "年末余额", "年初余额"
+    for (item, row), value in zip(MAPPING.items(), BALANCE.values()):
+        z32.cell(row, 1, item)
+        z32.cell(row, 3, value)
+        z32.cell(row, 4, value - 100)
+
+    z34 = wb.create_sheet("Z3-4")
+    z34["A7"], z34["A10"] = "深圳测试科技有限公司成立于2010年", "经营范围：软件开发"
+
+    z35 = wb.create_sheet("Z3-5")
+    z35["A5"], z35["I5"], z35["J5"] = "项目", "差异", "说明"
+    for i in range(z35_diffs):
+        z35.cell(7 + i, 1, f"附注{i + 1}")
+        z35.cell(7 + i, 9, 10.0)
+    for name in drop:
+        wb.remove(wb[name])
+    wb.save(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def scheme():
+    return default_scheme(MAPPING, {"预收账款": "预收款项"})
+
+
+def test_clean_workpaper_scores_full_marks(tmp_path, scheme):
+    prior = {item: value - 100 for item, value in BALANCE.items()}
+    context = {"balance_sheet": BALANCE, "prior_balance": prior, "subject_mapping_ratio": 1.0}
+    card = score_workpaper(_workpaper(tmp_path / "底稿.xlsx"), scheme, context)
+    assert card.error is None
+    assert (card.total, card.total_max) == (100, 100)
+
+
+def test_missing_sheet_diffs_and_missing_context(tmp_path, scheme):
+    path = _workpaper(tmp_path / "底稿.xlsx", z35_diffs=3, drop=("Z7",))
+    balance = dict(BALANCE, 货币资金=1300.0)
+    card = score_workpaper(path, scheme, {"balance_sheet": balance, "subject_mapping_ratio": 0.5})
+    scores = {name: d.actual for name, d in card.dimensions.items()}
+
+    assert scores["D1_报表平衡"] == 0
+    assert "Z7工作表不存在" in card.dimensions["D1_报表平衡"].details
+    # 3处差异，每处扣10%
+    assert scores["D5_附注平衡"] == 7
+    # 无上年数据的比对规则不参与平均：3项中1项不一致
+    assert scores["D6_数据比对"] == 20
+    assert any("货币资金: 差异100.00" in d for d in card.dimensions["D6_数据比对"].details)
+    # 项目行全部一致（1.0）与映射得分率（0.5）平均
+    assert scores["D3_科目映射"] == 8
+
+
+def test_json_scheme_and_batch(tmp_path):
+    scheme = load_scoring_scheme(_write(tmp_path / "规则.json", [
+        {"dimension": "D1_报表平衡", "check": "contains", "sheet": "Z7", "cells": ["I4"], "keywords": ["正确"]},
+    ]))
+    good = _workpaper(tmp_path / "底稿.xlsx")
+
+    cards = score_workpapers([(good, None), (tmp_path / "不存在.xlsx", None)], scheme, max_workers=1)
+    assert cards[0].dimensions["D1_报表平衡"].actual == 30
+    assert cards[1].error and cards[1].total == 0
+
+    with pytest.raises(ValueError):
+        load_scoring_scheme(_write(tmp_path / "坏.json", [{"dimension": "D1_报表平衡", "check": "nope"}]))
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""阶段缓存：缓存键按阶段函数源码与声明的依赖计算，改动只使相关阶段重跑"""
+
+import importlib.util
+
+from opencpai_pipeline.scheduler import Stage, StageScheduler
+from opencpai_pipeline.stage_cache import RunManifest, StageCache, fingerprint_value, function_version
+
+
+def _load_function(path, body):
+    path.write_text(f"def transform(text):\n    return {body}\n", encoding="utf-8")
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.transform
+
+
+def test_function_version_follows_source(tmp_path):
+    upper = _load_function(tmp_path / "v1.py", "text.upper()")
+    same = _load_function(tmp_path / "v2.py", "text.upper()")
+    lower = _load_function(tmp_path / "v3.py", "text.lower()")
+    assert function_version(upper) == function_version(same)
+    assert function_version(upper) != function_version(lower)
+    assert fingerprint_value((upper, {"营业收入": 4})) != fingerprint_value((lower, {"营业收入": 4}))
+
+
+def test_only_affected_stages_rerun(tmp_path):
+    calls = []
+    mapping = {"营业收入": 4}
+
+    def read(source):
+        calls.append("read")
+        return source * 2
+
+    def write(converted):
+        calls.append("write")
+        return {name: (converted, row) for name, row in mapping.items()}
+
+    def run(transform):
+        def convert(text):
+            calls.append("convert")
+            return transform(text)
+
+        calls.clear()
+        stages = [
+            Stage("read", read, inputs=("source",), outputs=("text",), cache=True),
+            Stage("convert", convert, inputs=("text",), outputs=("converted",), cache=True, fingerprint=(transform,)),
+            Stage("write", write, inputs=("converted",), outputs=("rows",), cache=True, fingerprint=(mapping,)),
+        ]
+        return StageScheduler(stages, cache=StageCache(tmp_path / "cache")).run({"source": "ab"})
+
+    upper = _load_function(tmp_path / "upper.py", "text.upper()")
+    first = run(upper)
+    assert calls == ["read", "convert", "write"]
+    before = RunManifest.from_result(first)
+
+    run(upper)
+    assert calls == []
+
+    # 映射表变化：只有使用它的阶段重跑
+    mapping["营业成本"] = 5
+    changed = RunManifest.from_result(run(upper)).changed_inputs(before)
+    assert calls == ["write"]
+    assert changed == {"write": ["<额外依赖>"]}
+
+    # 辅助函数变化：声明它的阶段及输出变化的下游重跑
+    result = run(_load_function(tmp_path / "lower.py", "text.lower()"))
+    assert calls == ["convert", "write"]
+    assert result.values["rows"]["营业成本"] == ("abab", 5)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""科目名称映射：分层匹配、编码冲突、待确认项不写入余额表"""
+
+import pandas as pd
+import pytest
+
+from opencpai_pipeline.subject_mapper import AliasStore, SubjectMapper, standard_name_column
+
+
+@pytest.fixture(scope="module")
+def mapper():
+    return SubjectMapper()
+
+
+@pytest.mark.parametrize("name, code, standard, tier", [
+    ("银行存款", "1002", "银行存款", "exact"),
+    ("银行存款-基本户", "1002", "银行存款", "prefix"),
+    # 缩写：编码对应同一科目时确定，否则待确认
+    ("其他应收", "1221", "其他应收款", "prefix"),
+    ("其他应收", "", "其他应收款", "abbrev"),
+    ("应收帐款", "1122", "应收账款", "fuzzy"),
+    ("", "1601", "固定资产", "code"),
+])
+def test_tiers(mapper, name, code, standard, tier):
+    match = mapper.map_name(name, code)
+    assert (match.standard, match.tier) == (standard, tier)
+
+
+def test_abbreviation_of_contra_account_is_not_confirmed(mapper):
+    # "存货" 是"存货跌价准备"的前缀，但不是同一科目
+    match = mapper.map_name("存货", "1405")
+    assert match.tier == "conflict" and match.tentative
+    assert match.standard == "库存商品"
+    assert "存货跌价准备" in match.candidates
+
+    assert mapper.map_name("存货").tier == "abbrev"
+
+
+def test_code_wins_over_conflicting_fuzzy_match(mapper):
+    match = mapper.map_name("营业收入", "6001")
+    assert match.standard == "主营业务收入"
+    assert match.tier == "conflict" and match.tentative
+    assert "营业外收入" in match.candidates
+
+
+def test_tentative_matches_are_reviewed_and_not_written(mapper):
+    df = pd.DataFrame({
+        "科目编码": ["1002", "100201", "1405", "6001"],
+        "科目名称": ["银行存款", "基本户", "存货", "营业收入"],
+    })
+    result = mapper.map_frame(df)
+    assert result.tier_counts()["conflict"] == 2
+    assert set(result.review_frame()["客户科目名称"]) == {"存货", "营业收入"}
+    assert result.score_ratio == pytest.approx((1 + 0.5 + 0.5) / 3)
+    assert standard_name_column(df, result) == ["银行存款", "银行存款", None, None]
+
+
+def test_alias_store_round_trip(tmp_path):
+    path = tmp_path / "aliases.json"
+    store = AliasStore(path)
+    store.learn("存货", "库存商品")
+    store.save()
+
+    match = SubjectMapper(aliases=AliasStore(path)).map_name("存货", "1405")
+    assert (match.standard, match.tier) == ("库存商品", "alias")
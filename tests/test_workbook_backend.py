@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""工作簿后端：抽象接口、openpyxl区域读写与单元格地址"""
+
+import openpyxl
+import pytest
+
+from opencpai_pipeline.workbook_backend import WorkbookBackend, open_workbook
+
+
+def test_incomplete_backend_fails_on_instantiation():
+    class ReadOnlyBackend(WorkbookBackend):
+        def sheet_names(self):
+            return ["Z3-2"]
+
+        def read_range(self, sheet, first_row, first_col, last_row, last_col):
+            return [[None]]
+
+    with pytest.raises(TypeError, match="write_range"):
+        ReadOnlyBackend()
+
+
+def test_openpyxl_range_and_ref_round_trip(tmp_path):
+    path = tmp_path / "底稿.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.title = "Z10"
+    wb.save(path)
+
+    with open_workbook(path, writable=True) as backend:
+        backend.write_range("Z10", 7, 3, [["有限责任公司", None, "张三"]])
+        backend.write_ref("Z10", "$C$9", "91440300TEST")
+        backend.save()
+
+    with open_workbook(path, read_only=True) as backend:
+        assert backend.has_sheet("Z10") and not backend.has_sheet("Z3-2")
+        assert backend.read_range("Z10", 7, 3, 7, 5) == [["有限责任公司", None, "张三"]]
+        assert backend.read_ref("Z10", "C9") == "91440300TEST"
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""写入计划：区域合并只跨越公式行/已知空行，间隔行原样回写"""
+
+from openpyxl import Workbook
+
+from opencpai_pipeline.workbook_backend import CountingBackend, open_workbook
+from opencpai_pipeline.write_plan import WritePlan
+
+
+def _spans(plan, max_gap):
+    return sorted((b.first_row, b.last_row) for b in plan.blocks(max_gap=max_gap))
+
+
+def test_gaps_merge_only_across_formula_or_empty_rows():
+    plan = WritePlan(skip_rows={"Z3-2": {12}}, empty_rows={"Z3-2": {20, 21}})
+    for row in (10, 11, 13, 19, 22, 30):
+        plan.add("Z3-2", row, 4, row)
+    assert not plan.add("Z3-2", 12, 4, 0)
+
+    # 12为公式行、20/21为空行可跨越；14-18、23-29 未知，不跨越
+    assert _spans(plan, max_gap=20) == [(10, 13), (19, 22), (30, 30)]
+    assert _spans(plan, max_gap=0) == [(10, 11), (13, 13), (19, 19), (22, 22), (30, 30)]
+
+
+def test_commit_rewrites_bridged_formula_row_unchanged(tmp_path):
+    path = tmp_path / "z.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Z3-2"
+    ws["D12"] = "=SUM(D10:D11)"
+    ws["D14"] = "手工"
+    wb.save(path)
+
+    plan = WritePlan(skip_rows={"Z3-2": {12}})
+    for row in (10, 11, 13, 15):
+        plan.add("Z3-2", row, 4, row * 100)
+
+    with open_workbook(path, engine="openpyxl", writable=True) as backend:
+        counting = CountingBackend(backend)
+        assert plan.commit(counting, max_gap=5) == 2
+        assert counting.calls["write_formulas"] == 1
+        values = [backend.read_cell("Z3-2", row, 4) for row in range(10, 16)]
+    assert values == [1000, 1100, "=SUM(D10:D11)", 1300, "手工", 1500]